@@ -20,6 +20,10 @@ class SalesAnalyticsService:
     Comprehensive sales analytics service with advanced reporting capabilities.
     """
 
+    # Months after joining that cohort retention is reported for
+    COHORT_TRACKED_MONTHS = 12
+    COHORT_CACHE_PREFIX = 'analytics:cohort_activity:'
+
     @staticmethod
     def generate_sales_dashboard(date_from: datetime = None, date_to: datetime = None) -> Dict:
         """
@@ -181,71 +185,136 @@ class SalesAnalyticsService:
     def generate_customer_cohort_analysis(months_back: int = 12) -> List[Dict]:
         """
         Generate customer cohort analysis for retention tracking.
+
+        Customers are grouped by the month they joined; for each of the
+        following ``COHORT_TRACKED_MONTHS`` calendar months the share of the
+        cohort that placed an order and the cohort's revenue are reported.
+        Activity is aggregated per order month in one grouped query and
+        pivoted in pandas. Closed months are cached, so only the current
+        month is queried again on repeat requests.
         """
-        from apps.orders.models import Order
+        import pandas as pd
+        from django.db.models.functions import TruncMonth
         from apps.customers.models import CustomerProfile
 
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=months_back * 30)
+        tracked = SalesAnalyticsService.COHORT_TRACKED_MONTHS
+        today = timezone.localdate()
+        current_month = SalesAnalyticsService._month_index(today)
+        first_month = SalesAnalyticsService._month_index(today - timedelta(days=months_back * 30))
+        start_date = date(first_month // 12, first_month % 12 + 1, 1)
 
-        # Get customer acquisition cohorts
         cohorts = CustomerProfile.objects.filter(
-            user__date_joined__gte=start_date,
+            user__date_joined__date__gte=start_date,
             is_deleted=False
-        ).extra(
-            select={
-                'cohort_month': "DATE_TRUNC('month', user.date_joined)"
-            }
+        ).annotate(
+            cohort_month=TruncMonth('user__date_joined')
         ).values('cohort_month').annotate(
             customers_count=Count('id')
         ).order_by('cohort_month')
+        sizes = pd.Series({
+            SalesAnalyticsService._month_index(cohort['cohort_month']): cohort['customers_count']
+            for cohort in cohorts
+        }, dtype='int64')
+        if sizes.empty:
+            return []
 
-        result = []
-        for cohort in cohorts:
-            cohort_month = cohort['cohort_month']
-            customers_in_cohort = CustomerProfile.objects.filter(
-                user__date_joined__gte=cohort_month,
-                user__date_joined__lt=cohort_month + timedelta(days=32),
-                is_deleted=False
-            )
+        activity = SalesAnalyticsService._get_cohort_activity(range(first_month, current_month + 1))
+        frame = pd.DataFrame(activity, columns=['cohort', 'order_month', 'customers', 'revenue'])
+        frame['offset'] = frame['order_month'] - frame['cohort']
+        frame = frame[frame['cohort'].isin(sizes.index) & frame['offset'].between(0, tracked - 1)]
 
-            # Calculate retention rates for each subsequent month
-            retention_rates = {}
-            revenue_per_cohort = {}
+        columns = pd.RangeIndex(tracked)
+        active = frame.pivot_table(
+            index='cohort', columns='offset', values='customers', aggfunc='sum', fill_value=0
+        ).reindex(index=sizes.index, columns=columns, fill_value=0)
+        revenue = frame.pivot_table(
+            index='cohort', columns='offset', values='revenue', aggfunc='sum', fill_value=0
+        ).reindex(index=sizes.index, columns=columns, fill_value=0)
+        retention = (active.to_numpy() * 100 / sizes.to_numpy()[:, None]).round(2)
 
-            for month_offset in range(12):  # Track 12 months
-                period_start = cohort_month + timedelta(days=month_offset * 30)
-                period_end = period_start + timedelta(days=30)
+        result = []
+        for row, (cohort, customers_count) in enumerate(sizes.items()):
+            result.append({
+                'cohort_month': f'{cohort // 12:04d}-{cohort % 12 + 1:02d}',
+                'customers_count': int(customers_count),
+                'retention_rates': {
+                    f'month_{offset}': float(retention[row, offset]) for offset in columns
+                },
+                'revenue_per_cohort': {
+                    f'month_{offset}': round(float(revenue.iat[row, offset]), 2) for offset in columns
+                }
+            })
 
-                # Count customers who made orders in this period
-                active_customers = Order.objects.filter(
-                    customer__in=customers_in_cohort.values_list('user', flat=True),
-                    created_at__range=[period_start, period_end],
-                    is_deleted=False
-                ).exclude(status='cancelled').values('customer').distinct().count()
+        return result
 
-                retention_rate = (active_customers / cohort['customers_count'] * 100) if cohort['customers_count'] > 0 else 0
-                retention_rates[f'month_{month_offset}'] = round(retention_rate, 2)
+    @staticmethod
+    def _month_index(value) -> int:
+        """Return a month as a sortable integer (year * 12 + month - 1)."""
+        return value.year * 12 + value.month - 1
 
-                # Calculate revenue for this cohort in this period
-                cohort_revenue = Order.objects.filter(
-                    customer__in=customers_in_cohort.values_list('user', flat=True),
-                    created_at__range=[period_start, period_end],
-                    is_deleted=False
-                ).exclude(status='cancelled').aggregate(
-                    total=Sum('total_amount')
-                )['total'] or 0
+    @staticmethod
+    def _get_cohort_activity(order_months) -> List[Tuple[int, int, int, float]]:
+        """
+        Return ``(cohort, order_month, active_customers, revenue)`` rows.
 
-                revenue_per_cohort[f'month_{month_offset}'] = float(cohort_revenue)
+        Rows of months that have ended are cached; every month that is not
+        cached, including the current one, is loaded in a single query.
+        """
+        from django.core.cache import cache
+        from django.db.models.functions import TruncMonth
+        from apps.orders.models import Order
 
-            result.append({
-                'cohort_month': cohort_month.strftime('%Y-%m'),
-                'customers_count': cohort['customers_count'],
-                'retention_rates': retention_rates,
-                'revenue_per_cohort': revenue_per_cohort
-            })
+        order_months = list(order_months)
+        current_month = SalesAnalyticsService._month_index(timezone.localdate())
+        keys = {month: f'{SalesAnalyticsService.COHORT_CACHE_PREFIX}{month}' for month in order_months}
+        cached = cache.get_many([keys[month] for month in order_months if month < current_month])
 
-        return result
+        rows = []
+        missing = []
+        for month in order_months:
+            if keys[month] in cached:
+                rows.extend(tuple(row) for row in cached[keys[month]])
+            else:
+                missing.append(month)
+        if not missing:
+            return rows
+
+        first, last = min(missing), max(missing) + 1
+        tracked = SalesAnalyticsService.COHORT_TRACKED_MONTHS
+        earliest_cohort = first - tracked + 1
+        grouped = Order.objects.filter(
+            created_at__date__gte=date(first // 12, first % 12 + 1, 1),
+            created_at__date__lt=date(last // 12, last % 12 + 1, 1),
+            customer__date_joined__date__gte=date(earliest_cohort // 12, earliest_cohort % 12 + 1, 1),
+            customer__customer_profile__is_deleted=False,
+            is_deleted=False
+        ).exclude(status='cancelled').annotate(
+            cohort_month=TruncMonth('customer__date_joined'),
+            order_month=TruncMonth('created_at')
+        ).values('cohort_month', 'order_month').annotate(
+            active_customers=Count('customer', distinct=True),
+            revenue=Sum('total_amount')
+        )
+
+        loaded = {month: [] for month in missing}
+        for item in grouped:
+            order_month = SalesAnalyticsService._month_index(item['order_month'])
+            if order_month in loaded:
+                loaded[order_month].append((
+                    SalesAnalyticsService._month_index(item['cohort_month']),
+                    order_month,
+                    item['active_customers'],
+                    float(item['revenue'] or 0)
+                ))
+
+        timeout = getattr(settings, 'ANALYTICS_COHORT_CACHE_TIMEOUT', 31 * 24 * 3600)
+        cache.set_many(
+            {keys[month]: loaded[month] for month in missing if month < current_month},
+            timeout
+        )
+        for month in missing:
+            rows.extend(loaded[month])
+        return rows
 
     @staticmethod
     def generate_sales_funnel_analysis(date_from: datetime, date_to: datetime) -> List[Dict]:
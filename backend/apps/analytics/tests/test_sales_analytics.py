@@ -1,7 +1,8 @@
 """
 Tests for sales analytics functionality.
 """
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import datetime, timedelta, date
@@ -134,6 +135,27 @@ class SalesAnalyticsServiceTest(TestCase):
             self.assertIn('retention_rates', cohort_data[0])
             self.assertIn('revenue_per_cohort', cohort_data[0])
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_customer_cohort_analysis_caches_closed_months(self):
+        """Test that cohort activity is loaded in one query and closed months are cached."""
+        cache.clear()
+        with self.assertNumQueries(2):
+            cohort_data = SalesAnalyticsService.generate_customer_cohort_analysis(3)
+
+        current_cohort = cohort_data[-1]
+        self.assertEqual(current_cohort['cohort_month'], timezone.localdate().strftime('%Y-%m'))
+        self.assertEqual(current_cohort['retention_rates']['month_0'], 100.0)
+        self.assertGreater(current_cohort['revenue_per_cohort']['month_0'], 0)
+        self.assertEqual(len(current_cohort['retention_rates']), SalesAnalyticsService.COHORT_TRACKED_MONTHS)
+
+        current_month = SalesAnalyticsService._month_index(timezone.localdate())
+        prefix = SalesAnalyticsService.COHORT_CACHE_PREFIX
+        self.assertIsNotNone(cache.get(f'{prefix}{current_month - 1}'))
+        self.assertIsNone(cache.get(f'{prefix}{current_month}'))
+
+        with self.assertNumQueries(2):
+            self.assertEqual(SalesAnalyticsService.generate_customer_cohort_analysis(3), cohort_data)
+
     def test_generate_sales_funnel_analysis(self):
         """Test sales funnel analysis."""
         end_date = timezone.now()
@@ -1,8 +1,8 @@
 import redis
 import memcache
 import hashlib
-import json
 import time
+import zlib
 import logging
 from typing import Any, Optional, Dict, List, Union
 from django.core.cache import cache
@@ -10,15 +10,149 @@ from django.conf import settings
 from django.utils import timezone
 from .models import CacheConfiguration, CacheMetrics, CacheInvalidation
 import threading
-import gzip
-import pickle
+from collections import OrderedDict
 from cryptography.fernet import Fernet
+from .codecs import CacheCodec, DEFAULT_THRESHOLD
+from core.cache_invalidation import scan_delete, unlink_keys, SCAN_BATCH_SIZE
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+# Add a key to each tag set, only ever extending the set's TTL
+REGISTER_TAGS_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+for i = 1, #KEYS do
+    redis.call('SADD', KEYS[i], ARGV[1])
+    if redis.call('TTL', KEYS[i]) < ttl then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return #KEYS
+"""
+
+
+def get_multi_level_cache_settings() -> Dict[str, Any]:
+    """Return codec, L1 tier and memoization settings"""
+    config = getattr(settings, 'MULTI_LEVEL_CACHE', {})
+    return {
+        'serializer': config.get('SERIALIZER', 'pickle'),
+        'compressor': config.get('COMPRESSOR', 'zstd'),
+        'compression_threshold': config.get('COMPRESSION_THRESHOLD', DEFAULT_THRESHOLD),
+        'l1_enabled': config.get('L1_ENABLED', True),
+        'l1_max_entries': config.get('L1_MAX_ENTRIES', 10000),
+        'l1_ttl': config.get('L1_TTL', 30),
+        'l1_max_value_size': config.get('L1_MAX_VALUE_SIZE', 64 * 1024),
+        'l1_key_version_slots': config.get('L1_KEY_VERSION_SLOTS', 1024),
+        'version_check_interval': config.get('VERSION_CHECK_INTERVAL', 1.0),
+        'config_cache_ttl': config.get('CONFIG_CACHE_TTL', 60),
+    }
+
+
+class LocalCacheTier:
+    """
+    Bounded in-process LRU tier in front of the shared cache levels.
+
+    Entries hold the encoded (uncompressed) payload so callers never share
+    mutable objects, and are tagged with a version when stored. An entry is
+    only served while it is younger than its TTL and its version is still
+    current.
+    """
+    
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, cache_key: tuple, version: Any):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return _MISSING
+        expires_at, entry_version, payload = entry
+        if entry_version != version or expires_at <= time.monotonic():
+            with self._lock:
+                self._entries.pop(cache_key, None)
+            return _MISSING
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+        return payload
+    
+    def set(self, cache_key: tuple, payload: bytes, version: Any, ttl: float):
+        with self._lock:
+            self._entries[cache_key] = (time.monotonic() + ttl, version, payload)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, cache_key: tuple):
+        with self._lock:
+            self._entries.pop(cache_key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class NamespacedCacheLevel:
+    """
+    Cache level whose keys carry the cache's namespace version.
+    
+    Memcached and Django cache backends cannot be scanned for a pattern, so
+    pattern invalidation moves them to a new namespace instead; entries in
+    the old one are never read again and expire by TTL.
+    """
+    
+    def __init__(self, client, namespace: int):
+        self.client = client
+        self.namespace = namespace
+    
+    def make_key(self, key: str) -> str:
+        return key if not self.namespace else f"{key}@ns{self.namespace}"
+    
+    def get(self, key: str):
+        return self.client.get(self.make_key(key))
+    
+    def set(self, key: str, value: Any, ttl: int):
+        result = self.client.set(self.make_key(key), value, ttl)
+        # Django's cache.set returns None and raises on failure
+        return True if result is None else result
+    
+    def delete(self, key: str):
+        return self.client.delete(self.make_key(key))
+    
+    def delete_many(self, keys: List[str]):
+        keys = [self.make_key(key) for key in keys]
+        if hasattr(self.client, 'delete_many'):
+            return self.client.delete_many(keys)
+        return self.client.delete_multi(keys)
+
 
 class MultiLevelCacheManager:
-    """Advanced multi-level caching system with Redis, Memcached, and database support"""
+    """
+    Advanced multi-level caching system with Redis, Memcached, and database support.
+    
+    Values are stored as self-describing bytes by ``CacheCodec`` and served
+    from an in-process ``LocalCacheTier`` when possible. Each cache name has
+    a version kept in Redis; pattern and tag invalidations and configuration
+    changes bump it, which drops all of that cache's L1 entries in every
+    process. Sets and deletes only bump the version of the key's slot, one of
+    ``L1_KEY_VERSION_SLOTS`` per cache held in a Redis hash, so they drop the
+    peer L1 copies of that key and the few keys sharing its slot. Processes
+    pick up new versions within ``VERSION_CHECK_INTERVAL`` seconds. Caches
+    with encryption enabled bypass the L1 tier.
+    
+    Keys can be stored under tags, recorded in Redis sets, and invalidated
+    together with ``invalidate_tags``. Pattern invalidation walks Redis with
+    SCAN and UNLINK in batches, and moves the non-Redis levels to a new
+    namespace.
+    """
+    
+    VERSION_KEY_PREFIX = 'cache_version'
+    TAG_KEY_PREFIX = 'cache_tags'
     
     def __init__(self):
         self.redis_client = None
@@ -27,18 +161,33 @@ class MultiLevelCacheManager:
         self._initialize_clients()
         self._metrics_lock = threading.Lock()
         
+        options = get_multi_level_cache_settings()
+        self.codec = CacheCodec(
+            options['serializer'], options['compressor'], options['compression_threshold']
+        )
+        self.l1 = LocalCacheTier(options['l1_max_entries']) if options['l1_enabled'] else None
+        self.l1_ttl = options['l1_ttl']
+        self.l1_max_value_size = options['l1_max_value_size']
+        self.l1_key_version_slots = max(1, options['l1_key_version_slots'])
+        self.version_check_interval = options['version_check_interval']
+        self.config_cache_ttl = options['config_cache_ttl']
+        self._versions = {}
+        self._key_versions = {}
+        self._configs = {}
+        self._register_tags_script = None
+        
     def _initialize_clients(self):
         """Initialize cache clients"""
         try:
             # Redis client
             if hasattr(settings, 'REDIS_URL'):
-                self.redis_client = redis.from_url(settings.REDIS_URL)
+                self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=False)
             else:
                 self.redis_client = redis.Redis(
                     host=getattr(settings, 'REDIS_HOST', 'localhost'),
                     port=getattr(settings, 'REDIS_PORT', 6379),
                     db=getattr(settings, 'REDIS_DB', 0),
-                    decode_responses=True
+                    decode_responses=False  # Values are binary codec payloads
                 )
             
             # Memcached client
@@ -62,6 +211,14 @@ class MultiLevelCacheManager:
             if not config or not config.is_active:
                 return None
             
+            use_l1 = self._uses_l1(config)
+            if use_l1:
+                version = self._l1_version(cache_name, key)
+                payload = self.l1.get((cache_name, key), version)
+                if payload is not _MISSING:
+                    self._record_metrics(cache_name, 'hit', time.time() - start_time)
+                    return self.codec.decode(payload)
+            
             # Try each cache level in order of priority
             cache_levels = self._get_cache_levels(config)
             
@@ -74,6 +231,8 @@ class MultiLevelCacheManager:
                         
                         # Populate higher priority caches
                         self._populate_higher_caches(cache_levels, level_name, key, value, config)
+                        if use_l1:
+                            self._set_l1(cache_name, key, value, config.ttl_seconds, version)
                         
                         return value
                         
@@ -90,8 +249,9 @@ class MultiLevelCacheManager:
             return None
     
     def set(self, key: str, value: Any, cache_name: str = 'default', 
-            ttl: Optional[int] = None, use_compression: bool = True) -> bool:
-        """Set value in cache across all configured levels"""
+            ttl: Optional[int] = None, use_compression: bool = True,
+            tags: Optional[List[str]] = None) -> bool:
+        """Set value in cache across all configured levels, optionally under tags"""
         start_time = time.time()
         
         try:
@@ -111,6 +271,12 @@ class MultiLevelCacheManager:
                     logger.warning(f"Cache level {level_name} set failed: {e}")
             
             if success:
+                if tags:
+                    self._register_tags(cache_name, key, tags, ttl)
+                if self._uses_l1(config):
+                    # Peers drop their copy of the old value
+                    self.bump_key_version(cache_name, key)
+                    self._set_l1(cache_name, key, value, ttl, self._l1_version(cache_name, key))
                 self._record_metrics(cache_name, 'set', time.time() - start_time)
             
             return success
@@ -136,6 +302,11 @@ class MultiLevelCacheManager:
                 except Exception as e:
                     logger.warning(f"Cache level {level_name} delete failed: {e}")
             
+            # Other processes may hold the key in their L1 tier
+            if self.l1 is not None:
+                self.l1.delete((cache_name, key))
+                self.bump_key_version(cache_name, key)
+            
             # Record invalidation
             CacheInvalidation.objects.create(
                 cache_key=key,
@@ -158,19 +329,16 @@ class MultiLevelCacheManager:
                 return 0
             
             deleted_count = 0
-            cache_levels = self._get_cache_levels(config)
             
-            for level_name, client in cache_levels:
+            if self.redis_client and config.cache_type == 'redis':
                 try:
-                    if level_name == 'redis' and self.redis_client:
-                        keys = self.redis_client.keys(pattern)
-                        if keys:
-                            deleted_count += self.redis_client.delete(*keys)
-                    elif level_name == 'django':
-                        # Django cache doesn't support pattern deletion
-                        pass
+                    deleted_count += scan_delete(self.redis_client, pattern)
                 except Exception as e:
-                    logger.warning(f"Pattern invalidation failed for {level_name}: {e}")
+                    logger.warning(f"Pattern invalidation failed for redis: {e}")
+            
+            # Levels that cannot be scanned move to a new namespace
+            self.bump_version(self._namespace_name(cache_name))
+            self.bump_version(cache_name)
             
             # Record invalidation
             CacheInvalidation.objects.create(
@@ -186,6 +354,51 @@ class MultiLevelCacheManager:
             logger.error(f"Pattern invalidation failed: {e}")
             return 0
     
+    def invalidate_tags(self, tags: List[str], cache_name: str = 'default') -> int:
+        """
+        Invalidate every key stored under any of the tags.
+        
+        Tag members are read with SSCAN and deleted from each level in
+        batches. Without Redis the tag sets are unavailable, so the non-Redis
+        levels move to a new namespace instead.
+        """
+        try:
+            config = self._get_cache_config(cache_name)
+            if not config:
+                return 0
+            
+            deleted_count = 0
+            if self.redis_client:
+                cache_levels = self._get_cache_levels(config)
+                for tag in tags:
+                    tag_key = self._tag_key(cache_name, tag)
+                    batch = []
+                    for member in self.redis_client.sscan_iter(tag_key, count=SCAN_BATCH_SIZE):
+                        batch.append(member.decode() if isinstance(member, bytes) else member)
+                        if len(batch) >= SCAN_BATCH_SIZE:
+                            deleted_count += self._delete_batch(cache_levels, batch)
+                            batch = []
+                    if batch:
+                        deleted_count += self._delete_batch(cache_levels, batch)
+                    self.redis_client.unlink(tag_key)
+            else:
+                self.bump_version(self._namespace_name(cache_name))
+            
+            self.bump_version(cache_name)
+            
+            CacheInvalidation.objects.create(
+                cache_key=','.join(tags),
+                cache_name=cache_name,
+                invalidation_type='dependency',
+                reason=f'Tag invalidation: {", ".join(tags)}'
+            )
+            
+            return deleted_count
+            
+        except Exception as e:
+            logger.error(f"Tag invalidation failed for {tags}: {e}")
+            return 0
+    
     def warm_cache(self, cache_name: str, data_loader_func, keys: List[str]) -> Dict[str, bool]:
         """Warm cache with preloaded data"""
         results = {}
@@ -252,24 +465,159 @@ class MultiLevelCacheManager:
             logger.error(f"Failed to get cache stats: {e}")
             return {}
     
+    def bump_version(self, cache_name: str) -> int:
+        """Invalidate every L1 entry for a cache, in this and other processes"""
+        version = self._versions.get(cache_name, (0, 0))[1] + 1
+        if self.redis_client:
+            try:
+                version = int(self.redis_client.incr(f"{self.VERSION_KEY_PREFIX}:{cache_name}"))
+            except Exception as e:
+                logger.warning(f"Failed to bump cache version for {cache_name}: {e}")
+        self._versions[cache_name] = (time.monotonic(), version)
+        return version
+    
+    def bump_key_version(self, cache_name: str, key: str) -> int:
+        """Invalidate L1 entries for a key's version slot, in this and other processes"""
+        slot = self._key_slot(key)
+        checked_at, versions = self._key_versions.get(cache_name, (time.monotonic(), {}))
+        version = versions.get(slot, 0) + 1
+        if self.redis_client:
+            try:
+                version = int(self.redis_client.hincrby(self._key_versions_name(cache_name), slot, 1))
+            except Exception as e:
+                logger.warning(f"Failed to bump key version for {cache_name}: {e}")
+        versions = dict(versions)
+        versions[slot] = version
+        self._key_versions[cache_name] = (checked_at, versions)
+        return version
+    
+    def is_enabled(self, cache_name: str) -> bool:
+        """Whether the cache has an active configuration"""
+        config = self._get_cache_config(cache_name)
+        return bool(config and config.is_active)
+    
+    def invalidate_config(self, cache_name: Optional[str] = None):
+        """Forget memoized configuration, for one cache or all of them"""
+        if cache_name is None:
+            self._configs.clear()
+        else:
+            self._configs.pop(cache_name, None)
+    
+    def _get_version(self, cache_name: str) -> int:
+        """Get the cache's version, re-reading Redis at most once per check interval"""
+        now = time.monotonic()
+        checked_at, version = self._versions.get(cache_name, (None, 0))
+        if checked_at is not None and now - checked_at < self.version_check_interval:
+            return version
+        if self.redis_client:
+            try:
+                version = int(self.redis_client.get(f"{self.VERSION_KEY_PREFIX}:{cache_name}") or 0)
+            except Exception as e:
+                logger.debug(f"Cache version check failed for {cache_name}: {e}")
+        self._versions[cache_name] = (now, version)
+        return version
+    
+    def _get_key_versions(self, cache_name: str) -> Dict[int, int]:
+        """Get the cache's key slot versions, re-reading Redis at most once per check interval"""
+        now = time.monotonic()
+        checked_at, versions = self._key_versions.get(cache_name, (None, {}))
+        if checked_at is not None and now - checked_at < self.version_check_interval:
+            return versions
+        if self.redis_client:
+            try:
+                versions = {
+                    int(slot): int(version)
+                    for slot, version in self.redis_client.hgetall(self._key_versions_name(cache_name)).items()
+                }
+            except Exception as e:
+                logger.debug(f"Key version check failed for {cache_name}: {e}")
+        self._key_versions[cache_name] = (now, versions)
+        return versions
+    
+    def _l1_version(self, cache_name: str, key: str) -> tuple:
+        """Version an L1 entry must carry: the cache's and its key slot's"""
+        slot_version = self._get_key_versions(cache_name).get(self._key_slot(key), 0)
+        return self._get_version(cache_name), slot_version
+    
+    def _key_slot(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % self.l1_key_version_slots
+    
+    def _key_versions_name(self, cache_name: str) -> str:
+        return f"{self.VERSION_KEY_PREFIX}:{cache_name}:keys"
+    
+    def _namespace_name(self, cache_name: str) -> str:
+        return f"{cache_name}:namespace"
+    
+    def _tag_key(self, cache_name: str, tag: str) -> str:
+        return f"{self.TAG_KEY_PREFIX}:{cache_name}:{tag}"
+    
+    def _register_tags(self, cache_name: str, key: str, tags: List[str], ttl: int):
+        """Add a key to its tag sets; a set outlives its newest member"""
+        if not self.redis_client:
+            return
+        try:
+            if self._register_tags_script is None:
+                self._register_tags_script = self.redis_client.register_script(REGISTER_TAGS_SCRIPT)
+            self._register_tags_script(
+                keys=[self._tag_key(cache_name, tag) for tag in tags], args=[key, ttl]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to register tags for key {key}: {e}")
+    
+    def _delete_batch(self, cache_levels: List[tuple], keys: List[str]) -> int:
+        """Delete a batch of keys from every level"""
+        deleted = 0
+        for level_name, client in cache_levels:
+            try:
+                if level_name == 'redis':
+                    deleted += unlink_keys(client, keys)
+                else:
+                    client.delete_many(keys)
+            except Exception as e:
+                logger.warning(f"Batch delete failed for {level_name}: {e}")
+        return deleted
+    
+    def _uses_l1(self, config: CacheConfiguration) -> bool:
+        return self.l1 is not None and not (config.encryption_enabled and self.encryption_key)
+    
+    def _set_l1(self, cache_name: str, key: str, value: Any, ttl: int, version: tuple):
+        try:
+            payload = self.codec.encode(value, compress=False)
+            if len(payload) > self.l1_max_value_size:
+                # Large values would let a few entries dominate process memory
+                self.l1.delete((cache_name, key))
+                return
+            self.l1.set((cache_name, key), payload, version, min(ttl, self.l1_ttl))
+        except Exception as e:
+            logger.warning(f"L1 cache set failed for key {key}: {e}")
+    
     def _get_cache_config(self, cache_name: str) -> Optional[CacheConfiguration]:
-        """Get cache configuration"""
+        """Get cache configuration, memoized for ``CONFIG_CACHE_TTL`` seconds"""
+        now = time.monotonic()
+        memoized = self._configs.get(cache_name)
+        if memoized is not None and memoized[0] > now:
+            return memoized[1]
         try:
-            return CacheConfiguration.objects.get(name=cache_name, is_active=True)
+            config = CacheConfiguration.objects.get(name=cache_name, is_active=True)
         except CacheConfiguration.DoesNotExist:
-            return None
+            config = None
+        if self.config_cache_ttl:
+            self._configs[cache_name] = (now + self.config_cache_ttl, config)
+        return config
     
     def _get_cache_levels(self, config: CacheConfiguration) -> List[tuple]:
         """Get ordered list of cache levels based on configuration"""
         levels = []
         
+        namespace = self._get_version(self._namespace_name(config.name))
+        
         if config.cache_type == 'redis' and self.redis_client:
             levels.append(('redis', self.redis_client))
         elif config.cache_type == 'memcached' and self.memcached_client:
-            levels.append(('memcached', self.memcached_client))
+            levels.append(('memcached', NamespacedCacheLevel(self.memcached_client, namespace)))
         
         # Always include Django cache as fallback
-        levels.append(('django', cache))
+        levels.append(('django', NamespacedCacheLevel(cache, namespace)))
         
         return levels
     
@@ -289,46 +637,28 @@ class MultiLevelCacheManager:
         # Decrypt if needed
         if config.encryption_enabled and self.encryption_key:
             try:
-                value = self.encryption_key.decrypt(value.encode()).decode()
+                value = self.encryption_key.decrypt(value.encode() if isinstance(value, str) else value)
             except Exception as e:
                 logger.warning(f"Decryption failed: {e}")
                 return None
         
-        # Decompress if needed
-        if use_compression and config.compression_enabled:
-            try:
-                if isinstance(value, str):
-                    value = gzip.decompress(value.encode()).decode()
-                else:
-                    value = pickle.loads(gzip.decompress(value))
-            except Exception as e:
-                logger.warning(f"Decompression failed: {e}")
-                return None
-        
-        # Deserialize JSON if it's a string
-        if isinstance(value, str):
-            try:
-                value = json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                pass
-        
-        return value
+        # The payload header records whether and how it was compressed
+        try:
+            return self.codec.decode(value)
+        except Exception as e:
+            logger.warning(f"Cache value decoding failed: {e}")
+            return None
     
     def _set_to_cache(self, client, key: str, value: Any, ttl: int, 
                      config: CacheConfiguration, use_compression: bool) -> bool:
         """Set value to specific cache client"""
         try:
-            # Serialize value
-            if not isinstance(value, str):
-                value = json.dumps(value, default=str)
-            
-            # Compress if needed
-            if use_compression and config.compression_enabled:
-                value = gzip.compress(value.encode()).decode('latin-1')
+            # Serialize, compressing values above the codec's size threshold
+            value = self.codec.encode(value, compress=use_compression and config.compression_enabled)
             
             # Encrypt if needed
             if config.encryption_enabled and self.encryption_key:
-                value = self.encryption_key.encrypt(value.encode()).decode()
+                value = self.encryption_key.encrypt(value)
             
             # Set in cache
             if hasattr(client, 'setex'):
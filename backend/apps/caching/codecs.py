@@ -0,0 +1,166 @@
+"""
+Binary value codecs for the multi-level cache.
+
+A codec turns a value into bytes with a serializer (pickle, msgpack or
+json) and, when the serialized value is at least ``threshold`` bytes, a
+compressor (zstd, lz4, zlib or gzip). Small values are stored as-is since
+compressing them costs more than it saves.
+
+Every payload starts with one header byte recording the serializer and
+compressor used, so values stay readable after the configuration changes.
+Strings written by the previous JSON + gzip/latin-1 format are still
+decoded by ``decode_legacy``.
+
+msgpack, zstandard and lz4 are optional; when a configured one is not
+installed the codec falls back to pickle and zlib respectively.
+"""
+import gzip
+import json
+import logging
+import pickle
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# Header byte: high nibble is the serializer, low nibble the compressor.
+# Ids are part of the stored format and must never be reused.
+SERIALIZER_IDS = {'pickle': 1, 'msgpack': 2, 'json': 3}
+COMPRESSOR_IDS = {'none': 0, 'zlib': 1, 'zstd': 2, 'lz4': 3, 'gzip': 4}
+
+DEFAULT_THRESHOLD = 1024
+
+
+def _msgpack_dumps(value):
+    return msgpack.packb(value, default=str, use_bin_type=True)
+
+
+def _msgpack_loads(data):
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def _json_dumps(value):
+    return json.dumps(value, default=str, separators=(',', ':')).encode()
+
+
+def _json_loads(data):
+    return json.loads(data)
+
+
+def _pickle_dumps(value):
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+SERIALIZERS = {
+    'pickle': (_pickle_dumps, pickle.loads),
+    'msgpack': (_msgpack_dumps, _msgpack_loads),
+    'json': (_json_dumps, _json_loads),
+}
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+COMPRESSORS = {
+    'none': (bytes, bytes),
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+    'zstd': (_zstd_compress, _zstd_decompress),
+    'lz4': (lambda data: lz4_frame.compress(data), lambda data: lz4_frame.decompress(data)),
+    'gzip': (gzip.compress, gzip.decompress),
+}
+
+_AVAILABLE = {
+    'msgpack': msgpack is not None,
+    'zstd': zstandard is not None,
+    'lz4': lz4_frame is not None,
+}
+
+_SERIALIZER_NAMES = {value: name for name, value in SERIALIZER_IDS.items()}
+_COMPRESSOR_NAMES = {value: name for name, value in COMPRESSOR_IDS.items()}
+
+
+class CacheCodec:
+    """
+    Encodes cache values to self-describing bytes and back.
+    """
+
+    def __init__(self, serializer='pickle', compressor='zstd', threshold=DEFAULT_THRESHOLD):
+        if not _AVAILABLE.get(serializer, True):
+            logger.warning(f"Cache serializer {serializer} is not installed, using pickle")
+            serializer = 'pickle'
+        if not _AVAILABLE.get(compressor, True):
+            logger.warning(f"Cache compressor {compressor} is not installed, using zlib")
+            compressor = 'zlib'
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+        if compressor not in COMPRESSORS:
+            raise ValueError(f"Unknown cache compressor: {compressor}")
+
+        self.serializer = serializer
+        self.compressor = compressor
+        self.threshold = threshold
+        self._dumps = SERIALIZERS[serializer][0]
+        self._compress = COMPRESSORS[compressor][0]
+        self._plain_header = bytes([SERIALIZER_IDS[serializer] << 4])
+        self._compressed_header = bytes([SERIALIZER_IDS[serializer] << 4 | COMPRESSOR_IDS[compressor]])
+
+    def encode(self, value, compress=True) -> bytes:
+        data = self._dumps(value)
+        if compress and self.compressor != 'none' and len(data) >= self.threshold:
+            compressed = self._compress(data)
+            if len(compressed) < len(data):
+                return self._compressed_header + compressed
+        return self._plain_header + data
+
+    def decode(self, payload):
+        """Decode a payload written by any codec, or a legacy string value."""
+        if isinstance(payload, str):
+            return decode_legacy(payload)
+        payload = bytes(payload)
+        try:
+            return self._decode_binary(payload)
+        except Exception:
+            # Legacy text read back as bytes; its first character may look like a header
+            return decode_legacy(payload.decode('utf-8'))
+
+    def _decode_binary(self, payload):
+        header = payload[0]
+        serializer = _SERIALIZER_NAMES.get(header >> 4)
+        compressor = _COMPRESSOR_NAMES.get(header & 0x0F)
+        if serializer is None or compressor is None:
+            raise ValueError(f"Unknown cache payload header: {header}")
+        data = payload[1:]
+        if compressor != 'none':
+            data = COMPRESSORS[compressor][1](data)
+        return SERIALIZERS[serializer][1](data)
+
+
+def decode_legacy(value):
+    """Decode a value written as JSON, optionally gzipped into a latin-1 string."""
+    try:
+        value = gzip.decompress(value.encode('latin-1')).decode()
+    except (OSError, EOFError, UnicodeError):
+        pass
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return value
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from apps.caching.cache_manager import LocalCacheTier
+from apps.caching.codecs import CacheCodec, COMPRESSORS, SERIALIZERS, decode_legacy
+import gzip
+import json
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compare bytes stored and time per operation for cache value codecs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Encode/decode round trips per value and codec'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        samples = self._samples()
+        
+        codecs = [('legacy json+gzip', self._legacy_encode, decode_legacy)]
+        for serializer in SERIALIZERS:
+            for compressor in COMPRESSORS:
+                codec = CacheCodec(serializer, compressor)
+                if (codec.serializer, codec.compressor) != (serializer, compressor):
+                    continue  # Optional package not installed
+                codecs.append((f'{serializer}+{compressor}', codec.encode, codec.decode))
+        
+        for sample_name, value in samples.items():
+            self.stdout.write(self.style.SUCCESS(f'\n{sample_name}'))
+            for codec_name, encode, decode in codecs:
+                try:
+                    payload = encode(value)
+                except Exception as e:
+                    self.stdout.write(f'  {codec_name:<24} unsupported: {e}')
+                    continue
+                
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    encode(value)
+                encode_us = (time.perf_counter() - started) / iterations * 1e6
+                
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    decode(payload)
+                decode_us = (time.perf_counter() - started) / iterations * 1e6
+                
+                self.stdout.write(
+                    f'  {codec_name:<24} {len(payload):>8} bytes  '
+                    f'set {encode_us:8.1f}us  get {decode_us:8.1f}us'
+                )
+        
+        self._benchmark_l1(samples, iterations)
+
+    def _legacy_encode(self, value):
+        """The previous MultiLevelCacheManager write path"""
+        if not isinstance(value, str):
+            value = json.dumps(value, default=str)
+        return gzip.compress(value.encode()).decode('latin-1')
+
+    def _benchmark_l1(self, samples, iterations):
+        codec = CacheCodec()
+        tier = LocalCacheTier()
+        self.stdout.write(self.style.SUCCESS('\nL1 tier hit (decode included)'))
+        for sample_name, value in samples.items():
+            tier.set(('benchmark', sample_name), codec.encode(value, compress=False), 0, 60)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                codec.decode(tier.get(('benchmark', sample_name), 0))
+            hit_us = (time.perf_counter() - started) / iterations * 1e6
+            self.stdout.write(f'  {sample_name:<24} get {hit_us:8.1f}us')
+
+    def _samples(self):
+        product = {
+            'id': 1234,
+            'name': 'Wireless Noise Cancelling Headphones',
+            'slug': 'wireless-noise-cancelling-headphones',
+            'price': '199.99',
+            'discount_price': '149.99',
+            'in_stock': True,
+            'rating': 4.6,
+            'tags': ['audio', 'bluetooth', 'travel'],
+        }
+        return {
+            'small dict': {'count': 3, 'status': 'ok'},
+            'product': product,
+            'product list (100)': [dict(product, id=i) for i in range(100)],
+            'html page': {
+                'content': '<div class="product-card">' * 400,
+                'content_type': 'text/html; charset=utf-8',
+                'status_code': 200,
+                'headers': {'Content-Type': 'text/html; charset=utf-8'},
+            },
+        }
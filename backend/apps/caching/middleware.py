@@ -1,25 +1,58 @@
+import hashlib
 import time
 import logging
 from django.utils.deprecation import MiddlewareMixin
 from django.core.cache import cache
+from django.conf import settings
 from django.http import HttpResponse
-from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from .models import CacheMetrics
 from .cache_manager import cache_manager
-import threading
-import json
+from datetime import datetime, timezone as dt_timezone
+from core.metrics_pipeline import HistogramSink, record_value, register_sink
 
 logger = logging.getLogger(__name__)
 
 
+def _write_cache_metrics(series_list):
+    """Write one CacheMetrics row per cache for a flush interval."""
+    rows = []
+    for series in series_list:
+        counters = series.counters
+        hits = counters.get('hit', 0)
+        misses = counters.get('miss', 0)
+        rows.append(CacheMetrics(
+            cache_name=series.key,
+            cache_type='redis',  # Would be detected dynamically
+            timestamp=datetime.fromtimestamp(series.started_at, tz=dt_timezone.utc),
+            hit_count=hits,
+            miss_count=misses,
+            hit_ratio=hits / max(hits + misses, 1),
+            avg_response_time_ms=series.mean,
+            max_response_time_ms=series.max or 0,
+            min_response_time_ms=series.min or 0,
+            get_operations=counters.get('get', 0),
+            set_operations=counters.get('set', 0),
+            delete_operations=counters.get('delete', 0),
+            error_count=counters.get('error', 0)
+        ))
+    CacheMetrics.objects.bulk_create(rows)
+
+
 class CacheMetricsMiddleware(MiddlewareMixin):
-    """Middleware to collect cache performance metrics"""
+    """
+    Middleware to collect cache performance metrics.
+
+    Each response queues its timing and cache operation counts on the
+    shared metrics pipeline; the pipeline's flusher aggregates them and
+    writes one CacheMetrics row per cache per interval.
+    """
+    
+    sink_name = 'caching.cache_metrics'
     
     def __init__(self, get_response):
         super().__init__(get_response)
-        self.metrics_lock = threading.Lock()
-        self.metrics_buffer = []
-        self.buffer_size = 100
+        register_sink(self.sink_name, HistogramSink(_write_cache_metrics))
         
     def process_request(self, request):
         """Start timing the request"""
@@ -38,129 +71,17 @@ class CacheMetricsMiddleware(MiddlewareMixin):
         try:
             if hasattr(request, '_cache_start_time'):
                 response_time = (time.time() - request._cache_start_time) * 1000
+                counters = dict(getattr(request, '_cache_operations', {}))
+                if response.status_code >= 400:
+                    counters['error'] = 1
                 
-                # Collect metrics asynchronously
-                threading.Thread(
-                    target=self._collect_metrics,
-                    args=(request, response, response_time),
-                    daemon=True
-                ).start()
+                # This would typically involve more sophisticated cache name detection
+                record_value(self.sink_name, 'default', response_time, counters)
                 
         except Exception as e:
             logger.error(f"Cache metrics collection failed: {e}")
         
         return response
-    
-    def _collect_metrics(self, request, response, response_time):
-        """Collect and buffer cache metrics"""
-        try:
-            # Get cache operations from request
-            operations = getattr(request, '_cache_operations', {})
-            
-            # Create metrics entry
-            metrics_data = {
-                'timestamp': timezone.now(),
-                'response_time_ms': response_time,
-                'operations': operations,
-                'path': request.path,
-                'method': request.method,
-                'status_code': response.status_code,
-                'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-                'ip_address': self._get_client_ip(request)
-            }
-            
-            # Buffer metrics
-            with self.metrics_lock:
-                self.metrics_buffer.append(metrics_data)
-                
-                # Flush buffer if it's full
-                if len(self.metrics_buffer) >= self.buffer_size:
-                    self._flush_metrics_buffer()
-                    
-        except Exception as e:
-            logger.error(f"Metrics collection failed: {e}")
-    
-    def _flush_metrics_buffer(self):
-        """Flush metrics buffer to database"""
-        try:
-            if not self.metrics_buffer:
-                return
-            
-            # Process buffered metrics
-            buffer_copy = self.metrics_buffer.copy()
-            self.metrics_buffer.clear()
-            
-            # Aggregate metrics by cache name
-            cache_metrics = {}
-            
-            for metrics_data in buffer_copy:
-                # This would typically involve more sophisticated cache name detection
-                cache_name = 'default'  # Simplified for now
-                
-                if cache_name not in cache_metrics:
-                    cache_metrics[cache_name] = {
-                        'cache_name': cache_name,
-                        'cache_type': 'redis',  # Would be detected dynamically
-                        'timestamp': metrics_data['timestamp'],
-                        'hit_count': 0,
-                        'miss_count': 0,
-                        'get_operations': 0,
-                        'set_operations': 0,
-                        'delete_operations': 0,
-                        'response_times': [],
-                        'error_count': 0
-                    }
-                
-                # Aggregate operations
-                ops = metrics_data['operations']
-                cache_metrics[cache_name]['hit_count'] += ops.get('hit', 0)
-                cache_metrics[cache_name]['miss_count'] += ops.get('miss', 0)
-                cache_metrics[cache_name]['get_operations'] += ops.get('get', 0)
-                cache_metrics[cache_name]['set_operations'] += ops.get('set', 0)
-                cache_metrics[cache_name]['delete_operations'] += ops.get('delete', 0)
-                cache_metrics[cache_name]['response_times'].append(metrics_data['response_time_ms'])
-                
-                if metrics_data['status_code'] >= 400:
-                    cache_metrics[cache_name]['error_count'] += 1
-            
-            # Save aggregated metrics
-            for cache_name, metrics in cache_metrics.items():
-                try:
-                    response_times = metrics['response_times']
-                    total_operations = (
-                        metrics['hit_count'] + metrics['miss_count']
-                    )
-                    
-                    CacheMetrics.objects.create(
-                        cache_name=cache_name,
-                        cache_type=metrics['cache_type'],
-                        timestamp=metrics['timestamp'],
-                        hit_count=metrics['hit_count'],
-                        miss_count=metrics['miss_count'],
-                        hit_ratio=metrics['hit_count'] / max(total_operations, 1),
-                        avg_response_time_ms=sum(response_times) / max(len(response_times), 1),
-                        max_response_time_ms=max(response_times) if response_times else 0,
-                        min_response_time_ms=min(response_times) if response_times else 0,
-                        get_operations=metrics['get_operations'],
-                        set_operations=metrics['set_operations'],
-                        delete_operations=metrics['delete_operations'],
-                        error_count=metrics['error_count']
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Failed to save metrics for {cache_name}: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Metrics buffer flush failed: {e}")
-    
-    def _get_client_ip(self, request):
-        """Get client IP address"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
 
 
 class CacheHeadersMiddleware(MiddlewareMixin):
@@ -317,41 +238,88 @@ class CompressionMiddleware(MiddlewareMixin):
         return response
 
 
+def get_page_cache_settings():
+    """Return stale window, lock and size limits for the full-page cache"""
+    config = getattr(settings, 'PAGE_CACHE', {})
+    return {
+        'cache_name': config.get('CACHE_NAME', 'page_cache'),
+        'stale_ttl': config.get('STALE_TTL', 60),
+        'lock_timeout': config.get('LOCK_TIMEOUT', 30),
+        'wait_timeout': config.get('WAIT_TIMEOUT', 1.0),
+        'max_body_size': config.get('MAX_BODY_SIZE', 1024 * 1024),
+        'skip_paths': tuple(config.get('SKIP_PATHS', ('/admin/', '/api/'))),
+    }
+
+
+# Envelope layout: (version, status, headers, body, etag, fresh_until)
+PAGE_ENVELOPE_VERSION = 1
+
+# Headers that describe this response or this client, not the page
+UNCACHED_HEADERS = {'set-cookie', 'x-cache', 'date', 'age', 'connection', 'transfer-encoding'}
+
+
 class CachingMiddleware(MiddlewareMixin):
-    """Advanced caching middleware with intelligent cache management"""
+    """
+    Full-page cache for anonymous GET requests.
+    
+    Pages are stored as a compact envelope holding the status, the response
+    headers and the raw body bytes, so binary and pre-compressed responses
+    round-trip unchanged. Keys follow the response's ``Vary`` headers: the
+    header names learned for a URL are stored next to its pages, as Django's
+    own cache middleware does.
+    
+    Entries stay servable for ``STALE_TTL`` seconds after they expire. The
+    first request to see an expired or missing page takes a short lock and
+    regenerates it; concurrent requests are served the stale copy, or wait
+    up to ``WAIT_TIMEOUT`` seconds for the fresh one, instead of all hitting
+    the view. Cached and freshly generated pages carry an ETag, and matching
+    ``If-None-Match`` requests get a 304.
+    
+    Paths under ``SKIP_PATHS`` are never cached, and the middleware does
+    nothing until the ``CACHE_NAME`` cache configuration exists and is
+    active.
+    """
+    
+    POLL_INTERVAL = 0.05
     
     def __init__(self, get_response):
         super().__init__(get_response)
         self.cache_timeout = 300  # 5 minutes default
         self.cache_key_prefix = 'page_cache'
+        options = get_page_cache_settings()
+        self.cache_name = options['cache_name']
+        self.stale_ttl = options['stale_ttl']
+        self.lock_timeout = options['lock_timeout']
+        self.wait_timeout = options['wait_timeout']
+        self.max_body_size = options['max_body_size']
+        self.skip_paths = options['skip_paths']
         
     def process_request(self, request):
-        """Check if cached response exists"""
+        """Serve a cached page, or arrange for this request to regenerate it"""
         try:
             # Skip caching for certain conditions
-            if self._should_skip_cache(request):
+            if self._should_skip_cache(request) or not cache_manager.is_enabled(self.cache_name):
                 return None
             
-            # Generate cache key
-            cache_key = self._generate_cache_key(request)
+            base_key = self._generate_cache_key(request)
+            request._page_cache_base_key = base_key
             
-            # Try to get cached response
-            cached_response = cache_manager.get(cache_key, 'page_cache')
+            cache_key = self._get_page_key(request, base_key)
+            envelope = cache_manager.get(cache_key, self.cache_name)
             
-            if cached_response:
-                # Reconstruct HttpResponse from cached data
-                response = HttpResponse(
-                    content=cached_response['content'],
-                    content_type=cached_response['content_type'],
-                    status=cached_response['status_code']
-                )
-                
-                # Add cache headers
-                for header, value in cached_response.get('headers', {}).items():
-                    response[header] = value
+            if envelope and envelope[0] == PAGE_ENVELOPE_VERSION:
+                if envelope[5] > time.time():
+                    return self._build_response(request, envelope, 'HIT')
                 
-                response['X-Cache'] = 'HIT'
-                return response
+                # Expired: one request regenerates, the rest get the stale copy
+                if self._acquire_lock(request, cache_key):
+                    return None
+                return self._build_response(request, envelope, 'STALE')
+            
+            if not self._acquire_lock(request, cache_key):
+                envelope = self._wait_for_page(request, base_key)
+                if envelope:
+                    return self._build_response(request, envelope, 'HIT')
                 
         except Exception as e:
             logger.error(f"Cache retrieval failed: {e}")
@@ -361,32 +329,124 @@ class CachingMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
         """Cache response if applicable"""
         try:
-            # Skip caching for certain conditions
-            if self._should_skip_cache(request, response):
+            base_key = getattr(request, '_page_cache_base_key', None)
+            if base_key is None or getattr(response, '_page_cache_served', False):
                 return response
             
-            # Generate cache key
-            cache_key = self._generate_cache_key(request)
-            
-            # Prepare response data for caching
-            cached_data = {
-                'content': response.content.decode('utf-8') if response.content else '',
-                'content_type': response.get('Content-Type', ''),
-                'status_code': response.status_code,
-                'headers': dict(response.items())
-            }
+            if not self._should_skip_cache(request, response):
+                self._store(request, response, base_key)
+                response['X-Cache'] = 'MISS'
             
-            # Cache the response
-            cache_timeout = self._get_cache_timeout(request, response)
-            cache_manager.set(cache_key, cached_data, 'page_cache', cache_timeout)
-            
-            response['X-Cache'] = 'MISS'
+            # A regenerated page can still save the client a download
+            if response.status_code == 200 and response.has_header('ETag'):
+                conditional = get_conditional_response(request, etag=response['ETag'], response=response)
+                if conditional is not response:
+                    return conditional
             
         except Exception as e:
             logger.error(f"Response caching failed: {e}")
+        finally:
+            self._release_lock(request)
+        
+        return response
+    
+    def process_exception(self, request, exception):
+        """Let another request regenerate the page if the view failed"""
+        self._release_lock(request)
+        return None
+    
+    def _store(self, request, response, base_key):
+        """Store the response's status, headers and body bytes"""
+        vary = [header.strip() for header in response.get('Vary', '').split(',') if header.strip()]
+        if '*' in vary:
+            return
+        
+        body = response.content
+        if len(body) > self.max_body_size:
+            return
+        
+        if not response.has_header('ETag'):
+            response['ETag'] = f'"{hashlib.md5(body).hexdigest()}"'
+        
+        headers = [
+            (name, value) for name, value in response.items()
+            if name.lower() not in UNCACHED_HEADERS
+        ]
+        fresh_ttl = self._get_cache_timeout(request, response)
+        envelope = (
+            PAGE_ENVELOPE_VERSION, response.status_code, headers, body,
+            response['ETag'], time.time() + fresh_ttl
+        )
+        
+        ttl = fresh_ttl + self.stale_ttl
+        vary_key = self._vary_key(base_key)
+        cache_manager.set(vary_key, sorted(vary, key=str.lower), self.cache_name, ttl)
+        cache_manager.set(self._page_key(request, base_key, vary), envelope, self.cache_name, ttl)
+    
+    def _build_response(self, request, envelope, cache_status):
+        """Rebuild a response from an envelope, or a 304 if the client has it"""
+        _, status_code, headers, body, etag, fresh_until = envelope
+        
+        conditional = get_conditional_response(request, etag=etag)
+        if conditional is not None:
+            response = conditional
+            for name, value in headers:
+                if name.lower() in ('cache-control', 'expires', 'vary', 'content-location'):
+                    response[name] = value
+            response['ETag'] = etag
+        else:
+            response = HttpResponse(content=body, status=status_code)
+            for name, value in headers:
+                response[name] = value
         
+        response['X-Cache'] = cache_status
+        response._page_cache_served = True
         return response
     
+    def _get_page_key(self, request, base_key):
+        """Look up the Vary headers learned for this URL and build the page key"""
+        vary = cache_manager.get(self._vary_key(base_key), self.cache_name)
+        return self._page_key(request, base_key, vary or [])
+    
+    def _vary_key(self, base_key):
+        return f"{self.cache_key_prefix}:vary:{base_key}"
+    
+    def _page_key(self, request, base_key, vary):
+        """Key for the page variant selected by the request's Vary header values"""
+        digest = hashlib.md5()
+        for header in vary:
+            meta_key = 'HTTP_' + header.upper().replace('-', '_')
+            digest.update(f"{header.lower()}={request.META.get(meta_key, '')}|".encode())
+        return f"{self.cache_key_prefix}:page:{base_key}:{digest.hexdigest()}"
+    
+    def _acquire_lock(self, request, cache_key):
+        """Single-flight lock so only one worker regenerates a page"""
+        lock_key = f"{cache_key}:lock"
+        if cache.add(lock_key, 1, self.lock_timeout):
+            request._page_cache_lock = lock_key
+            return True
+        return False
+    
+    def _release_lock(self, request):
+        lock_key = getattr(request, '_page_cache_lock', None)
+        if lock_key:
+            request._page_cache_lock = None
+            try:
+                cache.delete(lock_key)
+            except Exception as e:
+                logger.warning(f"Failed to release page cache lock: {e}")
+    
+    def _wait_for_page(self, request, base_key):
+        """Wait briefly for the worker holding the lock to store the page"""
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            # The page may vary on headers that were unknown before it was stored
+            envelope = cache_manager.get(self._get_page_key(request, base_key), self.cache_name)
+            if envelope and envelope[0] == PAGE_ENVELOPE_VERSION:
+                return envelope
+        return None
+    
     def _should_skip_cache(self, request, response=None):
         """Determine if caching should be skipped"""
         # Skip for authenticated users
@@ -397,33 +457,30 @@ class CachingMiddleware(MiddlewareMixin):
         if request.method != 'GET':
             return True
         
-        # Skip for admin and API endpoints
-        if request.path.startswith('/admin/') or request.path.startswith('/api/'):
+        # Skip for admin, API and monitoring endpoints
+        if request.path.startswith(self.skip_paths):
             return True
         
-        # Skip if response has errors (when processing response)
-        if response and response.status_code >= 400:
+        if response is None:
+            return False
+        
+        # Only successful, complete, shareable responses are cached
+        if response.status_code != 200 or response.streaming:
             return True
         
-        # Skip if response has cache-control no-cache
-        if response and 'no-cache' in response.get('Cache-Control', ''):
+        cache_control = response.get('Cache-Control', '')
+        if any(directive in cache_control for directive in ('no-cache', 'no-store', 'private')):
+            return True
+        
+        # Responses setting cookies belong to one client
+        if response.cookies:
             return True
         
         return False
     
     def _generate_cache_key(self, request):
-        """Generate cache key for request"""
-        import hashlib
-        
-        key_parts = [
-            self.cache_key_prefix,
-            request.path,
-            request.GET.urlencode(),
-            request.META.get('HTTP_ACCEPT_LANGUAGE', ''),
-            request.META.get('HTTP_ACCEPT_ENCODING', '')
-        ]
-        
-        key_string = '|'.join(key_parts)
+        """Generate the base cache key for a URL"""
+        key_string = f"{request.get_host()}|{request.get_full_path()}"
         return hashlib.md5(key_string.encode()).hexdigest()
     
     def _get_cache_timeout(self, request, response):
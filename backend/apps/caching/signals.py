@@ -20,10 +20,12 @@ def cache_configuration_changed(sender, instance, created, **kwargs):
         else:
             logger.info(f"Cache configuration updated: {instance.name}")
         
+        cache_manager.invalidate_config(instance.name)
+        
         # Invalidate related cache entries if configuration changed
         if not created:
-            # This would typically invalidate cache entries for this configuration
             logger.info(f"Invalidating cache entries for {instance.name}")
+            cache_manager.bump_version(instance.name)
             
         # Trigger health check for the cache
         if instance.is_active:
@@ -56,6 +58,7 @@ def cache_configuration_deleted(sender, instance, **kwargs):
     """Handle cache configuration deletion"""
     try:
         logger.info(f"Cache configuration deleted: {instance.name}")
+        cache_manager.invalidate_config(instance.name)
         
         # Clean up related data
         CacheMetrics.objects.filter(cache_name=instance.name).delete()
@@ -4,6 +4,7 @@ from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from unittest.mock import patch, MagicMock
+from django.http import HttpResponse
 import json
 import time
 
@@ -11,12 +12,21 @@ from .models import (
     CacheConfiguration, CacheMetrics, CacheInvalidation,
     CacheWarming, CacheAlert, CacheOptimization
 )
-from .cache_manager import MultiLevelCacheManager
+from .cache_manager import MultiLevelCacheManager, LocalCacheTier
+from .codecs import CacheCodec
 from .optimization import CacheOptimizer
 from .cdn_integration import CDNManager
+from core.tests.fakes import FakeRedis
 
 User = get_user_model()
 
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'caching-page-cache-tests',
+    }
+}
+
 
 class CacheConfigurationModelTest(TestCase):
     """Test CacheConfiguration model"""
@@ -124,7 +134,17 @@ class MultiLevelCacheManagerTest(TestCase):
         
         result = self.cache_manager.set('test_key', 'test_value', 'test_cache')
         self.assertTrue(result)
-    
+
+    @patch('apps.caching.cache_manager.cache')
+    def test_django_cache_set_counts_as_success(self, mock_cache):
+        """Test that a Django cache set, which returns None, is a successful write"""
+        mock_cache.set.return_value = None
+        self.cache_manager.redis_client = None
+
+        result = self.cache_manager.set('test_key', 'test_value', 'test_cache')
+        self.assertTrue(result)
+        mock_cache.set.assert_called_once()
+
     @patch('apps.caching.cache_manager.cache')
     def test_cache_delete_success(self, mock_cache):
         """Test cache delete operation"""
@@ -147,6 +167,183 @@ class MultiLevelCacheManagerTest(TestCase):
         self.assertIn('key3', results)
 
 
+class CacheCodecTest(TestCase):
+    """Test cache value codecs"""
+    
+    def test_round_trip_and_threshold(self):
+        """Test that values round trip and only large values are compressed"""
+        codec = CacheCodec('pickle', 'zlib', threshold=100)
+        small = {'status': 'ok'}
+        large = {'items': list(range(500))}
+        
+        self.assertEqual(codec.decode(codec.encode(small)), small)
+        self.assertEqual(codec.decode(codec.encode(large)), large)
+        self.assertEqual(codec.encode(small)[0] & 0x0F, 0)
+        self.assertNotEqual(codec.encode(large)[0] & 0x0F, 0)
+        self.assertEqual(codec.encode(large, compress=False)[0] & 0x0F, 0)
+    
+    def test_reads_other_codecs_and_legacy_values(self):
+        """Test that the payload header, not the configuration, selects the decoder"""
+        import gzip
+        
+        value = {'name': 'product', 'tags': ['a'] * 300}
+        writer = CacheCodec('json', 'gzip', threshold=10)
+        reader = CacheCodec('pickle', 'zlib')
+        self.assertEqual(reader.decode(writer.encode(value)), value)
+        
+        legacy = gzip.compress(json.dumps(value).encode()).decode('latin-1')
+        self.assertEqual(reader.decode(legacy), value)
+        self.assertEqual(reader.decode(legacy.encode()), value)
+        self.assertEqual(reader.decode(b'"plain"'), 'plain')
+
+
+class LocalCacheTierTest(TestCase):
+    """Test the in-process L1 cache tier"""
+    
+    def test_version_ttl_and_size_bounds(self):
+        """Test that stale versions, expired and least recently used entries are dropped"""
+        tier = LocalCacheTier(max_entries=2)
+        tier.set(('c', 'a'), b'1', version=1, ttl=60)
+        tier.set(('c', 'b'), b'2', version=1, ttl=60)
+        
+        self.assertEqual(tier.get(('c', 'a'), 1), b'1')
+        self.assertIsNot(tier.get(('c', 'a'), 2), b'1')
+        
+        tier.set(('c', 'a'), b'1', version=1, ttl=60)
+        tier.set(('c', 'c'), b'3', version=1, ttl=60)
+        self.assertEqual(len(tier), 2)
+        self.assertIsNot(tier.get(('c', 'b'), 1), b'2')
+        
+        tier.set(('c', 'd'), b'4', version=1, ttl=0)
+        self.assertIsNot(tier.get(('c', 'd'), 1), b'4')
+
+
+@override_settings(MULTI_LEVEL_CACHE={'VERSION_CHECK_INTERVAL': 60})
+class MultiLevelCacheManagerL1Test(TestCase):
+    """Test L1 tier and configuration memoization in MultiLevelCacheManager"""
+    
+    def setUp(self):
+        CacheConfiguration.objects.create(
+            name='l1_cache', cache_type='redis', ttl_seconds=3600, is_active=True
+        )
+        self.cache_manager = MultiLevelCacheManager()
+        self.cache_manager.redis_client = None
+    
+    @patch('apps.caching.cache_manager.cache')
+    def test_hits_are_served_from_l1(self, mock_cache):
+        """Test that a set value is read back without touching shared levels"""
+        mock_cache.set.return_value = True
+        value = {'id': 1, 'price': '9.99'}
+        
+        self.assertTrue(self.cache_manager.set('product:1', value, 'l1_cache'))
+        result = self.cache_manager.get('product:1', 'l1_cache')
+        
+        self.assertEqual(result, value)
+        mock_cache.get.assert_not_called()
+        
+        # Callers get a copy, so mutating it does not change the cached value
+        result['price'] = '0.00'
+        self.assertEqual(self.cache_manager.get('product:1', 'l1_cache'), value)
+    
+    @patch('apps.caching.cache_manager.cache')
+    def test_version_bump_invalidates_l1(self, mock_cache):
+        """Test that invalidation drops L1 entries for the cache"""
+        mock_cache.set.return_value = True
+        mock_cache.get.return_value = None
+        self.cache_manager.set('product:1', {'id': 1}, 'l1_cache')
+        
+        self.cache_manager.bump_version('l1_cache')
+        
+        self.assertIsNone(self.cache_manager.get('product:1', 'l1_cache'))
+        mock_cache.get.assert_called_once_with('product:1')
+    
+    @override_settings(MULTI_LEVEL_CACHE={'VERSION_CHECK_INTERVAL': 0})
+    @patch('apps.caching.cache_manager.cache')
+    def test_set_and_delete_invalidate_peer_l1_by_key(self, mock_cache):
+        """Test that a write in one process drops only that key's L1 copy in another"""
+        mock_cache.set.return_value = True
+        mock_cache.get.return_value = None
+        shared = FakeRedis()
+        writer = MultiLevelCacheManager()
+        reader = MultiLevelCacheManager()
+        writer.redis_client = reader.redis_client = shared
+        for key in ('product:1', 'product:2'):
+            reader.set(key, {'key': key, 'price': '1.00'}, 'l1_cache')
+        self.assertNotEqual(reader._key_slot('product:1'), reader._key_slot('product:2'))
+        
+        writer.set('product:1', {'key': 'product:1', 'price': '2.00'}, 'l1_cache')
+        
+        self.assertIsNone(reader.get('product:1', 'l1_cache'))
+        self.assertEqual(reader.get('product:2', 'l1_cache'), {'key': 'product:2', 'price': '1.00'})
+        self.assertIsNone(shared.get('cache_version:l1_cache'))
+        
+        writer.delete('product:2', 'l1_cache')
+        self.assertIsNone(reader.get('product:2', 'l1_cache'))
+    
+    def test_config_lookup_is_memoized(self):
+        """Test that configuration is read from the database once"""
+        self.cache_manager.get('missing', 'l1_cache')
+        with self.assertNumQueries(0):
+            self.cache_manager.get('missing', 'l1_cache')
+        
+        self.cache_manager.invalidate_config('l1_cache')
+        with self.assertNumQueries(1):
+            self.cache_manager._get_cache_config('l1_cache')
+
+
+class MultiLevelCacheInvalidationTest(TestCase):
+    """Test pattern and tag invalidation in MultiLevelCacheManager"""
+    
+    def setUp(self):
+        CacheConfiguration.objects.create(
+            name='invalidation_cache', cache_type='redis', ttl_seconds=3600, is_active=True
+        )
+        self.cache_manager = MultiLevelCacheManager()
+        self.cache_manager.redis_client = None
+        self.cache_manager.l1 = None
+    
+    def test_pattern_invalidation_scans_instead_of_keys(self):
+        """Test that Redis keys are found with SCAN and unlinked in a pipeline"""
+        redis_client = MagicMock()
+        redis_client.get.return_value = None
+        redis_client.incr.return_value = 1
+        redis_client.scan_iter.return_value = iter(['invalidation_cache:1', 'invalidation_cache:2'])
+        redis_client.pipeline.return_value.execute.return_value = [1, 1]
+        self.cache_manager.redis_client = redis_client
+        
+        deleted = self.cache_manager.invalidate_pattern('invalidation_cache:*', 'invalidation_cache')
+        
+        self.assertEqual(deleted, 2)
+        redis_client.keys.assert_not_called()
+        self.assertEqual(redis_client.pipeline.return_value.unlink.call_count, 2)
+    
+    def test_pattern_invalidation_reaches_django_level(self):
+        """Test that the Django cache level no longer keeps invalidated values"""
+        self.cache_manager.set('invalidation_cache:1', {'id': 1}, 'invalidation_cache')
+        self.assertEqual(self.cache_manager.get('invalidation_cache:1', 'invalidation_cache'), {'id': 1})
+        
+        self.cache_manager.invalidate_pattern('invalidation_cache:*', 'invalidation_cache')
+        
+        self.assertIsNone(self.cache_manager.get('invalidation_cache:1', 'invalidation_cache'))
+    
+    def test_tag_invalidation_deletes_tagged_keys(self):
+        """Test that tagged keys are removed from every level via their tag set"""
+        redis_client = MagicMock()
+        redis_client.get.return_value = None
+        redis_client.incr.return_value = 1
+        redis_client.sscan_iter.return_value = iter([b'product:1', b'product:2'])
+        redis_client.pipeline.return_value.execute.return_value = [1, 1]
+        self.cache_manager.redis_client = redis_client
+        
+        with patch('apps.caching.cache_manager.cache') as mock_cache:
+            deleted = self.cache_manager.invalidate_tags(['category:5'], 'invalidation_cache')
+        
+        self.assertEqual(deleted, 2)
+        redis_client.sscan_iter.assert_called_once_with('cache_tags:invalidation_cache:category:5', count=1000)
+        mock_cache.delete_many.assert_called_once_with(['product:1', 'product:2'])
+        redis_client.unlink.assert_called_once_with('cache_tags:invalidation_cache:category:5')
+
+
 class CacheOptimizerTest(TestCase):
     """Test CacheOptimizer"""
     
@@ -525,6 +722,131 @@ class CacheMiddlewareTest(TestCase):
         self.assertIsNotNone(middleware)
 
 
+@override_settings(CACHES=LOCMEM_CACHE)
+class PageCacheMiddlewareTest(TestCase):
+    """Test the full-page CachingMiddleware"""
+    
+    def setUp(self):
+        from django.contrib.auth.models import AnonymousUser
+        from django.core.cache import cache
+        from django.test import RequestFactory
+        from .cache_manager import cache_manager
+        
+        CacheConfiguration.objects.create(
+            name='page_cache', cache_type='redis', ttl_seconds=300, is_active=True
+        )
+        cache_manager.invalidate_config('page_cache')
+        redis_patch = patch.object(cache_manager, 'redis_client', None)
+        redis_patch.start()
+        self.addCleanup(redis_patch.stop)
+        self.addCleanup(cache.clear)
+        cache.clear()
+        if cache_manager.l1 is not None:
+            cache_manager.l1.clear()
+            self.addCleanup(cache_manager.l1.clear)
+        
+        self.factory = RequestFactory()
+        self.anonymous = AnonymousUser()
+        self.calls = 0
+    
+    def _middleware(self, body=b'\x1f\x8b\x08binary', **headers):
+        from .middleware import CachingMiddleware
+        
+        def view(request):
+            self.calls += 1
+            response = HttpResponse(body, content_type='application/octet-stream')
+            response['Cache-Control'] = 'public, max-age=60'
+            for name, value in headers.items():
+                response[name] = value
+            return response
+        
+        return CachingMiddleware(view)
+    
+    def _get(self, middleware, path='/catalog/', **extra):
+        request = self.factory.get(path, **extra)
+        request.user = self.anonymous
+        return middleware(request)
+    
+    def test_binary_body_and_headers_are_preserved(self):
+        """Test that cached pages keep raw bytes and response headers"""
+        middleware = self._middleware(**{'X-Catalog-Version': '7'})
+        
+        first = self._get(middleware)
+        second = self._get(middleware)
+        
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, b'\x1f\x8b\x08binary')
+        self.assertEqual(second['Content-Type'], 'application/octet-stream')
+        self.assertEqual(second['X-Catalog-Version'], '7')
+        self.assertEqual(self.calls, 1)
+    
+    def test_matching_etag_gets_not_modified(self):
+        """Test that conditional requests for a cached page get a 304"""
+        middleware = self._middleware()
+        etag = self._get(middleware)['ETag']
+        
+        response = self._get(middleware, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_pages_vary_on_response_vary_headers(self):
+        """Test that each Vary header value gets its own cached page"""
+        middleware = self._middleware(Vary='Accept-Language')
+        
+        self._get(middleware, HTTP_ACCEPT_LANGUAGE='en')
+        self._get(middleware, HTTP_ACCEPT_LANGUAGE='fr')
+        response = self._get(middleware, HTTP_ACCEPT_LANGUAGE='en')
+        
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(response['X-Cache'], 'HIT')
+    
+    def test_expired_page_is_regenerated_by_one_request(self):
+        """Test that while one request holds the lock others are served stale"""
+        from django.core.cache import cache
+        
+        middleware = self._middleware()
+        self._get(middleware)
+        
+        # Past the 60s max-age but within the 60s stale window
+        later = time.time() + 90
+        with patch('apps.caching.middleware.time.time', return_value=later):
+            # Simulate another worker already regenerating the page
+            with patch.object(cache, 'add', return_value=False):
+                stale = self._get(middleware)
+            regenerated = self._get(middleware)
+        
+        self.assertEqual(stale['X-Cache'], 'STALE')
+        self.assertEqual(regenerated['X-Cache'], 'MISS')
+        self.assertEqual(self.calls, 2)
+    
+    def test_skipped_paths_and_inactive_cache_are_not_cached(self):
+        """Test that monitoring pages and a disabled page cache always reach the view"""
+        from .cache_manager import cache_manager
+        
+        middleware = self._middleware()
+        middleware.skip_paths = ('/health/',)
+        self._get(middleware, path='/health/')
+        self._get(middleware, path='/health/')
+        self.assertEqual(self.calls, 2)
+        
+        CacheConfiguration.objects.filter(name='page_cache').update(is_active=False)
+        cache_manager.invalidate_config('page_cache')
+        response = self._get(middleware)
+        self._get(middleware)
+        self.assertEqual(self.calls, 4)
+        self.assertFalse(response.has_header('X-Cache'))
+    
+    def test_cookies_and_private_responses_are_not_cached(self):
+        """Test that per-client responses are never stored"""
+        middleware = self._middleware(**{'Cache-Control': 'private'})
+        self._get(middleware)
+        self._get(middleware)
+        self.assertEqual(self.calls, 2)
+
+
 class CacheSignalsTest(TestCase):
     """Test cache signals"""
     
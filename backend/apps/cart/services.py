@@ -232,6 +232,30 @@ class CartService:
         
         return True, "Coupon removed"
     
+    @staticmethod
+    def evaluate_promotions(cart, channel='website'):
+        """
+        Price the cart against every promotion it is eligible for.
+        Returns the subtotal, discount, free shipping flag and applied promotions.
+        """
+        from apps.customers.models import CustomerProfile
+        from apps.promotions.engine import get_promotion_engine
+        
+        items = [
+            {
+                'product_id': item.product_id,
+                'category_id': item.product.category_id,
+                'quantity': item.quantity,
+                'unit_price': item.custom_price or item.product.effective_price,
+            }
+            for item in cart.items.select_related('product')
+        ]
+        customer = None
+        if cart.user_id:
+            customer = CustomerProfile.objects.filter(user_id=cart.user_id).first()
+        
+        return get_promotion_engine().evaluate_cart(items, customer=customer, channel=channel)
+    
     @staticmethod
     def clean_abandoned_carts(days=30):
         """
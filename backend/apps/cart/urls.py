@@ -24,6 +24,7 @@ urlpatterns = [
     path('saved-items/', views.SavedItemsView.as_view(), name='saved-items'),
     path('apply-coupon/', views.ApplyCouponView.as_view(), name='apply-coupon'),
     path('remove-coupon/', views.RemoveCouponView.as_view(), name='remove-coupon'),
+    path('promotions/', views.CartPromotionsView.as_view(), name='cart-promotions'),
     
     # Legacy APIView URLs (keeping for backward compatibility)
     path('legacy/', views.CartView.as_view(), name='legacy-cart'),
@@ -342,6 +342,33 @@ class ApplyCouponView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CartPromotionsView(APIView):
+    """
+    View for pricing the cart against active promotions.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        # Get cart based on user or session
+        session_key = request.session.session_key
+        cart = CartService.get_or_create_cart(
+            user=request.user if request.user.is_authenticated else None,
+            session_key=session_key
+        )
+        
+        if not cart:
+            return Response({
+                'message': 'No cart found',
+                'success': False
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        channel = request.query_params.get('channel', 'website')
+        return Response({
+            'promotions': CartService.evaluate_promotions(cart, channel=channel),
+            'success': True
+        })
+
+
 class RemoveCouponView(APIView):
     """
     View for removing coupon from cart.
@@ -1,11 +1,19 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
-from .models import ChatRoom, Message
+from .models import ChatRoom
+from .persistence import get_chat_writer
 
 User = get_user_model()
 
+
+def user_in_room(user, room_id) -> bool:
+    """Whether ``user`` may read and post in chat room ``room_id``."""
+    if user.is_staff or user.is_superuser:
+        return ChatRoom.objects.filter(id=room_id, is_active=True).exists()
+    return ChatRoom.objects.filter(id=room_id, is_active=True, participants=user).exists()
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
@@ -26,6 +34,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        
+        # Store this socket's messages before it goes away
+        await get_chat_writer().flush()
     
     # Receive message from WebSocket
     async def receive(self, text_data):
@@ -33,14 +44,15 @@ class ChatConsumer(AsyncWebsocketConsumer):
         message = text_data_json['message']
         user_id = text_data_json['user_id']
         
-        # Save message to database
-        await self.save_message(user_id, message)
+        # Queue the message for storage; it is written in the next batch
+        await get_chat_writer().add(self.room_id, user_id, message)
         
         # Send message to room group
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'chat_message',
+                'room_id': self.room_id,
                 'message': message,
                 'user_id': user_id,
                 'timestamp': text_data_json.get('timestamp', None)
@@ -59,16 +71,3 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'user_id': user_id,
             'timestamp': timestamp
         }))
-    
-    @database_sync_to_async
-    def save_message(self, user_id, message_text):
-        try:
-            user = User.objects.get(id=user_id)
-            room = ChatRoom.objects.get(id=self.room_id)
-            Message.objects.create(
-                room=room,
-                user=user,
-                content=message_text
-            )
-        except (User.DoesNotExist, ChatRoom.DoesNotExist):
-            pass  # Handle error appropriately
\ No newline at end of file
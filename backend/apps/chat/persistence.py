@@ -0,0 +1,150 @@
+"""
+Write-behind persistence for chat messages.
+
+Consumers hand messages to ``ChatMessageWriter.add`` and broadcast them
+straight away; the writer stores what has accumulated with one
+``bulk_create`` every ``CHAT_WRITE_INTERVAL`` seconds, or as soon as
+``CHAT_WRITE_BATCH_SIZE`` messages are waiting. Messages are inserted in
+the order they were added, so ``created_at`` ordering is kept within a
+worker.
+
+Rows are not checked one by one before writing. If a batch is rejected
+(a room or user that does not exist), the ids are checked with one query
+each and the batch is written again without the invalid rows. If the
+database is unavailable the batch is kept for the next flush, up to
+``CHAT_MAX_PENDING`` messages; beyond that the oldest are dropped and
+logged. Messages still buffered when a worker is killed are lost, so
+consumers flush when a socket disconnects.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, transaction
+
+from .models import ChatRoom, Message
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def get_chat_writer_settings():
+    """Return flush interval, batch size and backlog cap for chat writes."""
+    config = getattr(settings, 'REALTIME_GATEWAY', {})
+    return {
+        'interval': config.get('CHAT_WRITE_INTERVAL', 0.5),
+        'batch_size': config.get('CHAT_WRITE_BATCH_SIZE', 200),
+        'max_pending': config.get('CHAT_MAX_PENDING', 10000),
+    }
+
+
+class ChatMessageWriter:
+    """
+    Buffers chat messages and stores them in batches.
+
+    The buffer is guarded by a thread lock rather than an asyncio lock, so
+    one writer can be shared by every consumer in the process whatever
+    event loop it runs on.
+    """
+
+    def __init__(self):
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def add(self, room_id, user_id, content: str):
+        """Queue a message for storage."""
+        try:
+            room_id = ChatRoom._meta.pk.to_python(room_id)
+            user_id = User._meta.pk.to_python(user_id)
+        except ValidationError:
+            logger.warning(f"Ignoring chat message with invalid room {room_id!r} or user {user_id!r}")
+            return
+
+        config = get_chat_writer_settings()
+        with self._lock:
+            self._pending.append({'room_id': room_id, 'user_id': user_id, 'content': content})
+            overflow = len(self._pending) - config['max_pending']
+            if overflow > 0:
+                del self._pending[:overflow]
+            size = len(self._pending)
+        if overflow > 0:
+            logger.error(f"Chat write backlog full; dropped {overflow} unsaved messages")
+
+        if size >= config['batch_size']:
+            await self.flush()
+        else:
+            self._schedule(config['interval'])
+
+    def _schedule(self, interval: float):
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and not self._timer.done() and self._timer.get_loop() is loop:
+            return
+        self._timer = loop.create_task(self._flush_later(interval))
+
+    async def _flush_later(self, interval: float):
+        await asyncio.sleep(interval)
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Store every queued message; returns how many were written."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        try:
+            return await database_sync_to_async(self.write)(rows)
+        except DatabaseError as e:
+            logger.error(f"Error storing {len(rows)} chat messages, retrying on next flush: {str(e)}")
+            with self._lock:
+                self._pending[:0] = rows
+            self._schedule(get_chat_writer_settings()['interval'])
+            return 0
+
+    def write(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert ``rows``, dropping those whose room or user does not exist."""
+        messages = [Message(**row) for row in rows]
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(messages)
+            return len(messages)
+        except IntegrityError:
+            pass
+
+        room_ids = set(ChatRoom.objects.filter(
+            id__in={row['room_id'] for row in rows}
+        ).values_list('id', flat=True))
+        user_ids = set(User.objects.filter(
+            id__in={row['user_id'] for row in rows}
+        ).values_list('id', flat=True))
+        valid = [
+            message for message in messages
+            if message.room_id in room_ids and message.user_id in user_ids
+        ]
+        if len(valid) < len(messages):
+            logger.warning(f"Dropped {len(messages) - len(valid)} chat messages for unknown rooms or users")
+        Message.objects.bulk_create(valid)
+        return len(valid)
+
+
+_writer: Optional[ChatMessageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_chat_writer() -> ChatMessageWriter:
+    """Return the process-wide chat message writer."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ChatMessageWriter()
+    return _writer
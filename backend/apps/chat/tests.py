@@ -2,12 +2,13 @@ import json
 from channels.testing import WebsocketCommunicator
 from channels.layers import get_channel_layer
 from channels.db import database_sync_to_async
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from ecommerce_project.asgi import application
 from .models import ChatRoom, Message
+from .persistence import ChatMessageWriter
 
 User = get_user_model()
 
@@ -123,4 +124,54 @@ class ChatConsumerTest(TransactionTestCase):
         
         # Close connections
         await communicator1.disconnect()
-        await communicator2.disconnect()
\ No newline at end of file
+        await communicator2.disconnect()
+
+
+@override_settings(REALTIME_GATEWAY={'CHAT_WRITE_INTERVAL': 60, 'CHAT_WRITE_BATCH_SIZE': 3})
+class ChatMessageWriterTest(TransactionTestCase):
+    """
+    Test case for write-behind storage of chat messages.
+    """
+    
+    async def create_room(self):
+        self.user = await database_sync_to_async(User.objects.create_user)(
+            username='writer',
+            email='writer@example.com',
+            password='password123'
+        )
+        self.room = await database_sync_to_async(ChatRoom.objects.create)(
+            name='Writer Room',
+            room_type='CUSTOMER_SUPPORT'
+        )
+    
+    async def test_messages_are_stored_in_batches(self):
+        """Test that messages wait in the buffer until the batch is full."""
+        await self.create_room()
+        writer = ChatMessageWriter()
+        
+        await writer.add(str(self.room.id), str(self.user.id), 'first')
+        await writer.add(str(self.room.id), str(self.user.id), 'second')
+        self.assertEqual(await database_sync_to_async(Message.objects.count)(), 0)
+        
+        await writer.add(str(self.room.id), str(self.user.id), 'third')
+        
+        contents = await database_sync_to_async(
+            lambda: list(Message.objects.order_by('id').values_list('content', flat=True))
+        )()
+        self.assertEqual(contents, ['first', 'second', 'third'])
+        self.assertEqual(writer.pending, 0)
+    
+    async def test_messages_for_unknown_rooms_are_dropped(self):
+        """Test that one bad row does not lose the rest of the batch."""
+        await self.create_room()
+        writer = ChatMessageWriter()
+        
+        await writer.add(str(self.room.id), str(self.user.id), 'kept')
+        await writer.add('999999', str(self.user.id), 'dropped')
+        written = await writer.flush()
+        
+        self.assertEqual(written, 1)
+        contents = await database_sync_to_async(
+            lambda: list(Message.objects.values_list('content', flat=True))
+        )()
+        self.assertEqual(contents, ['kept'])
@@ -0,0 +1,382 @@
+"""
+Streaming bulk import engine for ``DataImportJob``.
+
+The file is read record by record (see ``readers``) and handled in chunks
+of ``job.batch_size`` rows:
+
+* each chunk is transformed and coerced to model instances, optionally on
+  a process pool (``DATA_IMPORT['WORKERS']``) while the previous chunk is
+  being written;
+* instances are written with ``bulk_create``. With ``update_existing`` rows
+  are upserted on the model's natural key, using ``update_conflicts`` where
+  the database supports it and ``bulk_update`` of the rows that already
+  exist otherwise. With ``skip_duplicates`` conflicting rows are ignored;
+* a chunk the database rejects is retried row by row in savepoints, so one
+  bad row fails alone;
+* the job's counters are saved in the same transaction as the chunk, so
+  ``processed_records`` is an exact checkpoint. A failed or cancelled job
+  started again continues after the last committed chunk.
+
+Bulk writes do not call ``Model.save()`` or send ``pre_save``/``post_save``.
+"""
+import itertools
+import json
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import DataImportJob
+from .readers import iter_file_records
+from .services import DataImportService, DataTransformationService
+
+logger = logging.getLogger(__name__)
+
+MODE_INSERT = 'insert'
+MODE_SKIP = 'skip'
+MODE_UPSERT = 'upsert'
+
+
+def get_import_settings():
+    """Return process pool size and error log limits for imports."""
+    config = getattr(settings, 'DATA_IMPORT', {})
+    return {
+        'workers': config.get('WORKERS', 0),
+        'max_logged_errors': config.get('MAX_LOGGED_ERRORS', 1000),
+        'max_validation_errors': config.get('MAX_VALIDATION_ERRORS', 1000),
+    }
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def build_instance(model, record: Dict[str, Any]):
+    """
+    Build an unsaved ``model`` instance from a record, converting each
+    value with its field's ``to_python``.
+
+    Raises ``ValueError`` for unknown fields and ``ValidationError`` for
+    values the field cannot convert.
+    """
+    instance = model()
+    for name, value in record.items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError(f"Unknown field '{name}'")
+        if not field.concrete:
+            raise ValueError(f"Field '{name}' cannot be imported")
+        if value == '' and field.null:
+            value = None
+        setattr(instance, field.attname, field.to_python(value) if value is not None else None)
+    return instance
+
+
+def prepare_chunk(model_label: str, rows: List[Tuple[int, Dict[str, Any]]],
+                  transformation_rules: Dict) -> Tuple[List[Tuple[int, Any]], List[Dict[str, Any]]]:
+    """
+    Transform ``(row number, record)`` pairs and build model instances.
+
+    Returns the instances with their row numbers and the errors of rows
+    that could not be built. Runs in pool workers, so it only takes
+    picklable arguments and does not touch the database.
+    """
+    model = apps.get_model(model_label)
+    records = [record for _, record in rows]
+    if transformation_rules:
+        records = DataTransformationService().transform_data(records, transformation_rules)
+
+    instances = []
+    errors = []
+    for (row_number, _), record in zip(rows, records):
+        try:
+            instances.append((row_number, build_instance(model, record)))
+        except (ValueError, ValidationError) as e:
+            # Excel cells may hold dates; the error log is a JSONField
+            errors.append({'row': row_number, 'record': json.loads(json.dumps(record, default=str)),
+                           'error': _error_text(e)})
+    return instances, errors
+
+
+def _error_text(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return '; '.join(error.messages)
+    return str(error)
+
+
+def natural_key_fields(model, field_names: Iterable[str], configured: Optional[List[str]] = None) -> List[str]:
+    """
+    Fields identifying an existing row for upserts.
+
+    ``configured`` (``mapping_config['natural_key']``) wins. Otherwise the
+    first unique constraint, ``unique_together`` or unique field fully
+    covered by the imported fields is used, then the primary key.
+    """
+    if configured:
+        return list(configured)
+
+    opts = model._meta
+    available = set()
+    for name in field_names:
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        available.add(field.name)
+
+    candidates = [constraint.fields for constraint in opts.total_unique_constraints]
+    candidates.extend(opts.unique_together)
+    candidates.extend((field.name,) for field in opts.local_concrete_fields if field.unique and not field.primary_key)
+    for fields in candidates:
+        if set(fields) <= available:
+            return list(fields)
+    if opts.pk.name in available:
+        return [opts.pk.name]
+    return []
+
+
+class BulkWriter:
+    """
+    Writes chunks of instances for one model in one import mode.
+    """
+
+    def __init__(self, model, mode: str, field_names: Iterable[str], natural_key: Optional[List[str]] = None):
+        self.model = model
+        self.mode = mode
+        opts = model._meta
+        self.natural_key = natural_key or []
+        key_attnames = {opts.get_field(name).attname for name in self.natural_key}
+        # Unknown columns are reported per row by build_instance
+        fields = {field for field in opts.concrete_fields if field.name in field_names or field.attname in field_names}
+        fields.update(field for field in opts.concrete_fields if getattr(field, 'auto_now', False))
+        self.update_fields = sorted(
+            field.name for field in fields
+            if not field.primary_key and field.attname not in key_attnames
+        )
+        if mode == MODE_UPSERT and not self.natural_key:
+            raise ValueError(
+                f"Updating existing {opts.label} rows needs a natural key; set mapping_config['natural_key']"
+            )
+        self.use_update_conflicts = (
+            mode == MODE_UPSERT and bool(self.update_fields) and
+            connection.features.supports_update_conflicts_with_target
+        )
+
+    def write(self, instances: List[Tuple[int, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Write ``(row number, instance)`` pairs; returns how many were
+        written and the errors of rows that were not.
+
+        Must run inside a transaction.
+        """
+        if not instances:
+            return 0, []
+        unique = self._dedupe(instances)
+        # Rows superseded by a later row for the same key count as written
+        superseded = len(instances) - len(unique)
+        try:
+            with transaction.atomic():
+                self._write([instance for _, instance in unique])
+            return len(instances), []
+        except (DatabaseError, ValueError, ValidationError) as e:
+            logger.info(f"Bulk write of {len(unique)} {self.model._meta.label} rows failed, retrying row by row: {e}")
+
+        written = superseded
+        errors = []
+        for row_number, instance in unique:
+            try:
+                with transaction.atomic():
+                    self._write([instance])
+                written += 1
+            except (DatabaseError, ValueError, ValidationError) as e:
+                errors.append({'row': row_number, 'error': _error_text(e)})
+        return written, errors
+
+    def _key(self, instance) -> tuple:
+        return tuple(getattr(instance, self.model._meta.get_field(name).attname) for name in self.natural_key)
+
+    def _dedupe(self, instances: List[Tuple[int, Any]]) -> List[Tuple[int, Any]]:
+        # A row may only be upserted once per statement; the last occurrence wins
+        if self.mode != MODE_UPSERT:
+            return instances
+        latest = {}
+        for row_number, instance in instances:
+            latest[self._key(instance)] = (row_number, instance)
+        return list(latest.values())
+
+    def _write(self, objs: List[Any]):
+        if self.mode == MODE_SKIP:
+            self.model.objects.bulk_create(objs, ignore_conflicts=True)
+        elif self.mode == MODE_UPSERT and self.use_update_conflicts:
+            self.model.objects.bulk_create(
+                objs, update_conflicts=True, unique_fields=self.natural_key, update_fields=self.update_fields
+            )
+        elif self.mode == MODE_UPSERT:
+            self._create_or_update(objs)
+        else:
+            self.model.objects.bulk_create(objs)
+
+    def _create_or_update(self, objs: List[Any]):
+        opts = self.model._meta
+        lookup = {
+            f"{name}__in": {getattr(obj, opts.get_field(name).attname) for obj in objs}
+            for name in self.natural_key
+        }
+        attnames = [opts.get_field(name).attname for name in self.natural_key]
+        existing = {
+            tuple(row[1:]): row[0]
+            for row in self.model.objects.filter(**lookup).values_list(opts.pk.attname, *attnames)
+        }
+
+        to_create = []
+        to_update = []
+        for obj in objs:
+            pk = existing.get(self._key(obj))
+            if pk is None:
+                to_create.append(obj)
+                continue
+            obj.pk = pk
+            obj._state.adding = False
+            for field in opts.concrete_fields:
+                if getattr(field, 'auto_now', False):
+                    field.pre_save(obj, add=False)
+            to_update.append(obj)
+
+        if to_create:
+            self.model.objects.bulk_create(to_create)
+        if to_update and self.update_fields:
+            self.model.objects.bulk_update(to_update, self.update_fields)
+
+
+def _bounded_map(executor: Optional[ProcessPoolExecutor], fn: Callable, items: Iterable, window: int) -> Iterator:
+    # Keep at most ``window`` chunks in flight so memory stays bounded
+    if executor is None:
+        for item in items:
+            yield fn(*item)
+        return
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, *item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class ImportEngine:
+    """
+    Runs a ``DataImportJob`` from its last checkpoint.
+    """
+
+    def __init__(self, job: DataImportJob, service: Optional[DataImportService] = None):
+        self.job = job
+        self.service = service or DataImportService()
+        self.config = get_import_settings()
+        self.model = apps.get_model(job.content_type.app_label, job.content_type.model)
+
+    @property
+    def mode(self) -> str:
+        if self.job.update_existing:
+            return MODE_UPSERT
+        if self.job.skip_duplicates:
+            return MODE_SKIP
+        return MODE_INSERT
+
+    def run(self):
+        """Validate (on first run) and import the job's file."""
+        job = self.job
+        if job.status == 'cancelled':
+            return
+        resuming = job.processed_records > 0
+        job.status = 'processing'
+        job.started_at = job.started_at if resuming else timezone.now()
+        job.processing_log.append({
+            'event': 'resumed' if resuming else 'started',
+            'from_row': job.processed_records,
+            'at': timezone.now().isoformat(),
+        })
+        job.save(update_fields=['status', 'started_at', 'processing_log'])
+
+        if not resuming:
+            validation_results = self.service.validate_import_data(job)
+            job.validation_errors = validation_results['errors']
+            job.total_records = validation_results['total_records']
+            if not validation_results['is_valid']:
+                job.status = 'failed'
+                job.completed_at = timezone.now()
+                job.save(update_fields=['validation_errors', 'total_records', 'status', 'completed_at'])
+                return
+            job.save(update_fields=['validation_errors', 'total_records'])
+
+        if self._import():
+            job.status = 'completed'
+            job.progress_percentage = 100
+            job.completed_at = timezone.now()
+            job.save(update_fields=['status', 'progress_percentage', 'completed_at'])
+
+    def _rows(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # Row numbers are 1-based; rows before the checkpoint are skipped
+        records = iter_file_records(self.job.file_path, self.job.file_format)
+        return itertools.islice(enumerate(records, start=1), self.job.processed_records, None)
+
+    def _import(self) -> bool:
+        job = self.job
+        rows = self._rows()
+        first_chunk = list(itertools.islice(rows, job.batch_size))
+        if not first_chunk:
+            return True
+
+        field_names = set()
+        for _, record in first_chunk:
+            field_names.update(record)
+        natural_key = natural_key_fields(self.model, field_names, job.mapping_config.get('natural_key'))
+        writer = BulkWriter(self.model, self.mode, field_names, natural_key)
+
+        chunks = itertools.chain([first_chunk], chunked(rows, job.batch_size))
+        tasks = ((self.model._meta.label, chunk, job.transformation_rules) for chunk in chunks)
+        workers = self.config['workers']
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        try:
+            for instances, errors in _bounded_map(executor, prepare_chunk, tasks, window=max(workers, 1) * 2):
+                if self._is_cancelled():
+                    logger.info(f"Import job {job.id} cancelled at row {job.processed_records}")
+                    return False
+                self._commit_chunk(writer, instances, errors)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        return True
+
+    def _is_cancelled(self) -> bool:
+        return DataImportJob.objects.filter(pk=self.job.pk, status='cancelled').exists()
+
+    def _commit_chunk(self, writer: BulkWriter, instances: List[Tuple[int, Any]], errors: List[Dict[str, Any]]):
+        job = self.job
+        with transaction.atomic():
+            written, write_errors = writer.write(instances)
+            processed = len(instances) + len(errors)
+            errors = errors + write_errors
+
+            job.processed_records += processed
+            job.successful_records += written
+            job.failed_records += len(errors)
+            room = self.config['max_logged_errors'] - len(job.error_log)
+            if room > 0 and errors:
+                job.error_log.extend(sorted(errors, key=lambda error: error['row'])[:room])
+            if job.total_records:
+                job.progress_percentage = min(100, int(job.processed_records * 100 / job.total_records))
+            job.save(update_fields=[
+                'processed_records', 'successful_records', 'failed_records', 'error_log', 'progress_percentage'
+            ])
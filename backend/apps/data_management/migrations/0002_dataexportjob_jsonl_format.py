@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-16 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_management", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dataexportjob",
+            name="export_format",
+            field=models.CharField(
+                choices=[
+                    ("csv", "CSV"),
+                    ("excel", "Excel"),
+                    ("json", "JSON"),
+                    ("jsonl", "JSON Lines"),
+                    ("xml", "XML"),
+                    ("yaml", "YAML"),
+                    ("pdf", "PDF"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
@@ -91,6 +91,7 @@ class DataExportJob(models.Model):
         ('csv', 'CSV'),
         ('excel', 'Excel'),
         ('json', 'JSON'),
+        ('jsonl', 'JSON Lines'),
         ('xml', 'XML'),
         ('yaml', 'YAML'),
         ('pdf', 'PDF'),
@@ -0,0 +1,141 @@
+"""
+Streaming readers for import files.
+
+Each reader takes a binary file object and yields one ``dict`` per record,
+so an import never holds more than the records it is currently working on.
+CSV, JSON lines and XML are read incrementally. A JSON document holding an
+array is streamed with ``ijson`` when it is installed. Excel is streamed with
+``openpyxl``'s read-only mode when it is installed. YAML, and JSON arrays
+without ``ijson``, are loaded whole.
+"""
+import csv
+import io
+import json
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator
+
+import yaml
+from django.core.files.storage import default_storage
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+def iter_csv_records(file) -> Iterator[Dict[str, Any]]:
+    """Yield CSV rows as dicts keyed by the header row."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    for row in csv.DictReader(text):
+        yield dict(row)
+
+
+def iter_json_records(file) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records from JSON lines, a JSON array or a single JSON object.
+    """
+    first_line = file.readline()
+    try:
+        first = json.loads(first_line) if first_line.strip() else None
+    except ValueError:
+        first = None
+
+    if isinstance(first, dict):
+        # JSON lines: one object per line
+        yield first
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    file.seek(0)
+    if ijson is not None and first_line.lstrip().startswith(b'['):
+        yield from ijson.items(file, 'item')
+        return
+
+    data = json.load(file)
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict):
+        yield data
+    else:
+        raise ValueError("Invalid JSON format")
+
+
+def iter_excel_records(file) -> Iterator[Dict[str, Any]]:
+    """Yield rows of the first worksheet as dicts keyed by the header row."""
+    if openpyxl is None:
+        import pandas as pd
+        yield from pd.read_excel(file).to_dict('records')
+        return
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(name) if name is not None else '' for name in header]
+        for row in rows:
+            if any(value is not None for value in row):
+                yield dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def iter_xml_records(file) -> Iterator[Dict[str, Any]]:
+    """Yield each child of the root element as a dict of its children's text."""
+    depth = 0
+    root = None
+    for event, element in ET.iterparse(file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield {child.tag: child.text for child in element}
+            # Drop parsed records so the tree does not grow with the file
+            root.clear()
+
+
+def iter_yaml_records(file) -> Iterator[Dict[str, Any]]:
+    """Yield records from a YAML list or single mapping."""
+    data = yaml.safe_load(file)
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict):
+        yield data
+    else:
+        raise ValueError("Invalid YAML format")
+
+
+READERS = {
+    'csv': iter_csv_records,
+    'excel': iter_excel_records,
+    'json': iter_json_records,
+    'xml': iter_xml_records,
+    'yaml': iter_yaml_records,
+}
+
+
+def iter_file_records(file_path: str, file_format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Open ``file_path`` in the default storage and yield its records.
+
+    The file stays open until the generator is exhausted or closed.
+    """
+    reader = READERS.get(file_format)
+    if reader is None:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    if not default_storage.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    with default_storage.open(file_path, 'rb') as file:
+        yield from reader(file)
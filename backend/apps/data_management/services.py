@@ -1,10 +1,5 @@
 import os
-import csv
-import json
-import yaml
-import xml.etree.ElementTree as ET
-import pandas as pd
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from django.apps import apps
 from django.core.files.storage import default_storage
 from django.contrib.contenttypes.models import ContentType
@@ -17,6 +12,8 @@ from .models import (
     DataImportJob, DataExportJob, DataMapping, DataSyncJob,
     DataBackup, DataAuditLog, DataQualityRule, DataLineage
 )
+from .readers import iter_file_records
+from core.streaming_export import export_filename, iter_queryset, write_export
 
 logger = logging.getLogger(__name__)
 
@@ -64,27 +61,32 @@ class DataImportService:
             raise
     
     def validate_import_data(self, job: DataImportJob) -> Dict[str, Any]:
-        """Validate import data before processing"""
+        """
+        Validate import data before processing.
+
+        The file is streamed; at most ``DATA_IMPORT['MAX_VALIDATION_ERRORS']``
+        errors are returned, but every record is counted.
+        """
+        max_errors = getattr(settings, 'DATA_IMPORT', {}).get('MAX_VALIDATION_ERRORS', 1000)
         try:
-            # Read data from file
-            data = self._read_file_data(job.file_path, job.file_format)
-            
             # Apply validation rules
             validation_results = {
                 'is_valid': True,
                 'errors': [],
                 'warnings': [],
-                'total_records': len(data),
+                'total_records': 0,
                 'valid_records': 0,
                 'invalid_records': 0
             }
             
-            for i, record in enumerate(data):
-                record_errors = self._validate_record(record, job.validation_rules)
+            for i, record in enumerate(iter_file_records(job.file_path, job.file_format)):
+                validation_results['total_records'] += 1
+                record_errors = self._validate_record(record, job.validation_rules) if job.validation_rules else []
                 if record_errors:
+                    room = max_errors - len(validation_results['errors'])
                     validation_results['errors'].extend([
                         {'row': i + 1, 'field': error['field'], 'message': error['message']}
-                        for error in record_errors
+                        for error in record_errors[:max(room, 0)]
                     ])
                     validation_results['invalid_records'] += 1
                 else:
@@ -106,76 +108,13 @@ class DataImportService:
             }
     
     def _read_file_data(self, file_path: str, file_format: str) -> List[Dict]:
-        """Read data from file based on format"""
+        """Read all records from a file; imports stream with ``iter_file_records`` instead"""
         try:
-            if not default_storage.exists(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-            
-            with default_storage.open(file_path, 'rb') as file:
-                if file_format == 'csv':
-                    return self._read_csv_data(file)
-                elif file_format == 'excel':
-                    return self._read_excel_data(file)
-                elif file_format == 'json':
-                    return self._read_json_data(file)
-                elif file_format == 'xml':
-                    return self._read_xml_data(file)
-                elif file_format == 'yaml':
-                    return self._read_yaml_data(file)
-                else:
-                    raise ValueError(f"Unsupported file format: {file_format}")
-                    
+            return list(iter_file_records(file_path, file_format))
         except Exception as e:
             logger.error(f"Error reading file data: {str(e)}")
             raise
     
-    def _read_csv_data(self, file) -> List[Dict]:
-        """Read CSV data"""
-        data = []
-        reader = csv.DictReader(file.read().decode('utf-8').splitlines())
-        for row in reader:
-            data.append(dict(row))
-        return data
-    
-    def _read_excel_data(self, file) -> List[Dict]:
-        """Read Excel data"""
-        df = pd.read_excel(file)
-        return df.to_dict('records')
-    
-    def _read_json_data(self, file) -> List[Dict]:
-        """Read JSON data"""
-        data = json.load(file)
-        if isinstance(data, list):
-            return data
-        elif isinstance(data, dict):
-            return [data]
-        else:
-            raise ValueError("Invalid JSON format")
-    
-    def _read_xml_data(self, file) -> List[Dict]:
-        """Read XML data"""
-        tree = ET.parse(file)
-        root = tree.getroot()
-        data = []
-        
-        for item in root:
-            record = {}
-            for child in item:
-                record[child.tag] = child.text
-            data.append(record)
-        
-        return data
-    
-    def _read_yaml_data(self, file) -> List[Dict]:
-        """Read YAML data"""
-        data = yaml.safe_load(file)
-        if isinstance(data, list):
-            return data
-        elif isinstance(data, dict):
-            return [data]
-        else:
-            raise ValueError("Invalid YAML format")
-    
     def _validate_record(self, record: Dict, validation_rules: Dict) -> List[Dict]:
         """Validate a single record against rules"""
         errors = []
@@ -244,7 +183,7 @@ class DataExportService:
     """Service for handling data export operations"""
     
     def __init__(self):
-        self.supported_formats = ['csv', 'excel', 'json', 'xml', 'yaml', 'pdf']
+        self.supported_formats = ['csv', 'excel', 'json', 'jsonl', 'xml', 'yaml']
     
     def create_export_job(self, user, **kwargs) -> DataExportJob:
         """Create a new export job"""
@@ -277,109 +216,66 @@ class DataExportService:
             logger.error(f"Error creating export job: {str(e)}")
             raise
     
+    def build_export_rows(self, job: DataExportJob) -> Tuple[List[str], Iterator[Dict]]:
+        """
+        Return the column names and a lazy iterator over the rows of an export.
+
+        Rows are read in chunks (see ``core.streaming_export.iter_queryset``)
+        and mapped one at a time, so nothing holds the whole result.
+        """
+        # Get model class
+        model_class = apps.get_model(job.content_type.app_label, job.content_type.model)
+        
+        # Build queryset with filters
+        queryset = model_class.objects.all()
+        
+        if job.filter_criteria:
+            queryset = queryset.filter(**job.filter_criteria)
+        
+        if job.sort_criteria:
+            queryset = queryset.order_by(*job.sort_criteria)
+        
+        rows = iter_queryset(queryset.values())
+        
+        # Apply field mapping
+        if job.field_mapping:
+            return list(job.field_mapping.values()), self._apply_field_mapping(rows, job.field_mapping)
+        
+        return [field.attname for field in model_class._meta.concrete_fields], rows
+    
     def generate_export_file(self, job: DataExportJob) -> str:
         """Generate export file"""
         try:
-            # Get model class
-            model_class = apps.get_model(job.content_type.app_label, job.content_type.model)
-            
-            # Build queryset with filters
-            queryset = model_class.objects.all()
-            
-            if job.filter_criteria:
-                queryset = queryset.filter(**job.filter_criteria)
-            
-            if job.sort_criteria:
-                queryset = queryset.order_by(*job.sort_criteria)
-            
-            # Get data
-            data = list(queryset.values())
-            
-            # Apply field mapping
-            if job.field_mapping:
-                data = self._apply_field_mapping(data, job.field_mapping)
-            
-            # Generate file
-            file_path = self._generate_file(data, job)
+            headers, rows = self.build_export_rows(job)
+            
+            timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+            filename = export_filename(f"{job.name}_{timestamp}", job.export_format, job.compress_output)
+            
+            result = write_export(
+                rows,
+                job.export_format,
+                f"exports/{filename}",
+                headers=headers,
+                include_headers=job.include_headers,
+                compress=job.compress_output
+            )
+            job.exported_records = result['rows']
+            job.total_records = result['rows']
             
-            return file_path
+            return result['file_path']
             
         except Exception as e:
             logger.error(f"Error generating export file: {str(e)}")
             raise
     
-    def _apply_field_mapping(self, data: List[Dict], field_mapping: Dict) -> List[Dict]:
-        """Apply field mapping to data"""
-        mapped_data = []
-        
+    def _apply_field_mapping(self, data: Iterable[Dict], field_mapping: Dict) -> Iterator[Dict]:
+        """Apply field mapping to data, one record at a time"""
         for record in data:
             mapped_record = {}
             for source_field, target_field in field_mapping.items():
                 if source_field in record:
                     mapped_record[target_field] = record[source_field]
-            mapped_data.append(mapped_record)
-        
-        return mapped_data
-    
-    def _generate_file(self, data: List[Dict], job: DataExportJob) -> str:
-        """Generate file based on format"""
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{job.name}_{timestamp}.{job.export_format}"
-        file_path = f"exports/{filename}"
-        
-        if job.export_format == 'csv':
-            self._generate_csv_file(data, file_path, job.include_headers)
-        elif job.export_format == 'excel':
-            self._generate_excel_file(data, file_path, job.include_headers)
-        elif job.export_format == 'json':
-            self._generate_json_file(data, file_path)
-        elif job.export_format == 'xml':
-            self._generate_xml_file(data, file_path)
-        elif job.export_format == 'yaml':
-            self._generate_yaml_file(data, file_path)
-        
-        return file_path
-    
-    def _generate_csv_file(self, data: List[Dict], file_path: str, include_headers: bool):
-        """Generate CSV file"""
-        if not data:
-            return
-        
-        with default_storage.open(file_path, 'w') as file:
-            writer = csv.DictWriter(file, fieldnames=data[0].keys())
-            if include_headers:
-                writer.writeheader()
-            writer.writerows(data)
-    
-    def _generate_excel_file(self, data: List[Dict], file_path: str, include_headers: bool):
-        """Generate Excel file"""
-        df = pd.DataFrame(data)
-        with default_storage.open(file_path, 'wb') as file:
-            df.to_excel(file, index=False, header=include_headers)
-    
-    def _generate_json_file(self, data: List[Dict], file_path: str):
-        """Generate JSON file"""
-        with default_storage.open(file_path, 'w') as file:
-            json.dump(data, file, indent=2, default=str)
-    
-    def _generate_xml_file(self, data: List[Dict], file_path: str):
-        """Generate XML file"""
-        root = ET.Element('data')
-        
-        for record in data:
-            item = ET.SubElement(root, 'item')
-            for key, value in record.items():
-                field = ET.SubElement(item, key)
-                field.text = str(value) if value is not None else ''
-        
-        tree = ET.ElementTree(root)
-        with default_storage.open(file_path, 'wb') as file:
-            tree.write(file, encoding='utf-8', xml_declaration=True)
-    
-    def _generate_yaml_file(self, data: List[Dict], file_path: str):
-        """Generate YAML file"""
-        with default_storage.open(file_path, 'w') as file:
-            yaml.dump(data, file, default_flow_style=False)
+            yield mapped_record
 
 
 class DataTransformationService:
@@ -539,79 +435,25 @@ class DataQualityService:
 # Celery tasks for asynchronous processing
 @shared_task
 def process_import_job(job_id: str):
-    """Process import job asynchronously"""
+    """
+    Process import job asynchronously.
+
+    Jobs that already committed rows continue from their checkpoint; see
+    ``importer.ImportEngine``.
+    """
+    from .importer import ImportEngine
+    
+    job = None
     try:
         job = DataImportJob.objects.get(id=job_id)
-        job.status = 'processing'
-        job.started_at = timezone.now()
-        job.save()
-        
-        service = DataImportService()
-        
-        # Validate data
-        validation_results = service.validate_import_data(job)
-        job.validation_errors = validation_results['errors']
-        job.total_records = validation_results['total_records']
-        job.save()
-        
-        if not validation_results['is_valid']:
-            job.status = 'failed'
-            job.completed_at = timezone.now()
-            job.save()
-            return
-        
-        # Process data in batches
-        data = service._read_file_data(job.file_path, job.file_format)
-        
-        # Apply transformations
-        if job.transformation_rules:
-            transformation_service = DataTransformationService()
-            data = transformation_service.transform_data(data, job.transformation_rules)
-        
-        # Import data
-        model_class = apps.get_model(job.content_type.app_label, job.content_type.model)
-        
-        batch_size = job.batch_size
-        total_batches = (len(data) + batch_size - 1) // batch_size
-        
-        for batch_num in range(total_batches):
-            start_idx = batch_num * batch_size
-            end_idx = min((batch_num + 1) * batch_size, len(data))
-            batch_data = data[start_idx:end_idx]
-            
-            # Process batch
-            for record in batch_data:
-                try:
-                    # Create or update record
-                    if job.update_existing:
-                        # Try to find existing record and update
-                        # Implementation depends on specific model requirements
-                        pass
-                    else:
-                        # Create new record
-                        model_class.objects.create(**record)
-                    
-                    job.successful_records += 1
-                    
-                except Exception as e:
-                    job.failed_records += 1
-                    job.error_log.append({
-                        'record': record,
-                        'error': str(e)
-                    })
-                
-                job.processed_records += 1
-            
-            # Update progress
-            job.progress_percentage = int((job.processed_records / job.total_records) * 100)
-            job.save()
-        
-        job.status = 'completed'
-        job.completed_at = timezone.now()
-        job.save()
+        ImportEngine(job).run()
         
     except Exception as e:
         logger.error(f"Error processing import job {job_id}: {str(e)}")
+        if job is None:
+            return
+        # Counters in memory may include a chunk that was rolled back
+        job.refresh_from_db()
         job.status = 'failed'
         job.completed_at = timezone.now()
         job.error_log.append({'error': str(e)})
@@ -0,0 +1,254 @@
+"""
+Tests for streaming data imports and exports.
+"""
+import gzip
+import io
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from .importer import ImportEngine
+from .models import DataExportJob, DataImportJob, DataLineage
+from .readers import iter_csv_records, iter_json_records, iter_xml_records
+from .services import process_export_job, process_import_job
+
+User = get_user_model()
+
+HEADER = 'source_type,source_name,source_field,target_type,target_name,target_field,transformation_type\n'
+
+
+def lineage_row(index, transformation='copy'):
+    return f'table,supplier_{index},sku,table,product_{index},sku,{transformation}\n'
+
+
+class ReaderTests(TestCase):
+    """Tests for the streaming file readers"""
+
+    def test_csv_records(self):
+        """Test that CSV rows are keyed by the header, ignoring a BOM"""
+        file = io.BytesIO('\ufeffname,price\nPen,10\nInk,5\n'.encode('utf-8'))
+        self.assertEqual(list(iter_csv_records(file)), [
+            {'name': 'Pen', 'price': '10'},
+            {'name': 'Ink', 'price': '5'},
+        ])
+
+    def test_json_lines_and_arrays(self):
+        """Test that JSON lines, arrays and single objects are all read"""
+        lines = io.BytesIO(b'{"name": "Pen"}\n\n{"name": "Ink"}\n')
+        array = io.BytesIO(b'[\n  {"name": "Pen"},\n  {"name": "Ink"}\n]')
+        single = io.BytesIO(b'{\n  "name": "Pen"\n}')
+
+        self.assertEqual(list(iter_json_records(lines)), [{'name': 'Pen'}, {'name': 'Ink'}])
+        self.assertEqual(list(iter_json_records(array)), [{'name': 'Pen'}, {'name': 'Ink'}])
+        self.assertEqual(list(iter_json_records(single)), [{'name': 'Pen'}])
+
+    def test_xml_records(self):
+        """Test that each child of the root is one record"""
+        file = io.BytesIO(b'<data><item><name>Pen</name></item><item><name>Ink</name></item></data>')
+        self.assertEqual(list(iter_xml_records(file)), [{'name': 'Pen'}, {'name': 'Ink'}])
+
+
+class ImportEngineTests(TestCase):
+    """Tests for chunked bulk imports"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='importer', email='importer@example.com', password='testpass123')
+
+    def create_job(self, content, **kwargs):
+        path = default_storage.save('imports/lineage.csv', ContentFile(content.encode('utf-8')))
+        options = {
+            'skip_duplicates': False,
+            'update_existing': False,
+            'batch_size': 2,
+        }
+        options.update(kwargs)
+        return DataImportJob.objects.create(
+            name='Lineage import',
+            file_path=path,
+            file_format='csv',
+            file_size=len(content),
+            target_model='datalineage',
+            content_type=ContentType.objects.get_for_model(DataLineage),
+            created_by=self.user,
+            **options
+        )
+
+    def test_rows_are_imported_in_chunks(self):
+        """Test that every row is written and progress reaches 100%"""
+        job = self.create_job(HEADER + ''.join(lineage_row(index) for index in range(5)))
+
+        ImportEngine(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(DataLineage.objects.count(), 5)
+        self.assertEqual(
+            (job.total_records, job.processed_records, job.successful_records, job.failed_records),
+            (5, 5, 5, 0)
+        )
+        self.assertEqual(job.progress_percentage, 100)
+
+    def test_rejected_row_fails_alone(self):
+        """Test that a duplicate row fails without losing the rest of its chunk"""
+        job = self.create_job(HEADER + lineage_row(1) + lineage_row(1) + lineage_row(2))
+
+        ImportEngine(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(DataLineage.objects.count(), 2)
+        self.assertEqual((job.successful_records, job.failed_records), (2, 1))
+        self.assertEqual(job.error_log[0]['row'], 2)
+
+    def test_unknown_columns_fail_per_row(self):
+        """Test that rows that cannot be built are logged with their data"""
+        job = self.create_job('source_name,colour\nsupplier_1,red\n')
+
+        ImportEngine(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.failed_records, 1)
+        self.assertEqual(job.error_log[0]['record'], {'source_name': 'supplier_1', 'colour': 'red'})
+
+    def test_skip_duplicates_ignores_existing_rows(self):
+        """Test that rows conflicting with stored ones are left alone"""
+        DataLineage.objects.create(
+            source_type='table', source_name='supplier_1', source_field='sku',
+            target_type='table', target_name='product_1', target_field='sku',
+            transformation_type='manual'
+        )
+        job = self.create_job(HEADER + lineage_row(1) + lineage_row(2), skip_duplicates=True)
+
+        ImportEngine(job).run()
+
+        self.assertEqual(DataLineage.objects.count(), 2)
+        self.assertEqual(DataLineage.objects.get(source_name='supplier_1').transformation_type, 'manual')
+
+    def test_update_existing_upserts_on_natural_key(self):
+        """Test that existing rows are updated through the unique_together key"""
+        DataLineage.objects.create(
+            source_type='table', source_name='supplier_1', source_field='sku',
+            target_type='table', target_name='product_1', target_field='sku',
+            transformation_type='manual'
+        )
+        job = self.create_job(
+            HEADER + lineage_row(1, 'copy') + lineage_row(2) + lineage_row(1, 'uppercase'),
+            update_existing=True, batch_size=10
+        )
+
+        ImportEngine(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(DataLineage.objects.count(), 2)
+        self.assertEqual(DataLineage.objects.get(source_name='supplier_1').transformation_type, 'uppercase')
+        self.assertEqual((job.processed_records, job.successful_records), (3, 3))
+
+    def test_failed_job_resumes_after_checkpoint(self):
+        """Test that a job restarted after a failure skips rows already imported"""
+        job = self.create_job(HEADER + ''.join(lineage_row(index) for index in range(5)))
+        for index in range(2):
+            DataLineage.objects.create(
+                source_type='table', source_name=f'supplier_{index}', source_field='sku',
+                target_type='table', target_name=f'product_{index}', target_field='sku',
+                transformation_type='copy'
+            )
+        DataImportJob.objects.filter(pk=job.pk).update(
+            status='failed', total_records=5, processed_records=2, successful_records=2
+        )
+
+        process_import_job(str(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(DataLineage.objects.count(), 5)
+        self.assertEqual((job.processed_records, job.successful_records, job.failed_records), (5, 5, 0))
+        self.assertEqual(job.processing_log[-1]['event'], 'resumed')
+        self.assertEqual(job.processing_log[-1]['from_row'], 2)
+
+    def test_validation_failure_imports_nothing(self):
+        """Test that invalid files are rejected before any row is written"""
+        job = self.create_job(
+            HEADER + lineage_row(1) + 'table,,sku,table,product_2,sku,copy\n',
+            validation_rules={'source_name': {'required': True}}
+        )
+
+        ImportEngine(job).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(DataLineage.objects.count(), 0)
+        self.assertEqual(job.validation_errors[0]['row'], 2)
+
+
+class ExportTests(TestCase):
+    """Tests for streaming data exports"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='exporter', email='exporter@example.com', password='testpass123')
+        for index in range(3):
+            DataLineage.objects.create(
+                source_type='table', source_name=f'supplier_{index}', source_field='sku',
+                target_type='table', target_name=f'product_{index}', target_field='sku',
+                transformation_type='copy'
+            )
+
+    def create_job(self, **kwargs):
+        return DataExportJob.objects.create(
+            name='lineage',
+            source_model='datalineage',
+            content_type=ContentType.objects.get_for_model(DataLineage),
+            created_by=self.user,
+            **kwargs
+        )
+
+    def test_mapped_json_lines_export(self):
+        """Test that mapped rows are written to storage and counted"""
+        job = self.create_job(
+            export_format='jsonl',
+            field_mapping={'source_name': 'supplier', 'target_name': 'product'},
+            filter_criteria={'source_name__in': ['supplier_0', 'supplier_2']},
+            sort_criteria=['-source_name']
+        )
+
+        process_export_job(str(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total_records, job.exported_records), (2, 2))
+        with default_storage.open(job.file_path, 'rb') as file:
+            content = file.read()
+        self.assertEqual(job.file_size, len(content))
+        self.assertEqual([json.loads(line) for line in content.splitlines()], [
+            {'supplier': 'supplier_2', 'product': 'product_2'},
+            {'supplier': 'supplier_0', 'product': 'product_0'},
+        ])
+
+    def test_compressed_csv_export(self):
+        """Test that compressed exports are gzipped CSV with a header row"""
+        job = self.create_job(export_format='csv', compress_output=True)
+
+        process_export_job(str(job.id))
+
+        job.refresh_from_db()
+        self.assertTrue(job.file_path.endswith('.csv.gz'))
+        with default_storage.open(job.file_path, 'rb') as file:
+            lines = gzip.decompress(file.read()).decode('utf-8').splitlines()
+        self.assertIn('source_name', lines[0])
+        self.assertEqual(len(lines), 4)
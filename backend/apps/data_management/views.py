@@ -2,7 +2,7 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import HttpResponse, Http404
+from django.http import FileResponse, Http404
 from django.core.files.storage import default_storage
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q
@@ -10,6 +10,7 @@ from django.utils import timezone
 from datetime import timedelta
 import logging
 
+from core.streaming_export import CONTENT_TYPES, export_filename, streaming_export_response
 from .models import (
     DataImportJob, DataExportJob, DataMapping, DataSyncJob,
     DataBackup, DataAuditLog, DataQualityRule, DataLineage
@@ -144,6 +145,27 @@ class DataImportJobViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Resume a failed or cancelled import job after its last imported chunk"""
+        self.check_permissions(['data_management.change_dataimportjob'])
+        
+        job = self.get_object()
+        if job.status in ['failed', 'cancelled']:
+            job.status = 'pending'
+            job.completed_at = None
+            job.save(update_fields=['status', 'completed_at'])
+            
+            from .services import process_import_job
+            process_import_job.delay(str(job.id))
+            
+            return Response({'message': 'Job resumed successfully', 'from_record': job.processed_records})
+        
+        return Response(
+            {'error': 'Job cannot be resumed'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     @action(detail=True, methods=['get'])
     def validate(self, request, pk=None):
         """Validate import data without processing"""
@@ -276,15 +298,13 @@ class DataExportJobViewSet(AdminPermissionMixin, viewsets.ModelViewSet):
             )
         
         try:
-            file_content = default_storage.open(job.file_path, 'rb').read()
-            
-            response = HttpResponse(
-                file_content,
+            # FileResponse streams the file in blocks instead of reading it whole
+            return FileResponse(
+                default_storage.open(job.file_path, 'rb'),
+                as_attachment=True,
+                filename=job.file_path.split("/")[-1],
                 content_type='application/octet-stream'
             )
-            response['Content-Disposition'] = f'attachment; filename="{job.file_path.split("/")[-1]}"'
-            
-            return response
             
         except Exception as e:
             logger.error(f"Error downloading export file: {str(e)}")
@@ -293,6 +313,29 @@ class DataExportJobViewSet(AdminPermissionMixin, viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=['get'])
+    def stream(self, request, pk=None):
+        """Stream the export's rows directly to the client without storing a file"""
+        self.check_permissions(['data_management.view_dataexportjob'])
+        
+        job = self.get_object()
+        if job.export_format not in CONTENT_TYPES:
+            return Response(
+                {'error': f'Format {job.export_format} cannot be streamed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        headers, rows = DataExportService().build_export_rows(job)
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        return streaming_export_response(
+            rows,
+            job.export_format,
+            export_filename(f"{job.name}_{timestamp}", job.export_format, job.compress_output),
+            headers=headers,
+            include_headers=job.include_headers,
+            compress=job.compress_output
+        )
+    
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel an export job"""
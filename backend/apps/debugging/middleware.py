@@ -1,8 +1,65 @@
-import uuid
+"""
+Correlation ids and request timing for the debugging system.
+
+Response times and slow requests are queued on the shared metrics pipeline
+(``core.metrics_pipeline``) rather than written on the request path. Its
+flusher writes one ``PerformanceSnapshot`` per view per flush interval,
+holding the mean response time with the count, p95 and histogram in its
+metadata, and bulk-creates ``ErrorLog`` warnings for slow requests.
+"""
 import time
 from django.utils.deprecation import MiddlewareMixin
 from django.utils import timezone
-from .utils import get_correlation_id_from_request, add_correlation_id_to_response, PerformanceMonitor
+from core.metrics_pipeline import BulkCreateSink, HistogramSink, record_metric, record_value, register_sink
+from .models import ErrorLog, PerformanceSnapshot, PerformanceThreshold
+from .utils import get_correlation_id_from_request, add_correlation_id_to_response
+
+RESPONSE_TIME_SINK = 'debugging.response_time'
+SLOW_REQUEST_SINK = 'debugging.slow_request'
+
+# Requests slower than this are logged as SlowRequest warnings
+SLOW_REQUEST_MS = 1000
+
+
+def _write_response_time_snapshots(series_list):
+    """Write one API response time snapshot per view for a flush interval."""
+    thresholds = {
+        threshold.component: threshold
+        for threshold in PerformanceThreshold.objects.filter(
+            metric_name='response_time',
+            layer='api',
+            component__in=[series.key for series in series_list],
+            enabled=True
+        )
+    }
+    snapshots = []
+    for series in series_list:
+        threshold = thresholds.get(series.key)
+        snapshots.append(PerformanceSnapshot(
+            layer='api',
+            component=series.key,
+            metric_name='response_time',
+            metric_value=series.mean,
+            threshold_warning=threshold.warning_threshold if threshold else None,
+            threshold_critical=threshold.critical_threshold if threshold else None,
+            metadata={
+                'requests': series.count,
+                'max_ms': series.max,
+                'p95_ms': series.percentile(0.95),
+                'histogram_ms': series.histogram(),
+                'status_codes': series.counters,
+            }
+        ))
+    PerformanceSnapshot.objects.bulk_create(snapshots)
+
+
+register_sink(RESPONSE_TIME_SINK, HistogramSink(_write_response_time_snapshots))
+register_sink(SLOW_REQUEST_SINK, BulkCreateSink(ErrorLog, timestamp_field=None))
+
+
+def _view_name(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    return resolver_match.view_name if resolver_match else 'unknown'
 
 
 class CorrelationIdMiddleware(MiddlewareMixin):
@@ -19,27 +76,16 @@ class CorrelationIdMiddleware(MiddlewareMixin):
         return None
     
     def process_response(self, request, response):
-        """Add correlation ID to response and record performance metrics"""
+        """Add correlation ID to response and queue the response time"""
         correlation_id = getattr(request, 'correlation_id', None)
         
         if correlation_id:
             add_correlation_id_to_response(response, correlation_id)
         
-        # Record API response time
         if hasattr(request, '_debug_start_time'):
             duration_ms = (time.time() - request._debug_start_time) * 1000
-            
-            PerformanceMonitor.record_metric(
-                layer='api',
-                component=request.resolver_match.view_name if hasattr(request, 'resolver_match') and request.resolver_match else 'unknown',
-                metric_name='response_time',
-                metric_value=duration_ms,
-                correlation_id=correlation_id,
-                metadata={
-                    'path': request.path,
-                    'method': request.method,
-                    'status_code': response.status_code
-                }
+            record_value(
+                RESPONSE_TIME_SINK, _view_name(request), duration_ms, {str(response.status_code): 1}
             )
         
         return response
@@ -54,7 +100,7 @@ class CorrelationIdMiddleware(MiddlewareMixin):
         ErrorLogger.log_exception(
             exception=exception,
             layer='api',
-            component=request.resolver_match.view_name if hasattr(request, 'resolver_match') and request.resolver_match else 'unknown',
+            component=_view_name(request),
             correlation_id=correlation_id,
             user=user,
             request=request,
@@ -72,8 +118,9 @@ class DebuggingMiddleware(MiddlewareMixin):
     
     def process_request(self, request):
         """Initialize debugging context for request"""
-        # Store request start time
-        request._debug_start_time = time.time()
+        # CorrelationIdMiddleware normally started the clock already
+        if not hasattr(request, '_debug_start_time'):
+            request._debug_start_time = time.time()
         request._debug_timestamp = timezone.now()
         
         return None
@@ -90,27 +137,26 @@ class DebuggingMiddleware(MiddlewareMixin):
         return None
     
     def process_response(self, request, response):
-        """Process response and log metrics"""
+        """Queue a warning for slow requests"""
         if hasattr(request, '_debug_start_time'):
             duration_ms = (time.time() - request._debug_start_time) * 1000
             
-            # Log slow requests
-            if duration_ms > 1000:  # Requests slower than 1 second
-                from .utils import ErrorLogger
-                
-                ErrorLogger.log_error(
-                    layer='api',
-                    component='middleware',
-                    error_type='SlowRequest',
-                    error_message=f'Request took {duration_ms:.2f}ms',
-                    correlation_id=getattr(request, 'correlation_id', None),
-                    severity='warning',
-                    metadata={
+            if duration_ms > SLOW_REQUEST_MS:
+                record_metric(SLOW_REQUEST_SINK, 'api', {
+                    'layer': 'api',
+                    'component': 'middleware',
+                    'error_type': 'SlowRequest',
+                    'error_message': f'Request took {duration_ms:.2f}ms',
+                    'correlation_id': getattr(request, 'correlation_id', None),
+                    'severity': 'warning',
+                    'request_path': request.path[:500],
+                    'request_method': request.method,
+                    'metadata': {
                         'path': request.path,
                         'method': request.method,
                         'duration_ms': duration_ms,
                         'status_code': response.status_code
-                    }
-                )
+                    },
+                })
         
         return response
\ No newline at end of file
@@ -24,6 +24,7 @@ from .config import DebuggingConfig, FeatureFlags, ConfigValidator
 from .database_integration import DatabaseMonitor, database_monitor
 from .utils import PerformanceMonitor, ErrorLogger, WorkflowTracer
 from .middleware import CorrelationIdMiddleware, DebuggingMiddleware
+from core.metrics_pipeline import get_metrics_pipeline
 from .services import DebuggingService
 from .consumers import DebuggingConsumer
 
@@ -190,6 +191,7 @@ class MiddlewareIntegrationTest(SystemIntegrationTestCase):
         """Test debugging middleware performance tracking"""
         # Make a request that should be tracked
         response = self.client.get('/')
+        get_metrics_pipeline().flush()
         
         # Check if performance metrics were recorded
         metrics = PerformanceSnapshot.objects.filter(
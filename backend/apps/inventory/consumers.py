@@ -5,6 +5,24 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+def user_can_view_inventory(user) -> bool:
+    """Whether ``user`` may receive inventory updates."""
+    # Allow staff, admins, and users with specific permissions
+    if user.is_staff or user.is_superuser:
+        return True
+        
+    # Check for specific permission
+    if user.has_perm('inventory.view_inventory'):
+        return True
+        
+    # Check if user is a seller (for their own products)
+    if hasattr(user, 'seller_profile'):
+        return True
+        
+    return False
+
+
 class InventoryUpdateConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # Check if user is authenticated and has permission
@@ -75,19 +93,6 @@ class InventoryUpdateConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def check_inventory_permission(self, user_id):
         try:
-            user = User.objects.get(id=user_id)
-            # Allow staff, admins, and users with specific permissions
-            if user.is_staff or user.is_superuser:
-                return True
-                
-            # Check for specific permission
-            if user.has_perm('inventory.view_inventory'):
-                return True
-                
-            # Check if user is a seller (for their own products)
-            if hasattr(user, 'seller_profile'):
-                return True
-                
-            return False
+            return user_can_view_inventory(User.objects.get(id=user_id))
         except User.DoesNotExist:
-            return False
\ No newline at end of file
+            return False
@@ -408,6 +408,44 @@ class InventoryService:
         
         return transaction
     
+    @staticmethod
+    def _expire_stock_fields(inventory):
+        """
+        Drop cached stock levels from an instance changed by a queryset update.
+
+        Django reloads deferred fields on first access, so callers that read
+        them again get current values without an unconditional extra query.
+        """
+        for field in ('quantity', 'reserved_quantity', 'updated_at'):
+            inventory.__dict__.pop(field, None)
+
+    @staticmethod
+    def _reserve(inventory_id, quantity):
+        """
+        Reserve stock with one conditional UPDATE.
+
+        The availability check and the increment happen in the same statement,
+        so concurrent reservations can never push reserved stock above the
+        quantity on hand.
+        """
+        updated = Inventory.objects.filter(
+            pk=inventory_id,
+            quantity__gte=F('reserved_quantity') + quantity
+        ).update(
+            reserved_quantity=F('reserved_quantity') + quantity,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            available = Inventory.objects.filter(pk=inventory_id).values_list(
+                'quantity', 'reserved_quantity'
+            ).first()
+            if available is None:
+                raise ValidationError(f"Inventory with ID {inventory_id} not found")
+            raise ValidationError(
+                f"Insufficient stock to reserve. Available: {max(0, available[0] - available[1])}, "
+                f"Requested: {quantity}"
+            )
+
     @staticmethod
     @transaction.atomic
     def reserve_stock(inventory, quantity, user, reference_number="", order=None, notes=""):
@@ -428,16 +466,8 @@ class InventoryService:
         if quantity <= 0:
             raise ValidationError("Quantity must be positive when reserving stock")
         
-        # Refresh inventory to ensure we have current values
-        inventory.refresh_from_db()
-        
-        if inventory.available_quantity < quantity:
-            raise ValidationError(f"Insufficient stock to reserve. Available: {inventory.available_quantity}, Requested: {quantity}")
-        
-        # Update reserved quantity
-        inventory.reserved_quantity = F('reserved_quantity') + quantity
-        inventory.save()
-        inventory.refresh_from_db()
+        InventoryService._reserve(inventory.pk, quantity)
+        InventoryService._expire_stock_fields(inventory)
         
         # Create transaction record for audit trail
         InventoryTransaction.objects.create(
@@ -452,6 +482,52 @@ class InventoryService:
         
         return True
     
+    @staticmethod
+    @transaction.atomic
+    def reserve_items(items, user, reference_number="", order=None, notes=""):
+        """
+        Reserve stock for several inventory records, all or nothing.
+        
+        Rows are updated in primary-key order so concurrent carts sharing
+        items always lock them in the same sequence and cannot deadlock.
+        
+        Args:
+            items: Iterable of (inventory or inventory ID, quantity) pairs;
+                quantities for the same inventory are combined
+            user: User performing the action
+            reference_number: Reference number for the reservation
+            order: Related order if applicable
+            notes: Additional notes
+            
+        Returns:
+            list: The created InventoryTransaction audit records
+        """
+        quantities = {}
+        for inventory, quantity in items:
+            if quantity <= 0:
+                raise ValidationError("Quantity must be positive when reserving stock")
+            inventory_id = Inventory._meta.pk.to_python(getattr(inventory, 'pk', inventory))
+            quantities[inventory_id] = quantities.get(inventory_id, 0) + quantity
+        
+        for inventory_id in sorted(quantities):
+            try:
+                InventoryService._reserve(inventory_id, quantities[inventory_id])
+            except ValidationError as e:
+                raise ValidationError(f"Inventory {inventory_id}: {e.messages[0]}")
+        
+        return InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(
+                inventory_id=inventory_id,
+                transaction_type="ADJUSTMENT",
+                quantity=0,
+                reference_number=reference_number,
+                order=order,
+                notes=f"Reserved {quantity} units. {notes}",
+                created_by=user
+            )
+            for inventory_id, quantity in sorted(quantities.items())
+        ])
+    
     @staticmethod
     @transaction.atomic
     def release_reserved_stock(inventory, quantity, user, reference_number="", order=None, notes=""):
@@ -472,13 +548,18 @@ class InventoryService:
         if quantity <= 0:
             raise ValidationError("Quantity must be positive when releasing reserved stock")
         
-        if inventory.reserved_quantity < quantity:
-            raise ValidationError(f"Cannot release more than reserved. Reserved: {inventory.reserved_quantity}, Requested: {quantity}")
-        
-        # Update reserved quantity
-        inventory.reserved_quantity = F('reserved_quantity') - quantity
-        inventory.save()
-        inventory.refresh_from_db()
+        # Conditional update so concurrent releases cannot drive the reservation negative
+        updated = Inventory.objects.filter(
+            pk=inventory.pk,
+            reserved_quantity__gte=quantity
+        ).update(
+            reserved_quantity=F('reserved_quantity') - quantity,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            reserved = Inventory.objects.filter(pk=inventory.pk).values_list('reserved_quantity', flat=True).first()
+            raise ValidationError(f"Cannot release more than reserved. Reserved: {reserved or 0}, Requested: {quantity}")
+        InventoryService._expire_stock_fields(inventory)
         
         # Create transaction record for audit trail
         InventoryTransaction.objects.create(
@@ -0,0 +1,156 @@
+import threading
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase
+
+from apps.inventory.models import Inventory, InventoryTransaction, Warehouse
+from apps.inventory.services import InventoryService
+from apps.products.models import Product, Category
+
+User = get_user_model()
+
+
+def create_inventory(sku, quantity, reserved_quantity=0, warehouse=None):
+    category, _ = Category.objects.get_or_create(name="Electronics")
+    product = Product.objects.create(
+        name=f"Product {sku}",
+        description="Test Description",
+        sku=sku,
+        price=Decimal('99.99'),
+        category=category
+    )
+    if warehouse is None:
+        warehouse, _ = Warehouse.objects.get_or_create(
+            code="WH001",
+            defaults={'name': "Main Warehouse", 'location': "New York"}
+        )
+    return Inventory.objects.create(
+        product=product,
+        warehouse=warehouse,
+        quantity=quantity,
+        reserved_quantity=reserved_quantity,
+        cost_price=Decimal('50.00')
+    )
+
+
+class StockReservationTest(TestCase):
+    """Test cases for conditional and batch reservations."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="password123"
+        )
+        self.inventory = create_inventory("SKU-1", quantity=100, reserved_quantity=10)
+        self.inventory2 = create_inventory("SKU-2", quantity=5)
+
+    def test_reserve_stock_uses_one_conditional_update(self):
+        """Test that a reservation is one UPDATE plus its audit record."""
+        with self.assertNumQueries(4):  # savepoint, update, insert, release savepoint
+            InventoryService.reserve_stock(self.inventory, 20, self.user)
+
+        # Stale instance fields are reloaded on access
+        self.assertEqual(self.inventory.reserved_quantity, 30)
+        self.assertEqual(self.inventory.available_quantity, 70)
+
+    def test_reserve_stock_rejects_overselling(self):
+        """Test that reserving more than is available leaves stock unchanged."""
+        with self.assertRaisesMessage(ValidationError, "Available: 90, Requested: 91"):
+            InventoryService.reserve_stock(self.inventory, 91, self.user)
+
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.reserved_quantity, 10)
+
+    def test_reserve_items_is_all_or_nothing(self):
+        """Test that one short item rolls back the whole cart."""
+        with self.assertRaises(ValidationError):
+            InventoryService.reserve_items(
+                [(self.inventory, 5), (self.inventory2.pk, 6)],
+                self.user,
+                reference_number="CART-1"
+            )
+
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.reserved_quantity, 10)
+        self.assertFalse(InventoryTransaction.objects.filter(reference_number="CART-1").exists())
+
+    def test_reserve_items_combines_lines_for_the_same_inventory(self):
+        """Test that repeated lines are reserved together."""
+        records = InventoryService.reserve_items(
+            [(self.inventory2, 2), (self.inventory, 5), (self.inventory2, 3)],
+            self.user,
+            reference_number="CART-2"
+        )
+
+        self.assertEqual(len(records), 2)
+        self.inventory2.refresh_from_db()
+        self.assertEqual(self.inventory2.available_quantity, 0)
+        self.assertEqual(
+            InventoryTransaction.objects.filter(reference_number="CART-2").count(), 2
+        )
+
+    def test_release_more_than_reserved(self):
+        """Test that releases are checked against the stored reservation."""
+        with self.assertRaises(ValidationError):
+            InventoryService.release_reserved_stock(self.inventory, 11, self.user)
+
+        InventoryService.release_reserved_stock(self.inventory, 10, self.user)
+        self.assertEqual(self.inventory.reserved_quantity, 0)
+
+
+class StockReservationConcurrencyTest(TransactionTestCase):
+    """Stress test reservations of a single hot SKU from many threads."""
+
+    THREADS = 16
+    ATTEMPTS_PER_THREAD = 10
+    STOCK = 50
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="password123"
+        )
+        self.inventory = create_inventory("HOT-SKU", quantity=self.STOCK)
+
+    def test_concurrent_reservations_never_oversell(self):
+        """Test that concurrent checkouts reserve exactly the stock on hand."""
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("Needs a database that accepts connections from several threads")
+
+        successes = []
+        failures = []
+        errors = []
+        start = threading.Barrier(self.THREADS)
+
+        def checkout():
+            try:
+                start.wait()
+                for _ in range(self.ATTEMPTS_PER_THREAD):
+                    try:
+                        InventoryService.reserve_items([(self.inventory.pk, 1)], self.user)
+                        successes.append(1)
+                    except ValidationError:
+                        failures.append(1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.inventory.refresh_from_db()
+        self.assertEqual(len(successes), self.STOCK)
+        self.assertEqual(len(failures), self.THREADS * self.ATTEMPTS_PER_THREAD - self.STOCK)
+        self.assertEqual(self.inventory.reserved_quantity, self.STOCK)
+        self.assertEqual(self.inventory.available_quantity, 0)
@@ -7,11 +7,12 @@ import json
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
-from django.core.cache import cache
 from django.conf import settings
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from .store import CacheLogBuffer, LogStore, tokenize
+
 logger = logging.getLogger('log_aggregation')
 
 class LogLevel(Enum):
@@ -57,38 +58,51 @@ class AggregatedLogEntry:
     user_agent: Optional[str] = None
 
 class LogAggregationService:
-    """Service for aggregating and correlating logs across all system layers"""
+    """
+    Service for aggregating and correlating logs across all system layers.
+
+    Entries are appended to a Redis ``LogStore`` and indexed by time bucket,
+    level, source and message tokens, so searches only read matching
+    entries from the requested time range. While Redis is unavailable,
+    recent entries are kept in and read from the Django cache instead.
+    """
     
-    def __init__(self):
+    def __init__(self, store: Optional[LogStore] = None):
         self.cache_timeout = getattr(settings, 'LOG_AGGREGATION_CACHE_TIMEOUT', 3600)  # 1 hour
         self.max_entries_per_correlation = getattr(settings, 'MAX_LOG_ENTRIES_PER_CORRELATION', 1000)
+        self.store = store or LogStore()
+        self.fallback = CacheLogBuffer()
+    
+    def _read(self, operation: str, *args, **kwargs):
+        """Run a read on the store, or on the cache fallback if Redis fails."""
+        try:
+            return getattr(self.store, operation)(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Log store unavailable for {operation}, using cache fallback: {e}")
+        try:
+            return getattr(self.fallback, operation)(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Log cache fallback unavailable for {operation}: {e}")
+            return 0 if operation == 'prune' else []
         
     def add_log_entry(self, entry: AggregatedLogEntry) -> None:
         """Add a log entry to the aggregation system"""
-        cache_key = f"logs:{entry.correlation_id}"
-        
-        # Get existing entries
-        existing_entries = cache.get(cache_key, [])
-        
-        # Add new entry
         entry_dict = asdict(entry)
         entry_dict['timestamp'] = entry.timestamp.isoformat()
         # Convert enums to their string values
         entry_dict['level'] = entry.level.value
         entry_dict['source'] = entry.source.value
-        existing_entries.append(entry_dict)
-        
-        # Limit number of entries to prevent memory issues
-        if len(existing_entries) > self.max_entries_per_correlation:
-            existing_entries = existing_entries[-self.max_entries_per_correlation:]
-        
-        # Store back in cache
-        cache.set(cache_key, existing_entries, self.cache_timeout)
         
-        # Maintain an index of correlation IDs
-        correlation_index = cache.get('correlation_index', set())
-        correlation_index.add(entry.correlation_id)
-        cache.set('correlation_index', correlation_index, self.cache_timeout)
+        try:
+            self.store.append(entry_dict)
+        except Exception as e:
+            try:
+                self.fallback.append(entry_dict)
+                logger.warning(f"Log store unavailable, kept entry for {entry.correlation_id} in cache: {e}")
+            except Exception as fallback_error:
+                # Aggregation is best effort; never fail the request being logged
+                logger.warning(f"Dropping aggregated log entry for {entry.correlation_id}: {fallback_error}")
+                return
         
         # Log the aggregated entry
         logger.info(
@@ -103,8 +117,7 @@ class LogAggregationService:
     
     def get_logs_by_correlation_id(self, correlation_id: str) -> List[Dict[str, Any]]:
         """Get all logs for a specific correlation ID"""
-        cache_key = f"logs:{correlation_id}"
-        entries = cache.get(cache_key, [])
+        entries = self._read('get_correlation', correlation_id)
         
         # Sort by timestamp
         entries.sort(key=lambda x: x['timestamp'])
@@ -218,50 +231,22 @@ class LogAggregationService:
         end_time: Optional[datetime] = None,
         limit: int = 100
     ) -> List[Dict[str, Any]]:
-        """Search logs across all correlation IDs"""
-        # This is a simplified implementation
-        # In production, you'd want to use a proper search engine like Elasticsearch
-        
-        results = []
-        
-        # Get correlation IDs from index
-        correlation_index = cache.get('correlation_index', set())
-        
-        for correlation_id in correlation_index:
-            cache_key = f"logs:{correlation_id}"
-            entries = cache.get(cache_key, [])
-            
-            for entry in entries:
-                # Apply filters
-                if level and entry.get('level') != level:
-                    continue
-                
-                if source and entry.get('source') != source:
-                    continue
-                
-                if start_time:
-                    entry_time = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                    if entry_time < start_time:
-                        continue
-                
-                if end_time:
-                    entry_time = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                    if entry_time > end_time:
-                        continue
-                
-                # Search in message and context
-                if query.lower() in entry.get('message', '').lower():
-                    results.append(entry)
-                elif entry.get('context') and query.lower() in str(entry['context']).lower():
-                    results.append(entry)
-                
-                if len(results) >= limit:
-                    break
-            
-            if len(results) >= limit:
-                break
-        
-        return results[:limit]
+        """
+        Search logs across all correlation IDs, newest first.
+
+        Entries match when their message or context contains every word of
+        ``query``; an empty query matches everything. ``level`` and
+        ``source`` accept the enums or their string values.
+        """
+        return self._read(
+            'search',
+            tokenize(query),
+            level=getattr(level, 'value', level),
+            source=getattr(source, 'value', source),
+            start_time=start_time,
+            end_time=end_time,
+            limit=limit
+        )
     
     def get_error_patterns(self, hours: int = 24) -> Dict[str, Any]:
         """Analyze error patterns across the system"""
@@ -270,11 +255,13 @@ class LogAggregationService:
         
         errors = self.search_logs(
             query="",
-            level='error',  # Use string instead of enum
+            level=LogLevel.ERROR,
             start_time=start_time,
             end_time=end_time,
             limit=1000
         )
+        # Oldest first, so first_seen and last_seen follow the timeline
+        errors.reverse()
         
         # Group errors by message pattern
         error_patterns = {}
@@ -311,32 +298,9 @@ class LogAggregationService:
         }
     
     def cleanup_old_logs(self, hours: int = 24) -> int:
-        """Clean up old log entries from cache"""
+        """Clean up old log entries from the store"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        cleaned_count = 0
-        
-        # Get correlation IDs from index
-        correlation_index = cache.get('correlation_index', set())
-        
-        for correlation_id in correlation_index:
-            cache_key = f"logs:{correlation_id}"
-            entries = cache.get(cache_key, [])
-            original_count = len(entries)
-            
-            # Filter out old entries
-            filtered_entries = []
-            for entry in entries:
-                entry_time = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
-                if entry_time >= cutoff_time:
-                    filtered_entries.append(entry)
-            
-            # Update cache
-            if filtered_entries:
-                cache.set(cache_key, filtered_entries, self.cache_timeout)
-            else:
-                cache.delete(cache_key)
-            
-            cleaned_count += original_count - len(filtered_entries)
+        cleaned_count = self._read('prune', cutoff_time)
         
         logger.info(f"Cleaned up {cleaned_count} old log entries")
         return cleaned_count
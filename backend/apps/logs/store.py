@@ -0,0 +1,309 @@
+"""
+Append-only Redis store for aggregated log entries.
+
+Every entry is written once, under its own key, in a single pipeline:
+
+* ``logs:entry:<id>`` holds the JSON entry and expires with the store's TTL;
+* ``logs:correlation:<correlation_id>`` is a list of entry ids, appended with
+  RPUSH and capped with LTRIM, so concurrent writers never overwrite each
+  other's entries;
+* entries are indexed per time bucket (``LOG_AGGREGATION_BUCKET_SECONDS``
+  wide, by the entry's own timestamp). ``logs:idx:<bucket>:<term>`` is a
+  sorted set of entry ids scored by entry timestamp for each term: ``all``,
+  ``level:<level>``, ``source:<source>`` and ``tok:<token>`` for every
+  token of the message and context values. ``logs:idx:<bucket>:terms``
+  records which terms a bucket holds so it can be dropped as a whole, and
+  the ``logs:buckets`` sorted set lists buckets that have entries.
+
+Searches go through the buckets overlapping the requested time range,
+newest first. For each, the term sets are intersected in Redis and only
+the newest ids still needed are fetched, with ``ZREVRANGEBYSCORE ...
+LIMIT``, before their entries are loaded. Memory and transfer follow the
+requested limit rather than the size of a bucket.
+
+If Redis cannot be reached, ``CacheLogBuffer`` keeps the most recent
+entries in the Django cache so logging and reads degrade instead of
+failing; entries written there are not copied back once Redis returns.
+"""
+import json
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.redis_client import get_redis_client
+
+ENTRY_KEY_PREFIX = 'logs:entry:'
+CORRELATION_KEY_PREFIX = 'logs:correlation:'
+INDEX_KEY_PREFIX = 'logs:idx:'
+BUCKETS_KEY = 'logs:buckets'
+
+FALLBACK_CACHE_KEY = 'logs:fallback'
+
+TERM_ALL = 'all'
+TERMS_SET = 'terms'
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]{2,}')
+
+# Upper bound on indexed tokens per entry, so a huge context cannot blow up the index
+MAX_TOKENS_PER_ENTRY = 64
+
+
+def get_log_store_settings():
+    """Return TTL, bucket width, per-correlation cap and fallback size for the store."""
+    return {
+        'ttl': getattr(settings, 'LOG_AGGREGATION_CACHE_TIMEOUT', 3600),
+        'bucket_seconds': getattr(settings, 'LOG_AGGREGATION_BUCKET_SECONDS', 300),
+        'max_per_correlation': getattr(settings, 'MAX_LOG_ENTRIES_PER_CORRELATION', 1000),
+        'fallback_size': getattr(settings, 'LOG_AGGREGATION_FALLBACK_SIZE', 1000),
+    }
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of ``text``, in order of first appearance."""
+    return list(dict.fromkeys(TOKEN_PATTERN.findall((text or '').lower())))
+
+
+def _context_text(value) -> Iterable[str]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key)
+            yield from _context_text(item)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _context_text(item)
+    elif value is not None:
+        yield str(value)
+
+
+def entry_tokens(entry: Dict[str, Any]) -> List[str]:
+    """Tokens indexed for an entry: its message, then its context keys and values."""
+    tokens = tokenize(entry.get('message', ''))
+    if entry.get('context'):
+        tokens.extend(tokenize(' '.join(_context_text(entry['context']))))
+    return list(dict.fromkeys(tokens))[:MAX_TOKENS_PER_ENTRY]
+
+
+def entry_time(entry: Dict[str, Any]) -> datetime:
+    return datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
+
+
+def entry_matches(entry: Dict[str, Any], tokens: List[str], level: Optional[str] = None,
+                  source: Optional[str] = None, start_time: Optional[datetime] = None,
+                  end_time: Optional[datetime] = None) -> bool:
+    """Whether ``entry`` matches a search, checked on the entry itself."""
+    if level and entry.get('level') != level:
+        return False
+    if source and entry.get('source') != source:
+        return False
+    moment = entry_time(entry).timestamp()
+    if (start_time and moment < start_time.timestamp()) or (end_time and moment > end_time.timestamp()):
+        return False
+    return set(tokens) <= set(entry_tokens(entry))
+
+
+class LogStore:
+    """
+    Writes and queries log entries in Redis.
+
+    Entries are dicts as produced by ``LogAggregationService``, with an ISO
+    ``timestamp`` and string ``level`` and ``source``.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    def bucket_for(self, moment: datetime) -> int:
+        return int(moment.timestamp() // get_log_store_settings()['bucket_seconds'])
+
+    def _index_key(self, bucket: int, term: str) -> str:
+        return f"{INDEX_KEY_PREFIX}{bucket}:{term}"
+
+    def append(self, entry: Dict[str, Any]) -> str:
+        """Store ``entry`` and index it; returns the new entry id."""
+        config = get_log_store_settings()
+        entry_id = uuid.uuid4().hex
+        moment = entry_time(entry)
+        bucket = self.bucket_for(moment)
+        score = moment.timestamp()
+        terms = [TERM_ALL, f"level:{entry.get('level')}", f"source:{entry.get('source')}"]
+        terms.extend(f"tok:{token}" for token in entry_tokens(entry))
+        # Index keys outlive the entries they point to by one bucket
+        index_ttl = config['ttl'] + config['bucket_seconds']
+        correlation_key = f"{CORRELATION_KEY_PREFIX}{entry['correlation_id']}"
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(f"{ENTRY_KEY_PREFIX}{entry_id}", json.dumps(entry, default=str), ex=config['ttl'])
+        pipe.rpush(correlation_key, entry_id)
+        pipe.ltrim(correlation_key, -config['max_per_correlation'], -1)
+        pipe.expire(correlation_key, config['ttl'])
+        for term in terms:
+            key = self._index_key(bucket, term)
+            pipe.zadd(key, {entry_id: score})
+            pipe.expire(key, index_ttl)
+        terms_key = self._index_key(bucket, TERMS_SET)
+        pipe.sadd(terms_key, *terms)
+        pipe.expire(terms_key, index_ttl)
+        pipe.zadd(BUCKETS_KEY, {str(bucket): bucket})
+        pipe.zremrangebyscore(BUCKETS_KEY, '-inf', bucket - index_ttl // config['bucket_seconds'] - 1)
+        pipe.execute()
+        return entry_id
+
+    def get_entries(self, entry_ids: List[str]) -> List[Dict[str, Any]]:
+        """Load entries by id, in order; ids whose entry has expired are skipped."""
+        if not entry_ids:
+            return []
+        raw = self.client.mget([f"{ENTRY_KEY_PREFIX}{entry_id}" for entry_id in entry_ids])
+        return [json.loads(value) for value in raw if value is not None]
+
+    def get_correlation(self, correlation_id: str) -> List[Dict[str, Any]]:
+        """Entries for ``correlation_id``, in the order they were appended."""
+        entry_ids = self.client.lrange(f"{CORRELATION_KEY_PREFIX}{correlation_id}", 0, -1)
+        return self.get_entries(entry_ids)
+
+    def _buckets(self, start_time: Optional[datetime], end_time: Optional[datetime]) -> List[int]:
+        # Prune to buckets overlapping the range that still hold entries, newest first
+        config = get_log_store_settings()
+        oldest = time.time() - config['ttl'] - config['bucket_seconds']
+        low = self.bucket_for(start_time) if start_time else int(oldest // config['bucket_seconds'])
+        high = self.bucket_for(end_time) if end_time else '+inf'
+        buckets = self.client.zrangebyscore(BUCKETS_KEY, low, high)
+        return sorted((int(bucket) for bucket in buckets), reverse=True)
+
+    def search(
+        self,
+        tokens: List[str],
+        level: Optional[str] = None,
+        source: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Entries containing every token in ``tokens`` and matching the
+        filters, newest first.
+        """
+        terms = [f"tok:{token}" for token in tokens]
+        if level:
+            terms.append(f"level:{level}")
+        if source:
+            terms.append(f"source:{source}")
+        terms = terms or [TERM_ALL]
+        low = start_time.timestamp() if start_time else '-inf'
+        high = end_time.timestamp() if end_time else '+inf'
+
+        results = []
+        for bucket in self._buckets(start_time, end_time):
+            keys = [self._index_key(bucket, term) for term in terms]
+            matches_key = keys[0]
+            if len(keys) > 1:
+                matches_key = self._index_key(bucket, f"match:{uuid.uuid4().hex}")
+                pipe = self.client.pipeline(transaction=False)
+                pipe.zinterstore(matches_key, keys, aggregate='MAX')
+                pipe.expire(matches_key, 60)
+                pipe.execute()
+            try:
+                results.extend(self._newest(matches_key, high, low, limit - len(results)))
+            finally:
+                if matches_key != keys[0]:
+                    self.client.delete(matches_key)
+            if len(results) >= limit:
+                break
+        return results
+
+    def _newest(self, key: str, high, low, count: int) -> List[Dict[str, Any]]:
+        # Page through the ids newest first; entries may have expired under them
+        entries = []
+        offset = 0
+        while len(entries) < count:
+            page = count - len(entries)
+            entry_ids = self.client.zrevrangebyscore(key, high, low, start=offset, num=page)
+            entries.extend(self.get_entries(entry_ids))
+            if len(entry_ids) < page:
+                break
+            offset += len(entry_ids)
+        return entries
+
+    def _drop_bucket(self, bucket: int) -> int:
+        terms_key = self._index_key(bucket, TERMS_SET)
+        entry_ids = self.client.zrange(self._index_key(bucket, TERM_ALL), 0, -1)
+        terms = self.client.smembers(terms_key)
+        removed = self.client.delete(*[f"{ENTRY_KEY_PREFIX}{entry_id}" for entry_id in entry_ids]) if entry_ids else 0
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(terms_key, *[self._index_key(bucket, term) for term in terms])
+        pipe.zrem(BUCKETS_KEY, str(bucket))
+        pipe.execute()
+        return removed or 0
+
+    def prune(self, cutoff: datetime) -> int:
+        """
+        Delete entries older than ``cutoff``; returns how many were removed.
+
+        Buckets entirely before the cutoff are dropped with their index;
+        in the bucket containing it, only older entries are deleted.
+        Correlation lists keep the ids of deleted entries until they
+        expire; reads skip them.
+        """
+        cutoff_bucket = self.bucket_for(cutoff)
+        cutoff_score = f"({cutoff.timestamp()}"
+        removed = 0
+        for bucket in self.client.zrangebyscore(BUCKETS_KEY, '-inf', cutoff_bucket):
+            bucket = int(bucket)
+            if bucket < cutoff_bucket:
+                removed += self._drop_bucket(bucket)
+                continue
+            stale = self.client.zrangebyscore(self._index_key(bucket, TERM_ALL), '-inf', cutoff_score)
+            if not stale:
+                continue
+            terms = self.client.smembers(self._index_key(bucket, TERMS_SET))
+            pipe = self.client.pipeline(transaction=False)
+            pipe.delete(*[f"{ENTRY_KEY_PREFIX}{entry_id}" for entry_id in stale])
+            for term in terms:
+                pipe.zremrangebyscore(self._index_key(bucket, term), '-inf', cutoff_score)
+            removed += pipe.execute()[0]
+        return removed
+
+
+class CacheLogBuffer:
+    """
+    The most recent entries, kept in the Django cache while Redis is down.
+
+    A single bounded list, read and filtered in full; it only has to serve
+    until Redis is back.
+    """
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        config = get_log_store_settings()
+        entries = cache.get(FALLBACK_CACHE_KEY, [])
+        entries.append(entry)
+        cache.set(FALLBACK_CACHE_KEY, entries[-config['fallback_size']:], config['ttl'])
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return cache.get(FALLBACK_CACHE_KEY, [])
+
+    def get_correlation(self, correlation_id: str) -> List[Dict[str, Any]]:
+        return [entry for entry in self.entries() if entry.get('correlation_id') == correlation_id]
+
+    def search(self, tokens: List[str], level: Optional[str] = None, source: Optional[str] = None,
+               start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        matches = [
+            entry for entry in reversed(self.entries())
+            if entry_matches(entry, tokens, level, source, start_time, end_time)
+        ]
+        return matches[:limit]
+
+    def prune(self, cutoff: datetime) -> int:
+        entries = self.entries()
+        kept = [entry for entry in entries if entry_time(entry).timestamp() >= cutoff.timestamp()]
+        if len(kept) < len(entries):
+            cache.set(FALLBACK_CACHE_KEY, kept, get_log_store_settings()['ttl'])
+        return len(entries) - len(kept)
@@ -4,12 +4,13 @@ Tests for the log aggregation system
 
 import json
 from datetime import datetime, timedelta
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.cache import cache
 from unittest.mock import patch, MagicMock
 
+from core.tests.fakes import FakeRedis
 from .aggregation import (
     LogAggregationService, 
     AggregatedLogEntry, 
@@ -19,11 +20,23 @@ from .aggregation import (
     log_backend_entry,
     log_database_entry
 )
+from .store import BUCKETS_KEY, LogStore
 
-class LogAggregationServiceTests(TestCase):
+
+class FakeRedisMixin:
+    """Points every log store at an in-memory Redis"""
+
+    def use_fake_redis(self):
+        self.redis = FakeRedis()
+        patcher = patch('apps.logs.store.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+class LogAggregationServiceTests(FakeRedisMixin, TestCase):
     """Test the log aggregation service"""
     
     def setUp(self):
+        self.use_fake_redis()
         self.service = LogAggregationService()
         self.correlation_id = 'test-correlation-123'
         cache.clear()  # Clear cache before each test
@@ -178,10 +191,138 @@ class LogAggregationServiceTests(TestCase):
         self.assertIsNotNone(slow_api_issue)
         self.assertEqual(slow_api_issue['duration'], 2000)
 
-class LogAggregationAPITests(TestCase):
+    def _entry(self, message, level=LogLevel.INFO, source=LogSource.BACKEND,
+               correlation_id=None, timestamp=None, context=None):
+        return AggregatedLogEntry(
+            timestamp=timestamp or datetime.now(),
+            level=level,
+            message=message,
+            source=source,
+            correlation_id=correlation_id or self.correlation_id,
+            context=context
+        )
+    
+    def test_entries_are_appended_not_rewritten(self):
+        """Test that writers sharing a correlation ID do not overwrite each other"""
+        first = LogAggregationService()
+        second = LogAggregationService()
+        for index in range(5):
+            first.add_log_entry(self._entry(f'first {index}'))
+            second.add_log_entry(self._entry(f'second {index}'))
+        
+        logs = self.service.get_logs_by_correlation_id(self.correlation_id)
+        self.assertEqual(len(logs), 10)
+        self.assertNotIn('correlation_index', self.redis.data)
+    
+    @override_settings(MAX_LOG_ENTRIES_PER_CORRELATION=3)
+    def test_correlation_list_is_capped(self):
+        """Test that only the newest entries per correlation ID are kept"""
+        for index in range(5):
+            self.service.add_log_entry(self._entry(f'entry {index}'))
+        
+        logs = self.service.get_logs_by_correlation_id(self.correlation_id)
+        self.assertEqual([log['message'] for log in logs], ['entry 2', 'entry 3', 'entry 4'])
+    
+    def test_search_matches_every_query_word(self):
+        """Test that search uses the token index over message and context"""
+        self.service.add_log_entry(self._entry('Payment gateway timeout'))
+        self.service.add_log_entry(self._entry('Payment captured'))
+        self.service.add_log_entry(self._entry('Request failed', context={'gateway': 'razorpay'}))
+        
+        self.assertEqual(len(self.service.search_logs('payment')), 2)
+        self.assertEqual(
+            [log['message'] for log in self.service.search_logs('Payment TIMEOUT')],
+            ['Payment gateway timeout']
+        )
+        self.assertEqual(
+            [log['message'] for log in self.service.search_logs('razorpay')],
+            ['Request failed']
+        )
+        self.assertEqual(self.service.search_logs('refund'), [])
+    
+    def test_search_filters_by_level_and_source(self):
+        """Test that level and source accept enums and strings"""
+        self.service.add_log_entry(self._entry('Checkout failed', level=LogLevel.ERROR))
+        self.service.add_log_entry(self._entry('Checkout failed', level=LogLevel.ERROR, source=LogSource.FRONTEND))
+        self.service.add_log_entry(self._entry('Checkout started'))
+        
+        self.assertEqual(len(self.service.search_logs('checkout', level=LogLevel.ERROR)), 2)
+        self.assertEqual(len(self.service.search_logs('checkout', level='error', source='frontend')), 1)
+        self.assertEqual(len(self.service.search_logs('', source=LogSource.BACKEND)), 2)
+    
+    def test_search_reads_only_buckets_in_range(self):
+        """Test that time-range pruning skips buckets outside the range"""
+        now = datetime.now()
+        self.service.add_log_entry(self._entry('Cart updated', timestamp=now - timedelta(minutes=40)))
+        self.service.add_log_entry(self._entry('Cart updated', timestamp=now))
+        self.assertEqual(len(self.redis.data[BUCKETS_KEY]), 2)
+        
+        with patch.object(LogStore, 'get_entries', autospec=True, side_effect=LogStore.get_entries) as get_entries:
+            results = self.service.search_logs('cart', start_time=now - timedelta(minutes=5))
+        
+        self.assertEqual(len(results), 1)
+        self.assertEqual(get_entries.call_count, 1)
+    
+    def test_search_returns_newest_first_up_to_limit(self):
+        """Test that search stops once the limit is reached"""
+        now = datetime.now()
+        for minutes in (50, 30, 10):
+            self.service.add_log_entry(self._entry(f'Sync {minutes}', timestamp=now - timedelta(minutes=minutes)))
+        
+        results = self.service.search_logs('sync', limit=2)
+        self.assertEqual([log['message'] for log in results], ['Sync 10', 'Sync 30'])
+    
+    @override_settings(LOG_AGGREGATION_CACHE_TIMEOUT=6 * 3600)
+    def test_cleanup_removes_old_entries_and_index(self):
+        """Test that cleanup drops old buckets and old entries"""
+        now = datetime.now()
+        self.service.add_log_entry(self._entry('Old entry', timestamp=now - timedelta(hours=3)))
+        self.service.add_log_entry(self._entry('New entry', timestamp=now))
+        
+        self.assertEqual(self.service.cleanup_old_logs(hours=1), 1)
+        
+        self.assertEqual(
+            [log['message'] for log in self.service.get_logs_by_correlation_id(self.correlation_id)],
+            ['New entry']
+        )
+        self.assertEqual(len(self.redis.data[BUCKETS_KEY]), 1)
+        self.assertFalse([key for key in self.redis.data if 'tok:old' in key])
+    
+    def test_search_loads_only_the_entries_it_returns(self):
+        """Test that an empty-query search fetches no more ids than its limit"""
+        now = datetime.now()
+        for index in range(10):
+            self.service.add_log_entry(self._entry(f'Step {index}', timestamp=now + timedelta(seconds=index)))
+        
+        with patch.object(LogStore, 'get_entries', autospec=True, side_effect=LogStore.get_entries) as get_entries:
+            results = self.service.search_logs('', limit=3)
+        
+        self.assertEqual([log['message'] for log in results], ['Step 9', 'Step 8', 'Step 7'])
+        self.assertEqual(sum(len(call.args[1]) for call in get_entries.call_args_list), 3)
+        # Intersections are temporary
+        self.assertFalse([key for key in self.redis.data if ':match:' in key])
+    
+    def test_unavailable_store_does_not_raise(self):
+        """Test that a Redis failure keeps the entry in the cache instead of failing the caller"""
+        down = ConnectionError('down')
+        with patch.object(LogStore, 'append', side_effect=down), \
+                patch.object(LogStore, 'get_correlation', side_effect=down), \
+                patch.object(LogStore, 'search', side_effect=down):
+            self.service.add_log_entry(self._entry('Kept entry', level=LogLevel.ERROR))
+            self.service.add_log_entry(self._entry('Other entry', correlation_id='other'))
+            
+            logs = self.service.get_logs_by_correlation_id(self.correlation_id)
+            self.assertEqual([log['message'] for log in logs], ['Kept entry'])
+            self.assertEqual(
+                [log['message'] for log in self.service.search_logs('entry', level=LogLevel.ERROR)],
+                ['Kept entry']
+            )
+
+class LogAggregationAPITests(FakeRedisMixin, TestCase):
     """Test the log aggregation API endpoints"""
     
     def setUp(self):
+        self.use_fake_redis()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
@@ -334,10 +475,11 @@ class LogAggregationAPITests(TestCase):
         self.assertEqual(data['status'], 'success')
         self.assertIn('cleaned_entries', data)
 
-class LogHelperFunctionTests(TestCase):
+class LogHelperFunctionTests(FakeRedisMixin, TestCase):
     """Test the helper functions for logging"""
     
     def setUp(self):
+        self.use_fake_redis()
         self.correlation_id = 'test-helper-123'
         cache.clear()
     
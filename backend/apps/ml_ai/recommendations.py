@@ -0,0 +1,331 @@
+"""
+Item-item collaborative filtering serving engine.
+
+Training writes the model as a directory of plain ``.npy`` arrays:
+
+* ``user_ids`` / ``item_ids``: external IDs in matrix order
+* ``ratings_*``: users x items ratings as CSR components
+* ``neighbours_*``: items x items similarities as CSR components, holding for
+  every item its top-K most similar items above ``min_similarity``; stored
+  transposed so that scoring a user only touches the rows of items they rated
+* ``popularity``: mean rating per item, used for users without history
+
+Serving processes load the arrays once with ``mmap_mode='r'`` so the OS page
+cache is shared between workers, and the model is reloaded automatically
+when a newer one is published. A user's predicted rating for item ``i`` is
+the similarity-weighted mean of their ratings of the neighbours of ``i``,
+computed for all items with one sparse product of the user's rating row (and
+its binary mask) with the neighbour matrix.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'recommendation_system'
+META_FILE = 'meta.json'
+
+DEFAULT_TOP_K = 50
+DEFAULT_MIN_SIMILARITY = 0.1
+
+# Items per block when computing similarities; bounds memory to block x items
+SIMILARITY_BLOCK_SIZE = 1024
+
+# Users scored per sparse product in batch requests
+USER_BATCH_SIZE = 512
+
+# Seconds between checks for a newly published model
+RELOAD_CHECK_INTERVAL = 60
+
+
+def get_model_dir():
+    return os.path.join(getattr(settings, 'ML_MODELS_DIR', 'ml_models'), MODEL_NAME)
+
+
+def build_neighbours(ratings, top_k=DEFAULT_TOP_K, min_similarity=DEFAULT_MIN_SIMILARITY):
+    """
+    Compute the sparse top-K cosine similarity matrix between item columns.
+
+    Returns an items x items CSR matrix without self-similarities.
+    """
+    ratings = sparse.csc_matrix(ratings, dtype=np.float32)
+    norms = np.sqrt(np.asarray(ratings.multiply(ratings).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    normalized = ratings @ sparse.diags(1 / norms)
+    normalized_t = normalized.T.tocsr()
+    n_items = ratings.shape[1]
+    top_k = min(top_k, max(n_items - 1, 0))
+
+    rows, cols, values = [], [], []
+    for start in range(0, n_items, SIMILARITY_BLOCK_SIZE):
+        stop = min(start + SIMILARITY_BLOCK_SIZE, n_items)
+        block = (normalized_t[start:stop] @ normalized).toarray()
+        block[np.arange(stop - start), np.arange(start, stop)] = 0
+
+        if top_k == 0:
+            continue
+        candidates = np.argpartition(-block, top_k - 1, axis=1)[:, :top_k]
+        similarities = np.take_along_axis(block, candidates, axis=1)
+        keep = similarities > min_similarity
+        block_rows = np.repeat(np.arange(start, stop), top_k).reshape(-1, top_k)
+        rows.append(block_rows[keep])
+        cols.append(candidates[keep])
+        values.append(similarities[keep])
+
+    if rows:
+        rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+    return sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, cols)),
+        shape=(n_items, n_items)
+    )
+
+
+def build_model(interactions, top_k=DEFAULT_TOP_K, min_similarity=DEFAULT_MIN_SIMILARITY):
+    """
+    Build model arrays from a DataFrame with ``user_id``, ``product_id`` and ``rating``.
+
+    Repeated user/product pairs are averaged.
+    """
+    grouped = interactions.groupby(['user_id', 'product_id'], sort=False)['rating'].mean().reset_index()
+    user_codes, user_ids = grouped['user_id'].factorize(sort=True)
+    item_codes, item_ids = grouped['product_id'].factorize(sort=True)
+
+    ratings = sparse.csr_matrix(
+        (grouped['rating'].to_numpy(dtype=np.float32), (user_codes, item_codes)),
+        shape=(len(user_ids), len(item_ids))
+    )
+    neighbours = build_neighbours(ratings, top_k, min_similarity)
+
+    counts = np.diff(ratings.tocsc().indptr)
+    totals = np.asarray(ratings.sum(axis=0)).ravel()
+    # Mean over all users, matching the previous dense user-item matrix mean
+    popularity = totals / max(len(user_ids), 1)
+
+    return {
+        'user_ids': np.array([str(user_id) for user_id in user_ids], dtype=np.str_),
+        'item_ids': np.array([str(item_id) for item_id in item_ids], dtype=np.str_),
+        'ratings': ratings,
+        'neighbours_t': neighbours.T.tocsr(),
+        'popularity': popularity.astype(np.float32),
+        'meta': {
+            'top_k': top_k,
+            'min_similarity': min_similarity,
+            'users': len(user_ids),
+            'items': len(item_ids),
+            'interactions': int(ratings.nnz),
+            'neighbour_links': int(neighbours.nnz),
+            'rated_items': int((counts > 0).sum()),
+        },
+    }
+
+
+def save_model(model, model_dir=None):
+    """
+    Write model arrays and publish them atomically by writing ``meta.json`` last.
+    """
+    model_dir = model_dir or get_model_dir()
+    os.makedirs(model_dir, exist_ok=True)
+
+    arrays = {
+        'user_ids': model['user_ids'],
+        'item_ids': model['item_ids'],
+        'popularity': model['popularity'],
+    }
+    for name in ('ratings', 'neighbours_t'):
+        matrix = model[name]
+        # Matching index dtypes let scipy wrap the mapped arrays without copying
+        index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+        arrays[f'{name}_data'] = matrix.data.astype(np.float32)
+        arrays[f'{name}_indices'] = matrix.indices.astype(index_dtype)
+        arrays[f'{name}_indptr'] = matrix.indptr.astype(index_dtype)
+
+    version = str(time.time_ns())
+    for name, array in arrays.items():
+        np.save(os.path.join(model_dir, f'{name}.{version}.npy'), array, allow_pickle=False)
+
+    meta = dict(model['meta'], version=version, created_at=time.time())
+    tmp_path = os.path.join(model_dir, f'{META_FILE}.tmp')
+    with open(tmp_path, 'w') as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(tmp_path, os.path.join(model_dir, META_FILE))
+
+    # Older versions may still be mapped by running workers until they reload
+    for filename in os.listdir(model_dir):
+        parts = filename.split('.')
+        if filename.endswith('.npy') and len(parts) == 3 and parts[1] != version:
+            previous = os.path.join(model_dir, filename)
+            if time.time() - os.path.getmtime(previous) > RELOAD_CHECK_INTERVAL * 10:
+                os.remove(previous)
+    return meta
+
+
+class RecommendationEngine:
+    """
+    Read-only, memory-mapped item-item recommender.
+    """
+
+    def __init__(self, model_dir=None):
+        self.model_dir = model_dir or get_model_dir()
+        with open(os.path.join(self.model_dir, META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        version = self.meta['version']
+
+        def load(name):
+            return np.load(os.path.join(self.model_dir, f'{name}.{version}.npy'), mmap_mode='r', allow_pickle=False)
+
+        self.user_ids = load('user_ids')
+        self.item_ids = load('item_ids')
+        self.popularity = np.asarray(load('popularity'))
+        self.ratings = self._load_csr(load, 'ratings', (len(self.user_ids), len(self.item_ids)))
+        self.neighbours_t = self._load_csr(load, 'neighbours_t', (len(self.item_ids), len(self.item_ids)))
+
+        self.user_index = {user_id: index for index, user_id in enumerate(self.user_ids.tolist())}
+        self.item_index = {item_id: index for index, item_id in enumerate(self.item_ids.tolist())}
+        self.popular_order = np.argsort(-self.popularity, kind='stable')
+
+    @staticmethod
+    def _load_csr(load, name, shape):
+        return sparse.csr_matrix(
+            (load(f'{name}_data'), load(f'{name}_indices'), load(f'{name}_indptr')),
+            shape=shape,
+            copy=False
+        )
+
+    @property
+    def version(self):
+        return self.meta['version']
+
+    def score_users(self, user_indices):
+        """
+        Predict ratings for a batch of known users.
+
+        Returns a sparse ``len(user_indices) x items`` CSR matrix holding a
+        score for every item that has at least one rated neighbour, excluding
+        items the user already rated.
+        """
+        rows = self.ratings[user_indices]
+        mask = rows.copy()
+        mask.data = np.ones_like(mask.data)
+
+        # One product for ratings and mask stacked on top of each other
+        products = sparse.vstack([rows, mask]).tocsr() @ self.neighbours_t
+        numerator = products[:len(user_indices)]
+        denominator = products[len(user_indices):]
+        scores = numerator.multiply(denominator.power(-1)).tocsr()
+
+        scores = scores - scores.multiply(mask)
+        scores.eliminate_zeros()
+        return scores
+
+    def _format(self, indices, scores, reason):
+        return [
+            {
+                'product_id': self.item_ids[index].item(),
+                'score': float(score),
+                'rank': rank + 1,
+                'reason': reason,
+            }
+            for rank, (index, score) in enumerate(zip(indices, scores))
+        ]
+
+    def popular(self, limit, exclude=()):
+        """Return the most popular items."""
+        excluded = {self.item_index[item_id] for item_id in exclude if item_id in self.item_index}
+        indices = [index for index in self.popular_order[:limit + len(excluded)] if index not in excluded][:limit]
+        return self._format(indices, self.popularity[indices], 'Popular item')
+
+    def recommend_many(self, user_ids, limit=10):
+        """
+        Recommend items for many users in one pass.
+
+        Returns a dict mapping each user ID to its recommendations. Unknown
+        users and users without any scored item get popular items.
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        known = [user_id for user_id in dict.fromkeys(user_ids) if user_id in self.user_index]
+        results = {}
+
+        for start in range(0, len(known), USER_BATCH_SIZE):
+            batch = known[start:start + USER_BATCH_SIZE]
+            scores = self.score_users([self.user_index[user_id] for user_id in batch])
+            for row, user_id in enumerate(batch):
+                begin, end = scores.indptr[row], scores.indptr[row + 1]
+                if begin == end:
+                    continue
+                items, values = scores.indices[begin:end], scores.data[begin:end]
+                if len(values) > limit:
+                    # Keep ties at the cut-off so ordering below stays deterministic
+                    kth = np.partition(values, len(values) - limit)[len(values) - limit]
+                    keep = values >= kth
+                    items, values = items[keep], values[keep]
+                order = np.lexsort((items, -values))[:limit]
+                results[user_id] = self._format(items[order], values[order], 'Collaborative filtering')
+
+        for user_id in user_ids:
+            if user_id not in results:
+                rated = ()
+                if user_id in self.user_index:
+                    row = self.ratings[self.user_index[user_id]]
+                    rated = [self.item_ids[index].item() for index in row.indices]
+                results[user_id] = self.popular(limit, exclude=rated)
+        return results
+
+    def recommend(self, user_id, limit=10):
+        """Recommend items for a single user."""
+        return self.recommend_many([user_id], limit)[str(user_id)]
+
+
+_engine = None
+_engine_checked_at = 0
+_engine_lock = threading.Lock()
+
+
+def _published_version(model_dir):
+    try:
+        with open(os.path.join(model_dir, META_FILE)) as meta_file:
+            return json.load(meta_file)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def get_engine():
+    """
+    Return the process-wide engine, or ``None`` if no model has been trained.
+
+    A newly published model is picked up within ``RELOAD_CHECK_INTERVAL``.
+    """
+    global _engine, _engine_checked_at
+    now = time.monotonic()
+    if _engine is not None and now - _engine_checked_at < RELOAD_CHECK_INTERVAL:
+        return _engine
+
+    with _engine_lock:
+        if _engine is not None and now - _engine_checked_at < RELOAD_CHECK_INTERVAL:
+            return _engine
+        _engine_checked_at = now
+        model_dir = get_model_dir()
+        version = _published_version(model_dir)
+        if version is None:
+            _engine = None
+        elif _engine is None or _engine.version != version or _engine.model_dir != model_dir:
+            try:
+                _engine = RecommendationEngine(model_dir)
+                logger.info(f"Loaded recommendation model {version} ({_engine.meta['items']} items)")
+            except Exception as e:
+                logger.error(f"Error loading recommendation model: {str(e)}")
+    return _engine
+
+
+def reset_engine():
+    """Drop the cached engine so the next call reloads it."""
+    global _engine, _engine_checked_at
+    with _engine_lock:
+        _engine = None
+        _engine_checked_at = 0
@@ -218,9 +218,15 @@ class RecommendationRequestSerializer(serializers.Serializer):
     num_recommendations = serializers.IntegerField(default=10, min_value=1, max_value=50)
 
 
+class BatchRecommendationRequestSerializer(serializers.Serializer):
+    """Serializer for batch recommendation requests"""
+    user_ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=1000)
+    num_recommendations = serializers.IntegerField(default=10, min_value=1, max_value=50)
+
+
 class RecommendationResponseSerializer(serializers.Serializer):
     """Serializer for recommendation responses"""
-    product_id = serializers.IntegerField()
+    product_id = serializers.CharField()
     score = serializers.FloatField()
     rank = serializers.IntegerField()
     reason = serializers.CharField()
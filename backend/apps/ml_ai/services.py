@@ -12,6 +12,7 @@ import logging
 from django.conf import settings
 from django.db.models import Q, Avg, Sum, Count
 from .models import *
+from .recommendations import DEFAULT_TOP_K, build_model, get_engine, get_model_dir, reset_engine, save_model
 
 logger = logging.getLogger(__name__)
 
@@ -475,8 +476,6 @@ class RecommendationService:
     
     def __init__(self):
         self.model = None
-        self.user_item_matrix = None
-        self.item_similarity = None
     
     def prepare_interaction_data(self) -> pd.DataFrame:
         """Prepare user-item interaction data"""
@@ -501,39 +500,29 @@ class RecommendationService:
             logger.error(f"Error preparing interaction data: {str(e)}")
             raise
     
-    def train_recommendation_model(self) -> MLModel:
+    def train_recommendation_model(self, top_k: int = DEFAULT_TOP_K) -> MLModel:
         """Train collaborative filtering recommendation model"""
         try:
             # Prepare data
             df = self.prepare_interaction_data()
             
-            # Create user-item matrix
-            self.user_item_matrix = df.pivot_table(
-                index='user_id',
-                columns='product_id',
-                values='rating',
-                fill_value=0
-            )
-            
-            # Calculate item-item similarity using cosine similarity
-            from sklearn.metrics.pairwise import cosine_similarity
-            item_features = self.user_item_matrix.T  # Transpose to get items as rows
-            self.item_similarity = cosine_similarity(item_features)
-            
-            # Save model
-            model_path = "ml_models/recommendation_system.joblib"
-            joblib.dump({
-                'user_item_matrix': self.user_item_matrix,
-                'item_similarity': self.item_similarity
-            }, model_path)
+            # Sparse user-item matrix and top-K item-item cosine neighbours
+            model = build_model(df, top_k=top_k)
+            meta = save_model(model)
+            reset_engine()
             
             # Create ML model record
             ml_model = MLModel.objects.create(
                 name="Product Recommendation System",
                 model_type='recommendation',
                 description="Collaborative filtering recommendation system",
-                parameters={'similarity_metric': 'cosine'},
-                model_file_path=model_path,
+                parameters={
+                    'similarity_metric': 'cosine',
+                    'top_k': top_k,
+                    'min_similarity': meta['min_similarity'],
+                    'version': meta['version'],
+                },
+                model_file_path=get_model_dir(),
                 created_by_id=1,
                 last_trained=datetime.now()
             )
@@ -544,74 +533,27 @@ class RecommendationService:
             logger.error(f"Error training recommendation model: {str(e)}")
             raise
     
+    def _get_engine(self):
+        engine = get_engine()
+        if engine is None:
+            raise FileNotFoundError(f"No recommendation model found in {get_model_dir()}")
+        return engine
+    
     def get_recommendations(self, user_id: int, num_recommendations: int = 10) -> List[Dict]:
         """Get product recommendations for a user"""
         try:
-            # Load model
-            model_path = "ml_models/recommendation_system.joblib"
-            model_data = joblib.load(model_path)
-            self.user_item_matrix = model_data['user_item_matrix']
-            self.item_similarity = model_data['item_similarity']
-            
-            if user_id not in self.user_item_matrix.index:
-                # New user - return popular items
-                popular_items = self.user_item_matrix.mean().sort_values(ascending=False)
-                recommendations = []
-                for i, (product_id, score) in enumerate(popular_items.head(num_recommendations).items()):
-                    recommendations.append({
-                        'product_id': product_id,
-                        'score': float(score),
-                        'rank': i + 1,
-                        'reason': 'Popular item'
-                    })
-                return recommendations
-            
-            # Get user's ratings
-            user_ratings = self.user_item_matrix.loc[user_id]
-            
-            # Find items the user hasn't rated
-            unrated_items = user_ratings[user_ratings == 0].index
-            
-            # Calculate predicted ratings for unrated items
-            predictions = {}
-            for item in unrated_items:
-                if item in self.user_item_matrix.columns:
-                    item_idx = list(self.user_item_matrix.columns).index(item)
-                    
-                    # Find similar items that the user has rated
-                    similar_items = []
-                    for rated_item in user_ratings[user_ratings > 0].index:
-                        if rated_item in self.user_item_matrix.columns:
-                            rated_item_idx = list(self.user_item_matrix.columns).index(rated_item)
-                            similarity = self.item_similarity[item_idx][rated_item_idx]
-                            if similarity > 0.1:  # Threshold for similarity
-                                similar_items.append((rated_item, similarity, user_ratings[rated_item]))
-                    
-                    if similar_items:
-                        # Calculate weighted average
-                        weighted_sum = sum(sim * rating for _, sim, rating in similar_items)
-                        similarity_sum = sum(sim for _, sim, _ in similar_items)
-                        predicted_rating = weighted_sum / similarity_sum if similarity_sum > 0 else 0
-                        predictions[item] = predicted_rating
-            
-            # Sort by predicted rating
-            sorted_predictions = sorted(predictions.items(), key=lambda x: x[1], reverse=True)
-            
-            # Format recommendations
-            recommendations = []
-            for i, (product_id, score) in enumerate(sorted_predictions[:num_recommendations]):
-                recommendations.append({
-                    'product_id': int(product_id),
-                    'score': float(score),
-                    'rank': i + 1,
-                    'reason': 'Collaborative filtering'
-                })
-            
-            return recommendations
-            
+            return self._get_engine().recommend(user_id, num_recommendations)
         except Exception as e:
             logger.error(f"Error getting recommendations: {str(e)}")
             raise
+    
+    def get_recommendations_batch(self, user_ids: List[int], num_recommendations: int = 10) -> Dict[str, List[Dict]]:
+        """Get product recommendations for many users, keyed by user ID"""
+        try:
+            return self._get_engine().recommend_many(user_ids, num_recommendations)
+        except Exception as e:
+            logger.error(f"Error getting batch recommendations: {str(e)}")
+            raise
 
 
 class PricingOptimizationService:
@@ -184,6 +184,95 @@ class FraudDetectionServiceTestCase(TestCase):
         self.assertIn('risk_factors', result)
 
 
+class RecommendationEngineTestCase(TestCase):
+    """Test cases for the item-item recommendation engine"""
+    
+    def setUp(self):
+        import tempfile
+        from .recommendations import RecommendationEngine, build_model, save_model
+        
+        # Users 1 and 2 like products a and b together; user 3 only rated a
+        interactions = pd.DataFrame([
+            {'user_id': 1, 'product_id': 'a', 'rating': 5},
+            {'user_id': 1, 'product_id': 'b', 'rating': 4},
+            {'user_id': 2, 'product_id': 'a', 'rating': 4},
+            {'user_id': 2, 'product_id': 'b', 'rating': 5},
+            {'user_id': 2, 'product_id': 'c', 'rating': 3},
+            {'user_id': 3, 'product_id': 'a', 'rating': 5},
+            {'user_id': 4, 'product_id': 'd', 'rating': 3},
+        ])
+        self.model_dir = tempfile.mkdtemp()
+        save_model(build_model(interactions, top_k=2), self.model_dir)
+        self.engine = RecommendationEngine(self.model_dir)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.model_dir, ignore_errors=True)
+    
+    def test_arrays_are_memory_mapped(self):
+        """Test that the model is served from mapped files"""
+        def is_mapped(array):
+            while array is not None:
+                if isinstance(array, np.memmap):
+                    return True
+                array = array.base
+            return False
+        
+        self.assertTrue(is_mapped(self.engine.neighbours_t.data))
+        self.assertTrue(is_mapped(self.engine.ratings.indices))
+    
+    def test_neighbours_are_top_k(self):
+        """Test that each item keeps at most K neighbours"""
+        neighbours = self.engine.neighbours_t.T.tocsr()
+        self.assertTrue((np.diff(neighbours.indptr) <= 2).all())
+        self.assertEqual(neighbours.diagonal().sum(), 0)
+    
+    def test_recommend_excludes_rated_items(self):
+        """Test that known users get weighted-average scores for unrated items"""
+        recommendations = self.engine.recommend(3, 5)
+        
+        self.assertEqual(recommendations[0]['product_id'], 'b')
+        self.assertEqual(recommendations[0]['reason'], 'Collaborative filtering')
+        self.assertAlmostEqual(recommendations[0]['score'], 5.0, places=4)
+        self.assertNotIn('a', [rec['product_id'] for rec in recommendations])
+    
+    def test_unknown_user_gets_popular_items(self):
+        """Test the popularity fallback for new users"""
+        recommendations = self.engine.recommend(999, 2)
+        
+        self.assertEqual([rec['product_id'] for rec in recommendations], ['a', 'b'])
+        self.assertEqual(recommendations[0]['reason'], 'Popular item')
+    
+    def test_batch_matches_single_user_scoring(self):
+        """Test that batch scoring returns the same results as single requests"""
+        batch = self.engine.recommend_many([1, 2, 3, 4, 999], 3)
+        
+        self.assertEqual(set(batch), {'1', '2', '3', '4', '999'})
+        for user_id in (1, 3, 999):
+            self.assertEqual(batch[str(user_id)], self.engine.recommend(user_id, 3))
+    
+    @patch('apps.ml_ai.services.RecommendationService.prepare_interaction_data')
+    def test_service_uses_engine(self, mock_prepare):
+        """Test that the service publishes a model and serves it"""
+        from .recommendations import reset_engine
+        
+        mock_prepare.return_value = pd.DataFrame([
+            {'user_id': 1, 'product_id': 'a', 'rating': 5},
+            {'user_id': 1, 'product_id': 'b', 'rating': 4},
+            {'user_id': 2, 'product_id': 'a', 'rating': 4},
+        ])
+        User.objects.create_user(username='trainer', password='testpass')
+        with self.settings(ML_MODELS_DIR=self.model_dir):
+            reset_engine()
+            service = RecommendationService()
+            model = service.train_recommendation_model(top_k=5)
+            recommendations = service.get_recommendations(2, 5)
+            reset_engine()
+        
+        self.assertEqual(model.parameters.get('top_k'), 5)
+        self.assertEqual(recommendations[0]['product_id'], 'b')
+
+
 class MLAIAPITestCase(APITestCase):
     """Test cases for ML/AI API endpoints"""
     
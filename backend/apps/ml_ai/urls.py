@@ -27,6 +27,7 @@ urlpatterns = [
     # Recommendations
     path('recommendations/train/', RecommendationViewSet.as_view({'post': 'train_model'}), name='recommendations-train'),
     path('recommendations/get/', RecommendationViewSet.as_view({'post': 'get_recommendations'}), name='recommendations-get'),
+    path('recommendations/batch/', RecommendationViewSet.as_view({'post': 'get_batch_recommendations'}), name='recommendations-batch'),
     
     # Pricing Optimization
     path('pricing-optimization/train/', PricingOptimizationViewSet.as_view({'post': 'train_model'}), name='pricing-optimization-train'),
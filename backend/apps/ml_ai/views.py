@@ -391,6 +391,31 @@ class RecommendationViewSet(viewsets.ViewSet):
                 )
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'])
+    def get_batch_recommendations(self, request):
+        """Get product recommendations for many users at once"""
+        serializer = BatchRecommendationRequestSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                recommendations = self.service.get_recommendations_batch(
+                    serializer.validated_data['user_ids'],
+                    serializer.validated_data['num_recommendations']
+                )
+                
+                return Response({
+                    user_id: RecommendationResponseSerializer(items, many=True).data
+                    for user_id, items in recommendations.items()
+                })
+                
+            except Exception as e:
+                logger.error(f"Error getting batch recommendations: {str(e)}")
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class PricingOptimizationViewSet(viewsets.ViewSet):
@@ -0,0 +1,294 @@
+"""
+Batched fan-out for bulk notifications.
+
+``NotificationService._process_notification_batch`` used to call
+``send_notification`` once per target user, which looked up the template,
+checked preferences, inserted a notification and called the provider one
+user at a time, and copied the whole audience into the batch's
+``target_users`` table first. The fan-out instead:
+
+* reads the audience in primary-key chunks (``CHUNK_SIZE``), so no query
+  or cursor stays open for the whole campaign;
+* loads each channel's template once and renders it from templates
+  compiled once per process (``services.compile_template``);
+* fetches the opted-out ``(user, channel)`` pairs of a chunk in one query;
+* stores a chunk's notifications and their ``created`` logs with
+  ``bulk_create``;
+* sends each channel in groups of ``SEND_BATCH_SIZE`` through the
+  provider's ``send_many`` (one mail connection per group, one SMS request
+  per distinct message) on a thread pool bounded by ``MAX_WORKERS``;
+* records outcomes with a few ``UPDATE`` statements per chunk and adds
+  them to the batch counters with ``F()`` expressions, so progress is
+  visible while the batch runs and concurrent updates are not lost.
+
+``bulk_create`` does not send ``post_save``, so the ``created`` log
+written by ``signals.log_notification_creation`` is written here.
+A batch marked ``CANCELLED`` stops before its next chunk.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.template import Context
+from django.utils import timezone
+
+from core.task_pool import TaskPool
+from core.utils import chunks
+
+from .models import Notification, NotificationBatch, NotificationLog, NotificationPreference
+from .services import PREFERENCE_TYPES, compile_template
+
+logger = logging.getLogger(__name__)
+
+
+def get_notification_fanout_settings():
+    """Return chunking and concurrency settings for bulk notifications."""
+    config = getattr(settings, 'NOTIFICATION_FANOUT', {})
+    return {
+        'max_workers': config.get('MAX_WORKERS', 8),
+        'chunk_size': config.get('CHUNK_SIZE', 1000),
+        'send_batch_size': config.get('SEND_BATCH_SIZE', 100),
+    }
+
+
+def _iter_chunks(queryset, size: int):
+    # Keyset pagination: each chunk is a short indexed query
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+class CompiledTemplate:
+    """
+    A notification template with its subject, body and HTML parsed once.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.subject = compile_template(template.subject_template)
+        self.body = compile_template(template.body_template)
+        self.html = compile_template(template.html_template) if template.html_template else None
+
+    def render(self, context_data: Dict[str, Any]) -> Dict[str, str]:
+        context = Context(context_data)
+        return {
+            'subject': self.subject.render(context),
+            'message': self.body.render(context),
+            'html_content': self.html.render(context) if self.html else '',
+        }
+
+
+class FanoutStats:
+    """
+    Counters for one batch run.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.recipients = 0
+        self.opted_out = 0
+        self.sent = 0
+        self.failed = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            'recipients': self.recipients,
+            'opted_out': self.opted_out,
+            'sent': self.sent,
+            'failed': self.failed,
+            'elapsed_seconds': round(elapsed, 3),
+            'notifications_per_second': round((self.sent + self.failed) / elapsed, 2),
+        }
+
+
+class NotificationFanout:
+    """
+    Sends one batch's notifications to its audience, a chunk at a time.
+
+    ``service`` is the ``NotificationService`` whose templates, channel
+    defaults and providers are used.
+    """
+
+    def __init__(self, service, executor: Optional[TaskPool] = None):
+        self.service = service
+        self.executor = executor or get_send_executor()
+        self.providers = {
+            'EMAIL': service.email_service,
+            'SMS': service.sms_service,
+            'PUSH': service.push_service,
+            'IN_APP': service.in_app_service,
+        }
+
+    def run(self, batch: NotificationBatch, users, context_data: Dict[str, Any],
+            channels: Optional[List[str]] = None, priority: str = 'NORMAL') -> Dict[str, Any]:
+        """
+        Notify every user in ``users`` (a queryset) and return the run's stats.
+        """
+        config = get_notification_fanout_settings()
+        template_type = batch.template.template_type
+        templates = {}
+        for channel in channels or self.service._get_preferred_channels(None, template_type):
+            template = self.service._get_template(template_type, channel)
+            if template:
+                templates[channel] = CompiledTemplate(template)
+            else:
+                logger.warning(f"No template found for {template_type} - {channel}")
+
+        stats = FanoutStats()
+        if templates:
+            preference_type = PREFERENCE_TYPES.get(template_type, 'GENERAL')
+            for chunk in _iter_chunks(users, config['chunk_size']):
+                if NotificationBatch.objects.filter(pk=batch.pk, status='CANCELLED').exists():
+                    logger.info(f"Batch {batch.id} cancelled after {stats.recipients} recipients")
+                    break
+                self._process_chunk(batch, chunk, templates, preference_type, context_data, priority, stats, config)
+
+        report = stats.as_dict()
+        logger.info(
+            f"Batch {batch.id}: {report['recipients']} recipients, {report['sent']} sent, "
+            f"{report['failed']} failed, {report['opted_out']} opted out in {report['elapsed_seconds']}s "
+            f"({report['notifications_per_second']}/s)"
+        )
+        return report
+
+    def _process_chunk(self, batch, users, templates, preference_type, context_data, priority, stats, config):
+        stats.recipients += len(users)
+        disabled = set(
+            NotificationPreference.objects.filter(
+                user_id__in=[user.pk for user in users],
+                notification_type=preference_type,
+                channel__in=list(templates),
+                is_enabled=False
+            ).values_list('user_id', 'channel')
+        )
+
+        notifications = []
+        for user in users:
+            # Recipient values fill in for anything the campaign context leaves out
+            context = {'user_name': user.get_full_name() or user.username, **context_data}
+            for channel, template in templates.items():
+                if (user.pk, channel) in disabled:
+                    stats.opted_out += 1
+                    continue
+                notifications.append(Notification(
+                    user=user,
+                    template=template.template,
+                    channel=channel,
+                    priority=priority,
+                    recipient_email=user.email,
+                    recipient_phone=getattr(user, 'phone', ''),
+                    metadata=context_data,
+                    **template.render(context)
+                ))
+        if not notifications:
+            return
+
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications, batch_size=500)
+            NotificationLog.objects.bulk_create([
+                NotificationLog(
+                    notification=notification,
+                    action='created',
+                    details={
+                        'channel': notification.channel,
+                        'priority': notification.priority,
+                        'template_type': notification.template.template_type,
+                        'batch_id': str(batch.id),
+                    }
+                )
+                for notification in notifications
+            ], batch_size=500)
+
+        results = self.send(notifications, config['send_batch_size'])
+        sent, failed = self.record(notifications, results)
+        stats.sent += sent
+        stats.failed += failed
+        NotificationBatch.objects.filter(pk=batch.pk).update(
+            sent_count=F('sent_count') + sent,
+            failed_count=F('failed_count') + failed,
+            updated_at=timezone.now()
+        )
+
+    def send(self, notifications: List[Notification], send_batch_size: int) -> Dict[Any, bool]:
+        """
+        Send ``notifications`` through their channels' providers; returns
+        whether each was sent, by notification id.
+        """
+        by_channel = defaultdict(list)
+        for notification in notifications:
+            by_channel[notification.channel].append(notification)
+
+        tasks = {}
+        for channel, channel_notifications in by_channel.items():
+            provider = self.providers.get(channel)
+            if provider is None:
+                continue
+            for index, group in enumerate(chunks(channel_notifications, send_batch_size)):
+                tasks[(channel, index)] = self._send_task(provider, group)
+
+        results = {}
+        for (channel, index), outcome in self.executor.run(tasks).items():
+            if "error" in outcome:
+                logger.error(f"Error sending {channel} notifications: {outcome['error']}")
+            else:
+                results.update(outcome["result"])
+        return results
+
+    def _send_task(self, provider, notifications: List[Notification]):
+        def task():
+            return provider.send_many(notifications)
+        return task
+
+    def record(self, notifications: List[Notification], results: Dict[Any, bool]):
+        """
+        Store send outcomes and their logs; returns the sent and failed counts.
+        """
+        now = timezone.now()
+        sent = [notification for notification in notifications if results.get(notification.id)]
+        failed = [notification for notification in notifications if not results.get(notification.id)]
+        with_external_id = [notification for notification in sent if notification.external_id]
+
+        with transaction.atomic():
+            if sent:
+                Notification.objects.filter(pk__in=[notification.pk for notification in sent]).update(
+                    status='SENT', sent_at=now, updated_at=now
+                )
+            if failed:
+                Notification.objects.filter(pk__in=[notification.pk for notification in failed]).update(
+                    status='FAILED', error_message='Service send failed',
+                    retry_count=F('retry_count') + 1, updated_at=now
+                )
+            if with_external_id:
+                Notification.objects.bulk_update(with_external_id, ['external_id'], batch_size=500)
+            NotificationLog.objects.bulk_create([
+                NotificationLog(notification=notification, action='sent' if results.get(notification.id) else 'failed')
+                for notification in notifications
+            ], batch_size=500)
+
+        return len(sent), len(failed)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_send_executor() -> TaskPool:
+    """Return the process-wide pool for provider calls."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = TaskPool(
+                    get_notification_fanout_settings()['max_workers'], thread_name_prefix='notification'
+                )
+    return _executor
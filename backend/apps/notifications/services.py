@@ -1,9 +1,10 @@
 from django.conf import settings
 from django.template import Template, Context
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, get_connection, EmailMultiAlternatives
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
 import logging
 import json
@@ -18,6 +19,33 @@ from .models import (
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+# Map template types to preference types
+PREFERENCE_TYPES = {
+    'ORDER_CONFIRMATION': 'ORDER_UPDATES',
+    'ORDER_STATUS_UPDATE': 'ORDER_UPDATES',
+    'PAYMENT_SUCCESS': 'PAYMENT_UPDATES',
+    'PAYMENT_FAILED': 'PAYMENT_UPDATES',
+    'SHIPPING_UPDATE': 'SHIPPING_UPDATES',
+    'DELIVERY_CONFIRMATION': 'SHIPPING_UPDATES',
+    'PROMOTIONAL': 'PROMOTIONAL',
+    'SECURITY_ALERT': 'SECURITY',
+    'ACCOUNT_UPDATE': 'ACCOUNT',
+    'INVENTORY_LOW': 'INVENTORY',
+    'REVIEW_REQUEST': 'REVIEWS',
+    'SELLER_VERIFICATION': 'SELLER_UPDATES',
+    'SELLER_PAYOUT': 'SELLER_UPDATES',
+}
+
+
+@lru_cache(maxsize=512)
+def compile_template(template_string: str) -> Template:
+    """
+    Parse a template once per process.
+
+    Keyed by the source, so an edited template is simply parsed again.
+    """
+    return Template(template_string)
+
 
 class NotificationService:
     """
@@ -110,9 +138,8 @@ class NotificationService:
             target_criteria=user_criteria or {}
         )
         
-        # Get target users
+        # The audience is kept as criteria and read in chunks when the batch runs
         users = self._get_users_by_criteria(user_criteria)
-        batch.target_users.set(users)
         batch.total_recipients = users.count()
         batch.save()
         
@@ -221,32 +248,13 @@ class NotificationService:
         if not template_string:
             return ''
         
-        template = Template(template_string)
-        context = Context(context_data)
-        return template.render(context)
+        return compile_template(template_string).render(Context(context_data))
     
     def _is_channel_enabled(self, user: User, template_type: str, channel: str) -> bool:
         """
         Check if user has enabled this channel for this notification type
         """
-        # Map template types to preference types
-        type_mapping = {
-            'ORDER_CONFIRMATION': 'ORDER_UPDATES',
-            'ORDER_STATUS_UPDATE': 'ORDER_UPDATES',
-            'PAYMENT_SUCCESS': 'PAYMENT_UPDATES',
-            'PAYMENT_FAILED': 'PAYMENT_UPDATES',
-            'SHIPPING_UPDATE': 'SHIPPING_UPDATES',
-            'DELIVERY_CONFIRMATION': 'SHIPPING_UPDATES',
-            'PROMOTIONAL': 'PROMOTIONAL',
-            'SECURITY_ALERT': 'SECURITY',
-            'ACCOUNT_UPDATE': 'ACCOUNT',
-            'INVENTORY_LOW': 'INVENTORY',
-            'REVIEW_REQUEST': 'REVIEWS',
-            'SELLER_VERIFICATION': 'SELLER_UPDATES',
-            'SELLER_PAYOUT': 'SELLER_UPDATES',
-        }
-        
-        preference_type = type_mapping.get(template_type, 'GENERAL')
+        preference_type = PREFERENCE_TYPES.get(template_type, 'GENERAL')
         
         try:
             preference = NotificationPreference.objects.get(
@@ -304,35 +312,31 @@ class NotificationService:
         """
         Process notification batch
         """
+        from .fanout import NotificationFanout
+        
         batch.status = 'PROCESSING'
         batch.started_at = timezone.now()
         batch.save()
         
         try:
-            for user in batch.target_users.all():
-                notifications = self.send_notification(
-                    user=user,
-                    template_type=batch.template.template_type,
-                    context_data=context_data,
-                    channels=channels,
-                    priority=priority
-                )
-                
-                # Update batch statistics
-                for notification in notifications:
-                    if notification.status == 'SENT':
-                        batch.sent_count += 1
-                    elif notification.status == 'FAILED':
-                        batch.failed_count += 1
+            users = self._get_users_by_criteria(batch.target_criteria)
+            if batch.target_users.exists():
+                users = users.filter(pk__in=batch.target_users.values('pk'))
+            
+            NotificationFanout(self).run(batch, users, context_data or {}, channels, priority)
             
+            batch.refresh_from_db()
+            if batch.status == 'CANCELLED':
+                return
             batch.status = 'COMPLETED'
             batch.completed_at = timezone.now()
             
         except Exception as e:
             logger.error(f"Error processing batch {batch.id}: {str(e)}")
+            batch.refresh_from_db()
             batch.status = 'FAILED'
         
-        batch.save()
+        batch.save(update_fields=['status', 'completed_at', 'updated_at'])
     
     def _log_notification_action(self, notification: Notification, action: str, details: Dict[str, Any] = None):
         """
@@ -409,6 +413,39 @@ class EmailNotificationService:
         except Exception as e:
             logger.error(f"Error sending email notification {notification.id}: {str(e)}")
             return False
+    
+    def send_many(self, notifications: List[Notification]) -> Dict[Any, bool]:
+        """
+        Send email notifications over one mail server connection
+        """
+        results = {}
+        try:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+        except Exception as e:
+            logger.error(f"Error opening mail connection: {str(e)}")
+            return {notification.id: False for notification in notifications}
+        
+        try:
+            for notification in notifications:
+                msg = EmailMultiAlternatives(
+                    subject=notification.subject,
+                    body=notification.message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[notification.recipient_email],
+                    connection=connection
+                )
+                if notification.html_content:
+                    msg.attach_alternative(notification.html_content, "text/html")
+                try:
+                    results[notification.id] = bool(msg.send())
+                except Exception as e:
+                    logger.error(f"Error sending email notification {notification.id}: {str(e)}")
+                    results[notification.id] = False
+        finally:
+            connection.close()
+        
+        return results
 
 
 class SMSNotificationService:
@@ -450,6 +487,48 @@ class SMSNotificationService:
         except Exception as e:
             logger.error(f"Error sending SMS notification {notification.id}: {str(e)}")
             return False
+    
+    def send_many(self, notifications: List[Notification]) -> Dict[Any, bool]:
+        """
+        Send SMS notifications, one request per distinct message
+        """
+        results = {notification.id: False for notification in notifications}
+        if not self.api_key:
+            return results
+        
+        by_message = {}
+        for notification in notifications:
+            if notification.recipient_phone:
+                by_message.setdefault(notification.message, []).append(notification)
+        
+        for message, recipients in by_message.items():
+            if len(recipients) == 1:
+                results[recipients[0].id] = self.send(recipients[0])
+                continue
+            
+            try:
+                # The provider accepts a comma separated list of numbers for one message
+                payload = {
+                    'apikey': self.api_key,
+                    'numbers': ','.join(notification.recipient_phone for notification in recipients),
+                    'message': message,
+                    'sender': self.sender_id
+                }
+                
+                response = requests.post(self.api_url, data=payload, timeout=30)
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    if result.get('status') == 'success':
+                        external_id = str(result.get('batch_id') or result.get('message_id', ''))
+                        for notification in recipients:
+                            notification.external_id = external_id
+                            results[notification.id] = True
+                
+            except Exception as e:
+                logger.error(f"Error sending bulk SMS to {len(recipients)} recipients: {str(e)}")
+        
+        return results
 
 
 class PushNotificationService:
@@ -506,6 +585,12 @@ class PushNotificationService:
             logger.error(f"Error sending push notification {notification.id}: {str(e)}")
             return False
     
+    def send_many(self, notifications: List[Notification]) -> Dict[Any, bool]:
+        """
+        Send push notifications one by one; tokens are looked up per user
+        """
+        return {notification.id: self.send(notification) for notification in notifications}
+    
     def _get_user_fcm_token(self, user: User) -> Optional[str]:
         """
         Get user's FCM token for push notifications
@@ -527,6 +612,12 @@ class InAppNotificationService:
         # For in-app notifications, just marking as sent is enough
         # The frontend will fetch these via API
         return True
+    
+    def send_many(self, notifications: List[Notification]) -> Dict[Any, bool]:
+        """
+        In-app notifications are sent once stored
+        """
+        return {notification.id: True for notification in notifications}
 
 
 class NotificationAnalyticsService:
@@ -0,0 +1,134 @@
+"""
+Tests for batched bulk notifications.
+"""
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from apps.notifications.models import Notification, NotificationPreference, NotificationTemplate
+from apps.notifications.services import (
+    EmailNotificationService, NotificationService, SMSNotificationService, compile_template
+)
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_FANOUT={'CHUNK_SIZE': 2, 'SEND_BATCH_SIZE': 2, 'MAX_WORKERS': 2})
+class NotificationFanoutTests(TestCase):
+    """
+    Test cases for batched bulk notifications
+    """
+    
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123'
+        )
+        self.users = [
+            User.objects.create_user(
+                username=f'customer{index}',
+                email=f'customer{index}@example.com',
+                password='testpass123',
+                first_name=f'Customer{index}'
+            )
+            for index in range(4)
+        ]
+        
+        self.template = NotificationTemplate.objects.create(
+            name='Promotional Template',
+            template_type='PROMOTIONAL',
+            channel='EMAIL',
+            subject_template='{{ promotion_title }} for {{ user_name }}',
+            body_template='Hello {{ user_name }}, enjoy {{ discount_percent }}% off!',
+            is_active=True
+        )
+        
+        self.service = NotificationService()
+        mail.outbox = []
+    
+    def send_campaign(self, **kwargs):
+        return self.service.send_bulk_notification(
+            template_type='PROMOTIONAL',
+            context_data={'promotion_title': 'Summer Sale', 'discount_percent': '20'},
+            channels=['EMAIL'],
+            created_by=self.admin,
+            batch_name='Summer Sale',
+            **kwargs
+        )
+    
+    def test_bulk_notification_is_sent_in_chunks(self):
+        """Test that every recipient gets a personalised notification and the batch is counted"""
+        batch = self.send_campaign()
+        
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'COMPLETED')
+        self.assertEqual(batch.total_recipients, 5)
+        self.assertEqual((batch.sent_count, batch.failed_count), (5, 0))
+        self.assertEqual(batch.target_users.count(), 0)
+        
+        notifications = Notification.objects.filter(template=self.template)
+        self.assertEqual(notifications.count(), 5)
+        self.assertFalse(notifications.exclude(status='SENT').exists())
+        self.assertEqual(len(mail.outbox), 5)
+        
+        notification = notifications.get(user=self.users[0])
+        self.assertEqual(notification.subject, 'Summer Sale for Customer0')
+        self.assertEqual(notification.message, 'Hello Customer0, enjoy 20% off!')
+        self.assertEqual(
+            set(notification.logs.values_list('action', flat=True)), {'created', 'sent'}
+        )
+    
+    def test_opted_out_users_are_skipped(self):
+        """Test that users who disabled the channel get nothing"""
+        NotificationPreference.objects.update_or_create(
+            user=self.users[1],
+            notification_type='PROMOTIONAL',
+            channel='EMAIL',
+            defaults={'is_enabled': False}
+        )
+        
+        batch = self.send_campaign()
+        
+        batch.refresh_from_db()
+        self.assertEqual(batch.sent_count, 4)
+        self.assertFalse(Notification.objects.filter(template=self.template, user=self.users[1]).exists())
+    
+    def test_failed_sends_are_counted(self):
+        """Test that provider failures are recorded on the notifications and the batch"""
+        with patch.object(EmailNotificationService, 'send_many', side_effect=Exception('SMTP down')):
+            batch = self.send_campaign()
+        
+        batch.refresh_from_db()
+        self.assertEqual((batch.sent_count, batch.failed_count), (0, 5))
+        notification = Notification.objects.filter(template=self.template).first()
+        self.assertEqual(notification.status, 'FAILED')
+        self.assertEqual(notification.retry_count, 1)
+    
+    @patch('requests.post')
+    def test_sms_recipients_share_one_request(self, mock_post):
+        """Test that an identical SMS to several numbers is one provider request"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'status': 'success', 'batch_id': 'BATCH1'}
+        mock_post.return_value = mock_response
+        
+        service = SMSNotificationService()
+        service.api_key = 'key'
+        notifications = [
+            Notification(user=user, channel='SMS', subject='Sale', message='20% off', recipient_phone=f'+9100000000{index}')
+            for index, user in enumerate(self.users[:3])
+        ]
+        
+        results = service.send_many(notifications)
+        
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_post.call_args[1]['data']['numbers'].count(','), 2)
+        self.assertTrue(all(results.values()))
+        self.assertEqual(notifications[0].external_id, 'BATCH1')
+    
+    def test_templates_are_compiled_once(self):
+        """Test that the same template source is parsed only once"""
+        self.assertIs(compile_template('Hello {{ user_name }}'), compile_template('Hello {{ user_name }}'))
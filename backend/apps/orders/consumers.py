@@ -6,6 +6,30 @@ from .models import Order, OrderTracking
 
 User = get_user_model()
 
+
+def user_can_track_order(user, order_id) -> bool:
+    """Whether ``user`` may follow the tracking updates of order ``order_id``."""
+    try:
+        # Check if user is the order owner or an admin/staff
+        order = Order.objects.get(id=order_id)
+        
+        if user.is_staff or user.is_superuser:
+            return True
+            
+        if order.user_id == user.id:
+            return True
+            
+        # Check if user is the seller of any items in this order
+        if hasattr(user, 'seller_profile'):
+            seller_products = order.items.filter(product__seller=user.seller_profile).exists()
+            if seller_products:
+                return True
+                
+        return False
+    except (Order.DoesNotExist, ValueError):
+        return False
+
+
 class OrderTrackingConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.order_id = self.scope['url_route']['kwargs']['order_id']
@@ -69,24 +93,8 @@ class OrderTrackingConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def check_order_permission(self, user_id, order_id):
         try:
-            # Check if user is the order owner or an admin/staff
-            order = Order.objects.get(id=order_id)
-            user = User.objects.get(id=user_id)
-            
-            if user.is_staff or user.is_superuser:
-                return True
-                
-            if order.user_id == user_id:
-                return True
-                
-            # Check if user is the seller of any items in this order
-            if hasattr(user, 'seller_profile'):
-                seller_products = order.items.filter(product__seller=user.seller_profile).exists()
-                if seller_products:
-                    return True
-                    
-            return False
-        except (Order.DoesNotExist, User.DoesNotExist):
+            return user_can_track_order(User.objects.get(id=user_id), order_id)
+        except User.DoesNotExist:
             return False
     
     @database_sync_to_async
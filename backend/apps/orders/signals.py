@@ -223,6 +223,7 @@ def order_tracking_post_save(sender, instance, created, **kwargs):
                 order_group_name,
                 {
                     'type': 'order_update',
+                    'order_id': str(instance.order.id),
                     'status': instance.status,
                     'message': instance.description,
                     'tracking_data': tracking_data,
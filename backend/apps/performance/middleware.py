@@ -7,10 +7,25 @@ from django.db import connection
 from django.conf import settings
 from .models import PerformanceMetric, ApplicationPerformanceMonitor, DatabasePerformanceLog
 from .utils import get_client_ip, generate_transaction_id
+from core.metrics_pipeline import BulkCreateSink, record_metric, register_sink
+from datetime import datetime, timezone as dt_timezone
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# Rows are queued on the shared metrics pipeline and bulk-created by its flusher
+METRIC_SINK = 'performance.metric'
+APM_SINK = 'performance.apm'
+QUERY_LOG_SINK = 'performance.query_log'
+
+register_sink(METRIC_SINK, BulkCreateSink(PerformanceMetric))
+register_sink(APM_SINK, BulkCreateSink(ApplicationPerformanceMonitor, timestamp_field=None))
+register_sink(QUERY_LOG_SINK, BulkCreateSink(DatabasePerformanceLog))
+
+
+def _as_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
 class PerformanceMonitoringMiddleware(MiddlewareMixin):
     """Middleware to monitor application performance"""
     
@@ -45,7 +60,7 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
         
         # Log response time metric
         try:
-            PerformanceMetric.objects.create(
+            record_metric(METRIC_SINK, None, dict(
                 metric_type='response_time',
                 name=f"{request.method} {request.path}",
                 value=duration,
@@ -61,16 +76,16 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
                     'content_length': len(response.content) if hasattr(response, 'content') else 0,
                 },
                 severity='high' if duration > 5000 else 'medium' if duration > 2000 else 'low'
-            )
+            ))
             
             # Log APM transaction
-            ApplicationPerformanceMonitor.objects.create(
+            record_metric(APM_SINK, None, dict(
                 transaction_id=request.transaction_id,
                 transaction_type='web_request',
                 name=f"{request.method} {request.path}",
                 duration=duration,
-                start_time=request.start_time,
-                end_time=end_time,
+                start_time=_as_datetime(request.start_time),
+                end_time=_as_datetime(end_time),
                 status_code=response.status_code,
                 tags={
                     'endpoint': request.path,
@@ -79,13 +94,13 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
                 },
                 user_id=str(request.user.id) if hasattr(request, 'user') and request.user.is_authenticated else None,
                 session_id=request.performance_context.get('session_id'),
-            )
+            ))
             
             # Log database queries if any
             if hasattr(request, 'initial_queries'):
                 query_count = len(connection.queries) - request.initial_queries
                 if query_count > 0:
-                    PerformanceMetric.objects.create(
+                    record_metric(METRIC_SINK, None, dict(
                         metric_type='database_query',
                         name=f"Query count for {request.path}",
                         value=query_count,
@@ -94,7 +109,7 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
                         endpoint=request.path,
                         metadata={'queries': query_count},
                         severity='high' if query_count > 50 else 'medium' if query_count > 20 else 'low'
-                    )
+                    ))
         
         except Exception as e:
             logger.error(f"Error logging performance metrics: {e}")
@@ -124,7 +139,7 @@ class DatabasePerformanceMiddleware:
             
             # Log database performance
             try:
-                DatabasePerformanceLog.objects.create(
+                record_metric(QUERY_LOG_SINK, None, dict(
                     query=sql[:5000],  # Truncate very long queries
                     query_hash=hash(sql) % (10 ** 8),  # Simple hash for grouping
                     execution_time=execution_time,
@@ -135,7 +150,7 @@ class DatabasePerformanceMiddleware:
                         'params_count': len(params) if params else 0,
                         'many': many,
                     }
-                )
+                ))
             except Exception as e:
                 logger.error(f"Error logging database performance: {e}")
             
@@ -146,7 +161,7 @@ class DatabasePerformanceMiddleware:
             
             # Log failed query
             try:
-                DatabasePerformanceLog.objects.create(
+                record_metric(QUERY_LOG_SINK, None, dict(
                     query=sql[:5000],
                     query_hash=hash(sql) % (10 ** 8),
                     execution_time=execution_time,
@@ -157,7 +172,7 @@ class DatabasePerformanceMiddleware:
                         'error': str(e),
                         'params_count': len(params) if params else 0,
                     }
-                )
+                ))
             except Exception as log_error:
                 logger.error(f"Error logging failed query: {log_error}")
             
@@ -255,7 +270,7 @@ class ErrorTrackingMiddleware(MiddlewareMixin):
         """Log exceptions and errors for monitoring"""
         try:
             # Log error metric
-            PerformanceMetric.objects.create(
+            record_metric(METRIC_SINK, None, dict(
                 metric_type='error_rate',
                 name=f"Error: {exception.__class__.__name__}",
                 value=1,
@@ -268,17 +283,17 @@ class ErrorTrackingMiddleware(MiddlewareMixin):
                     'method': request.method if hasattr(request, 'method') else 'unknown',
                 },
                 severity='critical'
-            )
+            ))
             
             # Log APM error transaction
             if hasattr(request, 'transaction_id'):
-                ApplicationPerformanceMonitor.objects.create(
-                    transaction_id=request.transaction_id,
+                record_metric(APM_SINK, None, dict(
+                    transaction_id=f"{request.transaction_id}-error",
                     transaction_type='web_request',
                     name=f"ERROR: {request.method} {request.path}",
                     duration=0,
-                    start_time=getattr(request, 'start_time', time.time()),
-                    end_time=time.time(),
+                    start_time=_as_datetime(getattr(request, 'start_time', time.time())),
+                    end_time=_as_datetime(time.time()),
                     status_code=500,
                     error_message=str(exception),
                     stack_trace=str(exception.__traceback__) if hasattr(exception, '__traceback__') else None,
@@ -286,7 +301,7 @@ class ErrorTrackingMiddleware(MiddlewareMixin):
                         'error': True,
                         'exception_type': exception.__class__.__name__,
                     }
-                )
+                ))
         
         except Exception as e:
             logger.error(f"Error logging exception metrics: {e}")
@@ -3,7 +3,9 @@ Custom filters for product API endpoints.
 """
 import django_filters
 from django.db.models import Q
+from rest_framework import filters
 from .models import Product, Category
+from .search_backends import search_products
 
 
 class ProductFilter(django_filters.FilterSet):
@@ -71,21 +73,11 @@ class ProductFilter(django_filters.FilterSet):
 
     def filter_min_effective_price(self, queryset, name, value):
         """Filter by minimum effective price (considering discount)."""
-        return queryset.extra(
-            where=[
-                "CASE WHEN discount_price IS NOT NULL THEN discount_price ELSE price END >= %s"
-            ],
-            params=[value]
-        )
+        return queryset.filter(final_price__gte=value)
 
     def filter_max_effective_price(self, queryset, name, value):
         """Filter by maximum effective price (considering discount)."""
-        return queryset.extra(
-            where=[
-                "CASE WHEN discount_price IS NOT NULL THEN discount_price ELSE price END <= %s"
-            ],
-            params=[value]
-        )
+        return queryset.filter(final_price__lte=value)
 
     def filter_category_tree(self, queryset, name, value):
         """Filter products by category and all its descendants."""
@@ -95,9 +87,8 @@ class ProductFilter(django_filters.FilterSet):
                 is_active=True,
                 is_deleted=False
             )
-            # Get all descendant categories
-            descendant_categories = category.get_descendants()
-            category_ids = [category.id] + [cat.id for cat in descendant_categories]
+            # Resolve the subtree through the closure table as a subquery
+            category_ids = category.get_descendants(include_self=True).values('id')
             return queryset.filter(category_id__in=category_ids)
         except Category.DoesNotExist:
             return queryset.none()
@@ -111,25 +102,7 @@ class ProductFilter(django_filters.FilterSet):
 
     def filter_search(self, queryset, name, value):
         """Full-text search across multiple fields."""
-        if not value:
-            return queryset
-        
-        search_terms = value.split()
-        query = Q()
-        
-        for term in search_terms:
-            term_query = (
-                Q(name__icontains=term) |
-                Q(description__icontains=term) |
-                Q(short_description__icontains=term) |
-                Q(brand__icontains=term) |
-                Q(sku__icontains=term) |
-                Q(tags__icontains=term) |
-                Q(category__name__icontains=term)
-            )
-            query &= term_query
-        
-        return queryset.filter(query).distinct()
+        return search_products(queryset, value)
 
     def filter_tags(self, queryset, name, value):
         """Filter products by tags (comma-separated)."""
@@ -161,6 +134,16 @@ class ProductFilter(django_filters.FilterSet):
         return queryset.filter(status__in=statuses)
 
 
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter that sorts full-text search results by relevance
+    unless the client asked for an explicit ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations and not request.query_params.get(self.ordering_param):
+            return queryset.order_by('-search_rank', *(self.get_default_ordering(view) or []))
+        return super().filter_queryset(request, queryset, view)
 
 
 class CategoryFilter(django_filters.FilterSet):
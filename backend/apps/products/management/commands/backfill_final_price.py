@@ -0,0 +1,57 @@
+"""
+Management command to backfill the denormalized product final_price column.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Backfill Product.final_price in primary-key ordered batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of products updated per batch (default: 5000)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every product instead of only rows without a final price',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to limit replication lag',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Product.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(final_price__isnull=True)
+
+        self.stdout.write('Backfilling product final prices...')
+
+        updated = 0
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+
+            updated += Product.objects.filter(pk__in=pks).sync_final_price()
+            last_pk = pks[-1]
+            self.stdout.write(f'  {updated} products updated')
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled final price for {updated} products.'))
@@ -0,0 +1,57 @@
+"""
+Management command to backfill the denormalized product search_document column.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Backfill Product.search_document in primary-key ordered batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Number of products updated per batch (default: 2000)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every product instead of only rows with an empty search document',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to limit replication lag',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Product.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(search_document='')
+
+        self.stdout.write('Backfilling product search documents...')
+
+        updated = 0
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+
+            updated += Product.objects.filter(pk__in=pks).sync_search_document()
+            last_pk = pks[-1]
+            self.stdout.write(f'  {updated} products updated')
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled search documents for {updated} products.'))
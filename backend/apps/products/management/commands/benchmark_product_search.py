@@ -0,0 +1,132 @@
+"""
+Management command to benchmark product text search backends.
+
+Generates a synthetic catalog, then times the legacy multi-column
+``icontains`` search against the database full-text backend on the same
+queries. The generated rows are committed (InnoDB only indexes FULLTEXT
+data at commit time) and removed afterwards unless ``--keep`` is given.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from apps.products.models import Category, Product
+from apps.products.search_backends import IContainsSearchBackend, get_search_backend
+
+
+SKU_PREFIX = 'SEARCHBENCH-'
+
+WORDS = [
+    'wireless', 'bluetooth', 'organic', 'cotton', 'leather', 'stainless', 'steel',
+    'portable', 'gaming', 'ultra', 'slim', 'premium', 'classic', 'smart', 'digital',
+    'outdoor', 'kitchen', 'travel', 'vintage', 'ergonomic', 'waterproof', 'compact',
+    'headphones', 'speaker', 'jacket', 'backpack', 'bottle', 'keyboard', 'mouse',
+    'monitor', 'lamp', 'chair', 'sneakers', 'watch', 'camera', 'charger', 'blender',
+    'kettle', 'notebook', 'pen', 'tent', 'sleeping', 'bag', 'yoga', 'mat', 'shirt',
+]
+BRANDS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Hooli', 'Vandelay']
+
+
+def legacy_icontains_search(queryset, value):
+    """The pre full-text search: 7-way icontains OR per term joined to category."""
+    query = Q()
+    for term in value.split():
+        query &= (
+            Q(name__icontains=term) |
+            Q(description__icontains=term) |
+            Q(short_description__icontains=term) |
+            Q(brand__icontains=term) |
+            Q(sku__icontains=term) |
+            Q(tags__icontains=term) |
+            Q(category__name__icontains=term)
+        )
+    return queryset.filter(query).distinct()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark legacy icontains product search against the full-text search backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Number of products to generate')
+        parser.add_argument('--queries', type=int, default=50, help='Number of random queries to time')
+        parser.add_argument('--limit', type=int, default=20, help='Results fetched per query (one page)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for data and queries')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated products')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f'Database vendor: {connection.vendor}')
+
+        category = self._generate_catalog(rng, options['products'])
+        try:
+            queries = [
+                ' '.join(rng.sample(WORDS, rng.choice([1, 2])))
+                for _ in range(options['queries'])
+            ]
+            base = Product.objects.filter(category=category, is_active=True, is_deleted=False)
+            backend = get_search_backend(base.db)
+
+            contenders = [
+                ('legacy icontains (7 columns + join)', legacy_icontains_search),
+                ('icontains on search_document', IContainsSearchBackend().search),
+                (f'{type(backend).__name__}', backend.search),
+            ]
+            for label, search in contenders:
+                self._run(label, search, base, queries, options['limit'])
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing generated products...')
+                Product.objects.filter(sku__startswith=SKU_PREFIX).delete()
+                category.hard_delete()
+
+    def _generate_catalog(self, rng, count):
+        self.stdout.write(f'Generating {count} products...')
+        category, _ = Category.objects.get_or_create(
+            slug='search-benchmark', defaults={'name': 'Search Benchmark'}
+        )
+
+        started = time.perf_counter()
+        batch = []
+        for i in range(count):
+            words = rng.sample(WORDS, 4)
+            batch.append(Product(
+                name=' '.join(words[:3]).title(),
+                slug=f'search-benchmark-{i}',
+                description=' '.join(rng.choices(WORDS, k=30)),
+                short_description=' '.join(rng.choices(WORDS, k=8)),
+                category=category,
+                brand=rng.choice(BRANDS),
+                sku=f'{SKU_PREFIX}{i:07d}',
+                price=Decimal(rng.randint(100, 100000)) / 100,
+                tags=','.join(words[1:]),
+                status='active',
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Product.objects.bulk_create(batch)
+
+        self.stdout.write(f'  generated in {time.perf_counter() - started:.1f}s')
+        return category
+
+    def _run(self, label, search, base, queries, limit):
+        timings = []
+        hits = 0
+        for query in queries:
+            started = time.perf_counter()
+            results = list(search(base, query).values_list('pk', flat=True)[:limit])
+            timings.append((time.perf_counter() - started) * 1000)
+            hits += len(results)
+
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f'{label:<40} mean={statistics.mean(timings):8.2f}ms '
+            f'p50={statistics.median(timings):8.2f}ms p95={p95:8.2f}ms '
+            f'avg_hits={hits / len(queries):.1f}'
+        )
@@ -0,0 +1,14 @@
+"""
+Management command to rebuild the category closure table.
+"""
+from django.core.management.base import BaseCommand
+from apps.products.models import CategoryClosure
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the category ancestor/descendant closure table from parent links'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding category closure table...')
+        count = CategoryClosure.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Category closure rebuilt with {count} links.'))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-16 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_category_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='final_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Denormalized effective price used for indexed filtering and sorting', max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'is_active', 'final_price'], name='products_pr_categor_8acb40_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'final_price'], name='products_pr_is_acti_814f68_idx'),
+        ),
+    ]
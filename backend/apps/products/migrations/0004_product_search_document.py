@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-16 20:49
+
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """Create the vendor specific full-text index on search_document."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX products_product_search_ft '
+            'ON products_product (search_document)'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX products_product_search_gin ON products_product "
+            "USING GIN (to_tsvector('english'::regconfig, search_document))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('DROP INDEX products_product_search_ft ON products_product')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_product_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_final_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Denormalized searchable text backing the database full-text index'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-16 21:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingProductSnapshot',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('snapshot_at', models.DateTimeField(db_index=True)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trending_snapshots', to='products.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_snapshots', to='products.product')),
+            ],
+            options={
+                'ordering': ['-snapshot_at', 'rank'],
+                'indexes': [models.Index(fields=['category', 'snapshot_at', 'rank'], name='products_tr_categor_dbe86e_idx'), models.Index(fields=['product', 'snapshot_at'], name='products_tr_product_0779d6_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,9 @@
 """
 Product models for the ecommerce platform.
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, NullIf
 from django.core.validators import MinValueValidator
 from django.utils.text import slugify
 from core.models import BaseModel
@@ -44,17 +46,195 @@ class Category(BaseModel):
     @property
     def full_name(self):
         """Return full category path for hierarchical display."""
-        if self.parent:
-            return f"{self.parent.full_name} > {self.name}"
-        return self.name
+        return ' > '.join(category.name for category in self.get_ancestors(include_self=True))
+
+    @property
+    def breadcrumb(self):
+        """Return breadcrumb list for navigation."""
+        return [
+            {
+                'id': str(category.id),
+                'name': category.name,
+                'slug': category.slug,
+                'url': f'/categories/{category.slug}/'
+            }
+            for category in self.get_ancestors(include_self=True)
+        ]
+
+    def get_descendants(self, include_self=False):
+        """
+        Get all active descendant categories using the closure table.
+
+        Categories below an inactive category are excluded, so a disabled
+        branch hides its whole subtree.
+        """
+        min_depth = 0 if include_self else 1
+        inactive = Category.objects.filter(
+            ancestor_links__ancestor=self,
+            ancestor_links__depth__gte=min_depth,
+            is_active=False
+        )
+        return Category.objects.filter(
+            ancestor_links__ancestor=self,
+            ancestor_links__depth__gte=min_depth,
+            is_active=True
+        ).exclude(ancestor_links__ancestor__in=inactive)
+
+    def get_ancestors(self, include_self=False):
+        """Get all ancestor categories ordered from the root down."""
+        depth_filter = {} if include_self else {'descendant_links__depth__gt': 0}
+        return Category.objects.filter(
+            descendant_links__descendant=self,
+            **depth_filter
+        ).order_by('-descendant_links__depth')
+
+
+class CategoryClosure(models.Model):
+    """
+    Closure table holding every ancestor/descendant pair of the category tree.
+
+    Each category has a self-referencing row at depth 0 plus one row per
+    ancestor. Rows are maintained by the signals in ``apps.products.signals``.
+    """
+    ancestor = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='descendant_links'
+    )
+    descendant = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='ancestor_links'
+    )
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ancestor', 'depth']),
+            models.Index(fields=['descendant', 'depth']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ancestor', 'descendant'],
+                name='unique_category_closure_pair'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+    @classmethod
+    def insert_node(cls, category):
+        """Add closure rows for a newly created category."""
+        links = [cls(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+        if category.parent_id:
+            links.extend(
+                cls(ancestor_id=ancestor_id, descendant_id=category.pk, depth=depth + 1)
+                for ancestor_id, depth in cls.objects.filter(
+                    descendant_id=category.parent_id
+                ).values_list('ancestor_id', 'depth')
+            )
+        cls.objects.bulk_create(links, ignore_conflicts=True)
+
+    @classmethod
+    def move_subtree(cls, category):
+        """Re-link a category and its subtree below its current parent."""
+        subtree = list(
+            cls.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth')
+        )
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+        # Detach the subtree from its old ancestors, keeping internal links
+        cls.objects.filter(descendant_id__in=subtree_ids).exclude(
+            ancestor_id__in=subtree_ids
+        ).delete()
+
+        if not category.parent_id:
+            return
+
+        ancestors = list(
+            cls.objects.filter(descendant_id=category.parent_id).values_list('ancestor_id', 'depth')
+        )
+        cls.objects.bulk_create([
+            cls(
+                ancestor_id=ancestor_id,
+                descendant_id=descendant_id,
+                depth=ancestor_depth + descendant_depth + 1
+            )
+            for ancestor_id, ancestor_depth in ancestors
+            for descendant_id, descendant_depth in subtree
+        ])
+
+    @classmethod
+    def rebuild(cls):
+        """Rebuild the whole closure table from the category parent links."""
+        parents = dict(Category.objects.values_list('id', 'parent_id'))
+        links = []
+        for category_id in parents:
+            ancestor_id, depth, seen = category_id, 0, set()
+            while ancestor_id is not None and ancestor_id not in seen:
+                seen.add(ancestor_id)
+                links.append(cls(ancestor_id=ancestor_id, descendant_id=category_id, depth=depth))
+                ancestor_id, depth = parents.get(ancestor_id), depth + 1
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(links, batch_size=1000)
+        return len(links)
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    QuerySet that keeps the denormalized ``final_price`` and
+    ``search_document`` columns in sync when products are changed through
+    bulk operations.
+    """
+    PRICE_FIELDS = {'price', 'discount_price'}
+    SEARCH_DOCUMENT_FIELDS = {
+        'name', 'brand', 'sku', 'tags', 'category', 'category_id',
+        'short_description', 'description'
+    }
+
+    def update(self, **kwargs):
+        if self.PRICE_FIELDS & kwargs.keys() and 'final_price' not in kwargs:
+            kwargs['final_price'] = Product.final_price_expression(
+                kwargs.get('price', F('price')),
+                kwargs.get('discount_price', F('discount_price'))
+            )
+        if self.SEARCH_DOCUMENT_FIELDS & kwargs.keys() and 'search_document' not in kwargs:
+            kwargs['search_document'] = Product.search_document_expression(**{
+                field: value for field, value in kwargs.items()
+                if field in self.SEARCH_DOCUMENT_FIELDS
+            })
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.final_price = obj.effective_price
+            obj.search_document = obj.build_search_document()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if self.PRICE_FIELDS & set(fields):
+            for obj in objs:
+                obj.final_price = obj.effective_price
+            fields.append('final_price')
+        if self.SEARCH_DOCUMENT_FIELDS & set(fields):
+            for obj in objs:
+                obj.search_document = obj.build_search_document()
+            fields.append('search_document')
+        return super().bulk_update(objs, fields, *args, **kwargs)
 
-    def get_descendants(self):
-        """Get all descendant categories."""
-        descendants = []
-        for child in self.children.filter(is_active=True):
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+    def sync_final_price(self):
+        """Recompute ``final_price`` in the database for every matched product."""
+        return super().update(final_price=Product.final_price_expression())
+
+    def sync_search_document(self):
+        """Recompute ``search_document`` in the database for every matched product."""
+        return super().update(search_document=Product.search_document_expression())
 
 
 class Product(BaseModel):
@@ -96,6 +276,20 @@ class Product(BaseModel):
         blank=True,
         help_text="Dimensions as JSON: {'length': 0, 'width': 0, 'height': 0}"
     )
+    final_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Denormalized effective price used for indexed filtering and sorting"
+    )
+    search_document = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        help_text="Denormalized searchable text backing the database full-text index"
+    )
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     meta_title = models.CharField(max_length=200, blank=True)
@@ -122,11 +316,27 @@ class Product(BaseModel):
             models.Index(fields=['slug']),
             models.Index(fields=['is_featured', 'is_active']),
             models.Index(fields=['brand', 'is_active']),
+            models.Index(fields=['category', 'is_active', 'final_price']),
+            models.Index(fields=['is_active', 'final_price']),
         ]
 
+    objects = ProductQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        self.final_price = self.effective_price
+        self.search_document = self.build_search_document()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if ProductQuerySet.PRICE_FIELDS & update_fields:
+                update_fields.add('final_price')
+            if ProductQuerySet.SEARCH_DOCUMENT_FIELDS & update_fields:
+                update_fields.add('search_document')
+            kwargs['update_fields'] = update_fields
+
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -137,6 +347,68 @@ class Product(BaseModel):
         """Return the effective price (discount price if available, otherwise regular price)."""
         return self.discount_price if self.discount_price else self.price
 
+    @staticmethod
+    def final_price_expression(price=F('price'), discount_price=F('discount_price')):
+        """
+        Database expression matching ``effective_price``.
+
+        Accepts the new price values of an UPDATE; defaults to the stored columns.
+        """
+        output_field = models.DecimalField(max_digits=10, decimal_places=2)
+
+        def as_expression(value):
+            if hasattr(value, 'resolve_expression'):
+                return value
+            return Value(value, output_field=output_field)
+
+        return Coalesce(
+            NullIf(as_expression(discount_price), Value(0)),
+            as_expression(price),
+            output_field=output_field
+        )
+
+    def build_search_document(self):
+        """Return the searchable text stored in ``search_document``."""
+        category_name = self.category.name if self.category_id else ''
+        return ' '.join([
+            self.name, self.brand, self.sku, self.tags, category_name,
+            self.short_description, self.description
+        ])
+
+    @staticmethod
+    def search_document_expression(**values):
+        """
+        Database expression matching ``build_search_document``.
+
+        Keyword arguments override the stored column values, e.g. the new
+        values of an UPDATE.
+        """
+        def as_expression(field_name):
+            value = values.get(field_name, F(field_name))
+            if hasattr(value, 'resolve_expression'):
+                return value
+            return Value(value, output_field=models.TextField())
+
+        category = values.get('category', values.get('category_id', OuterRef('category_id')))
+        if isinstance(category, Category):
+            category = category.pk
+        category_name = Coalesce(
+            Subquery(Category.objects.filter(pk=category).values('name')[:1]),
+            Value('')
+        )
+
+        parts = [
+            as_expression('name'), as_expression('brand'), as_expression('sku'),
+            as_expression('tags'), category_name,
+            as_expression('short_description'), as_expression('description'),
+        ]
+        separated = []
+        for part in parts:
+            if separated:
+                separated.append(Value(' '))
+            separated.append(part)
+        return Concat(*separated, output_field=models.TextField())
+
     @property
     def discount_percentage(self):
         """Calculate discount percentage if discount price is set."""
@@ -317,4 +589,46 @@ class ProductRating(BaseModel):
             3: round((self.rating_3_count / self.total_reviews) * 100, 1),
             2: round((self.rating_2_count / self.total_reviews) * 100, 1),
             1: round((self.rating_1_count / self.total_reviews) * 100, 1),
-        }
\ No newline at end of file
+        }
+
+
+class TrendingProductSnapshot(BaseModel):
+    """
+    Point-in-time copy of the trending lists kept in Redis.
+
+    One row per ranked product per list; ``category`` is null for the
+    site-wide list.
+    """
+    snapshot_at = models.DateTimeField(db_index=True)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='trending_snapshots'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='trending_snapshots'
+    )
+    rank = models.PositiveIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-snapshot_at', 'rank']
+        indexes = [
+            models.Index(fields=['category', 'snapshot_at', 'rank']),
+            models.Index(fields=['product', 'snapshot_at']),
+        ]
+
+    @classmethod
+    def latest_for(cls, category_id=None):
+        """Return the rows of the most recent snapshot of one list, in rank order."""
+        rows = cls.objects.filter(category_id=category_id)
+        snapshot_at = rows.order_by('-snapshot_at').values_list('snapshot_at', flat=True).first()
+        return rows.filter(snapshot_at=snapshot_at).order_by('rank')
+
+    def __str__(self):
+        scope = self.category.name if self.category_id else 'All products'
+        return f"#{self.rank} {self.product.name} ({scope}, {self.snapshot_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,146 @@
+"""
+Database search backends for product text search.
+
+Products keep their searchable text in the denormalized ``search_document``
+column. The backend used for a request is picked from the
+``PRODUCT_SEARCH_BACKEND`` setting, or from the database vendor when the
+setting is not defined:
+
+* MySQL uses ``MATCH ... AGAINST`` on a FULLTEXT index.
+* PostgreSQL uses ``to_tsvector`` backed by a GIN expression index.
+* Other databases fall back to ``icontains`` on the search document.
+
+Ranking backends annotate the queryset with ``search_rank``.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F, FloatField, Func, Value
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Must match the configuration of the GIN index created by the migrations
+POSTGRES_SEARCH_CONFIG = 'english'
+
+
+def tokenize(value):
+    """Split a search string into the word tokens understood by every backend."""
+    return TOKEN_PATTERN.findall(value or '')
+
+
+class BaseSearchBackend:
+    """Interface for product search backends."""
+    ranks_results = False
+
+    def search(self, queryset, value):
+        """Return ``queryset`` restricted to products matching every term of ``value``."""
+        raise NotImplementedError
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """
+    Portable fallback matching each term with ``icontains``.
+
+    Uses the single ``search_document`` column so no joins or DISTINCT are
+    needed, but the leading wildcard still prevents index use.
+    """
+
+    def search(self, queryset, value):
+        for term in value.split():
+            queryset = queryset.filter(search_document__icontains=term)
+        return queryset
+
+
+class MatchAgainst(Func):
+    """MySQL ``MATCH (column) AGAINST (query IN BOOLEAN MODE)`` relevance expression."""
+    output_field = FloatField()
+
+    def __init__(self, column, query):
+        super().__init__(column, Value(query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        column_sql, column_params = compiler.compile(self.source_expressions[0])
+        query_sql, query_params = compiler.compile(self.source_expressions[1])
+        sql = f'MATCH ({column_sql}) AGAINST ({query_sql} IN BOOLEAN MODE)'
+        return sql, [*column_params, *query_params]
+
+
+class MySQLFullTextSearchBackend(BaseSearchBackend):
+    """MySQL FULLTEXT search with relevance ranking."""
+    ranks_results = True
+
+    def build_query(self, value):
+        """Require every term and allow prefix matches, e.g. ``+iph* +pro*``."""
+        return ' '.join(f'+{term}*' for term in tokenize(value))
+
+    def search(self, queryset, value):
+        query = self.build_query(value)
+        if not query:
+            return queryset
+        return queryset.annotate(
+            search_rank=MatchAgainst(F('search_document'), query)
+        ).filter(search_rank__gt=0)
+
+
+class PostgreSQLSearchBackend(BaseSearchBackend):
+    """PostgreSQL ``tsvector`` search with ``ts_rank`` relevance ranking."""
+    ranks_results = True
+    config = POSTGRES_SEARCH_CONFIG
+
+    def build_query(self, value):
+        """AND every term together as a prefix match, e.g. ``iph:* & pro:*``."""
+        return ' & '.join(f'{term}:*' for term in tokenize(value))
+
+    def search(self, queryset, value):
+        # Imported lazily: django.contrib.postgres requires psycopg
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+        query = self.build_query(value)
+        if not query:
+            return queryset
+
+        # Must match the GIN expression index exactly for the planner to use it
+        vector = Func(
+            Value(self.config),
+            F('search_document'),
+            template="to_tsvector(%(expressions)s)",
+            arg_joiner='::regconfig, ',
+            output_field=SearchVectorField()
+        )
+        search_query = SearchQuery(query, search_type='raw', config=self.config)
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=SearchRank(vector, search_query)
+        ).filter(search_vector=search_query)
+
+
+VENDOR_BACKENDS = {
+    'mysql': MySQLFullTextSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def _load_backend(backend_path, vendor):
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(vendor, IContainsSearchBackend)()
+
+
+def get_search_backend(using=None):
+    """Return the configured product search backend for the given database alias."""
+    vendor = connections[using or router.db_for_read(Product)].vendor
+    return _load_backend(getattr(settings, 'PRODUCT_SEARCH_BACKEND', None), vendor)
+
+
+def search_products(queryset, value):
+    """Filter ``queryset`` to products matching ``value`` using the active backend."""
+    if not value or not value.strip():
+        return queryset
+    return get_search_backend(queryset.db).search(queryset, value)
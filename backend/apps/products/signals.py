@@ -0,0 +1,63 @@
+"""
+Signal handlers keeping denormalized category data in sync with the tree,
+and feeding cart and order activity into the trending counters.
+"""
+from django.db.models.signals import pre_save, post_save
+from django.dispatch import receiver
+
+from .models import Category, CategoryClosure, Product
+from .trending import EVENT_ADD_TO_CART, EVENT_ORDER, record_event
+
+
+@receiver(pre_save, sender=Category)
+def track_category_changes(sender, instance, raw=False, **kwargs):
+    """Remember the stored parent and name so post_save can detect changes."""
+    instance._previous_parent_id = None
+    instance._previous_name = None
+    if raw or instance._state.adding:
+        return
+
+    previous = Category.objects.filter(pk=instance.pk).values_list('parent_id', 'name').first()
+    if previous:
+        instance._previous_parent_id, instance._previous_name = previous
+
+
+@receiver(post_save, sender=Category)
+def update_category_closure(sender, instance, created, raw=False, **kwargs):
+    """
+    Insert closure rows for new categories and re-link moved subtrees.
+
+    Hard deletes are handled by the cascading foreign keys on CategoryClosure.
+    """
+    if raw:
+        return
+
+    if created:
+        CategoryClosure.insert_node(instance)
+    elif instance.parent_id != getattr(instance, '_previous_parent_id', instance.parent_id):
+        CategoryClosure.move_subtree(instance)
+
+
+@receiver(post_save, sender=Category)
+def update_product_search_documents(sender, instance, created, raw=False, **kwargs):
+    """Refresh the search text of products whose category was renamed."""
+    if raw or created:
+        return
+
+    previous_name = getattr(instance, '_previous_name', None)
+    if previous_name is not None and previous_name != instance.name:
+        Product.objects.filter(category=instance).sync_search_document()
+
+
+@receiver(post_save, sender='cart.CartItem')
+def count_add_to_cart(sender, instance, created, raw=False, **kwargs):
+    """Count products added to a cart towards trending."""
+    if created and not raw:
+        record_event(instance.product_id, EVENT_ADD_TO_CART, instance.quantity)
+
+
+@receiver(post_save, sender='orders.OrderItem')
+def count_ordered_item(sender, instance, created, raw=False, **kwargs):
+    """Count ordered products towards trending."""
+    if created and not raw:
+        record_event(instance.product_id, EVENT_ORDER, instance.quantity)
@@ -0,0 +1,125 @@
+"""
+Tests for product filters and search backends.
+"""
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+from rest_framework.request import Request
+from apps.products.filters import ProductFilter, ProductOrderingFilter
+from apps.products.models import Category, Product
+from apps.products import search_backends
+from apps.products.search_backends import (
+    IContainsSearchBackend, MySQLFullTextSearchBackend, PostgreSQLSearchBackend,
+    get_search_backend, tokenize
+)
+
+
+class ProductSearchFilterTest(TestCase):
+    """Test cases for ProductFilter text search."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.category = Category.objects.create(name="Audio")
+        self.headphones = Product.objects.create(
+            name="Studio Headphones",
+            description="Closed back monitoring headphones",
+            category=self.category,
+            brand="Sonic",
+            sku="SONIC-HP-01",
+            price=Decimal('199.00'),
+            tags="wired,studio"
+        )
+        self.speaker = Product.objects.create(
+            name="Bluetooth Speaker",
+            description="Portable speaker",
+            category=self.category,
+            brand="Boom",
+            sku="BOOM-SPK-01",
+            price=Decimal('59.00')
+        )
+
+    def filter(self, **params):
+        return ProductFilter(params, queryset=Product.objects.all()).qs
+
+    def test_search_matches_every_term(self):
+        """Test that every search term must match."""
+        self.assertEqual(list(self.filter(search='studio sonic')), [self.headphones])
+        self.assertEqual(list(self.filter(search='studio boom')), [])
+
+    def test_search_matches_category_name(self):
+        """Test that the category name is part of the search document."""
+        self.assertCountEqual(list(self.filter(search='audio')), [self.headphones, self.speaker])
+
+    def test_search_follows_category_rename(self):
+        """Test that renaming a category refreshes product search documents."""
+        self.category.name = "Sound"
+        self.category.save()
+        self.assertCountEqual(list(self.filter(search='sound')), [self.headphones, self.speaker])
+        self.assertEqual(list(self.filter(search='audio')), [])
+
+    def test_search_document_kept_in_sync_by_queryset_update(self):
+        """Test that bulk updates recompute the search document in SQL."""
+        Product.objects.filter(pk=self.speaker.pk).update(brand="Thunder")
+        self.speaker.refresh_from_db()
+        self.assertEqual(self.speaker.search_document, self.speaker.build_search_document())
+        self.assertEqual(list(self.filter(search='thunder')), [self.speaker])
+
+    def test_empty_search_returns_queryset(self):
+        """Test that an empty search leaves the queryset untouched."""
+        self.assertEqual(self.filter(search='').count(), 2)
+
+
+class SearchBackendTest(TestCase):
+    """Test cases for search backend selection and query building."""
+
+    def setUp(self):
+        search_backends._load_backend.cache_clear()
+
+    def tearDown(self):
+        search_backends._load_backend.cache_clear()
+
+    def test_tokenize_strips_operators(self):
+        """Test that boolean search operators are not passed through."""
+        self.assertEqual(tokenize('+iphone -"pro" max*'), ['iphone', 'pro', 'max'])
+
+    def test_mysql_boolean_query(self):
+        """Test MySQL boolean mode query generation."""
+        backend = MySQLFullTextSearchBackend()
+        self.assertEqual(backend.build_query('iphone pro'), '+iphone* +pro*')
+
+    def test_postgresql_tsquery(self):
+        """Test PostgreSQL prefix tsquery generation."""
+        backend = PostgreSQLSearchBackend()
+        self.assertEqual(backend.build_query('iphone pro'), 'iphone:* & pro:*')
+
+    def test_vendor_fallback_backend(self):
+        """Test that SQLite falls back to the icontains backend."""
+        self.assertIsInstance(get_search_backend(), IContainsSearchBackend)
+
+    @override_settings(PRODUCT_SEARCH_BACKEND='apps.products.search_backends.MySQLFullTextSearchBackend')
+    def test_backend_from_settings(self):
+        """Test that PRODUCT_SEARCH_BACKEND overrides vendor detection."""
+        self.assertIsInstance(get_search_backend(), MySQLFullTextSearchBackend)
+
+
+class ProductOrderingFilterTest(TestCase):
+    """Test cases for relevance ordering of search results."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = mock.Mock(ordering=['-created_at'], ordering_fields=['name', 'created_at'])
+
+    def test_ranked_results_ordered_by_relevance(self):
+        """Test that ranked querysets are ordered by search_rank first."""
+        queryset = Product.objects.annotate(search_rank=Product.final_price_expression())
+        request = Request(self.factory.get('/products/'))
+        ordered = ProductOrderingFilter().filter_queryset(request, queryset, self.view)
+        self.assertEqual(ordered.query.order_by, ('-search_rank', '-created_at'))
+
+    def test_explicit_ordering_wins(self):
+        """Test that an explicit ordering parameter overrides relevance."""
+        queryset = Product.objects.annotate(search_rank=Product.final_price_expression())
+        request = Request(self.factory.get('/products/', {'ordering': 'name'}))
+        ordered = ProductOrderingFilter().filter_queryset(request, queryset, self.view)
+        self.assertEqual(ordered.query.order_by, ('name',))
@@ -6,7 +6,7 @@ from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.utils.text import slugify
-from apps.products.models import Category, Product, ProductImage
+from apps.products.models import Category, CategoryClosure, Product, ProductImage
 
 
 class CategoryModelTest(TestCase):
@@ -83,6 +83,89 @@ class CategoryModelTest(TestCase):
         self.assertTrue(categories.index(cat1) < categories.index(cat2))
 
 
+
+class CategoryClosureTest(TestCase):
+    """Test cases for the category closure table."""
+
+    def setUp(self):
+        """Set up a three level category tree."""
+        self.root = Category.objects.create(name="Electronics")
+        self.child = Category.objects.create(name="Smartphones", parent=self.root)
+        self.grandchild = Category.objects.create(name="Android Phones", parent=self.child)
+        self.other_root = Category.objects.create(name="Books")
+
+    def test_closure_rows_created_on_save(self):
+        """Test that every ancestor pair is stored with its depth."""
+        links = set(
+            CategoryClosure.objects.filter(descendant=self.grandchild)
+            .values_list('ancestor_id', 'depth')
+        )
+        self.assertEqual(links, {
+            (self.grandchild.id, 0),
+            (self.child.id, 1),
+            (self.root.id, 2),
+        })
+
+    def test_get_ancestors_ordered_from_root(self):
+        """Test that ancestors are returned root first."""
+        self.assertEqual(list(self.grandchild.get_ancestors()), [self.root, self.child])
+        self.assertEqual(
+            list(self.grandchild.get_ancestors(include_self=True)),
+            [self.root, self.child, self.grandchild]
+        )
+
+    def test_get_descendants_single_query(self):
+        """Test that descendants are resolved with one query."""
+        with self.assertNumQueries(1):
+            descendants = list(self.root.get_descendants())
+        self.assertCountEqual(descendants, [self.child, self.grandchild])
+        self.assertIn(self.root, self.root.get_descendants(include_self=True))
+
+    def test_get_descendants_skips_inactive_branch(self):
+        """Test that an inactive category hides its whole subtree."""
+        self.child.is_active = False
+        self.child.save()
+        self.assertEqual(list(self.root.get_descendants()), [])
+
+    def test_breadcrumb(self):
+        """Test breadcrumb path generation."""
+        self.assertEqual(
+            [item['slug'] for item in self.grandchild.breadcrumb],
+            ['electronics', 'smartphones', 'android-phones']
+        )
+
+    def test_move_subtree(self):
+        """Test that moving a category re-links its whole subtree."""
+        self.child.parent = self.other_root
+        self.child.save()
+
+        self.assertEqual(list(self.grandchild.get_ancestors()), [self.other_root, self.child])
+        self.assertCountEqual(list(self.other_root.get_descendants()), [self.child, self.grandchild])
+        self.assertEqual(list(self.root.get_descendants()), [])
+        self.assertEqual(self.grandchild.full_name, "Books > Smartphones > Android Phones")
+
+    def test_move_subtree_to_root(self):
+        """Test that detaching a category makes it a root."""
+        self.child.parent = None
+        self.child.save()
+
+        self.assertEqual(list(self.grandchild.get_ancestors()), [self.child])
+        self.assertFalse(CategoryClosure.objects.filter(ancestor=self.root, depth__gt=0).exists())
+
+    def test_rebuild(self):
+        """Test rebuilding the closure table from parent links."""
+        expected = set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        CategoryClosure.objects.all().delete()
+
+        count = CategoryClosure.rebuild()
+
+        self.assertEqual(count, len(expected))
+        self.assertEqual(
+            set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')),
+            expected
+        )
+
+
 class ProductModelTest(TestCase):
     """Test cases for Product model."""
 
@@ -128,6 +211,38 @@ class ProductModelTest(TestCase):
         self.product.save()
         self.assertEqual(self.product.effective_price, Decimal('899.99'))
 
+    def test_product_final_price_stored_on_save(self):
+        """Test that final_price mirrors effective_price on save."""
+        self.assertEqual(self.product.final_price, Decimal('999.99'))
+        self.product.discount_price = Decimal('899.99')
+        self.product.save(update_fields=['discount_price'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.final_price, Decimal('899.99'))
+
+    def test_product_final_price_kept_in_sync_by_queryset_update(self):
+        """Test that bulk price updates recompute final_price in SQL."""
+        Product.objects.filter(pk=self.product.pk).update(discount_price=Decimal('850.00'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.final_price, Decimal('850.00'))
+
+        Product.objects.filter(pk=self.product.pk).update(discount_price=None, price=Decimal('950.00'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.final_price, Decimal('950.00'))
+
+    def test_product_final_price_kept_in_sync_by_bulk_update(self):
+        """Test that bulk_update includes final_price when prices change."""
+        self.product.discount_price = Decimal('700.00')
+        Product.objects.bulk_update([self.product], ['discount_price'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.final_price, Decimal('700.00'))
+
+    def test_product_sync_final_price(self):
+        """Test recomputing stale final prices from the stored columns."""
+        Product.objects.filter(pk=self.product.pk).update(final_price=None)
+        Product.objects.all().sync_final_price()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.final_price, Decimal('999.99'))
+
     def test_product_discount_percentage(self):
         """Test discount_percentage property."""
         self.product.discount_price = Decimal('799.99')
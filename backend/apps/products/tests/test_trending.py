@@ -0,0 +1,134 @@
+"""
+Tests for the trending products counters.
+"""
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase, override_settings
+from apps.products import trending
+from apps.products.models import Category, Product, TrendingProductSnapshot
+from apps.products.trending import (
+    EPOCH_KEY, EVENT_ADD_TO_CART, EVENT_ORDER, EVENT_VIEW, GLOBAL_KEY,
+    TrendingBuffer, TrendingStore, category_key, snapshot_trending
+)
+from core.tests.fakes import FakeRedis
+
+
+@override_settings(TRENDING_ENABLED=True, TRENDING_HALF_LIFE=3600, TRENDING_FLUSH_INTERVAL=60)
+class TrendingTest(TestCase):
+    """Test cases for event buffering, decay and snapshots."""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.buffer = TrendingBuffer(client=self.redis, background=False)
+        self.store = TrendingStore(client=self.redis)
+        self.parent = Category.objects.create(name="Electronics")
+        self.child = Category.objects.create(name="Phones", parent=self.parent)
+        self.other = Category.objects.create(name="Books")
+        self.phone = self._product("Phone", self.child)
+        self.tablet = self._product("Tablet", self.parent)
+        self.novel = self._product("Novel", self.other)
+
+        patcher = mock.patch.object(trending, '_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _product(self, name, category):
+        return Product.objects.create(
+            name=name,
+            description=name,
+            category=category,
+            sku=f"{name.upper()}-001",
+            price=Decimal('10.00'),
+        )
+
+    def _record(self, product, event, quantity=1):
+        trending.record_event(product.pk, event, quantity)
+
+    def test_events_are_buffered_and_written_in_one_flush(self):
+        """Test that events stay in process until flushed, then reach every list."""
+        self._record(self.phone, EVENT_VIEW)
+        self._record(self.phone, EVENT_ADD_TO_CART, quantity=2)
+        self._record(self.tablet, EVENT_ORDER)
+        self.assertNotIn(GLOBAL_KEY, self.redis.data)
+
+        self.assertEqual(trending.flush_events(), 2)
+
+        self.assertEqual([product_id for product_id, _ in self.store.top()], [str(self.phone.pk), str(self.tablet.pk)])
+        self.assertEqual(
+            [product_id for product_id, _ in self.store.top(self.parent.pk)],
+            [str(self.phone.pk), str(self.tablet.pk)]
+        )
+        self.assertEqual([product_id for product_id, _ in self.store.top(self.child.pk)], [str(self.phone.pk)])
+        self.assertEqual(self.store.top(self.other.pk), [])
+
+    @override_settings(TRENDING_MAX_PENDING=2)
+    def test_buffer_flushes_when_full(self):
+        """Test that a full buffer is flushed without an explicit call."""
+        self._record(self.phone, EVENT_VIEW)
+        self.assertNotIn(GLOBAL_KEY, self.redis.data)
+        self._record(self.novel, EVENT_VIEW)
+        self.assertEqual(len(self.redis.data[GLOBAL_KEY]), 2)
+
+    @override_settings(TRENDING_FLUSH_INTERVAL=0.05)
+    def test_background_flush_off_the_calling_thread(self):
+        """Test that buffered events are flushed by the flusher thread once they age."""
+        buffer = TrendingBuffer(client=self.redis)
+        flushed = threading.Event()
+        callers = []
+
+        def fake_flush():
+            callers.append(threading.current_thread().name)
+            buffer._pending.clear()
+            flushed.set()
+
+        with mock.patch.object(buffer, 'flush', side_effect=fake_flush):
+            buffer.add(self.phone.pk, 1.0)
+            self.assertTrue(flushed.wait(timeout=5))
+        self.assertEqual(callers, ['trending-flusher'])
+
+    def test_older_events_decay(self):
+        """Test that an event one half-life old counts half as much as a new one."""
+        self.redis.set(EPOCH_KEY, time.time() - 3600)
+        self._record(self.phone, EVENT_VIEW)
+        trending.flush_events()
+
+        self.redis.set(EPOCH_KEY, time.time() - 7200)
+        self.assertAlmostEqual(self.store.top()[0][1], 0.5, places=3)
+
+    def test_maintain_rescales_and_trims(self):
+        """Test that moving the epoch keeps decayed scores and trims long lists."""
+        self.redis.set(EPOCH_KEY, time.time() - 3600)
+        self._record(self.phone, EVENT_ORDER)
+        self._record(self.novel, EVENT_VIEW)
+        trending.flush_events()
+        before = dict(self.store.top())
+
+        with override_settings(TRENDING_MAX_ITEMS=1):
+            self.store.maintain()
+
+        after = self.store.top()
+        self.assertEqual(len(after), 1)
+        self.assertEqual(after[0][0], str(self.phone.pk))
+        self.assertAlmostEqual(after[0][1], before[str(self.phone.pk)], places=3)
+        self.assertAlmostEqual(float(self.redis.get(EPOCH_KEY)), time.time(), delta=5)
+
+    @override_settings(TRENDING_ENABLED=False)
+    def test_disabled_counters_ignore_events(self):
+        """Test that events are dropped when trending is switched off."""
+        self._record(self.phone, EVENT_VIEW)
+        self.assertEqual(trending.flush_events(), 0)
+
+    def test_snapshot_persists_ranked_lists(self):
+        """Test that snapshots store every list and expose the latest one."""
+        self._record(self.phone, EVENT_VIEW)
+        self._record(self.tablet, EVENT_ORDER)
+        with mock.patch('apps.products.trending.get_redis_client', return_value=self.redis):
+            rows = snapshot_trending(limit=10)
+
+        self.assertEqual(rows, 2 + 2 + 1)
+        latest = TrendingProductSnapshot.latest_for(self.parent.pk)
+        self.assertEqual([row.product_id for row in latest], [self.tablet.pk, self.phone.pk])
+        self.assertEqual([row.rank for row in TrendingProductSnapshot.latest_for()], [1, 2])
+        self.assertIn(category_key(self.child.pk), self.store.keys())
@@ -0,0 +1,336 @@
+"""
+Trending products from time-decayed view, add-to-cart and order counters.
+
+Every event adds ``weight * 2 ** ((now - epoch) / half_life)`` to the
+product's score in a Redis sorted set for the whole catalog and for its
+category and every ancestor category. Growing the increment instead of
+shrinking old scores (forward decay) keeps the ranking equivalent to
+exponentially decaying every counter, without ever rewriting old entries;
+a maintenance pass occasionally moves the epoch forward and rescales the
+sets with a single ``ZUNIONSTORE ... WEIGHTS`` per set.
+
+Events are buffered per process and written in one pipeline, so a burst of
+product views costs one Redis round trip per flush rather than per view.
+Flushing happens on a background thread, never on the request or signal
+that recorded the event: every ``TRENDING_FLUSH_INTERVAL`` seconds, so an
+idle process does not sit on old events, and early once
+``TRENDING_MAX_PENDING`` products are buffered.
+Reading a top-N list is a single ``ZREVRANGE`` (O(log n + N)).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from celery import shared_task
+from django.conf import settings
+from django.db import close_old_connections
+
+from core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 'trending:products:all'
+CATEGORY_KEY_PREFIX = 'trending:products:category:'
+KEYS_REGISTRY = 'trending:products:keys'
+EPOCH_KEY = 'trending:products:epoch'
+
+EVENT_VIEW = 'view'
+EVENT_ADD_TO_CART = 'add_to_cart'
+EVENT_ORDER = 'order'
+
+DEFAULT_EVENT_WEIGHTS = {
+    EVENT_VIEW: 1.0,
+    EVENT_ADD_TO_CART: 5.0,
+    EVENT_ORDER: 10.0,
+}
+
+
+def get_trending_settings():
+    """Return the enabled flag, event weights, half-life, buffering and list sizes."""
+    weights = dict(DEFAULT_EVENT_WEIGHTS)
+    weights.update(getattr(settings, 'TRENDING_EVENT_WEIGHTS', {}))
+    return {
+        'enabled': getattr(settings, 'TRENDING_ENABLED', True),
+        'weights': weights,
+        'half_life': getattr(settings, 'TRENDING_HALF_LIFE', 6 * 3600),
+        'flush_interval': getattr(settings, 'TRENDING_FLUSH_INTERVAL', 2.0),
+        'max_pending': getattr(settings, 'TRENDING_MAX_PENDING', 500),
+        'max_items': getattr(settings, 'TRENDING_MAX_ITEMS', 1000),
+    }
+
+
+def category_key(category_id):
+    return f'{CATEGORY_KEY_PREFIX}{category_id}'
+
+
+def decay_factor(elapsed, half_life):
+    return 2 ** (elapsed / half_life)
+
+
+def get_category_keys(product_ids):
+    """
+    Map product IDs to the sorted sets of their category and its ancestors.
+
+    Two queries per flush regardless of how many products were touched.
+    """
+    from .models import CategoryClosure, Product
+
+    product_categories = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'category_id'))
+    lineages = {}
+    for ancestor_id, descendant_id in CategoryClosure.objects.filter(
+        descendant_id__in=set(product_categories.values())
+    ).values_list('ancestor_id', 'descendant_id'):
+        lineages.setdefault(descendant_id, []).append(category_key(ancestor_id))
+
+    return {
+        str(product_id): lineages.get(category_id, [category_key(category_id)])
+        for product_id, category_id in product_categories.items()
+    }
+
+
+class TrendingBuffer:
+    """
+    Per-process accumulator of weighted events, flushed to Redis in batches.
+
+    With ``background`` (the default) a daemon thread does the flushing; it
+    is started on first use and again in a forked child, which drops the
+    events it inherited since the parent flushes those. Without it, a full
+    buffer is flushed by the caller.
+    """
+
+    def __init__(self, client=None, background=True):
+        self._client = client
+        self.background = background
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._wake = threading.Event()
+        self._pid = None
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    def add(self, product_id, weight):
+        if self.background:
+            self._ensure_flusher()
+        with self._lock:
+            self._pending[str(product_id)] += weight
+            full = len(self._pending) >= get_trending_settings()['max_pending']
+        if not full:
+            return
+        if self.background:
+            self._wake.set()
+        else:
+            self.flush()
+
+    def _ensure_flusher(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self._pending = Counter()
+            self._wake = threading.Event()
+            threading.Thread(target=self._run, name='trending-flusher', daemon=True).start()
+            self._pid = pid
+
+    def _run(self):
+        wake = self._wake
+        while True:
+            wake.wait(get_trending_settings()['flush_interval'])
+            wake.clear()
+            if not self._pending:
+                continue
+            # Like a request, the thread must not keep a broken or expired connection
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write buffered scores to Redis; returns the number of products written."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        try:
+            half_life = get_trending_settings()['half_life']
+            epoch = self.client.get(EPOCH_KEY)
+            if epoch is None:
+                epoch = time.time()
+                self.client.set(EPOCH_KEY, epoch, nx=True)
+                epoch = self.client.get(EPOCH_KEY)
+            multiplier = decay_factor(time.time() - float(epoch), half_life)
+
+            category_keys = get_category_keys(list(pending))
+            pipe = self.client.pipeline(transaction=False)
+            keys = {GLOBAL_KEY}
+            for product_id, weight in pending.items():
+                if product_id not in category_keys:
+                    continue
+                increment = weight * multiplier
+                for key in [GLOBAL_KEY] + category_keys[product_id]:
+                    keys.add(key)
+                    pipe.zincrby(key, increment, product_id)
+            pipe.sadd(KEYS_REGISTRY, *keys)
+            pipe.execute()
+        except Exception as e:
+            # Trending is best effort; events are dropped rather than retried
+            logger.warning(f"Dropping {len(pending)} trending events: {e}")
+            return 0
+        return len(pending)
+
+
+_buffer = TrendingBuffer()
+atexit.register(_buffer.flush)
+
+
+def record_event(product_id, event, quantity=1):
+    """
+    Count a product interaction towards trending.
+
+    ``event`` is one of ``EVENT_VIEW``, ``EVENT_ADD_TO_CART`` or ``EVENT_ORDER``.
+    """
+    config = get_trending_settings()
+    weight = config['weights'].get(event)
+    if not config['enabled'] or not weight or not product_id:
+        return
+    _buffer.add(product_id, weight * max(quantity, 1))
+
+
+def flush_events():
+    """Write this process's buffered events to Redis immediately."""
+    return _buffer.flush()
+
+
+class TrendingStore:
+    """
+    Read and maintenance access to the trending sorted sets.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    def top(self, category_id=None, limit=10):
+        """
+        Return ``[(product_id, score), ...]`` for the catalog or a category.
+
+        Scores are decayed to the present, so they are comparable over time.
+        """
+        key = category_key(category_id) if category_id else GLOBAL_KEY
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(EPOCH_KEY)
+        pipe.zrevrange(key, 0, limit - 1, withscores=True)
+        epoch, entries = pipe.execute()
+
+        multiplier = 1.0
+        if epoch is not None:
+            multiplier = decay_factor(time.time() - float(epoch), get_trending_settings()['half_life'])
+        return [(product_id, score / multiplier) for product_id, score in entries]
+
+    def keys(self):
+        return sorted(self.client.smembers(KEYS_REGISTRY))
+
+    def maintain(self):
+        """
+        Rescale scores to a new epoch and trim every set to its top items.
+
+        Returns the number of sets processed.
+        """
+        config = get_trending_settings()
+        keys = self.keys()
+        epoch = self.client.get(EPOCH_KEY)
+        now = time.time()
+
+        pipe = self.client.pipeline(transaction=True)
+        if epoch is not None:
+            # Multiply stored scores by 2 ** (-elapsed / half_life) and restart the epoch
+            factor = 1 / decay_factor(now - float(epoch), config['half_life'])
+            for key in keys:
+                pipe.zunionstore(key, {key: factor})
+            pipe.set(EPOCH_KEY, now)
+        for key in keys:
+            pipe.zremrangebyrank(key, 0, -(config['max_items'] + 1))
+            # Decayed scores this small no longer matter for ranking
+            pipe.zremrangebyscore(key, '-inf', 1e-6)
+        pipe.execute()
+
+        # Forget categories whose sets decayed away entirely
+        empty = [key for key in keys if not self.client.exists(key)]
+        if empty:
+            self.client.srem(KEYS_REGISTRY, *empty)
+        return len(keys)
+
+
+def snapshot_trending(limit=None):
+    """
+    Copy the current top lists into ``TrendingProductSnapshot`` rows.
+
+    Returns the number of rows written.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from .models import Category, Product, TrendingProductSnapshot
+
+    limit = limit or getattr(settings, 'TRENDING_SNAPSHOT_SIZE', 50)
+    store = TrendingStore()
+    flush_events()
+    store.maintain()
+
+    lists = {}
+    for key in store.keys():
+        category_id = None if key == GLOBAL_KEY else key[len(CATEGORY_KEY_PREFIX):]
+        entries = store.top(category_id, limit)
+        if entries:
+            lists[category_id] = entries
+
+    product_ids = {product_id for entries in lists.values() for product_id, _ in entries}
+    existing_products = {str(pk) for pk in Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True)}
+    existing_categories = {
+        str(pk) for pk in Category.objects.filter(pk__in=[c for c in lists if c]).values_list('pk', flat=True)
+    }
+
+    snapshot_at = timezone.now()
+    rows = []
+    for category_id, entries in lists.items():
+        if category_id and category_id not in existing_categories:
+            continue
+        rank = 0
+        for product_id, score in entries:
+            if product_id not in existing_products:
+                continue
+            rank += 1
+            rows.append(TrendingProductSnapshot(
+                snapshot_at=snapshot_at,
+                category_id=category_id,
+                product_id=product_id,
+                rank=rank,
+                score=score,
+            ))
+
+    retention_days = getattr(settings, 'TRENDING_SNAPSHOT_RETENTION_DAYS', 30)
+    with transaction.atomic():
+        TrendingProductSnapshot.objects.bulk_create(rows, batch_size=1000)
+        TrendingProductSnapshot.objects.filter(
+            snapshot_at__lt=snapshot_at - timezone.timedelta(days=retention_days)
+        ).delete()
+    return len(rows)
+
+
+@shared_task(ignore_result=True)
+def snapshot_trending_products():
+    """Decay, trim and persist the trending lists."""
+    rows = snapshot_trending()
+    logger.info(f"Stored {rows} trending product snapshot rows")
+    return rows
@@ -13,7 +13,8 @@ from .serializers import (
     ProductListSerializer, ProductDetailSerializer, ProductCreateUpdateSerializer,
     CategorySerializer, CategoryListSerializer
 )
-from .filters import ProductFilter, CategoryFilter
+from .filters import ProductFilter, CategoryFilter, ProductOrderingFilter
+from .trending import EVENT_VIEW, record_event
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -86,8 +87,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         category = self.get_object()
         
         # Get products from this category and all descendant categories
-        descendant_categories = category.get_descendants()
-        category_ids = [category.id] + [cat.id for cat in descendant_categories]
+        category_ids = category.get_descendants(include_self=True).values('id')
         
         queryset = Product.objects.filter(
             category_id__in=category_ids,
@@ -122,11 +122,11 @@ class ProductViewSet(viewsets.ModelViewSet):
     """
     queryset = Product.objects.filter(is_deleted=False)
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Text search is served by ProductFilter.search through the search backend
+    filter_backends = [DjangoFilterBackend, ProductOrderingFilter]
     filterset_class = ProductFilter
-    search_fields = ['name', 'description', 'short_description', 'brand', 'sku', 'tags']
     ordering_fields = [
-        'name', 'price', 'discount_price', 'created_at', 'updated_at', 
+        'name', 'price', 'discount_price', 'final_price', 'created_at', 'updated_at', 
         'brand', 'weight', 'is_featured'
     ]
     ordering = ['-created_at']
@@ -155,6 +155,13 @@ class ProductViewSet(viewsets.ModelViewSet):
         else:
             return ProductDetailSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """Get a product and count the view towards trending."""
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        record_event(instance.pk, EVENT_VIEW)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured products."""
@@ -203,22 +210,12 @@ class ProductViewSet(viewsets.ModelViewSet):
         """Get price range for filtering."""
         queryset = self.get_queryset()
         
-        # Calculate price range considering discount prices
-        from django.db.models import Case, When, Min, Max
+        # Use the denormalized effective price column
+        from django.db.models import Min, Max
         
         price_range = queryset.aggregate(
-            min_price=Min(
-                Case(
-                    When(discount_price__isnull=False, then='discount_price'),
-                    default='price'
-                )
-            ),
-            max_price=Max(
-                Case(
-                    When(discount_price__isnull=False, then='discount_price'),
-                    default='price'
-                )
-            )
+            min_price=Min('final_price'),
+            max_price=Max('final_price')
         )
         
         return Response(price_range)
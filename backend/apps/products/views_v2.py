@@ -1,11 +1,14 @@
 """
 Product views for API v2 with enhanced features and backward compatibility.
 """
+import logging
+import uuid
+
 from rest_framework import viewsets, filters, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Avg
+from django.db.models import Count, Avg
 from core.permissions import IsAdminOrReadOnly
 from core.pagination import StandardResultsSetPagination
 from core.versioning import VersionedViewMixin, VersionedSerializerMixin, DeprecationWarningMixin
@@ -15,7 +18,7 @@ from core.docs import (
 )
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
-from .models import Product, Category
+from .models import Product, Category, TrendingProductSnapshot
 from .serializers_v2 import (
     ProductListSerializerV2, ProductDetailSerializerV2, ProductCreateUpdateSerializerV2,
     CategorySerializerV2, CategorySerializer as CategoryListSerializerV2
@@ -25,8 +28,23 @@ from .serializers import (
     CategorySerializer, CategoryListSerializer
 )
 from .filters import ProductFilter, CategoryFilter
+from .search_backends import search_products
+from .trending import TrendingStore
 from .views import CategoryViewSet as CategoryViewSetV1, ProductViewSet as ProductViewSetV1
 
+logger = logging.getLogger(__name__)
+
+
+def _valid_uuids(values):
+    """Keep only values that are valid product primary keys."""
+    valid = []
+    for value in values:
+        try:
+            valid.append(uuid.UUID(str(value)))
+        except ValueError:
+            continue
+    return valid
+
 
 @extend_schema(tags=["Categories"])
 class CategoryViewSetV2(CategoryViewSetV1, VersionedViewMixin, VersionedSerializerMixin, DeprecationWarningMixin):
@@ -84,17 +102,7 @@ class CategoryViewSetV2(CategoryViewSetV1, VersionedViewMixin, VersionedSerializ
             return self.version_not_supported("Breadcrumb endpoint is only available in API v2")
         
         category = self.get_object()
-        breadcrumb = []
-        current = category
-        
-        while current:
-            breadcrumb.insert(0, {
-                'id': str(current.id),
-                'name': current.name,
-                'slug': current.slug,
-                'url': f'/categories/{current.slug}/'
-            })
-            current = current.parent
+        breadcrumb = category.breadcrumb
         
         return Response({'breadcrumb': breadcrumb})
 
@@ -131,22 +139,26 @@ class CategoryViewSetV2(CategoryViewSetV1, VersionedViewMixin, VersionedSerializ
         if not self.is_version('v2'):
             return self.version_not_supported("Tree endpoint is only available in API v2")
         
-        def build_tree(parent=None):
-            categories = self.get_queryset().filter(parent=parent)
-            tree = []
-            
-            for category in categories:
-                node = {
-                    'id': str(category.id),
-                    'name': category.name,
-                    'slug': category.slug,
-                    'children': build_tree(category)
-                }
+        # Fetch the whole tree in one query and assemble it in memory
+        categories = list(self.get_queryset())
+        nodes = {
+            category.id: {
+                'id': str(category.id),
+                'name': category.name,
+                'slug': category.slug,
+                'children': []
+            }
+            for category in categories
+        }
+        
+        tree = []
+        for category in categories:
+            node = nodes[category.id]
+            if category.parent_id is None:
                 tree.append(node)
-            
-            return tree
+            elif category.parent_id in nodes:
+                nodes[category.parent_id]['children'].append(node)
         
-        tree = build_tree()
         return Response({'tree': tree})
 
 
@@ -185,7 +197,7 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
 
     @extend_schema(
         summary="Get trending products",
-        description="Returns a list of trending products based on popularity metrics.",
+        description="Returns the products with the most views, cart additions and orders, decayed over time.",
         responses={200: ProductListSerializerV2(many=True)},
         parameters=[
             OpenApiParameter(
@@ -196,6 +208,13 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
                 required=False,
                 default=10
             ),
+            OpenApiParameter(
+                name="category",
+                type=OpenApiTypes.UUID,
+                location=OpenApiParameter.QUERY,
+                description="Only return products from this category and its subcategories",
+                required=False
+            ),
         ],
         tags=["Products"]
     )
@@ -205,10 +224,48 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
         if not self.is_version('v2'):
             return self.version_not_supported("Trending endpoint is only available in API v2")
         
-        # This would typically be based on view counts, sales, etc.
-        # For now, return featured products as trending
-        queryset = self.get_queryset().filter(is_featured=True)[:10]
-        serializer = ProductListSerializerV2(queryset, many=True, context={'request': request})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except (TypeError, ValueError):
+            limit = 10
+        
+        category_id = request.query_params.get('category')
+        if category_id:
+            valid = _valid_uuids([category_id])
+            if not valid:
+                return Response({'error': 'Invalid category'}, status=status.HTTP_400_BAD_REQUEST)
+            category_id = str(valid[0])
+        
+        queryset = self.get_queryset()
+        if category_id:
+            queryset = queryset.filter(category__ancestor_links__ancestor_id=category_id)
+        
+        # Over-fetch so trending products that are no longer visible can be skipped
+        try:
+            product_ids = [product_id for product_id, _ in TrendingStore().top(category_id, limit * 2)]
+        except Exception as e:
+            logger.warning(f"Trending counters unavailable, serving last snapshot: {e}")
+            product_ids = list(
+                TrendingProductSnapshot.latest_for(category_id)
+                .values_list('product_id', flat=True)[:limit * 2]
+            )
+            product_ids = [str(product_id) for product_id in product_ids]
+        
+        by_id = {
+            str(product.pk): product
+            for product in queryset.filter(pk__in=_valid_uuids(product_ids))
+        }
+        products = [by_id[product_id] for product_id in product_ids if product_id in by_id][:limit]
+        
+        # Top up with featured products while there is too little activity
+        if len(products) < limit:
+            products.extend(
+                queryset.exclude(pk__in=[product.pk for product in products])
+                .filter(is_featured=True)
+                .order_by('-created_at')[:limit - len(products)]
+            )
+        
+        serializer = ProductListSerializerV2(products, many=True, context={'request': request})
         return Response(serializer.data)
 
     @extend_schema(
@@ -233,10 +290,39 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
         if not self.is_version('v2'):
             return self.version_not_supported("Recommendations endpoint is only available in API v2")
         
-        # This would typically use ML algorithms for recommendations
-        # For now, return random products from popular categories
-        queryset = self.get_queryset().order_by('?')[:8]
-        serializer = ProductListSerializerV2(queryset, many=True, context={'request': request})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 50)
+        except (TypeError, ValueError):
+            limit = 8
+        
+        queryset = self.get_queryset()
+        products = []
+        
+        # numpy and scipy load with the engine, not with every product view
+        from apps.ml_ai.recommendations import get_engine
+        
+        engine = get_engine()
+        if engine is not None:
+            # Over-fetch so recommended products that are no longer visible can be skipped
+            if request.user.is_authenticated:
+                candidates = engine.recommend(request.user.pk, limit * 2)
+            else:
+                candidates = engine.popular(limit * 2)
+            product_ids = [rec['product_id'] for rec in candidates]
+            by_id = {
+                str(product.pk): product
+                for product in queryset.filter(pk__in=_valid_uuids(product_ids))
+            }
+            products = [by_id[product_id] for product_id in product_ids if product_id in by_id][:limit]
+        
+        # Top up from featured and newest products when the model has too few
+        if len(products) < limit:
+            products.extend(
+                queryset.exclude(pk__in=[product.pk for product in products])
+                .order_by('-is_featured', '-created_at')[:limit - len(products)]
+            )
+        
+        serializer = ProductListSerializerV2(products, many=True, context={'request': request})
         return Response(serializer.data)
 
     @extend_schema(
@@ -304,12 +390,12 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
                     "product_id": {"type": "string"},
                     "sku": {"type": "string"},
                     "status": {"type": "string", "enum": ["in_stock", "out_of_stock", "unknown"]},
-                    "quantity": {"type": "integer", "nullable": true},
-                    "estimated_restock_date": {"type": "string", "format": "date", "nullable": true},
+                    "quantity": {"type": "integer", "nullable": True},
+                    "estimated_restock_date": {"type": "string", "format": "date", "nullable": True},
                     "can_backorder": {"type": "boolean"},
-                    "low_stock_threshold": {"type": "integer", "nullable": true},
-                    "is_low_stock": {"type": "boolean", "nullable": true},
-                    "reserved_quantity": {"type": "integer", "nullable": true}
+                    "low_stock_threshold": {"type": "integer", "nullable": True},
+                    "is_low_stock": {"type": "boolean", "nullable": True},
+                    "reserved_quantity": {"type": "integer", "nullable": True}
                 }
             }
         },
@@ -358,7 +444,7 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
                                 "product_id": {"type": "string"},
                                 "sku": {"type": "string"},
                                 "status": {"type": "string", "enum": ["in_stock", "out_of_stock", "unknown"]},
-                                "quantity": {"type": "integer", "nullable": true}
+                                "quantity": {"type": "integer", "nullable": True}
                             }
                         }
                     }
@@ -378,7 +464,7 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
                 location=OpenApiParameter.QUERY,
                 description="Comma-separated list of product IDs",
                 required=True,
-                example="1,2,3,4"
+                examples=[OpenApiExample("Product IDs", value="1,2,3,4")]
             ),
         ],
         tags=["Products"]
@@ -493,12 +579,7 @@ class ProductViewSetV2(ProductViewSetV1, VersionedViewMixin, VersionedSerializer
         # Basic search
         query = request.GET.get('q', '').strip()
         if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query) |
-                Q(brand__icontains=query) |
-                Q(tags__icontains=query)
-            )
+            queryset = search_products(queryset, query)
         
         # V2 specific filters
         if self.is_version('v2'):
@@ -0,0 +1,453 @@
+"""
+In-memory promotion rule engine for cart and checkout pricing.
+
+Checking promotions one at a time with ``Promotion.is_active`` and
+``can_be_used_by_customer`` costs a ``PromotionUsage`` count query per
+promotion and customer, so pricing a cart against every promotion was
+O(promotions x items) queries. The engine instead:
+
+* compiles every active promotion, with its product and category scope,
+  into a ``PromotionIndex`` held in process memory. The index maps
+  channel -> product / category -> promotions, plus the promotions that
+  apply to every product, so a cart only looks at promotions that can
+  match one of its lines. Category scopes cover subcategories through the
+  category closure table, loaded with the index;
+* evaluates the whole cart in one pass: candidate lookup, time window,
+  targeting and minimums in memory, then usage totals, budgets and the
+  customer's per-promotion usage read in at most two queries, then
+  discounts and stacking rules;
+* rebuilds the index when promotions, their scopes or categories change.
+  Change signals bump a version in the shared cache after commit; each
+  process compares it at most every ``CHECK_INTERVAL`` seconds and
+  rebuilds on a mismatch, or after ``MAX_AGE`` seconds regardless. Saves
+  that only touch counters (usage count, budget spent, ...) do not count
+  as changes since counters are always read live.
+
+Bundle, tiered and dynamic promotions have no rule configuration on the
+model and are not evaluated here.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import (
+    Promotion, PromotionCategory, PromotionProduct, PromotionStatus,
+    PromotionType, PromotionUsage, TargetType
+)
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'promotions:engine:version'
+
+# Promotions with an empty allowed_channels list apply on every channel
+ALL_CHANNELS = '*'
+
+# Promotion fields updated as promotions are used; they never change the rules
+COUNTER_FIELDS = frozenset({
+    'usage_count', 'budget_spent', 'conversion_rate', 'roi', 'fraud_score', 'is_flagged_for_review',
+})
+
+EVALUATED_TYPES = (
+    PromotionType.PERCENTAGE, PromotionType.FIXED_AMOUNT, PromotionType.BOGO, PromotionType.FREE_SHIPPING,
+)
+
+CENT = Decimal('0.01')
+
+
+def get_promotion_engine_settings():
+    """Return how often processes check for rule changes and the index's maximum age."""
+    config = getattr(settings, 'PROMOTION_ENGINE', {})
+    return {
+        'check_interval': config.get('CHECK_INTERVAL', 2),
+        'max_age': config.get('MAX_AGE', 300),
+    }
+
+
+class CartLine:
+    """
+    One cart line as seen by the engine.
+    """
+    __slots__ = ('product_id', 'category_ids', 'quantity', 'unit_price', 'total')
+
+    def __init__(self, product_id, category_ids, quantity: int, unit_price: Decimal):
+        self.product_id = product_id
+        self.category_ids = category_ids
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.total = unit_price * quantity
+
+
+class CompiledPromotion:
+    """
+    The rules of one promotion, detached from the ORM.
+    """
+    __slots__ = (
+        'id', 'name', 'promotion_type', 'discount_value', 'max_discount_amount',
+        'buy_quantity', 'get_quantity', 'get_discount_percentage', 'start_date', 'end_date',
+        'usage_limit_total', 'usage_limit_per_customer', 'budget_limit',
+        'minimum_order_amount', 'minimum_quantity', 'target_type', 'target_customer_ids',
+        'can_stack', 'stackable_types', 'excluded_ids', 'priority', 'channels',
+        'included_products', 'excluded_products', 'included_categories', 'excluded_categories',
+    )
+
+    def __init__(self, promotion: Promotion, scope: Dict[str, set]):
+        self.id = promotion.id
+        self.name = promotion.name
+        self.promotion_type = promotion.promotion_type
+        self.discount_value = promotion.discount_value
+        self.max_discount_amount = promotion.max_discount_amount
+        self.buy_quantity = promotion.buy_quantity
+        self.get_quantity = promotion.get_quantity
+        self.get_discount_percentage = promotion.get_discount_percentage
+        self.start_date = promotion.start_date
+        self.end_date = promotion.end_date
+        self.usage_limit_total = promotion.usage_limit_total
+        self.usage_limit_per_customer = promotion.usage_limit_per_customer
+        self.budget_limit = promotion.budget_limit
+        self.minimum_order_amount = promotion.minimum_order_amount
+        self.minimum_quantity = promotion.minimum_quantity
+        self.target_type = promotion.target_type
+        self.target_customer_ids = frozenset(str(value) for value in promotion.target_customer_ids or ())
+        self.can_stack = promotion.can_stack_with_other_promotions
+        self.stackable_types = frozenset(promotion.stackable_promotion_types or ())
+        self.excluded_ids = frozenset(str(value) for value in promotion.excluded_promotion_ids or ())
+        self.priority = promotion.priority
+        self.channels = tuple(promotion.allowed_channels or ())
+        self.included_products = frozenset(scope['included_products'])
+        self.excluded_products = frozenset(scope['excluded_products'])
+        self.included_categories = frozenset(scope['included_categories'])
+        self.excluded_categories = frozenset(scope['excluded_categories'])
+
+    @property
+    def has_usage_totals(self) -> bool:
+        return self.usage_limit_total is not None or self.budget_limit is not None
+
+    def is_live(self, now) -> bool:
+        return self.start_date <= now <= self.end_date
+
+    def targets(self, customer_id: Optional[str]) -> bool:
+        if self.target_type == TargetType.SPECIFIC_CUSTOMERS:
+            return customer_id is not None and customer_id in self.target_customer_ids
+        return True
+
+    def covers(self, line: CartLine) -> bool:
+        """Whether the line is in scope and not excluded."""
+        if line.product_id in self.excluded_products:
+            return False
+        if self.excluded_categories and not self.excluded_categories.isdisjoint(line.category_ids):
+            return False
+        if not self.included_products and not self.included_categories:
+            return True
+        return (
+            line.product_id in self.included_products or
+            not self.included_categories.isdisjoint(line.category_ids)
+        )
+
+    def meets_minimums(self, cart_subtotal: Decimal, lines: List[CartLine]) -> bool:
+        if self.minimum_order_amount is not None and cart_subtotal < self.minimum_order_amount:
+            return False
+        if self.minimum_quantity is not None and sum(line.quantity for line in lines) < self.minimum_quantity:
+            return False
+        return True
+
+    def discount_for(self, lines: List[CartLine]) -> Decimal:
+        """Discount this promotion gives on the lines it covers."""
+        eligible_total = sum((line.total for line in lines), Decimal('0'))
+        if self.promotion_type == PromotionType.PERCENTAGE:
+            discount = eligible_total * self.discount_value / 100
+            if self.max_discount_amount is not None:
+                discount = min(discount, self.max_discount_amount)
+        elif self.promotion_type == PromotionType.FIXED_AMOUNT:
+            discount = min(self.discount_value, eligible_total)
+        elif self.promotion_type == PromotionType.BOGO:
+            # Most expensive units are the ones bought; the cheaper ones in each group are discounted
+            group = self.buy_quantity + self.get_quantity
+            units = sorted((line.unit_price for line in lines for _ in range(line.quantity)), reverse=True)
+            discount = sum(
+                (price for position, price in enumerate(units) if position % group >= self.buy_quantity),
+                Decimal('0')
+            ) * self.get_discount_percentage / 100
+        else:
+            discount = Decimal('0')
+        return discount.quantize(CENT)
+
+    def stacks_with(self, other: 'CompiledPromotion') -> bool:
+        if not self.can_stack:
+            return False
+        if self.stackable_types and other.promotion_type not in self.stackable_types:
+            return False
+        return str(other.id) not in self.excluded_ids
+
+
+class PromotionIndex:
+    """
+    Active promotions keyed by channel, then product and category.
+    """
+
+    def __init__(self, promotions: Iterable[CompiledPromotion], category_ancestors: Dict[Any, tuple],
+                 version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.category_ancestors = category_ancestors
+        self.size = 0
+        self.by_channel = {}
+        for promotion in promotions:
+            self.size += 1
+            for channel in promotion.channels or (ALL_CHANNELS,):
+                bucket = self.by_channel.setdefault(
+                    channel, {'products': defaultdict(list), 'categories': defaultdict(list), 'all': []}
+                )
+                self._add(bucket, promotion)
+
+    @classmethod
+    def build(cls, version=None) -> 'PromotionIndex':
+        """Load and compile every promotion that is active now or later."""
+        started = time.perf_counter()
+        now = timezone.now()
+        promotions = Promotion.objects.filter(
+            status=PromotionStatus.ACTIVE, end_date__gte=now, promotion_type__in=EVALUATED_TYPES
+        ).defer('description', 'internal_notes')
+        active = {'promotion__status': PromotionStatus.ACTIVE, 'promotion__end_date__gte': now}
+
+        scopes = defaultdict(lambda: {
+            'included_products': set(), 'excluded_products': set(),
+            'included_categories': set(), 'excluded_categories': set(),
+        })
+        for promotion_id, product_id, is_included in PromotionProduct.objects.filter(**active).values_list(
+            'promotion_id', 'product_id', 'is_included'
+        ):
+            scopes[promotion_id]['included_products' if is_included else 'excluded_products'].add(product_id)
+        for promotion_id, category_id, is_included in PromotionCategory.objects.filter(**active).values_list(
+            'promotion_id', 'category_id', 'is_included'
+        ):
+            scopes[promotion_id]['included_categories' if is_included else 'excluded_categories'].add(category_id)
+
+        index = cls(
+            [CompiledPromotion(promotion, scopes[promotion.id]) for promotion in promotions],
+            _load_category_ancestors(),
+            version
+        )
+        logger.info(
+            f"Compiled {index.size} promotions into the rule index in "
+            f"{(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return index
+
+    @staticmethod
+    def _add(bucket, promotion: CompiledPromotion):
+        if not promotion.included_products and not promotion.included_categories:
+            bucket['all'].append(promotion)
+            return
+        for product_id in promotion.included_products:
+            bucket['products'][product_id].append(promotion)
+        for category_id in promotion.included_categories:
+            bucket['categories'][category_id].append(promotion)
+
+    def match(self, lines: List[CartLine], channel: Optional[str]) -> Dict[Any, List[CartLine]]:
+        """
+        Return ``{promotion: [covered lines]}`` for promotions that cover
+        at least one line on ``channel``.
+        """
+        buckets = [self.by_channel[key] for key in (ALL_CHANNELS, channel) if key in self.by_channel]
+        matches = defaultdict(list)
+        for bucket in buckets:
+            for promotion in bucket['all']:
+                if promotion.excluded_products or promotion.excluded_categories:
+                    covered = [line for line in lines if promotion.covers(line)]
+                else:
+                    covered = list(lines)
+                if covered:
+                    matches[promotion] = covered
+
+        for line in lines:
+            candidates = {}
+            for bucket in buckets:
+                for promotion in bucket['products'].get(line.product_id, ()):
+                    candidates[promotion.id] = promotion
+                for category_id in line.category_ids:
+                    for promotion in bucket['categories'].get(category_id, ()):
+                        candidates[promotion.id] = promotion
+            for promotion in candidates.values():
+                if promotion.covers(line):
+                    matches[promotion].append(line)
+        return matches
+
+
+def _load_category_ancestors() -> Dict[Any, tuple]:
+    from apps.products.models import CategoryClosure
+
+    ancestors = defaultdict(list)
+    for descendant_id, ancestor_id in CategoryClosure.objects.values_list('descendant_id', 'ancestor_id'):
+        ancestors[descendant_id].append(ancestor_id)
+    return {category_id: tuple(ids) for category_id, ids in ancestors.items()}
+
+
+class PromotionEngine:
+    """
+    Evaluates carts against the process's compiled promotion index.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_index(self) -> PromotionIndex:
+        """Return the compiled index, rebuilding it when the rules changed."""
+        config = get_promotion_engine_settings()
+        now = time.monotonic()
+        index = self._index
+        if index is not None and now - index.built_at < config['max_age']:
+            if now - self._checked_at < config['check_interval']:
+                return index
+            version = cache.get(VERSION_KEY)
+            if version == index.version:
+                self._checked_at = now
+                return index
+        else:
+            version = cache.get(VERSION_KEY)
+
+        with self._lock:
+            index = self._index
+            if index is None or index.version != version or now - index.built_at >= config['max_age']:
+                index = self._index = PromotionIndex.build(version)
+            self._checked_at = now
+        return index
+
+    def invalidate(self):
+        """Drop this process's index; the next evaluation rebuilds it."""
+        self._index = None
+
+    def evaluate_cart(self, items: Iterable[Dict[str, Any]], customer=None, channel: Optional[str] = None,
+                      now=None) -> Dict[str, Any]:
+        """
+        Apply every eligible promotion to a cart.
+
+        Args:
+            items: Dicts with ``product_id``, ``category_id``, ``quantity``
+                and ``unit_price``
+            customer: The ``CustomerProfile`` buying, if known
+            channel: A ``PromotionChannel`` value
+            now: Evaluation time, defaults to the current time
+
+        Returns:
+            Dict with the subtotal, total discount, free shipping flag and
+            the promotions applied with their discounts
+        """
+        now = now or timezone.now()
+        index = self.get_index()
+        lines = [
+            CartLine(
+                item['product_id'],
+                index.category_ancestors.get(item.get('category_id'), (item.get('category_id'),)),
+                int(item['quantity']),
+                Decimal(str(item['unit_price'])),
+            )
+            for item in items
+        ]
+        subtotal = sum((line.total for line in lines), Decimal('0'))
+        customer_id = str(customer.pk) if customer is not None else None
+
+        eligible = {
+            promotion: covered
+            for promotion, covered in index.match(lines, channel).items()
+            if promotion.is_live(now) and promotion.targets(customer_id) and promotion.meets_minimums(subtotal, covered)
+        }
+        usage_totals, customer_usage = self._load_counters(eligible, customer)
+
+        offers = []
+        for promotion, covered in eligible.items():
+            if promotion.id in usage_totals:
+                usage_count, budget_spent = usage_totals[promotion.id]
+                if promotion.usage_limit_total is not None and usage_count >= promotion.usage_limit_total:
+                    continue
+                if promotion.budget_limit is not None and budget_spent >= promotion.budget_limit:
+                    continue
+            if (promotion.usage_limit_per_customer and
+                    customer_usage.get(promotion.id, 0) >= promotion.usage_limit_per_customer):
+                continue
+            discount = promotion.discount_for(covered)
+            if discount > 0 or promotion.promotion_type == PromotionType.FREE_SHIPPING:
+                offers.append((promotion, discount, covered))
+
+        # Highest priority first, then the biggest discount; later offers must stack with all applied
+        offers.sort(key=lambda offer: (-offer[0].priority, -offer[1]))
+        applied = []
+        remaining = subtotal
+        free_shipping = False
+        for promotion, discount, covered in offers:
+            if not all(promotion.stacks_with(other) and other.stacks_with(promotion) for other, _ in applied):
+                continue
+            discount = min(discount, remaining)
+            remaining -= discount
+            free_shipping = free_shipping or promotion.promotion_type == PromotionType.FREE_SHIPPING
+            applied.append((promotion, {
+                'promotion_id': str(promotion.id),
+                'name': promotion.name,
+                'promotion_type': promotion.promotion_type,
+                'discount': discount,
+                'product_ids': [line.product_id for line in covered],
+            }))
+
+        return {
+            'subtotal': subtotal.quantize(CENT),
+            'discount_total': (subtotal - remaining).quantize(CENT),
+            'total': remaining.quantize(CENT),
+            'free_shipping': free_shipping,
+            'applied_promotions': [entry for _, entry in applied],
+        }
+
+    def _load_counters(self, eligible, customer):
+        usage_totals = {}
+        limited = [promotion.id for promotion in eligible if promotion.has_usage_totals]
+        if limited:
+            usage_totals = {
+                promotion_id: (usage_count, budget_spent)
+                for promotion_id, usage_count, budget_spent in Promotion.objects.filter(
+                    id__in=limited
+                ).values_list('id', 'usage_count', 'budget_spent')
+            }
+
+        customer_usage = {}
+        per_customer = [promotion.id for promotion in eligible if promotion.usage_limit_per_customer]
+        if customer is not None and per_customer:
+            customer_usage = dict(
+                PromotionUsage.objects.filter(
+                    customer=customer, promotion_id__in=per_customer
+                ).values('promotion_id').annotate(count=Count('id')).values_list('promotion_id', 'count')
+            )
+        return usage_totals, customer_usage
+
+
+_engine = PromotionEngine()
+
+
+def get_promotion_engine() -> PromotionEngine:
+    """Return the process-wide promotion engine."""
+    return _engine
+
+
+def invalidate_promotion_rules():
+    """
+    Make every process rebuild its promotion index.
+
+    The shared version is bumped after the current transaction commits so
+    no process rebuilds from data that is not visible yet.
+    """
+    _engine.invalidate()
+
+    def bump():
+        _engine.invalidate()
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,201 @@
+"""
+Management command to benchmark cart promotion evaluation.
+
+Generates a synthetic catalog and active promotions scoped to products,
+categories or everything, then prices random carts with the legacy
+per-promotion checks (``can_be_used_by_customer`` plus scope lookups for
+each promotion) and with the compiled rule engine, reporting time and
+queries per cart. Generated rows are removed afterwards unless ``--keep``
+is given.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.customers.models import CustomerProfile
+from apps.products.models import Category, Product
+from apps.promotions.engine import PromotionEngine
+from apps.promotions.models import (
+    Promotion, PromotionCategory, PromotionChannel, PromotionProduct,
+    PromotionStatus, PromotionType, TargetType
+)
+
+User = get_user_model()
+
+PREFIX = 'PROMOBENCH-'
+
+
+def legacy_evaluate(lines, customer, channel):
+    """Per-promotion evaluation as done before the rule engine."""
+    applied = []
+    for promotion in Promotion.objects.filter(status=PromotionStatus.ACTIVE):
+        if not promotion.can_be_used_by_customer(customer):
+            continue
+        if promotion.allowed_channels and channel not in promotion.allowed_channels:
+            continue
+        products = set(promotion.promotion_products.filter(is_included=True).values_list('product_id', flat=True))
+        categories = set(promotion.promotion_categories.filter(is_included=True).values_list('category_id', flat=True))
+        covered = [
+            line for line in lines
+            if (not products and not categories) or line['product_id'] in products or line['category_id'] in categories
+        ]
+        if covered:
+            applied.append(promotion.id)
+    return applied
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-promotion cart evaluation against the compiled promotion rule engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--promotions', type=int, default=5000, help='Active promotions to generate')
+        parser.add_argument('--products', type=int, default=2000, help='Products to generate')
+        parser.add_argument('--carts', type=int, default=50, help='Carts priced with the engine')
+        parser.add_argument('--legacy-carts', type=int, default=3,
+                            help='Carts priced with the legacy checks (thousands of queries each)')
+        parser.add_argument('--items', type=int, default=50, help='Lines per cart')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated data')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f'Database vendor: {connection.vendor}')
+
+        user, _ = User.objects.get_or_create(
+            username='promotion-benchmark', defaults={'email': 'promotion-benchmark@example.com'}
+        )
+        customer, _ = CustomerProfile.objects.get_or_create(user=user)
+        try:
+            categories, products = self._generate_catalog(rng, options['products'])
+            self._generate_promotions(rng, options['promotions'], user, categories, products)
+
+            carts = [
+                [
+                    {
+                        'product_id': product.pk,
+                        'category_id': product.category_id,
+                        'quantity': rng.randint(1, 3),
+                        'unit_price': product.price,
+                    }
+                    for product in rng.sample(products, min(options['items'], len(products)))
+                ]
+                for _ in range(max(options['carts'], options['legacy_carts']))
+            ]
+            channel = PromotionChannel.WEBSITE
+
+            engine = PromotionEngine()
+            started = time.perf_counter()
+            index = engine.get_index()
+            self.stdout.write(
+                f'Compiled {index.size} promotions in {(time.perf_counter() - started) * 1000:.0f}ms'
+            )
+
+            self._run(
+                'legacy per-promotion checks',
+                lambda lines: legacy_evaluate(lines, customer, channel),
+                carts[:options['legacy_carts']]
+            )
+            self._run(
+                'compiled rule engine',
+                lambda lines: engine.evaluate_cart(lines, customer=customer, channel=channel),
+                carts[:options['carts']]
+            )
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing generated data...')
+                Promotion.objects.filter(name__startswith=PREFIX).delete()
+                Product.objects.filter(sku__startswith=PREFIX).delete()
+                for category in Category.objects.filter(slug__startswith=PREFIX.lower(), parent__isnull=True):
+                    category.hard_delete()
+                user.delete()
+
+    def _generate_catalog(self, rng, count):
+        self.stdout.write(f'Generating {count} products...')
+        categories = []
+        for root_index in range(10):
+            root = Category.objects.create(name=f'{PREFIX}{root_index}', slug=f'{PREFIX.lower()}{root_index}')
+            categories.append(root)
+            for child_index in range(5):
+                categories.append(Category.objects.create(
+                    name=f'{PREFIX}{root_index}-{child_index}',
+                    slug=f'{PREFIX.lower()}{root_index}-{child_index}',
+                    parent=root
+                ))
+
+        Product.objects.bulk_create([
+            Product(
+                name=f'Promotion Benchmark {i}',
+                slug=f'{PREFIX.lower()}{i}',
+                description='Promotion benchmark product',
+                category=rng.choice(categories),
+                sku=f'{PREFIX}{i:07d}',
+                price=Decimal(rng.randint(100, 100000)) / 100,
+                status='active',
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        return categories, list(Product.objects.filter(sku__startswith=PREFIX))
+
+    def _generate_promotions(self, rng, count, user, categories, products):
+        self.stdout.write(f'Generating {count} active promotions...')
+        now = timezone.now()
+        channels = [choice for choice, _ in PromotionChannel.choices]
+        promotions = []
+        for i in range(count):
+            promotion_type = rng.choice([PromotionType.PERCENTAGE, PromotionType.FIXED_AMOUNT, PromotionType.BOGO])
+            promotions.append(Promotion(
+                name=f'{PREFIX}{i}',
+                description='Promotion benchmark',
+                promotion_type=promotion_type,
+                status=PromotionStatus.ACTIVE,
+                discount_value=Decimal(rng.randint(5, 30)),
+                start_date=now - timedelta(days=1),
+                end_date=now + timedelta(days=30),
+                target_type=TargetType.ALL_CUSTOMERS,
+                usage_limit_per_customer=rng.choice([None, None, 1, 5]),
+                allowed_channels=rng.choice([[], [], rng.sample(channels, 2)]),
+                can_stack_with_other_promotions=rng.random() < 0.3,
+                priority=rng.randint(1, 10),
+                created_by=user,
+            ))
+        Promotion.objects.bulk_create(promotions, batch_size=1000)
+
+        promotion_products = []
+        promotion_categories = []
+        for promotion in promotions:
+            scope = rng.random()
+            if scope < 0.45:
+                for product in rng.sample(products, rng.randint(1, 5)):
+                    promotion_products.append(PromotionProduct(promotion=promotion, product=product))
+            elif scope < 0.9:
+                promotion_categories.append(PromotionCategory(promotion=promotion, category=rng.choice(categories)))
+        PromotionProduct.objects.bulk_create(promotion_products, batch_size=2000)
+        PromotionCategory.objects.bulk_create(promotion_categories, batch_size=2000)
+
+    def _run(self, label, evaluate, carts):
+        if not carts:
+            return
+        timings = []
+        queries = []
+        for lines in carts:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                evaluate(lines)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f'{label:<30} carts={len(carts):<4} mean={statistics.mean(timings):9.2f}ms '
+            f'p50={statistics.median(timings):9.2f}ms p95={p95:9.2f}ms '
+            f'queries/cart={statistics.mean(queries):.0f}'
+        )
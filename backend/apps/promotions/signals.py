@@ -1,15 +1,16 @@
 """
 Promotion and Coupon Management Signals
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.db.models import F
 from decimal import Decimal
 from .models import (
     PromotionUsage, PromotionAnalytics, Promotion, Coupon,
-    PromotionAuditLog, PromotionSchedule
+    PromotionAuditLog, PromotionSchedule, PromotionProduct, PromotionCategory
 )
+from .engine import COUNTER_FIELDS, invalidate_promotion_rules
 
 
 @receiver(post_save, sender=PromotionUsage)
@@ -189,5 +190,23 @@ def update_conversion_rate(sender, instance, created, **kwargs):
             instance.promotion.save(update_fields=['conversion_rate'])
 
 
+@receiver([post_save, post_delete], sender=Promotion)
+def refresh_promotion_rules(sender, instance, **kwargs):
+    """Recompile the promotion rule index when a promotion's rules change"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        # Usage counters are read live by the engine
+        return
+    invalidate_promotion_rules()
+
+
+@receiver([post_save, post_delete], sender=PromotionProduct)
+@receiver([post_save, post_delete], sender=PromotionCategory)
+@receiver([post_save, post_delete], sender='products.Category')
+def refresh_promotion_scopes(sender, instance, **kwargs):
+    """Recompile the promotion rule index when promotion scopes or the category tree change"""
+    invalidate_promotion_rules()
+
+
 # Import models for signal registration
 from django.db import models
\ No newline at end of file
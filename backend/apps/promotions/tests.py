@@ -1261,4 +1261,140 @@ class PromotionIntegrationTests(TestCase):
         self.assertTrue(base_promotion.can_stack_with_other_promotions)
         self.assertIn(PromotionType.FREE_SHIPPING, base_promotion.stackable_promotion_types)
         self.assertFalse(exclusive_promotion.can_stack_with_other_promotions)
-        self.assertIn(str(base_promotion.id), exclusive_promotion.excluded_promotion_ids)
\ No newline at end of file
+        self.assertIn(str(base_promotion.id), exclusive_promotion.excluded_promotion_ids)
+
+class PromotionEngineTests(TestCase):
+    """Test cases for the compiled promotion rule engine"""
+    
+    def setUp(self):
+        """Set up a small catalog"""
+        from apps.products.models import Category, Product
+        from .engine import get_promotion_engine
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.electronics = Category.objects.create(name='Electronics', slug='electronics')
+        self.phones = Category.objects.create(name='Phones', slug='phones', parent=self.electronics)
+        self.books = Category.objects.create(name='Books', slug='books')
+        self.phone = Product.objects.create(
+            name='Phone', slug='phone', sku='PHONE-1', price=Decimal('100.00'), category=self.phones
+        )
+        self.book = Product.objects.create(
+            name='Book', slug='book', sku='BOOK-1', price=Decimal('50.00'), category=self.books
+        )
+        self.cart = [
+            {'product_id': self.phone.pk, 'category_id': self.phones.pk, 'quantity': 1, 'unit_price': '100.00'},
+            {'product_id': self.book.pk, 'category_id': self.books.pk, 'quantity': 2, 'unit_price': '50.00'},
+        ]
+        self.engine = get_promotion_engine()
+        self.engine.invalidate()
+    
+    def create_promotion(self, **kwargs):
+        data = {
+            'name': 'Promotion',
+            'description': 'Engine test promotion',
+            'promotion_type': PromotionType.PERCENTAGE,
+            'discount_value': Decimal('10.00'),
+            'start_date': timezone.now() - timedelta(hours=1),
+            'end_date': timezone.now() + timedelta(days=30),
+            'target_type': TargetType.ALL_CUSTOMERS,
+            'status': PromotionStatus.ACTIVE,
+            'created_by': self.user,
+        }
+        data.update(kwargs)
+        return Promotion.objects.create(**data)
+    
+    def test_category_scope_covers_subcategories(self):
+        """Test that a category promotion applies to products in its subcategories only"""
+        promotion = self.create_promotion()
+        PromotionCategory.objects.create(promotion=promotion, category=self.electronics)
+        
+        result = self.engine.evaluate_cart(self.cart, channel=PromotionChannel.WEBSITE)
+        
+        self.assertEqual(result['subtotal'], Decimal('200.00'))
+        self.assertEqual(result['discount_total'], Decimal('10.00'))
+        self.assertEqual(result['applied_promotions'][0]['product_ids'], [self.phone.pk])
+    
+    def test_excluded_product_is_not_discounted(self):
+        """Test that excluded products are left out of a store-wide promotion"""
+        promotion = self.create_promotion()
+        PromotionProduct.objects.create(promotion=promotion, product=self.book, is_included=False)
+        
+        result = self.engine.evaluate_cart(self.cart, channel=PromotionChannel.WEBSITE)
+        
+        self.assertEqual(result['discount_total'], Decimal('10.00'))
+    
+    def test_channel_restriction(self):
+        """Test that promotions only apply on their allowed channels"""
+        self.create_promotion(allowed_channels=[PromotionChannel.MOBILE_APP])
+        
+        self.assertEqual(
+            self.engine.evaluate_cart(self.cart, channel=PromotionChannel.WEBSITE)['applied_promotions'], []
+        )
+        self.assertEqual(
+            len(self.engine.evaluate_cart(self.cart, channel=PromotionChannel.MOBILE_APP)['applied_promotions']), 1
+        )
+    
+    def test_non_stackable_promotions_keep_highest_priority(self):
+        """Test that only the highest priority promotion applies when they do not stack"""
+        self.create_promotion(name='Low', discount_value=Decimal('50.00'), priority=1)
+        self.create_promotion(name='High', discount_value=Decimal('10.00'), priority=5)
+        
+        result = self.engine.evaluate_cart(self.cart)
+        
+        self.assertEqual([entry['name'] for entry in result['applied_promotions']], ['High'])
+        self.assertEqual(result['discount_total'], Decimal('20.00'))
+    
+    def test_stackable_promotions_combine(self):
+        """Test that stackable promotions apply together"""
+        self.create_promotion(name='Ten', can_stack_with_other_promotions=True, priority=2)
+        self.create_promotion(
+            name='Shipping',
+            promotion_type=PromotionType.FREE_SHIPPING,
+            can_stack_with_other_promotions=True
+        )
+        
+        result = self.engine.evaluate_cart(self.cart)
+        
+        self.assertEqual(len(result['applied_promotions']), 2)
+        self.assertTrue(result['free_shipping'])
+    
+    def test_bogo_discounts_cheapest_units(self):
+        """Test buy one get one on the cheaper unit of each pair"""
+        promotion = self.create_promotion(promotion_type=PromotionType.BOGO, buy_quantity=1, get_quantity=1)
+        PromotionProduct.objects.create(promotion=promotion, product=self.book)
+        
+        result = self.engine.evaluate_cart(self.cart)
+        
+        self.assertEqual(result['discount_total'], Decimal('50.00'))
+    
+    def test_usage_limits_read_in_one_batch(self):
+        """Test that usage counters for every candidate are read with a fixed number of queries"""
+        from apps.customers.models import CustomerProfile
+        
+        customer, _ = CustomerProfile.objects.get_or_create(user=self.user)
+        exhausted = self.create_promotion(name='Exhausted', usage_limit_total=5, usage_count=5, priority=9)
+        for index in range(10):
+            self.create_promotion(name=f'Limited {index}', usage_limit_per_customer=1, usage_limit_total=100)
+        self.engine.get_index()
+        
+        with self.assertNumQueries(2):
+            result = self.engine.evaluate_cart(self.cart, customer=customer)
+        
+        self.assertNotIn(str(exhausted.id), [entry['promotion_id'] for entry in result['applied_promotions']])
+        self.assertEqual(len(result['applied_promotions']), 1)
+    
+    def test_index_is_rebuilt_on_change(self):
+        """Test that saving a promotion refreshes the index but counter updates do not"""
+        self.assertEqual(self.engine.evaluate_cart(self.cart)['applied_promotions'], [])
+        
+        promotion = self.create_promotion()
+        self.assertEqual(len(self.engine.evaluate_cart(self.cart)['applied_promotions']), 1)
+        
+        index = self.engine.get_index()
+        promotion.usage_count = 3
+        promotion.save(update_fields=['usage_count'])
+        self.assertIs(self.engine.get_index(), index)
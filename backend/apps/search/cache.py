@@ -0,0 +1,239 @@
+"""
+Shared cache for Elasticsearch search results, suggestions and filter options.
+
+Entries are stored in Redis under a key derived from the normalized request
+(query, filters, sort, page) and record the global cache version they were
+computed at. Changes to indexed products bump the version, which marks every
+entry stale at once. An entry is fresh for a short TTL; stale entries (expired
+or from an older version) are still served for a bounded window while a single
+background task recomputes them, so a burst of catalog updates never sends all
+traffic to Elasticsearch at once. Hits, stale hits and misses are counted per
+kind for monitoring.
+"""
+import hashlib
+import json
+import logging
+import time
+
+from celery import shared_task
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'search:cache:version'
+ENTRY_KEY_PREFIX = 'search:cache:entry:'
+REFRESH_LOCK_PREFIX = 'search:cache:refresh:'
+STATS_KEY = 'search:cache:stats'
+
+KIND_RESULTS = 'results'
+KIND_SUGGESTIONS = 'suggestions'
+KIND_FILTER_OPTIONS = 'filter_options'
+
+DEFAULT_TTLS = {
+    KIND_RESULTS: 60,
+    KIND_SUGGESTIONS: 300,
+    KIND_FILTER_OPTIONS: 600,
+}
+
+# Filters whose list values are unordered sets of terms
+SET_FILTERS = {'category', 'brand', 'tags'}
+
+
+def get_cache_settings():
+    """Return whether caching is enabled, fresh TTLs per kind and the stale window."""
+    ttls = dict(DEFAULT_TTLS)
+    ttls.update(getattr(settings, 'SEARCH_CACHE_TTLS', {}))
+    return {
+        'enabled': getattr(settings, 'SEARCH_CACHE_ENABLED', True),
+        'ttls': ttls,
+        'stale_ttl': getattr(settings, 'SEARCH_CACHE_STALE_TTL', 300),
+    }
+
+
+def _is_empty(value):
+    return value is None or value == '' or value == [] or value == {}
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent queries share an entry."""
+    return ' '.join((query or '').lower().split())
+
+
+def normalize_filters(filters):
+    """Drop empty filters and order set-like values."""
+    normalized = {}
+    for field, value in (filters or {}).items():
+        if _is_empty(value):
+            continue
+        if field in SET_FILTERS and isinstance(value, (list, tuple)):
+            value = sorted(str(item) for item in value)
+        normalized[field] = value
+    return normalized
+
+
+def normalize_params(params):
+    """
+    Return a JSON-safe canonical form of request parameters.
+
+    Values such as ``Decimal`` are converted through ``DjangoJSONEncoder`` so
+    the result can be hashed and passed to a Celery task.
+    """
+    params = dict(params)
+    if 'query' in params:
+        params['query'] = normalize_query(params['query'])
+    for name in ('filters', 'context'):
+        if name in params:
+            params[name] = normalize_filters(params[name])
+    return json.loads(json.dumps(params, cls=DjangoJSONEncoder, sort_keys=True))
+
+
+def is_cacheable(data):
+    """Error responses and empty results from a failed query are never cached."""
+    return bool(data) and not (isinstance(data, dict) and 'error' in data)
+
+
+def make_key(kind, params):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f'{ENTRY_KEY_PREFIX}{kind}:{digest}'
+
+
+class SearchCache:
+    """
+    Versioned Redis cache with stale-while-revalidate semantics.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    def get_version(self):
+        return int(self.client.get(VERSION_KEY) or 0)
+
+    def bump_version(self):
+        """Mark every cached entry stale."""
+        return self.client.incr(VERSION_KEY)
+
+    def _record(self, kind, outcome):
+        try:
+            self.client.hincrby(STATS_KEY, f'{kind}:{outcome}', 1)
+        except Exception as e:
+            logger.debug(f"Could not record search cache stats: {e}")
+
+    def store(self, kind, params, data, version=None):
+        config = get_cache_settings()
+        ttl = config['ttls'][kind]
+        if version is None:
+            version = self.get_version()
+        envelope = {'version': version, 'fresh_until': time.time() + ttl, 'data': data}
+        self.client.set(
+            make_key(kind, params),
+            json.dumps(envelope, cls=DjangoJSONEncoder),
+            ex=ttl + config['stale_ttl']
+        )
+
+    def get_or_compute(self, kind, params, compute):
+        """
+        Return a cached value for ``params`` or compute and store it.
+
+        ``compute`` is called with the original keyword arguments.
+        """
+        config = get_cache_settings()
+        if not config['enabled']:
+            return compute(**params)
+
+        normalized = normalize_params(params)
+        key = make_key(kind, normalized)
+        try:
+            pipe = self.client.pipeline()
+            pipe.get(VERSION_KEY)
+            pipe.get(key)
+            version, raw = pipe.execute()
+            version = int(version or 0)
+        except Exception as e:
+            logger.warning(f"Search cache unavailable, querying Elasticsearch directly: {e}")
+            return compute(**params)
+
+        if raw is not None:
+            envelope = json.loads(raw)
+            if envelope['version'] == version and envelope['fresh_until'] > time.time():
+                self._record(kind, 'hit')
+            else:
+                self._record(kind, 'stale')
+                self._schedule_refresh(kind, normalized, key)
+            return envelope['data']
+
+        self._record(kind, 'miss')
+        data = compute(**params)
+        if is_cacheable(data):
+            try:
+                self.store(kind, normalized, data, version)
+            except Exception as e:
+                logger.warning(f"Could not store search cache entry: {e}")
+        return data
+
+    def _schedule_refresh(self, kind, params, key):
+        """Refresh a stale entry in the background, once across all workers."""
+        lock_key = f'{REFRESH_LOCK_PREFIX}{key}'
+        try:
+            if self.client.set(lock_key, '1', nx=True, ex=30):
+                refresh_search_cache.delay(kind, params, lock_key)
+        except Exception as e:
+            logger.warning(f"Could not schedule search cache refresh: {e}")
+
+    def get_stats(self):
+        """Return hit, stale and miss counts and the hit rate per kind."""
+        raw = self.client.hgetall(STATS_KEY)
+        stats = {}
+        for kind in DEFAULT_TTLS:
+            hits = int(raw.get(f'{kind}:hit', 0))
+            stale = int(raw.get(f'{kind}:stale', 0))
+            misses = int(raw.get(f'{kind}:miss', 0))
+            total = hits + stale + misses
+            stats[kind] = {
+                'hits': hits,
+                'stale_hits': stale,
+                'misses': misses,
+                'hit_rate': round((hits + stale) / total, 4) if total else 0.0,
+            }
+        stats['version'] = self.get_version()
+        return stats
+
+    def reset_stats(self):
+        self.client.delete(STATS_KEY)
+
+
+def invalidate_search_cache():
+    """Bump the cache version after indexed products changed."""
+    if not get_cache_settings()['enabled']:
+        return
+    try:
+        SearchCache().bump_version()
+    except Exception as e:
+        logger.warning(f"Could not invalidate search cache: {e}")
+
+
+@shared_task(ignore_result=True)
+def refresh_search_cache(kind, params, lock_key):
+    """Recompute a stale cache entry."""
+    from .services import SearchService
+
+    compute = {
+        KIND_RESULTS: SearchService._search_products,
+        KIND_SUGGESTIONS: SearchService._get_suggestions,
+        KIND_FILTER_OPTIONS: SearchService._get_filter_options,
+    }[kind]
+
+    cache = SearchCache()
+    try:
+        version = cache.get_version()
+        data = compute(**params)
+        if is_cacheable(data):
+            cache.store(kind, params, data, version)
+    finally:
+        cache.client.delete(lock_key)
@@ -127,6 +127,15 @@ class ProductDocument(Document):
             'meta_description',
         ]
     
+    def get_queryset(self):
+        """
+        Return the queryset used for bulk indexing with the relations that
+        the prepare methods read loaded up front.
+        """
+        return super().get_queryset().select_related(
+            'category', 'category__parent'
+        ).prefetch_related('images')
+    
     def prepare_category(self, instance):
         """
         Prepare the category data for indexing.
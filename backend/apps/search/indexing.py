@@ -0,0 +1,348 @@
+"""
+Batched, coalescing Elasticsearch indexing pipeline.
+
+Model saves and deletes only record ``<app_label>.<model_name>:<pk>`` in a
+Redis hash, so repeated changes to the same object within the flush window
+collapse into one entry (the last action wins). The first change of a window
+schedules ``flush_index_queue``, which drains the hash and sends the
+documents to Elasticsearch with the ``_bulk`` API in configurable batches.
+Items that fail are re-queued with a retry budget, and each flushed batch
+produces one summary WebSocket event instead of one per product.
+
+Deletes are also kept for a day in a sorted set scored by time, so an
+alias-swap rebuild can remove documents of rows deleted while it ran.
+"""
+import logging
+import time
+import uuid
+from collections import defaultdict
+
+import redis
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from core.redis_client import get_redis_client
+from .cache import invalidate_search_cache
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'search:indexing:pending'
+PROCESSING_KEY_PREFIX = 'search:indexing:processing:'
+ATTEMPTS_KEY = 'search:indexing:attempts'
+FLUSH_SCHEDULED_KEY = 'search:indexing:flush_scheduled'
+DELETED_KEY = 'search:indexing:deleted'
+
+# How long deletes are remembered for rebuilds to replay
+DELETED_RETENTION = 24 * 3600
+
+ACTION_INDEX = 'index'
+ACTION_DELETE = 'delete'
+
+# Cap on product IDs included in a WebSocket summary event
+SUMMARY_ID_LIMIT = 100
+
+
+def get_indexing_settings():
+    """Return the flush window, batch size and retry budget."""
+    return {
+        'window': getattr(settings, 'ELASTICSEARCH_INDEXING_WINDOW', 5),
+        'batch_size': getattr(settings, 'ELASTICSEARCH_INDEXING_BATCH_SIZE', 500),
+        'max_retries': getattr(settings, 'ELASTICSEARCH_INDEXING_MAX_RETRIES', 3),
+    }
+
+
+def make_member(app_label, model_name, pk):
+    """Build the queue member identifying a model instance."""
+    return f'{app_label}.{model_name}:{pk}'
+
+
+def parse_member(member):
+    """Split a queue member into ``(model_label, pk)``."""
+    model_label, pk = member.rsplit(':', 1)
+    return model_label, pk
+
+
+class IndexingQueue:
+    """
+    Redis-backed set of pending index operations keyed by object.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    def enqueue(self, app_label, model_name, pk, action):
+        """Record a pending action and schedule a flush if none is pending."""
+        config = get_indexing_settings()
+        pipe = self.client.pipeline()
+        pipe.hset(PENDING_KEY, make_member(app_label, model_name, pk), action)
+        # The flag outlives the countdown so a lost flush is rescheduled eventually
+        pipe.set(FLUSH_SCHEDULED_KEY, '1', nx=True, ex=config['window'] + 60)
+        if action == ACTION_DELETE:
+            now = time.time()
+            pipe.zadd(DELETED_KEY, {make_member(app_label, model_name, pk): now})
+            pipe.zremrangebyscore(DELETED_KEY, '-inf', now - DELETED_RETENTION)
+        scheduled = pipe.execute()[1]
+
+        if scheduled:
+            flush_index_queue.apply_async(countdown=config['window'])
+
+    def drain(self):
+        """
+        Atomically take every pending item.
+
+        Returns ``(processing_key, items)``; call ``ack`` with the key once the
+        items have been handled.
+        """
+        processing_key = f'{PROCESSING_KEY_PREFIX}{uuid.uuid4().hex}'
+        try:
+            self.client.rename(PENDING_KEY, processing_key)
+        except redis.ResponseError:
+            # Nothing pending
+            return None, {}
+
+        # Keep an abandoned snapshot around for inspection, but not forever
+        self.client.expire(processing_key, 3600)
+        return processing_key, self.client.hgetall(processing_key)
+
+    def ack(self, processing_key):
+        """Discard a drained snapshot."""
+        if processing_key:
+            self.client.delete(processing_key)
+
+    def requeue(self, items, max_retries):
+        """
+        Put failed items back without overwriting newer actions.
+
+        Returns the members dropped because they exhausted their retries.
+        """
+        if not items:
+            return []
+
+        pipe = self.client.pipeline()
+        for member in items:
+            pipe.hincrby(ATTEMPTS_KEY, member, 1)
+        attempts = pipe.execute()
+
+        dropped = []
+        pipe = self.client.pipeline()
+        for (member, action), attempt in zip(items.items(), attempts):
+            if attempt > max_retries:
+                dropped.append(member)
+                pipe.hdel(ATTEMPTS_KEY, member)
+            else:
+                pipe.hsetnx(PENDING_KEY, member, action)
+        pipe.execute()
+        return dropped
+
+    def clear_attempts(self, members):
+        """Forget retry counters of items that were indexed successfully."""
+        if members:
+            self.client.hdel(ATTEMPTS_KEY, *members)
+
+    def schedule_flush(self, countdown):
+        """Schedule a flush unless one is already pending."""
+        if self.client.set(FLUSH_SCHEDULED_KEY, '1', nx=True, ex=countdown + 60):
+            flush_index_queue.apply_async(countdown=countdown)
+
+    def clear_flush_flag(self):
+        self.client.delete(FLUSH_SCHEDULED_KEY)
+
+    def deleted_since(self, model_label, since):
+        """Return the pks of ``model_label`` objects deleted since the ``since`` timestamp."""
+        prefix = f'{model_label}:'
+        return [
+            parse_member(member)[1]
+            for member in self.client.zrangebyscore(DELETED_KEY, since, '+inf')
+            if member.startswith(prefix)
+        ]
+
+
+def failed_ids(errors):
+    """Extract document IDs from ``helpers.bulk`` error items, ignoring 404 deletes."""
+    failed = set()
+    for error in errors:
+        for op_type, details in error.items():
+            if op_type == ACTION_DELETE and details.get('status') == 404:
+                continue
+            failed.add(str(details.get('_id')))
+    return failed
+
+
+def _bulk_index(model, pks, batch_size):
+    """
+    Index existing instances and delete documents of missing ones.
+
+    Returns ``(indexed_pks, deleted_pks, failed_pks)``.
+    """
+    from django_elasticsearch_dsl.registries import registry
+
+    documents = registry.get_documents([model])
+    if not documents:
+        return [], [], []
+
+    found, missing, failed = set(), set(), set()
+    for document_class in documents:
+        document = document_class()
+        instances = list(document.get_queryset().filter(pk__in=pks))
+        document_found = {str(instance.pk) for instance in instances}
+        document_missing = [pk for pk in pks if pk not in document_found]
+        found |= document_found
+        missing |= set(document_missing)
+
+        if instances:
+            _, errors = document.update(
+                instances,
+                refresh=False,
+                raise_on_error=False,
+                raise_on_exception=False,
+                chunk_size=batch_size
+            )
+            failed |= failed_ids(errors)
+
+        if document_missing:
+            failed |= _bulk_delete(document, document_missing, batch_size)
+
+    indexed = [pk for pk in pks if pk in found and pk not in failed]
+    deleted = [pk for pk in pks if pk in missing and pk not in failed]
+    return indexed, deleted, [pk for pk in pks if pk in failed]
+
+
+def _bulk_delete(document, pks, batch_size):
+    """Delete documents by ID and return the IDs that failed; missing documents count as deleted."""
+    from elasticsearch.helpers import bulk
+    from elasticsearch_dsl.connections import connections
+
+    actions = [
+        {'_op_type': ACTION_DELETE, '_index': document._index._name, '_id': pk}
+        for pk in pks
+    ]
+    _, errors = bulk(
+        connections.get_connection(),
+        actions,
+        raise_on_error=False,
+        raise_on_exception=False,
+        chunk_size=batch_size
+    )
+    return failed_ids(errors)
+
+
+def _send_batch_summary(indexed, deleted, failed):
+    """Send one WebSocket event summarising a flushed product batch."""
+    try:
+        from channels.layers import get_channel_layer
+        from asgiref.sync import async_to_sync
+
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            'inventory_updates',
+            {
+                'type': 'inventory_update',
+                'update_type': 'products_indexed',
+                'product_id': None,
+                'data': {
+                    'indexed_count': len(indexed),
+                    'deleted_count': len(deleted),
+                    'failed_count': len(failed),
+                    'product_ids': list(indexed)[:SUMMARY_ID_LIMIT],
+                    'truncated': len(indexed) > SUMMARY_ID_LIMIT,
+                },
+                'timestamp': timezone.now().isoformat()
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error sending WebSocket indexing summary: {str(e)}")
+
+
+def process_items(items, batch_size):
+    """
+    Apply drained queue items to Elasticsearch.
+
+    Returns ``(stats, failed_items)`` where ``failed_items`` maps members to
+    their action so they can be re-queued.
+    """
+    grouped = defaultdict(lambda: {ACTION_INDEX: [], ACTION_DELETE: []})
+    for member, action in items.items():
+        model_label, pk = parse_member(member)
+        grouped[model_label][action].append(pk)
+
+    stats = {'indexed': 0, 'deleted': 0, 'failed': 0, 'batches': 0}
+    failed_items = {}
+
+    for model_label, actions in grouped.items():
+        try:
+            model = apps.get_model(model_label)
+        except LookupError:
+            logger.warning(f"Skipping indexing for unknown model {model_label}")
+            continue
+
+        # Deleted rows are simply missing from the queryset, so both actions
+        # go through the same lookup and missing objects are deleted
+        pks = actions[ACTION_INDEX] + actions[ACTION_DELETE]
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            stats['batches'] += 1
+            try:
+                indexed, deleted, failed = _bulk_index(model, batch, batch_size)
+            except Exception as e:
+                logger.error(f"Bulk indexing batch for {model_label} failed: {str(e)}")
+                indexed, deleted, failed = [], [], batch
+
+            stats['indexed'] += len(indexed)
+            stats['deleted'] += len(deleted)
+            stats['failed'] += len(failed)
+            for pk in failed:
+                member = f'{model_label}:{pk}'
+                failed_items[member] = items[member]
+
+            if model_label == 'products.product':
+                _send_batch_summary(indexed, deleted, failed)
+
+    if stats['indexed'] or stats['deleted']:
+        invalidate_search_cache()
+
+    return stats, failed_items
+
+
+@shared_task(bind=True, ignore_result=True)
+def flush_index_queue(self):
+    """
+    Drain the indexing queue and push pending changes to Elasticsearch.
+    """
+    config = get_indexing_settings()
+    queue = IndexingQueue()
+
+    queue.clear_flush_flag()
+    processing_key, items = queue.drain()
+    if not items:
+        return {'status': 'success', 'indexed': 0, 'deleted': 0, 'failed': 0}
+
+    try:
+        stats, failed_items = process_items(items, config['batch_size'])
+        queue.clear_attempts([member for member in items if member not in failed_items])
+
+        if failed_items:
+            dropped = queue.requeue(failed_items, config['max_retries'])
+            if dropped:
+                logger.error(f"Giving up indexing {len(dropped)} objects after {config['max_retries']} retries")
+            if len(dropped) < len(failed_items):
+                queue.schedule_flush(config['window'] * 2)
+    finally:
+        queue.ack(processing_key)
+
+    logger.info(
+        f"Flushed search indexing queue: {len(items)} objects in {stats['batches']} batches, "
+        f"{stats['indexed']} indexed, {stats['deleted']} deleted, {stats['failed']} failed"
+    )
+    return {'status': 'success', **stats}
+
+
+def index_now(app_label, model_name, pks, action=ACTION_INDEX):
+    """Synchronously apply index operations, bypassing the queue."""
+    items = {make_member(app_label, model_name, pk): action for pk in pks}
+    return process_items(items, get_indexing_settings()['batch_size'])
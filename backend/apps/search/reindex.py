@@ -0,0 +1,390 @@
+"""
+Zero-downtime Elasticsearch reindexing using versioned indices and an alias.
+
+``ProductDocument`` is queried and written through its index name, which is
+turned into an alias pointing at a versioned index (``<name>_<timestamp>``).
+A rebuild creates a fresh versioned index next to the live one, streams
+every product into it with the ``_bulk`` API, then moves the alias in a
+single atomic ``update_aliases`` call and removes the old index. Search
+keeps serving from the old index for the whole rebuild. After the swap,
+products changed during the build are indexed again and products deleted
+(or soft-deleted) during it are removed, using the deletes recorded by the indexing queue.
+
+Large catalogs can be split into primary-key slices that are indexed by
+separate Celery workers; a chord callback performs the swap once every
+slice has finished, and an error callback marks the rebuild failed if a
+slice gives up.
+"""
+import logging
+import time
+
+from celery import chord, shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import SoftDeleteModel
+from core.redis_client import get_redis_client
+from .cache import invalidate_search_cache
+from .documents import ProductDocument
+from .indexing import ACTION_DELETE, IndexingQueue, failed_ids
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY_PREFIX = 'search:reindex:progress:'
+PROGRESS_TTL = 24 * 3600
+
+# Stop the rebuild instead of swapping if more than this share of documents failed
+MAX_FAILURE_RATIO = 0.01
+
+
+def get_client():
+    from elasticsearch_dsl.connections import connections
+    return connections.get_connection()
+
+
+class ReindexProgress:
+    """
+    Rebuild progress shared by every slice through a Redis hash.
+    """
+
+    def __init__(self, index_name, client=None):
+        self.index_name = index_name
+        self.key = f'{PROGRESS_KEY_PREFIX}{index_name}'
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    def start(self, total, slices):
+        self.client.hset(self.key, mapping={
+            'index': self.index_name,
+            'status': 'running',
+            'total': total,
+            'slices': slices,
+            'slices_done': 0,
+            'indexed': 0,
+            'failed': 0,
+            'started_at': time.time(),
+        })
+        self.client.expire(self.key, PROGRESS_TTL)
+
+    def add(self, indexed, failed):
+        pipe = self.client.pipeline()
+        pipe.hincrby(self.key, 'indexed', indexed)
+        pipe.hincrby(self.key, 'failed', failed)
+        pipe.execute()
+
+    def slice_done(self):
+        return self.client.hincrby(self.key, 'slices_done', 1)
+
+    def finish(self, status, **extra):
+        self.client.hset(self.key, mapping={'status': status, 'finished_at': time.time(), **extra})
+
+    def snapshot(self):
+        """Return progress with derived throughput and ETA."""
+        data = self.client.hgetall(self.key)
+        if not data:
+            return None
+
+        total = int(data.get('total', 0))
+        indexed = int(data.get('indexed', 0))
+        started_at = float(data.get('started_at', time.time()))
+        finished_at = float(data['finished_at']) if 'finished_at' in data else time.time()
+        elapsed = max(finished_at - started_at, 0.001)
+        throughput = indexed / elapsed
+        remaining = max(total - indexed, 0)
+
+        return {
+            'index': data.get('index'),
+            'status': data.get('status'),
+            'total': total,
+            'indexed': indexed,
+            'failed': int(data.get('failed', 0)),
+            'slices': int(data.get('slices', 1)),
+            'slices_done': int(data.get('slices_done', 0)),
+            'percent': round(indexed * 100 / total, 2) if total else 100.0,
+            'elapsed_seconds': round(elapsed, 1),
+            'docs_per_second': round(throughput, 1),
+            'eta_seconds': round(remaining / throughput, 1) if throughput and data.get('status') == 'running' else 0,
+            'error': data.get('error'),
+        }
+
+
+class AliasReindexer:
+    """
+    Blue/green rebuild of a django-elasticsearch-dsl document index.
+    """
+
+    def __init__(self, document_class=ProductDocument, chunk_size=None, client=None, queue=None):
+        self.document_class = document_class
+        self.alias = document_class._index._name
+        self.chunk_size = chunk_size or getattr(settings, 'ELASTICSEARCH_REINDEX_CHUNK_SIZE', 1000)
+        self._client = client
+        self.queue = queue or IndexingQueue()
+
+    @property
+    def client(self):
+        return self._client or get_client()
+
+    def new_index_name(self):
+        return f"{self.alias}_{timezone.now().strftime('%Y%m%d%H%M%S%f')}"
+
+    def live_indices(self):
+        """Return the concrete indices currently behind the alias."""
+        if self.client.indices.exists_alias(name=self.alias):
+            return list(self.client.indices.get_alias(name=self.alias).keys())
+        return []
+
+    def create_index(self, index_name):
+        """Create the versioned index tuned for bulk ingestion."""
+        index = self.document_class._index.clone(name=index_name)
+        index.create(using=self.client)
+        self.client.indices.put_settings(index=index_name, settings={
+            'index': {'refresh_interval': '-1', 'number_of_replicas': 0}
+        })
+
+    def get_queryset(self):
+        return self.document_class().get_queryset().order_by('pk')
+
+    def slice_bounds(self, slices):
+        """
+        Split the primary-key space into ``slices`` contiguous ranges.
+
+        Returns a list of ``(lower_exclusive, upper_inclusive)`` pairs where
+        ``None`` means unbounded.
+        """
+        queryset = self.get_queryset()
+        total = queryset.count()
+        if slices <= 1 or total <= self.chunk_size:
+            return [(None, None)], total
+
+        step = -(-total // slices)
+        boundaries = [
+            str(queryset.values_list('pk', flat=True)[position])
+            for position in range(step - 1, total - 1, step)
+        ]
+        lowers = [None] + boundaries
+        uppers = boundaries + [None]
+        return list(zip(lowers, uppers)), total
+
+    def index_slice(self, index_name, lower=None, upper=None, progress=None, since=None):
+        """
+        Stream one primary-key range into ``index_name``.
+
+        Returns ``(indexed, failed)``.
+        """
+        from elasticsearch.helpers import streaming_bulk
+
+        queryset = self.get_queryset()
+        if lower is not None:
+            queryset = queryset.filter(pk__gt=lower)
+        if upper is not None:
+            queryset = queryset.filter(pk__lte=upper)
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+
+        document = self.document_class()
+
+        def actions():
+            for action in document.get_actions(queryset.iterator(chunk_size=self.chunk_size), 'index'):
+                action['_index'] = index_name
+                yield action
+
+        indexed = failed = pending_indexed = pending_failed = 0
+        started = time.monotonic()
+        for ok, item in streaming_bulk(
+            self.client,
+            actions(),
+            chunk_size=self.chunk_size,
+            raise_on_error=False,
+            max_retries=3,
+            initial_backoff=2,
+        ):
+            if ok:
+                indexed += 1
+                pending_indexed += 1
+            else:
+                failed += 1
+                pending_failed += 1
+                logger.warning(f"Failed to index document into {index_name}: {item}")
+
+            if pending_indexed + pending_failed >= self.chunk_size:
+                if progress:
+                    progress.add(pending_indexed, pending_failed)
+                pending_indexed = pending_failed = 0
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Reindex {index_name}: {indexed} indexed, {failed} failed "
+                    f"({indexed / max(elapsed, 0.001):.0f} docs/s)"
+                )
+
+        if progress and (pending_indexed or pending_failed):
+            progress.add(pending_indexed, pending_failed)
+        return indexed, failed
+
+    def swap(self, index_name, started_at=None):
+        """
+        Finalize ``index_name`` and atomically point the alias at it.
+
+        Returns the names of the indices that were replaced.
+        """
+        replicas = settings.ELASTICSEARCH_INDEX_SETTINGS.get('number_of_replicas', 0)
+        self.client.indices.put_settings(index=index_name, settings={
+            'index': {'refresh_interval': None, 'number_of_replicas': replicas}
+        })
+        self.client.indices.refresh(index=index_name)
+
+        old_indices = [name for name in self.live_indices() if name != index_name]
+        actions = [{'remove': {'index': name, 'alias': self.alias}} for name in old_indices]
+        actions.append({'add': {'index': index_name, 'alias': self.alias}})
+        if not old_indices and self.client.indices.exists(index=self.alias):
+            # One-off migration from a concrete index named like the alias:
+            # it is dropped in the same atomic call that creates the alias
+            actions.append({'remove_index': {'index': self.alias}})
+        self.client.indices.update_aliases(actions=actions)
+
+        # Catch up on products changed or deleted while the new index was being built
+        if started_at is not None:
+            self.index_slice(index_name, since=started_at)
+            self.replay_deletions(index_name, started_at)
+
+        for name in old_indices:
+            self.client.indices.delete(index=name, ignore_unavailable=True)
+        return old_indices
+
+    def replay_deletions(self, index_name, since):
+        """
+        Remove documents of rows deleted since ``since`` from ``index_name``.
+
+        Soft deletes do not go through the indexing queue, so rows of a
+        ``SoftDeleteModel`` flagged ``is_deleted`` since ``since`` are removed
+        too. Returns the number of documents removed or already missing.
+        """
+        from elasticsearch.helpers import bulk
+
+        model = self.document_class.Django.model
+        manager = model._default_manager
+        pks = self.queue.deleted_since(model._meta.label_lower, since.timestamp())
+        existing = manager.filter(pk__in=pks)
+        if issubclass(model, SoftDeleteModel):
+            soft_deleted = manager.filter(is_deleted=True, updated_at__gte=since).values_list('pk', flat=True)
+            pks = list(dict.fromkeys(pks + [str(pk) for pk in soft_deleted]))
+            existing = existing.filter(is_deleted=False)
+        if not pks:
+            return 0
+        # A row can be deleted and then recreated with the same key
+        existing = {str(pk) for pk in existing.values_list('pk', flat=True)}
+        pks = [pk for pk in pks if pk not in existing]
+        if not pks:
+            return 0
+
+        _, errors = bulk(
+            self.client,
+            ({'_op_type': ACTION_DELETE, '_index': index_name, '_id': pk} for pk in pks),
+            chunk_size=self.chunk_size,
+            raise_on_error=False,
+            raise_on_exception=False,
+        )
+        failed = failed_ids(errors)
+        if failed:
+            logger.warning(f"Could not remove {len(failed)} deleted documents from {index_name}")
+        return len(pks) - len(failed)
+
+    def abort(self, index_name):
+        self.client.indices.delete(index=index_name, ignore_unavailable=True)
+
+    def rebuild(self, slices=1):
+        """
+        Rebuild the index without downtime.
+
+        With ``slices`` greater than one the work is dispatched to Celery and
+        the method returns immediately; poll ``ReindexProgress`` for status.
+        """
+        index_name = self.new_index_name()
+        bounds, total = self.slice_bounds(slices)
+        started_at = timezone.now()
+
+        self.create_index(index_name)
+        progress = ReindexProgress(index_name)
+        progress.start(total, len(bounds))
+
+        if len(bounds) > 1:
+            callback = finalize_reindex_task.s(index_name, started_at.isoformat())
+            chord(
+                reindex_slice_task.s(index_name, lower, upper, self.chunk_size)
+                for lower, upper in bounds
+            )(callback.on_error(reindex_failed_task.si(index_name)))
+            return {'status': 'started', 'index': index_name, 'slices': len(bounds), 'total': total}
+
+        try:
+            indexed, failed = self.index_slice(index_name, progress=progress)
+            progress.slice_done()
+            return self.finalize(index_name, started_at, indexed, failed, progress)
+        except Exception as e:
+            self.abort(index_name)
+            progress.finish('failed', error=str(e))
+            raise
+
+    def finalize(self, index_name, started_at, indexed, failed, progress):
+        """Swap the alias unless too many documents failed."""
+        total = indexed + failed
+        if total and failed / total > MAX_FAILURE_RATIO:
+            self.abort(index_name)
+            message = f'{failed} of {total} documents failed to index; live index left unchanged'
+            progress.finish('failed', error=message)
+            return {'status': 'error', 'message': message, 'index': index_name}
+
+        replaced = self.swap(index_name, started_at)
+        invalidate_search_cache()
+        progress.finish('completed')
+        return {
+            'status': 'success',
+            'message': 'Product index rebuilt successfully',
+            'index': index_name,
+            'replaced': replaced,
+            'progress': progress.snapshot(),
+        }
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=30)
+def reindex_slice_task(self, index_name, lower, upper, chunk_size):
+    """Index one primary-key slice of the product catalog."""
+    reindexer = AliasReindexer(chunk_size=chunk_size)
+    progress = ReindexProgress(index_name)
+    try:
+        indexed, failed = reindexer.index_slice(index_name, lower, upper, progress=progress)
+    except Exception as exc:
+        logger.error(f"Reindex slice ({lower}, {upper}] of {index_name} failed: {str(exc)}")
+        raise self.retry(exc=exc)
+    progress.slice_done()
+    return {'indexed': indexed, 'failed': failed}
+
+
+@shared_task
+def finalize_reindex_task(slice_results, index_name, started_at):
+    """Swap the alias once every slice has been indexed."""
+    from django.utils.dateparse import parse_datetime
+
+    indexed = sum(result['indexed'] for result in slice_results)
+    failed = sum(result['failed'] for result in slice_results)
+    reindexer = AliasReindexer()
+    progress = ReindexProgress(index_name)
+    try:
+        return reindexer.finalize(index_name, parse_datetime(started_at), indexed, failed, progress)
+    except Exception as e:
+        reindexer.abort(index_name)
+        progress.finish('failed', error=str(e))
+        raise
+
+
+@shared_task
+def reindex_failed_task(index_name):
+    """Mark a sliced rebuild failed when one of its slices gives up."""
+    progress = ReindexProgress(index_name)
+    snapshot = progress.snapshot()
+    if snapshot is not None and snapshot['status'] != 'running':
+        return
+    AliasReindexer().abort(index_name)
+    progress.finish('failed', error='A reindex slice failed; live index left unchanged')
+    logger.error(f"Rebuild of {index_name} failed; the new index was discarded")
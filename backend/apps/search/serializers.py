@@ -190,6 +190,10 @@ class IndexRebuildRequestSerializer(serializers.Serializer):
     Serializer for index rebuild request.
     """
     force = serializers.BooleanField(default=False, help_text="Force rebuild even if index exists")
+    slices = serializers.IntegerField(
+        required=False, min_value=1, max_value=64,
+        help_text="Number of primary-key slices indexed in parallel by Celery workers"
+    )
 
 
 class IndexRebuildResponseSerializer(serializers.Serializer):
@@ -197,7 +201,10 @@ class IndexRebuildResponseSerializer(serializers.Serializer):
     Serializer for index rebuild response.
     """
     status = serializers.CharField()
-    message = serializers.CharField()
+    message = serializers.CharField(required=False)
+    index = serializers.CharField(required=False)
+    slices = serializers.IntegerField(required=False)
+    total = serializers.IntegerField(required=False)
 
 
 class RelatedProductsRequestSerializer(serializers.Serializer):
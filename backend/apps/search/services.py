@@ -3,6 +3,7 @@ Search services for the ecommerce platform.
 """
 from elasticsearch_dsl import Q, Search, A
 from .documents import ProductDocument
+from .cache import KIND_FILTER_OPTIONS, KIND_RESULTS, KIND_SUGGESTIONS, SearchCache
 from django.conf import settings
 import logging
 from elasticsearch.exceptions import ConnectionError, RequestError, TransportError
@@ -28,6 +29,8 @@ class SearchService:
         """
         Search for products with filtering, sorting, and pagination.
         
+        Results are served from the search cache when available.
+        
         Args:
             query: Search query string
             filters: Dictionary of filters to apply
@@ -39,6 +42,33 @@ class SearchService:
         Returns:
             dict: Search results with pagination info
         """
+        results = SearchCache().get_or_compute(
+            KIND_RESULTS,
+            {
+                'query': query,
+                'filters': filters,
+                'sort_by': sort_by,
+                'page': page,
+                'page_size': page_size,
+                'highlight': highlight,
+            },
+            SearchService._search_products
+        )
+        # Echo the caller's parameters rather than the normalized cache key
+        return {**results, 'query': query, 'filters': filters, 'sort_by': sort_by}
+    
+    @staticmethod
+    def _search_products(
+        query: Optional[str] = None, 
+        filters: Optional[Dict[str, Any]] = None, 
+        sort_by: Optional[str] = None, 
+        page: int = 1, 
+        page_size: int = 20,
+        highlight: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Run a product search against Elasticsearch, bypassing the cache.
+        """
         try:
             # Start with an empty search
             search = ProductDocument.search()
@@ -282,6 +312,8 @@ class SearchService:
         """
         Get autocomplete suggestions for search with context-aware filtering.
         
+        Suggestions are served from the search cache when available.
+        
         Args:
             query: Partial query to get suggestions for
             context: Optional context filters (e.g., category)
@@ -293,6 +325,22 @@ class SearchService:
         if not query or len(query) < 2:
             return {'suggestions': [], 'products': []}
         
+        suggestions = SearchCache().get_or_compute(
+            KIND_SUGGESTIONS,
+            {'query': query, 'context': context, 'limit': limit},
+            SearchService._get_suggestions
+        )
+        return {**suggestions, 'query': query}
+    
+    @staticmethod
+    def _get_suggestions(
+        query: str, 
+        context: Optional[Dict[str, Any]] = None,
+        limit: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Get autocomplete suggestions from Elasticsearch, bypassing the cache.
+        """
         try:
             # Use completion suggester for fast autocomplete
             suggest = {
@@ -408,9 +456,19 @@ class SearchService:
         """
         Get available filter options for the search interface.
         
+        The aggregations are shared by every visitor and served from the
+        search cache when available.
+        
         Returns:
             dict: Dictionary of filter options
         """
+        return SearchCache().get_or_compute(KIND_FILTER_OPTIONS, {}, SearchService._get_filter_options)
+    
+    @staticmethod
+    def _get_filter_options() -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Compute filter option aggregations in Elasticsearch, bypassing the cache.
+        """
         try:
             # Create aggregation search
             search = ProductDocument.search()
@@ -518,23 +576,48 @@ class SearchService:
             return f"{from_discount}% - {to_discount}% off"
     
     @staticmethod
-    def rebuild_index():
+    def rebuild_index(slices=None, chunk_size=None):
         """
-        Rebuild the Elasticsearch index for products.
+        Rebuild the Elasticsearch index for products without downtime.
+
+        Documents are streamed into a new versioned index while searches keep
+        using the current one; the index alias is then swapped atomically.
+        With more than one slice the rebuild runs on Celery workers and this
+        returns immediately with the new index name for progress polling.
         """
+        from .reindex import AliasReindexer
+
+        if slices is None:
+            slices = getattr(settings, 'ELASTICSEARCH_REINDEX_SLICES', 1)
         try:
-            ProductDocument._index.delete(ignore=404)
-            ProductDocument.init()
-            
-            # This will trigger indexing of all products
-            from django_elasticsearch_dsl.management.commands.search_index import Command
-            cmd = Command()
-            cmd.handle(action='rebuild', models=['products.Product'], force=True)
-            
-            return {'status': 'success', 'message': 'Product index rebuilt successfully'}
+            return AliasReindexer(chunk_size=chunk_size).rebuild(slices=slices)
         except Exception as e:
             logger.error(f"Error rebuilding index: {str(e)}")
             return {'status': 'error', 'message': f'Error rebuilding index: {str(e)}'}
+
+    @staticmethod
+    def get_rebuild_progress(index_name):
+        """
+        Get progress of an index rebuild started by ``rebuild_index``.
+        """
+        from .reindex import ReindexProgress
+
+        try:
+            return ReindexProgress(index_name).snapshot()
+        except Exception as e:
+            logger.error(f"Error getting rebuild progress: {str(e)}")
+            return None
+
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """
+        Get hit-rate metrics of the search cache.
+        """
+        try:
+            return SearchCache().get_stats()
+        except Exception as e:
+            logger.error(f"Error getting search cache stats: {str(e)}")
+            return {'error': 'Search cache stats unavailable'}
     
     @staticmethod
     def get_related_products(product_id, limit=6):
@@ -7,6 +7,7 @@ from django.apps import apps
 from django.utils import timezone
 from celery import shared_task
 from tasks.monitoring import TaskMonitor, TaskRetryHandler, task_monitor_decorator
+from .indexing import ACTION_DELETE, ACTION_INDEX, IndexingQueue, index_now
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
@@ -106,61 +107,47 @@ def delete_document(self, instance_id, app_label, model_name):
 class CelerySignalProcessor(RealTimeSignalProcessor):
     """
     Celery-based signal processor for Elasticsearch indexing.
-    This offloads indexing operations to Celery tasks for better performance.
+    Changes are recorded in the coalescing indexing queue and flushed to
+    Elasticsearch in bulk batches (see apps.search.indexing).
     """
     
     def handle_save(self, sender, instance, **kwargs):
         """
-        Handle save signal by dispatching a Celery task.
+        Handle save signal by queueing the instance for bulk indexing.
         """
-        from django.conf import settings
-        
-        try:
-            app_label = instance._meta.app_label
-            model_name = instance._meta.model_name
-            
-            # Skip Celery tasks during testing
-            if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
-                # Run synchronously during tests
-                try:
-                    update_document(app_label, model_name, str(instance.id), 'save')
-                except Exception:
-                    # Ignore Elasticsearch errors during testing
-                    pass
-            else:
-                update_document.delay(app_label, model_name, str(instance.id), 'save')
-        except Exception as e:
-            # Fallback to synchronous processing if Celery is not available
-            try:
-                super().handle_save(sender, instance, **kwargs)
-            except Exception as es_error:
-                # If Elasticsearch is also not available, just skip indexing
-                pass
+        self._dispatch(instance, ACTION_INDEX)
     
     def handle_delete(self, sender, instance, **kwargs):
         """
-        Handle delete signal by dispatching a Celery task.
+        Handle delete signal by queueing the document for bulk deletion.
         """
+        self._dispatch(instance, ACTION_DELETE)
+    
+    def _dispatch(self, instance, action):
         from django.conf import settings
         
+        app_label = instance._meta.app_label
+        model_name = instance._meta.model_name
+        instance_id = str(instance.pk)
+        
+        # Run synchronously when Celery runs tasks eagerly (tests, local development)
+        if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+            try:
+                index_now(app_label, model_name, [instance_id], action)
+            except Exception:
+                # Ignore Elasticsearch errors during testing
+                pass
+            return
+        
         try:
-            app_label = instance._meta.app_label
-            model_name = instance._meta.model_name
-            
-            # Skip Celery tasks during testing
-            if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
-                # Run synchronously during tests
-                try:
-                    delete_document(str(instance.id), app_label, model_name)
-                except Exception:
-                    # Ignore Elasticsearch errors during testing
-                    pass
-            else:
-                delete_document.delay(str(instance.id), app_label, model_name)
+            IndexingQueue().enqueue(app_label, model_name, instance_id, action)
         except Exception as e:
-            # Fallback to synchronous processing if Celery is not available
+            # Fall back to the per-object tasks if the queue is unavailable
             try:
-                super().handle_delete(sender, instance, **kwargs)
-            except Exception as es_error:
-                # If Elasticsearch is also not available, just skip indexing
+                if action == ACTION_DELETE:
+                    delete_document.delay(instance_id, app_label, model_name)
+                else:
+                    update_document.delay(app_label, model_name, instance_id, 'save')
+            except Exception:
+                # If Celery is also not available, just skip indexing
                 pass
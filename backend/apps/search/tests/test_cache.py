@@ -0,0 +1,104 @@
+"""
+Tests for the search result cache.
+"""
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase, override_settings
+from apps.search import cache as search_cache
+from apps.search.cache import (
+    KIND_FILTER_OPTIONS, KIND_RESULTS, SearchCache, make_key, normalize_params
+)
+from apps.search.services import SearchService
+from core.tests.fakes import FakeRedis
+
+
+@override_settings(SEARCH_CACHE_ENABLED=True)
+class SearchCacheTest(TestCase):
+    """Test cases for keys, staleness and invalidation."""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.cache = SearchCache(client=self.redis)
+        self.compute = mock.Mock(return_value={'count': 1, 'results': [{'id': '1'}]})
+
+    def test_equivalent_requests_share_a_key(self):
+        """Test that case, whitespace, empty filters and term order are normalized."""
+        first = normalize_params({
+            'query': '  Wireless   Headphones ',
+            'filters': {'brand': ['Sony', 'Bose'], 'tags': [], 'price_range': [Decimal('10.00'), None]},
+        })
+        second = normalize_params({
+            'query': 'wireless headphones',
+            'filters': {'brand': ['Bose', 'Sony'], 'price_range': [Decimal('10.00'), None]},
+        })
+        self.assertEqual(make_key(KIND_RESULTS, first), make_key(KIND_RESULTS, second))
+        self.assertEqual(first['filters']['price_range'], ['10.00', None])
+
+    def test_miss_then_hit(self):
+        """Test that the second identical request is served from the cache."""
+        params = {'query': 'lamp', 'page': 1}
+        self.cache.get_or_compute(KIND_RESULTS, params, self.compute)
+        result = self.cache.get_or_compute(KIND_RESULTS, params, self.compute)
+
+        self.assertEqual(result['count'], 1)
+        self.compute.assert_called_once_with(query='lamp', page=1)
+        stats = self.cache.get_stats()[KIND_RESULTS]
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_errors_are_not_cached(self):
+        """Test that failed searches are recomputed on the next request."""
+        self.compute.return_value = {'count': 0, 'error': 'Search service temporarily unavailable'}
+        self.cache.get_or_compute(KIND_RESULTS, {'query': 'lamp'}, self.compute)
+        self.cache.get_or_compute(KIND_RESULTS, {'query': 'lamp'}, self.compute)
+        self.assertEqual(self.compute.call_count, 2)
+
+    @mock.patch.object(search_cache.refresh_search_cache, 'delay')
+    def test_version_bump_serves_stale_and_refreshes_once(self, delay):
+        """Test that invalidated entries are served stale while one refresh is scheduled."""
+        self.cache.get_or_compute(KIND_FILTER_OPTIONS, {}, self.compute)
+        self.cache.bump_version()
+
+        for _ in range(3):
+            result = self.cache.get_or_compute(KIND_FILTER_OPTIONS, {}, self.compute)
+
+        self.assertEqual(result['count'], 1)
+        self.compute.assert_called_once()
+        delay.assert_called_once()
+        self.assertEqual(self.cache.get_stats()[KIND_FILTER_OPTIONS]['stale_hits'], 3)
+
+    def test_refresh_task_stores_current_version(self):
+        """Test that the refresh task recomputes an entry and releases its lock."""
+        self.redis.set('lock', '1')
+        with mock.patch('apps.search.cache.get_redis_client', return_value=self.redis), \
+                mock.patch.object(SearchService, '_get_filter_options', return_value={'brands': []}):
+            search_cache.refresh_search_cache.run(KIND_FILTER_OPTIONS, {}, 'lock')
+
+        self.assertNotIn('lock', self.redis.data)
+        result = self.cache.get_or_compute(KIND_FILTER_OPTIONS, {}, self.compute)
+        self.assertEqual(result, {'brands': []})
+        self.compute.assert_not_called()
+
+    def test_redis_outage_falls_back_to_elasticsearch(self):
+        """Test that an unavailable cache does not break search."""
+        self.redis.pipeline = mock.Mock(side_effect=ConnectionError('down'))
+        result = self.cache.get_or_compute(KIND_RESULTS, {'query': 'lamp'}, self.compute)
+        self.assertEqual(result['count'], 1)
+
+    @override_settings(SEARCH_CACHE_ENABLED=False)
+    def test_disabled_cache_always_computes(self):
+        """Test that the cache can be switched off."""
+        self.cache.get_or_compute(KIND_RESULTS, {'query': 'lamp'}, self.compute)
+        self.cache.get_or_compute(KIND_RESULTS, {'query': 'lamp'}, self.compute)
+        self.assertEqual(self.compute.call_count, 2)
+        self.assertEqual(self.redis.data, {})
+
+    def test_search_products_echoes_caller_parameters(self):
+        """Test that cached payloads report the caller's own query and filters."""
+        with mock.patch('apps.search.services.SearchCache', return_value=self.cache), \
+                mock.patch.object(SearchService, '_search_products', return_value={'count': 1, 'query': 'x'}):
+            SearchService.search_products(query='Lamp')
+            result = SearchService.search_products(query='LAMP ', filters={'brand': 'Acme'})
+
+        self.assertEqual(result['query'], 'LAMP ')
+        self.assertEqual(result['filters'], {'brand': 'Acme'})
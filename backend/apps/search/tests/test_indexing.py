@@ -0,0 +1,106 @@
+"""
+Tests for the batched Elasticsearch indexing pipeline.
+"""
+from unittest import mock
+from django.test import TestCase, override_settings
+from apps.search import indexing
+from apps.search.indexing import (
+    ACTION_DELETE, ACTION_INDEX, FLUSH_SCHEDULED_KEY, PENDING_KEY,
+    IndexingQueue, make_member, parse_member, process_items
+)
+from core.tests.fakes import FakeRedis
+
+
+class IndexingQueueTest(TestCase):
+    """Test cases for queue coalescing and retries."""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.queue = IndexingQueue(client=self.redis)
+
+    def test_member_round_trip(self):
+        """Test that queue members can be parsed back into model label and pk."""
+        member = make_member('products', 'product', 'abc-123')
+        self.assertEqual(parse_member(member), ('products.product', 'abc-123'))
+
+    @mock.patch.object(indexing.flush_index_queue, 'apply_async')
+    def test_enqueue_coalesces_and_schedules_one_flush(self, apply_async):
+        """Test that repeated changes collapse and only one flush is scheduled."""
+        for _ in range(50):
+            self.queue.enqueue('products', 'product', '1', ACTION_INDEX)
+        self.queue.enqueue('products', 'product', '2', ACTION_INDEX)
+        self.queue.enqueue('products', 'product', '1', ACTION_DELETE)
+
+        self.assertEqual(self.redis.hgetall(PENDING_KEY), {
+            'products.product:1': ACTION_DELETE,
+            'products.product:2': ACTION_INDEX,
+        })
+        apply_async.assert_called_once()
+
+    @mock.patch.object(indexing.flush_index_queue, 'apply_async')
+    def test_drain_takes_snapshot(self, apply_async):
+        """Test that draining empties the pending set."""
+        self.queue.enqueue('products', 'product', '1', ACTION_INDEX)
+        key, items = self.queue.drain()
+        self.assertEqual(items, {'products.product:1': ACTION_INDEX})
+        self.assertEqual(self.queue.drain(), (None, {}))
+        self.queue.ack(key)
+        self.assertNotIn(key, self.redis.data)
+
+    def test_requeue_keeps_newer_actions_and_drops_exhausted(self):
+        """Test that retries do not overwrite newer actions and respect the budget."""
+        self.redis.hset(PENDING_KEY, 'products.product:1', ACTION_DELETE)
+        failed = {'products.product:1': ACTION_INDEX, 'products.product:2': ACTION_INDEX}
+
+        self.assertEqual(self.queue.requeue(failed, max_retries=1), [])
+        self.assertEqual(self.redis.hgetall(PENDING_KEY)['products.product:1'], ACTION_DELETE)
+        self.assertEqual(self.queue.requeue(failed, max_retries=1), ['products.product:1', 'products.product:2'])
+
+
+class ProcessItemsTest(TestCase):
+    """Test cases for batch processing of drained items."""
+
+    @mock.patch('apps.search.indexing._send_batch_summary')
+    @mock.patch('apps.search.indexing._bulk_index')
+    def test_batches_and_single_summary_per_batch(self, bulk_index, send_summary):
+        """Test that items are split into batches with one summary event each."""
+        bulk_index.side_effect = lambda model, pks, batch_size: (pks, [], [])
+        items = {make_member('products', 'product', str(i)): ACTION_INDEX for i in range(5)}
+
+        stats, failed = process_items(items, batch_size=2)
+
+        self.assertEqual(bulk_index.call_count, 3)
+        self.assertEqual(send_summary.call_count, 3)
+        self.assertEqual(stats['indexed'], 5)
+        self.assertEqual(failed, {})
+
+    @mock.patch('apps.search.indexing._send_batch_summary')
+    @mock.patch('apps.search.indexing._bulk_index')
+    def test_failed_items_returned_for_retry(self, bulk_index, send_summary):
+        """Test that per-item and whole-batch failures are reported for retry."""
+        bulk_index.side_effect = [(['0'], [], ['1']), Exception('cluster unavailable')]
+        items = {make_member('products', 'product', str(i)): ACTION_INDEX for i in range(3)}
+
+        stats, failed = process_items(items, batch_size=2)
+
+        self.assertEqual(set(failed), {'products.product:1', 'products.product:2'})
+        self.assertEqual(stats['failed'], 2)
+
+    @override_settings(ELASTICSEARCH_INDEXING_MAX_RETRIES=3)
+    @mock.patch('apps.search.indexing.process_items')
+    def test_flush_requeues_failures(self, process):
+        """Test that the flush task re-queues failed items and schedules a retry."""
+        redis_client = FakeRedis()
+        redis_client.hset(PENDING_KEY, 'products.product:1', ACTION_INDEX)
+        redis_client.set(FLUSH_SCHEDULED_KEY, '1')
+        process.return_value = (
+            {'indexed': 0, 'deleted': 0, 'failed': 1, 'batches': 1},
+            {'products.product:1': ACTION_INDEX}
+        )
+
+        with mock.patch('apps.search.indexing.get_redis_client', return_value=redis_client), \
+                mock.patch.object(indexing.flush_index_queue, 'apply_async') as apply_async:
+            indexing.flush_index_queue.run()
+
+        self.assertEqual(redis_client.hgetall(PENDING_KEY), {'products.product:1': ACTION_INDEX})
+        apply_async.assert_called_once()
@@ -0,0 +1,192 @@
+"""
+Tests for zero-downtime alias-swap reindexing.
+"""
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase
+from apps.products.models import Category, Product
+from apps.search import indexing
+from apps.search.indexing import ACTION_DELETE, IndexingQueue
+from apps.search.reindex import AliasReindexer, ReindexProgress, reindex_failed_task
+from core.tests.fakes import FakeRedis
+
+
+class AliasReindexerTest(TestCase):
+    """Test cases for versioned index builds and alias swaps."""
+
+    def setUp(self):
+        self.es = mock.MagicMock()
+        self.redis = FakeRedis()
+        self.queue = IndexingQueue(client=self.redis)
+        self.reindexer = AliasReindexer(chunk_size=2, client=self.es, queue=self.queue)
+        patcher = mock.patch('apps.search.reindex.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.products = [
+            Product.objects.create(
+                name=f'Speaker {i}', slug=f'speaker-{i}', description='Loud', category=self.category,
+                brand='Acme', sku=f'SPK-{i}', price=Decimal('10.00'), status='active'
+            )
+            for i in range(5)
+        ]
+
+    def _live(self, indices):
+        self.es.indices.exists_alias.return_value = bool(indices)
+        self.es.indices.get_alias.return_value = {name: {} for name in indices}
+
+    def test_rebuild_swaps_alias_atomically_and_drops_old_index(self):
+        """Test that the alias moves in one call and the old index is removed afterwards."""
+        old_index = f'{self.reindexer.alias}_old'
+        self._live([old_index])
+
+        with mock.patch.object(self.reindexer, 'create_index'), \
+                mock.patch.object(self.reindexer, 'index_slice', return_value=(5, 0)) as index_slice:
+            result = self.reindexer.rebuild()
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['replaced'], [old_index])
+        self.es.indices.update_aliases.assert_called_once_with(actions=[
+            {'remove': {'index': old_index, 'alias': self.reindexer.alias}},
+            {'add': {'index': result['index'], 'alias': self.reindexer.alias}},
+        ])
+        self.es.indices.delete.assert_called_once_with(index=old_index, ignore_unavailable=True)
+        # Full build plus the catch-up pass for changes made during the build
+        self.assertEqual(index_slice.call_count, 2)
+        self.assertIn('since', index_slice.call_args.kwargs)
+        self.assertEqual(result['progress']['status'], 'completed')
+
+    def test_rebuild_keeps_live_index_when_too_many_failures(self):
+        """Test that a failed build is discarded without touching the alias."""
+        self._live([f'{self.reindexer.alias}_old'])
+
+        with mock.patch.object(self.reindexer, 'create_index'), \
+                mock.patch.object(self.reindexer, 'index_slice', return_value=(50, 50)):
+            result = self.reindexer.rebuild()
+
+        self.assertEqual(result['status'], 'error')
+        self.es.indices.update_aliases.assert_not_called()
+        self.es.indices.delete.assert_called_once_with(index=result['index'], ignore_unavailable=True)
+
+    def test_swap_migrates_concrete_index_to_alias(self):
+        """Test that a legacy concrete index with the alias name is replaced by the alias."""
+        self._live([])
+        self.es.indices.exists.return_value = True
+
+        self.reindexer.swap('new_index')
+
+        # The old index is dropped in the alias call, never before it
+        self.es.indices.delete.assert_not_called()
+        self.es.indices.update_aliases.assert_called_once_with(actions=[
+            {'add': {'index': 'new_index', 'alias': self.reindexer.alias}},
+            {'remove_index': {'index': self.reindexer.alias}},
+        ])
+
+    @mock.patch.object(indexing.flush_index_queue, 'apply_async')
+    def test_swap_replays_deletions_made_during_the_build(self, apply_async):
+        """Test that rows deleted while the index was built are removed from it."""
+        from django.utils import timezone
+
+        self._live([])
+        self.es.indices.exists.return_value = False
+        started_at = timezone.now()
+        deleted, recreated = self.products[0], self.products[1]
+        for product in (deleted, recreated):
+            self.queue.enqueue('products', 'product', str(product.pk), ACTION_DELETE)
+        deleted_pk = str(deleted.pk)
+        deleted.hard_delete()
+        sent = []
+
+        def fake_bulk(client, actions, **kwargs):
+            sent.extend(actions)
+            return len(sent), []
+
+        with mock.patch.object(self.reindexer, 'index_slice', return_value=(0, 0)), \
+                mock.patch('elasticsearch.helpers.bulk', side_effect=fake_bulk):
+            self.reindexer.swap('new_index', started_at)
+
+        # Only the row that is still missing is removed
+        self.assertEqual(sent, [{'_op_type': 'delete', '_index': 'new_index', '_id': deleted_pk}])
+
+    def test_swap_removes_products_soft_deleted_during_the_build(self):
+        """Test that rows flagged is_deleted while the index was built are removed from it."""
+        from django.utils import timezone
+
+        self._live([])
+        self.es.indices.exists.return_value = False
+        started_at = timezone.now()
+        soft_deleted = self.products[0]
+        soft_deleted.delete()
+        sent = []
+
+        def fake_bulk(client, actions, **kwargs):
+            sent.extend(actions)
+            return len(sent), []
+
+        with mock.patch.object(self.reindexer, 'index_slice', return_value=(0, 0)), \
+                mock.patch('elasticsearch.helpers.bulk', side_effect=fake_bulk):
+            self.reindexer.swap('new_index', started_at)
+
+        self.assertEqual(sent, [{'_op_type': 'delete', '_index': 'new_index', '_id': str(soft_deleted.pk)}])
+
+    def test_index_slice_streams_into_versioned_index(self):
+        """Test that bulk actions target the new index and progress is recorded."""
+        progress = ReindexProgress('new_index', client=self.redis)
+        progress.start(total=5, slices=1)
+        sent = []
+
+        def fake_streaming_bulk(client, actions, **kwargs):
+            for action in actions:
+                sent.append(action)
+                yield True, {'index': {'_id': action['_id']}}
+
+        with mock.patch('elasticsearch.helpers.streaming_bulk', side_effect=fake_streaming_bulk):
+            indexed, failed = self.reindexer.index_slice('new_index', progress=progress)
+
+        self.assertEqual((indexed, failed), (5, 0))
+        self.assertEqual({action['_index'] for action in sent}, {'new_index'})
+        snapshot = progress.snapshot()
+        self.assertEqual(snapshot['indexed'], 5)
+        self.assertEqual(snapshot['percent'], 100.0)
+
+    def test_slice_bounds_cover_every_product_once(self):
+        """Test that primary-key slices partition the catalog."""
+        bounds, total = self.reindexer.slice_bounds(3)
+        self.assertEqual(total, 5)
+        self.assertEqual(len(bounds), 3)
+
+        seen = []
+        for lower, upper in bounds:
+            queryset = self.reindexer.get_queryset()
+            if lower is not None:
+                queryset = queryset.filter(pk__gt=lower)
+            if upper is not None:
+                queryset = queryset.filter(pk__lte=upper)
+            seen.extend(queryset.values_list('pk', flat=True))
+
+        self.assertCountEqual(seen, [product.pk for product in self.products])
+
+    @mock.patch('apps.search.reindex.chord')
+    def test_sliced_rebuild_dispatches_chord(self, chord):
+        """Test that a sliced rebuild hands the work to Celery and returns immediately."""
+        with mock.patch.object(self.reindexer, 'create_index'):
+            result = self.reindexer.rebuild(slices=2)
+
+        self.assertEqual(result['status'], 'started')
+        self.assertEqual(result['slices'], 2)
+        chord.assert_called_once()
+        callback = chord.return_value.call_args.args[0]
+        self.assertEqual(callback.options['link_error'][0]['task'], reindex_failed_task.name)
+        self.es.indices.update_aliases.assert_not_called()
+
+    def test_failed_slice_marks_rebuild_failed(self):
+        """Test that the chord error callback stops the progress from running forever."""
+        progress = ReindexProgress('new_index', client=self.redis)
+        progress.start(total=5, slices=2)
+
+        with mock.patch('apps.search.reindex.get_client', return_value=self.es):
+            reindex_failed_task.run('new_index')
+
+        self.assertEqual(progress.snapshot()['status'], 'failed')
+        self.es.indices.delete.assert_called_once_with(index='new_index', ignore_unavailable=True)
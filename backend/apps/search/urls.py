@@ -8,7 +8,8 @@ from .views import (
     FilterOptionsView,
     PopularSearchesView,
     RebuildIndexView,
-    RelatedProductsView
+    RelatedProductsView,
+    SearchCacheStatsView
 )
 
 urlpatterns = [
@@ -18,4 +19,5 @@ urlpatterns = [
     path('popular/', PopularSearchesView.as_view(), name='popular-searches'),
     path('related/', RelatedProductsView.as_view(), name='related-products'),
     path('rebuild-index/', RebuildIndexView.as_view(), name='rebuild-index'),
+    path('cache-stats/', SearchCacheStatsView.as_view(), name='search-cache-stats'),
 ]
\ No newline at end of file
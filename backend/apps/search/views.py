@@ -291,13 +291,62 @@ class RebuildIndexView(APIView):
         # Log index rebuild request
         logger.info(f"Index rebuild requested by user: {request.user.username}")
         
-        result = SearchService.rebuild_index()
+        result = SearchService.rebuild_index(slices=serializer.validated_data.get('slices'))
         
         if result['status'] == 'error':
             return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if result['status'] == 'started':
+            return Response(result, status=status.HTTP_202_ACCEPTED)
             
         return Response(result)
 
+    @swagger_auto_schema(
+        operation_description="Get progress and throughput of an index rebuild",
+        manual_parameters=[
+            openapi.Parameter(
+                'index',
+                openapi.IN_QUERY,
+                description="Index name returned by the rebuild request",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        responses={
+            200: "Rebuild progress",
+            404: "Not Found - Unknown rebuild"
+        }
+    )
+    def get(self, request):
+        """
+        Get progress of an index rebuild.
+        """
+        index_name = request.query_params.get('index', '')
+        progress = SearchService.get_rebuild_progress(index_name) if index_name else None
+        if progress is None:
+            return Response({'error': 'Unknown index rebuild'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(progress)
+
+
+class SearchCacheStatsView(APIView):
+    """
+    API view for search cache hit-rate metrics.
+    Admin only endpoint.
+    """
+    permission_classes = [IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="Get hit, stale and miss counts of the search cache",
+        responses={
+            200: "Search cache metrics per cached operation",
+            401: "Unauthorized - Authentication required"
+        }
+    )
+    def get(self, request):
+        """
+        Get search cache hit-rate metrics.
+        """
+        return Response(SearchService.get_cache_stats())
+
 
 class RelatedProductsView(APIView):
     """
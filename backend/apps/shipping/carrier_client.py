@@ -0,0 +1,317 @@
+"""
+Shared HTTP clients and credentials for shipping partner integrations.
+
+Every ``ShippingPartnerService`` used to talk to its carrier with bare
+``requests`` calls, and ``ShiprocketService`` kept its auth token on the
+instance; since a new service is built per call, nearly every request
+logged in again. This module gives all services of one carrier:
+
+* a single pooled ``requests.Session`` per process, with keep-alive
+  connections and automatic retries with exponential backoff for
+  idempotent requests that fail to connect or get a 429/5xx answer
+  (``Retry-After`` is honoured);
+* request deadlines: inside ``request_deadline`` (which the fan-out
+  executor wraps around every carrier task) each attempt's timeout is cut
+  to the time left, read timeouts are never retried and connect or status
+  failures are retried at most ``DEADLINE_RETRIES`` times, so a call cannot
+  outlive the fan-out budget and hold a pool thread after its result has
+  been discarded;
+* a ``CarrierTokenCache`` that keeps auth tokens in process memory and in
+  the shared Django cache (Redis in production), so one login serves the
+  whole cluster. Refreshes take a cache lock so only one worker logs in
+  while the others wait briefly for its token;
+* per-carrier latency and error metrics, aggregated by the shared metrics
+  pipeline and published to the ``carrier_metrics_<code>`` cache keys.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics_pipeline import HistogramSink, record_value, register_sink
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a carrier to accept the connection and to answer
+DEFAULT_CARRIER_TIMEOUT = (3.05, 10)
+
+CARRIER_METRICS_SINK = 'shipping.carrier_requests'
+
+# Only these are retried; a retried POST could create a second order
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# time.monotonic() by which requests in the current context must finish
+_request_deadline: ContextVar[Optional[float]] = ContextVar('carrier_request_deadline', default=None)
+
+
+def get_carrier_client_settings():
+    """Return pool, retry and token cache settings."""
+    config = getattr(settings, 'SHIPPING_CARRIER_CLIENT', {})
+    return {
+        'pool_size': config.get('POOL_SIZE', getattr(settings, 'SHIPPING_FANOUT', {}).get('MAX_WORKERS', 16)),
+        'retries': config.get('RETRIES', 3),
+        'deadline_retries': config.get('DEADLINE_RETRIES', 1),
+        'backoff_factor': config.get('BACKOFF_FACTOR', 0.3),
+        'retry_statuses': tuple(config.get('RETRY_STATUSES', (429, 500, 502, 503, 504))),
+        'token_lock_timeout': config.get('TOKEN_LOCK_TIMEOUT', 15),
+        'token_wait_timeout': config.get('TOKEN_WAIT_TIMEOUT', 5),
+    }
+
+
+def _publish_carrier_metrics(series_list):
+    """
+    Store each carrier's request metrics for the last flush interval in the cache
+    """
+    for series in series_list:
+        errors = series.counters.get('errors', 0)
+        cache.set(
+            f"carrier_metrics_{series.key}",
+            {
+                'requests': series.count,
+                'errors': errors,
+                'timeouts': series.counters.get('timeouts', 0),
+                'error_rate': errors / series.count,
+                'avg_latency_ms': series.mean,
+                'max_latency_ms': series.max,
+                'p95_latency_ms': series.percentile(0.95),
+                'histogram_ms': series.histogram(),
+                'timestamp': time.time()
+            },
+            300  # 5 minutes
+        )
+
+
+register_sink(CARRIER_METRICS_SINK, HistogramSink(_publish_carrier_metrics))
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """Make every carrier request inside the block finish within ``seconds``."""
+    deadline = time.monotonic() + seconds
+    current = _request_deadline.get()
+    token = _request_deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def _cap_timeout(timeout, remaining: float):
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, (list, tuple)):
+        return tuple(remaining if part is None else min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+def get_carrier_metrics(carrier_codes) -> Dict[str, Dict]:
+    """Return the latest published metrics for each carrier code."""
+    found = cache.get_many([f"carrier_metrics_{code}" for code in carrier_codes])
+    return {code: found.get(f"carrier_metrics_{code}") for code in carrier_codes}
+
+
+class CarrierClient:
+    """
+    Pooled, retrying HTTP client for one carrier.
+
+    Requests made under ``request_deadline`` go through a second pool
+    without adapter retries and are retried here instead, so every attempt
+    can be bounded by the time left.
+    """
+
+    def __init__(self, carrier_code: str):
+        config = get_carrier_client_settings()
+        self.carrier_code = carrier_code
+        self.deadline_retries = config['deadline_retries']
+        self.backoff_factor = config['backoff_factor']
+        self.retry_statuses = config['retry_statuses']
+        retry = Retry(
+            total=config['retries'],
+            connect=config['retries'],
+            read=config['retries'],
+            status=config['retries'],
+            backoff_factor=config['backoff_factor'],
+            status_forcelist=config['retry_statuses'],
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.session = self._build_session(config['pool_size'], retry)
+        self.deadline_session = self._build_session(config['pool_size'], 0)
+
+    def _build_session(self, pool_size: int, max_retries) -> requests.Session:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=max_retries)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request, record its latency and raise for error statuses.
+        """
+        kwargs.setdefault('timeout', DEFAULT_CARRIER_TIMEOUT)
+        deadline = _request_deadline.get()
+        started = time.perf_counter()
+        counters = None
+        try:
+            if deadline is None:
+                response = self.session.request(method, url, **kwargs)
+            else:
+                response = self._request_before(deadline, method, url, kwargs)
+            response.raise_for_status()
+            return response
+        except requests.exceptions.Timeout:
+            counters = {'errors': 1, 'timeouts': 1}
+            raise
+        except requests.exceptions.RequestException:
+            counters = {'errors': 1}
+            raise
+        finally:
+            record_value(
+                CARRIER_METRICS_SINK, self.carrier_code, (time.perf_counter() - started) * 1000, counters
+            )
+
+
+    def _request_before(self, deadline: float, method: str, url: str, kwargs) -> requests.Response:
+        """
+        Send a request whose attempts all end by ``deadline``.
+
+        Connection failures and retryable statuses of idempotent requests
+        are retried while time is left; a read timeout is not, since the
+        carrier may still be working on the first attempt.
+        """
+        timeout = kwargs.pop('timeout')
+        retries = self.deadline_retries if method.upper() in IDEMPOTENT_METHODS else 0
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(max(0, min(self.backoff_factor * 2 ** (attempt - 1), deadline - time.monotonic())))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"{self.carrier_code} request deadline passed")
+            try:
+                response = self.deadline_session.request(
+                    method, url, timeout=_cap_timeout(timeout, remaining), **kwargs
+                )
+            except requests.exceptions.ConnectionError:
+                if attempt == retries:
+                    raise
+                continue
+            if attempt == retries or response.status_code not in self.retry_statuses:
+                return response
+            response.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_carrier_client(carrier_code: str) -> CarrierClient:
+    """Return the process-wide client for a carrier."""
+    client = _clients.get(carrier_code)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(carrier_code)
+            if client is None:
+                client = _clients[carrier_code] = CarrierClient(carrier_code)
+    return client
+
+
+class CarrierTokenCache:
+    """
+    Auth tokens shared by every process, refreshed by one of them at a time.
+
+    Tokens are keyed by carrier code and a hash of the credentials, so
+    changing a partner's credentials never reuses the old token.
+    """
+
+    def __init__(self, prefix: str = 'carrier_token'):
+        self.prefix = prefix
+        self._local: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def key(self, carrier_code: str, *credentials) -> str:
+        digest = hashlib.sha256('\0'.join(str(part) for part in credentials).encode()).hexdigest()[:16]
+        return f"{self.prefix}:{carrier_code}:{digest}"
+
+    def get(self, key: str, fetch: Callable[[], Tuple[str, int]]) -> str:
+        """
+        Return the token stored under ``key``, calling ``fetch`` to log in
+        when there is none.
+
+        ``fetch`` returns ``(token, ttl_seconds)``.
+        """
+        token = self._get_local(key)
+        if token:
+            return token
+
+        token = self._get_shared(key)
+        if token:
+            return token
+
+        config = get_carrier_client_settings()
+        lock_key = f"{key}:lock"
+        if cache.add(lock_key, 1, config['token_lock_timeout']):
+            try:
+                # Another worker may have finished a refresh since our last look
+                token = self._get_shared(key)
+                if token:
+                    return token
+                return self._store(key, *fetch())
+            finally:
+                cache.delete(lock_key)
+
+        # Someone else is logging in; wait for their token rather than log in too
+        deadline = time.monotonic() + config['token_wait_timeout']
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            token = self._get_shared(key)
+            if token:
+                return token
+        logger.warning(f"Timed out waiting for carrier token refresh of {key}, logging in directly")
+        return self._store(key, *fetch())
+
+    def invalidate(self, key: str):
+        """Forget a token the carrier rejected."""
+        with self._lock:
+            self._local.pop(key, None)
+        cache.delete(key)
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._local.get(key)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        return None
+
+    def _get_shared(self, key: str) -> Optional[str]:
+        entry = cache.get(key)
+        if entry and entry[1] > time.time():
+            with self._lock:
+                self._local[key] = entry
+            return entry[0]
+        return None
+
+    def _store(self, key: str, token: str, ttl: int) -> str:
+        entry = (token, time.time() + ttl)
+        with self._lock:
+            self._local[key] = entry
+        cache.set(key, entry, ttl)
+        return token
+
+
+_token_cache = CarrierTokenCache()
+
+
+def get_token_cache() -> CarrierTokenCache:
+    """Return the process-wide carrier token cache."""
+    return _token_cache
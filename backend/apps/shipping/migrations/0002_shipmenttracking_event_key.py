@@ -0,0 +1,60 @@
+# Generated by Django 4.2.23 on 2026-10-16 21:30
+
+import hashlib
+from datetime import timezone as dt_timezone
+
+from django.db import migrations, models
+
+
+def make_event_key(status, description, location, timestamp):
+    """Frozen copy of ``ShipmentTracking.make_event_key`` as of this migration"""
+    if hasattr(timestamp, 'astimezone'):
+        timestamp = timestamp.astimezone(dt_timezone.utc).isoformat()
+    raw = '\x1f'.join([status or '', description or '', location or '', str(timestamp or '')])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def backfill_event_keys(apps, schema_editor):
+    """
+    Key existing tracking entries; repeats of an event already stored for
+    the same shipment keep an empty key so the unique constraint holds.
+    """
+    ShipmentTracking = apps.get_model('shipping', 'ShipmentTracking')
+
+    seen = set()
+    batch = []
+    rows = ShipmentTracking.objects.order_by('id').only(
+        'id', 'shipment_id', 'status', 'description', 'location', 'timestamp'
+    )
+    for row in rows.iterator(chunk_size=2000):
+        key = make_event_key(row.status, row.description, row.location, row.timestamp)
+        if (row.shipment_id, key) in seen:
+            continue
+        seen.add((row.shipment_id, key))
+        row.event_key = key
+        batch.append(row)
+        if len(batch) >= 1000:
+            ShipmentTracking.objects.bulk_update(batch, ['event_key'])
+            batch = []
+    if batch:
+        ShipmentTracking.objects.bulk_update(batch, ['event_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipmenttracking',
+            name='event_key',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True, verbose_name='Event Key'),
+        ),
+        migrations.RunPython(backfill_event_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='shipmenttracking',
+            constraint=models.UniqueConstraint(fields=('shipment', 'event_key'), name='unique_shipment_tracking_event'),
+        ),
+    ]
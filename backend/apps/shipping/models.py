@@ -1,3 +1,6 @@
+import hashlib
+from datetime import timezone as dt_timezone
+
 from django.db import models
 from django.core.validators import RegexValidator
 from django.utils.translation import gettext_lazy as _
@@ -230,6 +233,10 @@ class ShipmentTracking(models.Model):
     # Raw response from shipping partner
     raw_response = models.JSONField(_('Raw Response'), default=dict, blank=True)
     
+    # Identifies a carrier event so repeated syncs never store it twice;
+    # empty for entries we create ourselves
+    event_key = models.CharField(_('Event Key'), max_length=40, null=True, blank=True, editable=False)
+    
     # Timestamps
     timestamp = models.DateTimeField(_('Timestamp'))
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
@@ -238,9 +245,25 @@ class ShipmentTracking(models.Model):
         verbose_name = _('Shipment Tracking')
         verbose_name_plural = _('Shipment Tracking')
         ordering = ['-timestamp']
+        constraints = [
+            models.UniqueConstraint(fields=['shipment', 'event_key'], name='unique_shipment_tracking_event'),
+        ]
     
     def __str__(self):
         return f"{self.shipment.tracking_number} - {self.get_status_display()} at {self.timestamp}"
+    
+    @staticmethod
+    def make_event_key(status, description, location, timestamp) -> str:
+        """
+        Hash a carrier event's status, description, location and time
+        
+        ``timestamp`` is an aware datetime, or the carrier's raw string when
+        it could not be parsed.
+        """
+        if hasattr(timestamp, 'astimezone'):
+            timestamp = timestamp.astimezone(dt_timezone.utc).isoformat()
+        raw = '\x1f'.join([status or '', description or '', location or '', str(timestamp or '')])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
 
 
 class ShippingRate(models.Model):
@@ -139,6 +139,27 @@ class TrackingWebhookSerializer(serializers.Serializer):
         return value.strip().upper()
 
 
+class BulkServiceabilitySerializer(serializers.Serializer):
+    """Serializer for checking many pin codes at once"""
+    pin_codes = serializers.ListField(
+        child=serializers.RegexField(r'^\d{6}$'),
+        min_length=1,
+        max_length=200
+    )
+    weight = serializers.DecimalField(max_digits=8, decimal_places=3, required=False, min_value=0)
+
+
+class RateShoppingSerializer(serializers.Serializer):
+    """Serializer for rate quotes across all shipping partners"""
+    source_pin_code = serializers.CharField(max_length=10)
+    destination_pin_code = serializers.CharField(max_length=10)
+    weight = serializers.DecimalField(max_digits=8, decimal_places=3, min_value=0)
+    length = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+    breadth = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+    height = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+    payment_method = serializers.ChoiceField(choices=['PREPAID', 'COD'], default='PREPAID')
+
+
 class BulkShipmentUpdateSerializer(serializers.Serializer):
     """Serializer for bulk shipment status updates"""
     shipment_ids = serializers.ListField(
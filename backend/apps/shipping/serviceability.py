@@ -0,0 +1,266 @@
+"""
+Concurrent serviceability checks and rate shopping across carriers.
+
+Checking a pin code used to call every active carrier one after another,
+so checkout waited for the sum of their latencies. Carrier calls are now
+submitted to a shared thread pool and collected together, bounded by
+``SHIPPING_FANOUT['OVERALL_TIMEOUT']``; each call also has its own
+per-carrier timeout (see ``ShippingPartnerService._get_timeout``), cut to
+whatever is left of the overall budget (see
+``carrier_client.request_deadline``). A carrier that fails or times out is
+reported with an ``error`` and does not hold up the others.
+
+Successful answers are cached per carrier, pin code and weight band.
+Carriers price and route by weight slab, so weights are rounded up to the
+upper bound of their band (``SHIPPING_FANOUT['WEIGHT_BANDS']``) both for
+the cache key and for the carrier request, which keeps a cached answer
+valid for every weight in the band. Cache keys include the partner's
+``updated_at`` so editing a partner's configuration retires its entries.
+Errors are never cached.
+"""
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.task_pool import TaskPool
+from core.utils import chunks
+
+from .carrier_client import request_deadline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHT_BANDS = (0.5, 1, 2, 5, 10, 20, 50)
+
+
+def get_shipping_fanout_settings():
+    """Return pool size, timeouts, cache TTLs and weight bands."""
+    config = getattr(settings, 'SHIPPING_FANOUT', {})
+    return {
+        'max_workers': config.get('MAX_WORKERS', 16),
+        'overall_timeout': config.get('OVERALL_TIMEOUT', 8),
+        'serviceability_ttl': config.get('SERVICEABILITY_TTL', 6 * 3600),
+        'rate_ttl': config.get('RATE_TTL', 30 * 60),
+        'weight_bands': tuple(config.get('WEIGHT_BANDS', DEFAULT_WEIGHT_BANDS)),
+        'bulk_chunk_size': config.get('BULK_CHUNK_SIZE', 50),
+    }
+
+
+def band_weight(weight: Optional[float]) -> Optional[float]:
+    """
+    Round ``weight`` (kg) up to the upper bound of its band.
+
+    Weights above the last band are rounded up to the next whole kilogram.
+    ``None`` stays ``None`` so carriers apply their own default.
+    """
+    if weight is None:
+        return None
+    weight = float(weight)
+    bands = get_shipping_fanout_settings()['weight_bands']
+    index = bisect_left(bands, weight)
+    if index < len(bands):
+        return float(bands[index])
+    return float(math.ceil(weight))
+
+
+def _partner_stamp(partner) -> int:
+    updated_at = getattr(partner, 'updated_at', None)
+    return int(updated_at.timestamp()) if updated_at else 0
+
+
+def serviceability_cache_key(partner, pin_code: str, weight: Optional[float]) -> str:
+    band = 'default' if weight is None else f"{band_weight(weight):g}"
+    return f"shipping:serviceability:{partner.code}:{_partner_stamp(partner)}:{pin_code}:{band}"
+
+
+def rate_cache_key(partner, package_data: Dict[str, Any]) -> str:
+    dimensions = 'x'.join(
+        str(package_data.get(side) or '') for side in ('length', 'breadth', 'height')
+    )
+    return ":".join([
+        "shipping:rate",
+        partner.code,
+        str(_partner_stamp(partner)),
+        str(package_data.get("source_pin_code", "")),
+        str(package_data.get("destination_pin_code", "")),
+        f"{band_weight(package_data.get('weight', 0.5)):g}",
+        "cod" if package_data.get("payment_method") == "COD" else "prepaid",
+        dimensions,
+    ])
+
+
+class CarrierExecutor(TaskPool):
+    """
+    Process-wide thread pool for carrier calls.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        super().__init__(
+            max_workers or get_shipping_fanout_settings()['max_workers'],
+            thread_name_prefix='carrier',
+        )
+
+    def run(self, tasks: Dict[Any, Callable[[], Any]], timeout: Optional[float] = None) -> Dict[Any, Dict[str, Any]]:
+        """
+        Run ``tasks`` through the pool; see ``TaskPool.run``.
+
+        Carrier requests made by a task must finish by the same deadline, so
+        a discarded task frees its pool thread soon after.
+        """
+        if tasks and timeout is not None:
+            deadline = time.monotonic() + timeout
+            tasks = {key: self._bounded(task, deadline) for key, task in tasks.items()}
+        return super().run(tasks, timeout=timeout)
+
+    def _bounded(self, task: Callable[[], Any], deadline: float) -> Callable[[], Any]:
+        def bounded():
+            with request_deadline(deadline - time.monotonic()):
+                return task()
+        return bounded
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_carrier_executor() -> CarrierExecutor:
+    """Return the process-wide carrier executor."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = CarrierExecutor()
+    return _executor
+
+
+def _strip_raw(result: Dict[str, Any]) -> Dict[str, Any]:
+    # Raw carrier payloads are large and not needed by callers of cached data
+    return {key: value for key, value in result.items() if key != "raw_response"}
+
+
+class CarrierFanout:
+    """
+    Serviceability checks and rate quotes fanned out over carriers.
+
+    ``get_service`` builds the ``ShippingPartnerService`` for a partner.
+    """
+
+    def __init__(self, get_service: Callable, executor: Optional[CarrierExecutor] = None):
+        self.get_service = get_service
+        self.executor = executor or get_carrier_executor()
+
+    def check_serviceability(self, partners, pin_codes: List[str],
+                             weight: Optional[float] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Check every pin code with every partner.
+
+        Returns ``{pin_code: {partner_code: result}}``.
+        """
+        config = get_shipping_fanout_settings()
+        pin_codes = list(dict.fromkeys(pin_codes))
+        partners = list(partners)
+        carrier_weight = band_weight(weight)
+
+        keys = {
+            (partner.code, pin_code): serviceability_cache_key(partner, pin_code, weight)
+            for partner in partners for pin_code in pin_codes
+        }
+        cached = cache.get_many(list(keys.values()))
+
+        results = {pin_code: {} for pin_code in pin_codes}
+        tasks = {}
+        for partner in partners:
+            missing = []
+            for pin_code in pin_codes:
+                hit = cached.get(keys[(partner.code, pin_code)])
+                if hit is not None:
+                    results[pin_code][partner.code] = hit
+                else:
+                    missing.append(pin_code)
+            if not missing:
+                continue
+            try:
+                service = self.get_service(partner)
+            except Exception as e:
+                logger.error(f"Error checking serviceability with {partner.code}: {e}")
+                for pin_code in missing:
+                    results[pin_code][partner.code] = {"serviceable": False, "error": str(e)}
+                continue
+            # One request per chunk where the carrier has a bulk lookup, else one per pin code
+            chunk_size = config['bulk_chunk_size'] if service.supports_bulk_serviceability else 1
+            for index, chunk in enumerate(chunks(missing, chunk_size)):
+                tasks[(partner.code, index)] = self._serviceability_task(service, chunk, carrier_weight)
+
+        if not tasks:
+            return results
+
+        pin_chunks = {key: task.pin_codes for key, task in tasks.items()}
+        to_cache = {}
+        for (partner_code, index), outcome in self.executor.run(tasks, config['overall_timeout']).items():
+            if "error" in outcome:
+                logger.error(f"Error checking serviceability with {partner_code}: {outcome['error']}")
+            for pin_code in pin_chunks[(partner_code, index)]:
+                if "error" in outcome:
+                    results[pin_code][partner_code] = {"serviceable": False, "error": outcome["error"]}
+                    continue
+                result = _strip_raw(outcome["result"].get(pin_code, {"serviceable": False}))
+                results[pin_code][partner_code] = result
+                to_cache[keys[(partner_code, pin_code)]] = result
+
+        if to_cache:
+            cache.set_many(to_cache, config['serviceability_ttl'])
+        return results
+
+    def _serviceability_task(self, service, pin_codes: List[str], weight: Optional[float]):
+        def task():
+            if len(pin_codes) == 1:
+                if weight is None:
+                    return {pin_codes[0]: service.check_serviceability(pin_codes[0])}
+                return {pin_codes[0]: service.check_serviceability(pin_codes[0], weight=weight)}
+            return service.check_serviceability_bulk(pin_codes, weight=weight)
+        task.pin_codes = pin_codes
+        return task
+
+    def shop_rates(self, partners, package_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Quote ``package_data`` with every partner.
+
+        Returns ``{partner_code: {"rates": [...]}}`` or an ``error`` entry.
+        """
+        config = get_shipping_fanout_settings()
+        partners = list(partners)
+        package_data = dict(package_data, weight=band_weight(package_data.get("weight", 0.5)))
+
+        keys = {partner.code: rate_cache_key(partner, package_data) for partner in partners}
+        cached = cache.get_many(list(keys.values()))
+
+        results = {}
+        tasks = {}
+        for partner in partners:
+            hit = cached.get(keys[partner.code])
+            if hit is not None:
+                results[partner.code] = hit
+            else:
+                tasks[partner.code] = self._rate_task(partner, package_data)
+
+        to_cache = {}
+        for partner_code, outcome in self.executor.run(tasks, config['overall_timeout']).items():
+            if "error" in outcome:
+                logger.error(f"Error calculating shipping rate with {partner_code}: {outcome['error']}")
+                results[partner_code] = {"rates": [], "error": outcome["error"]}
+            else:
+                results[partner_code] = to_cache[keys[partner_code]] = _strip_raw(outcome["result"])
+
+        if to_cache:
+            cache.set_many(to_cache, config['rate_ttl'])
+        return results
+
+    def _rate_task(self, partner, package_data: Dict[str, Any]):
+        def task():
+            return self.get_service(partner).calculate_shipping_rate(package_data)
+        return task
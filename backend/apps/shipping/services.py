@@ -5,9 +5,10 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union, Any
 from django.conf import settings
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
 
+from .carrier_client import DEFAULT_CARRIER_TIMEOUT, get_carrier_client, get_token_cache
 from .models import ShippingPartner, ServiceableArea, Shipment, ShipmentTracking
+from .tracking_sync import TrackingSyncEngine
 
 logger = logging.getLogger(__name__)
 
@@ -19,25 +20,81 @@ class ShippingException(Exception):
 class ShippingPartnerService:
     """Base service class for shipping partner integrations"""
     
+    # Whether check_serviceability_bulk answers many pin codes in one request
+    supports_bulk_serviceability = False
+    
+    # Tracking numbers sent per track_shipments_bulk request
+    tracking_batch_size = 1
+    
     def __init__(self, shipping_partner: ShippingPartner):
         self.shipping_partner = shipping_partner
         self.base_url = shipping_partner.base_url
         self.api_key = shipping_partner.api_key
         self.api_secret = shipping_partner.api_secret
         self.configuration = shipping_partner.configuration
+        self.client = get_carrier_client(shipping_partner.code)
+        self.session = self.client.session
+        self.timeout = self._get_timeout()
+    
+    def _get_timeout(self):
+        """
+        Get the (connect, read) timeout for this carrier
+        
+        A ``timeout`` in the partner configuration overrides the
+        ``SHIPPING_FANOUT['CARRIER_TIMEOUT']`` setting.
+        """
+        timeout = self.configuration.get("timeout") or getattr(settings, 'SHIPPING_FANOUT', {}).get(
+            'CARRIER_TIMEOUT', DEFAULT_CARRIER_TIMEOUT
+        )
+        return tuple(timeout) if isinstance(timeout, (list, tuple)) else timeout
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request with the carrier's shared client and timeout
+        
+        The client pools connections, retries idempotent requests with
+        backoff and records latency and error metrics for the carrier.
         
-    def check_serviceability(self, pin_code: str) -> Dict[str, Any]:
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Passed through to ``requests.Session.request``
+            
+        Returns:
+            The response, after ``raise_for_status``
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.client.request(method, url, **kwargs)
+        
+    def check_serviceability(self, pin_code: str, weight: float = None) -> Dict[str, Any]:
         """
         Check if a pin code is serviceable
         
         Args:
             pin_code: The pin code to check
+            weight: Optional package weight in kg
             
         Returns:
             Dict with serviceability information
         """
         raise NotImplementedError("Subclasses must implement this method")
     
+    def check_serviceability_bulk(self, pin_codes: List[str], weight: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Check several pin codes, one request per pin code unless overridden
+        
+        Args:
+            pin_codes: The pin codes to check
+            weight: Optional package weight in kg
+            
+        Returns:
+            Dict mapping each pin code to its serviceability information
+        """
+        results = {}
+        for pin_code in pin_codes:
+            results[pin_code] = self.check_serviceability(pin_code, weight=weight)
+        return results
+    
     def create_order(self, order_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a shipping order with the partner
@@ -74,6 +131,25 @@ class ShippingPartnerService:
         """
         raise NotImplementedError("Subclasses must implement this method")
     
+    def track_shipments_bulk(self, tracking_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Track several shipments, one request per tracking number unless overridden
+        
+        Args:
+            tracking_numbers: The tracking numbers, at most ``tracking_batch_size``
+            
+        Returns:
+            Dict mapping each tracking number to its tracking information,
+            or to ``{"error": ...}`` when it could not be tracked
+        """
+        results = {}
+        for tracking_number in tracking_numbers:
+            try:
+                results[tracking_number] = self.track_shipment(tracking_number)
+            except ShippingException as e:
+                results[tracking_number] = {"error": str(e)}
+        return results
+    
     def calculate_shipping_rate(self, package_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Calculate shipping rate
@@ -101,15 +177,44 @@ class ShippingPartnerService:
 class ShiprocketService(ShippingPartnerService):
     """Service for Shiprocket integration"""
     
+    tracking_batch_size = 50
+    
+    # Map Shiprocket status to our status
+    STATUS_MAPPING = {
+        "PICKUP SCHEDULED": "PROCESSING",
+        "PICKUP GENERATED": "PROCESSING",
+        "AWB ASSIGNED": "PROCESSING",
+        "LABEL GENERATED": "PROCESSING",
+        "PICKUP COMPLETE": "SHIPPED",
+        "IN TRANSIT": "IN_TRANSIT",
+        "OUT FOR DELIVERY": "OUT_FOR_DELIVERY",
+        "DELIVERED": "DELIVERED",
+        "CANCELLED": "CANCELLED",
+        "RTO INITIATED": "RETURNED",
+        "RTO DELIVERED": "RETURNED",
+        "FAILED DELIVERY": "FAILED_DELIVERY"
+    }
+    
     def __init__(self, shipping_partner: ShippingPartner):
         super().__init__(shipping_partner)
         self.token = None
         self.token_expiry = None
     
+    # Shiprocket tokens are valid for 24 hours; refresh an hour early
+    TOKEN_TTL = 23 * 60 * 60
+    
+    def _token_key(self) -> str:
+        return get_token_cache().key(
+            self.shipping_partner.code, self.base_url, self.configuration.get("email"), self.api_secret
+        )
+    
     def _get_auth_token(self) -> str:
         """
         Get authentication token from Shiprocket
         
+        Tokens are shared through the carrier token cache, so one login
+        serves every service instance, worker and server.
+        
         Returns:
             Authentication token
         """
@@ -117,7 +222,17 @@ class ShiprocketService(ShippingPartnerService):
         if self.token and self.token_expiry and self.token_expiry > timezone.now():
             return self.token
         
-        # Get new token
+        self.token = get_token_cache().get(self._token_key(), self._login)
+        self.token_expiry = timezone.now() + timedelta(seconds=self.TOKEN_TTL)
+        return self.token
+    
+    def _login(self):
+        """
+        Log in to Shiprocket
+        
+        Returns:
+            Tuple of the new token and its lifetime in seconds
+        """
         url = f"{self.base_url}/auth/login"
         payload = {
             "email": self.configuration.get("email"),
@@ -125,20 +240,28 @@ class ShiprocketService(ShippingPartnerService):
         }
         
         try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
+            response = self.client.request("POST", url, json=payload, timeout=self.timeout)
             data = response.json()
-            
-            # Store token and expiry
-            self.token = data.get("token")
-            # Token typically expires in 24 hours
-            self.token_expiry = timezone.now() + timedelta(hours=23)
-            
-            return self.token
+            return data.get("token"), self.TOKEN_TTL
         except requests.exceptions.RequestException as e:
             logger.error(f"Shiprocket authentication error: {str(e)}")
             raise ShippingException(f"Failed to authenticate with Shiprocket: {str(e)}")
     
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request, logging in again once if Shiprocket rejects the token
+        """
+        try:
+            return super()._request(method, url, **kwargs)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 401 or "headers" not in kwargs:
+                raise
+            logger.info("Shiprocket rejected the cached token, logging in again")
+            get_token_cache().invalidate(self._token_key())
+            self.token = None
+            kwargs["headers"] = dict(kwargs["headers"], **self._get_headers())
+            return super()._request(method, url, **kwargs)
+    
     def _get_headers(self) -> Dict[str, str]:
         """
         Get headers for Shiprocket API requests
@@ -152,12 +275,13 @@ class ShiprocketService(ShippingPartnerService):
             "Authorization": f"Bearer {token}"
         }
     
-    def check_serviceability(self, pin_code: str) -> Dict[str, Any]:
+    def check_serviceability(self, pin_code: str, weight: float = None) -> Dict[str, Any]:
         """
         Check if a pin code is serviceable by Shiprocket
         
         Args:
             pin_code: The pin code to check
+            weight: Optional package weight in kg, 1 kg by default
             
         Returns:
             Dict with serviceability information
@@ -166,14 +290,13 @@ class ShiprocketService(ShippingPartnerService):
         params = {
             "pickup_postcode": self.configuration.get("pickup_postcode", ""),
             "delivery_postcode": pin_code,
-            "weight": 1,  # Default weight in kg
+            "weight": weight or 1,  # Default weight in kg
             "cod": 0  # Default to prepaid
         }
         
         try:
             headers = self._get_headers()
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, headers=headers, params=params)
             data = response.json()
             
             # Process and return serviceability data
@@ -250,8 +373,7 @@ class ShiprocketService(ShippingPartnerService):
         
         try:
             headers = self._get_headers()
-            response = requests.post(url, headers=headers, json=shiprocket_order)
-            response.raise_for_status()
+            response = self._request("POST", url, headers=headers, json=shiprocket_order)
             data = response.json()
             
             # Process and return order data
@@ -285,8 +407,7 @@ class ShiprocketService(ShippingPartnerService):
         
         try:
             headers = self._get_headers()
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
+            response = self._request("POST", url, headers=headers, json=payload)
             data = response.json()
             
             # Return label URL
@@ -312,59 +433,79 @@ class ShiprocketService(ShippingPartnerService):
         
         try:
             headers = self._get_headers()
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, headers=headers, params=params)
             data = response.json()
-            
-            # Process tracking data
-            tracking_data = data.get("tracking_data", {})
-            shipment_track = tracking_data.get("shipment_track", [])
-            
-            # Map Shiprocket status to our status
-            status_mapping = {
-                "PICKUP SCHEDULED": "PROCESSING",
-                "PICKUP GENERATED": "PROCESSING",
-                "AWB ASSIGNED": "PROCESSING",
-                "LABEL GENERATED": "PROCESSING",
-                "PICKUP COMPLETE": "SHIPPED",
-                "IN TRANSIT": "IN_TRANSIT",
-                "OUT FOR DELIVERY": "OUT_FOR_DELIVERY",
-                "DELIVERED": "DELIVERED",
-                "CANCELLED": "CANCELLED",
-                "RTO INITIATED": "RETURNED",
-                "RTO DELIVERED": "RETURNED",
-                "FAILED DELIVERY": "FAILED_DELIVERY"
-            }
-            
-            current_status = "PENDING"
-            if tracking_data.get("current_status"):
-                current_status = status_mapping.get(
-                    tracking_data.get("current_status").upper(), 
-                    "IN_TRANSIT"
-                )
-            
-            # Extract tracking history
-            tracking_history = []
-            for track in shipment_track:
-                status = status_mapping.get(track.get("status", "").upper(), "IN_TRANSIT")
-                tracking_history.append({
-                    "status": status,
-                    "description": track.get("status", ""),
-                    "location": track.get("location", ""),
-                    "timestamp": track.get("date", ""),
-                    "raw_response": track
-                })
-            
-            return {
-                "status": current_status,
-                "estimated_delivery_date": tracking_data.get("etd"),
-                "tracking_history": tracking_history,
-                "raw_response": data
-            }
+            return self._parse_tracking(data)
         except requests.exceptions.RequestException as e:
             logger.error(f"Shiprocket tracking error: {str(e)}")
             raise ShippingException(f"Failed to track shipment with Shiprocket: {str(e)}")
     
+    def track_shipments_bulk(self, tracking_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Track several shipments with one Shiprocket request
+        
+        Args:
+            tracking_numbers: The AWB codes
+            
+        Returns:
+            Dict mapping each AWB code to its tracking information
+        """
+        url = f"{self.base_url}/courier/track/awbs"
+        
+        try:
+            headers = self._get_headers()
+            response = self._request("POST", url, headers=headers, json={"awbs": tracking_numbers})
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Shiprocket bulk tracking error: {str(e)}")
+            raise ShippingException(f"Failed to track shipments with Shiprocket: {str(e)}")
+        
+        # Answers come keyed by AWB, either as one object or a list of them
+        entries = {}
+        for item in (data if isinstance(data, list) else [data]):
+            if isinstance(item, dict):
+                entries.update(item)
+        
+        results = {}
+        for tracking_number in tracking_numbers:
+            entry = entries.get(tracking_number)
+            if isinstance(entry, dict) and entry.get("tracking_data"):
+                results[tracking_number] = self._parse_tracking(entry)
+            else:
+                results[tracking_number] = {"error": f"No tracking data found for {tracking_number}"}
+        return results
+    
+    def _parse_tracking(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a Shiprocket tracking answer to our tracking information"""
+        tracking_data = data.get("tracking_data", {})
+        shipment_track = tracking_data.get("shipment_track", [])
+        
+        current_status = "PENDING"
+        if tracking_data.get("current_status"):
+            current_status = self.STATUS_MAPPING.get(
+                tracking_data.get("current_status").upper(), 
+                "IN_TRANSIT"
+            )
+        
+        # Extract tracking history
+        tracking_history = []
+        for track in shipment_track:
+            status = self.STATUS_MAPPING.get(track.get("status", "").upper(), "IN_TRANSIT")
+            tracking_history.append({
+                "status": status,
+                "description": track.get("status", ""),
+                "location": track.get("location", ""),
+                "timestamp": track.get("date", ""),
+                "raw_response": track
+            })
+        
+        return {
+            "status": current_status,
+            "estimated_delivery_date": tracking_data.get("etd"),
+            "tracking_history": tracking_history,
+            "raw_response": data
+        }
+    
     def calculate_shipping_rate(self, package_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Calculate shipping rate with Shiprocket
@@ -391,8 +532,7 @@ class ShiprocketService(ShippingPartnerService):
         
         try:
             headers = self._get_headers()
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, headers=headers, params=params)
             data = response.json()
             
             # Process and return rate data
@@ -433,8 +573,7 @@ class ShiprocketService(ShippingPartnerService):
         
         try:
             headers = self._get_headers()
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
+            response = self._request("POST", url, headers=headers, json=payload)
             data = response.json()
             
             return {
@@ -450,6 +589,24 @@ class ShiprocketService(ShippingPartnerService):
 class DelhiveryService(ShippingPartnerService):
     """Service for Delhivery integration"""
     
+    supports_bulk_serviceability = True
+    tracking_batch_size = 50
+    
+    # Map Delhivery status to our status
+    STATUS_MAPPING = {
+        "Pickup Scheduled": "PROCESSING",
+        "Pickup Generated": "PROCESSING",
+        "Pickup Assigned": "PROCESSING",
+        "Pickup Complete": "SHIPPED",
+        "In Transit": "IN_TRANSIT",
+        "Out for Delivery": "OUT_FOR_DELIVERY",
+        "Delivered": "DELIVERED",
+        "Cancelled": "CANCELLED",
+        "RTO Initiated": "RETURNED",
+        "RTO Delivered": "RETURNED",
+        "Failed Delivery": "FAILED_DELIVERY"
+    }
+    
     def _get_headers(self) -> Dict[str, str]:
         """
         Get headers for Delhivery API requests
@@ -462,41 +619,58 @@ class DelhiveryService(ShippingPartnerService):
             "Authorization": f"Token {self.api_key}"
         }
     
-    def check_serviceability(self, pin_code: str) -> Dict[str, Any]:
+    def check_serviceability(self, pin_code: str, weight: float = None) -> Dict[str, Any]:
         """
         Check if a pin code is serviceable by Delhivery
         
         Args:
             pin_code: The pin code to check
+            weight: Ignored; Delhivery serviceability does not depend on weight
             
         Returns:
             Dict with serviceability information
         """
+        return self.check_serviceability_bulk([pin_code])[pin_code]
+    
+    def check_serviceability_bulk(self, pin_codes: List[str], weight: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Check several pin codes with one Delhivery request
+        
+        Args:
+            pin_codes: The pin codes to check
+            weight: Ignored; Delhivery serviceability does not depend on weight
+            
+        Returns:
+            Dict mapping each pin code to its serviceability information
+        """
         url = f"{self.base_url}/c/api/pin-codes/json/"
         params = {
             "token": self.api_key,
-            "filter_codes": pin_code
+            "filter_codes": ",".join(pin_codes)
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, params=params)
             data = response.json()
             
             # Process and return serviceability data
-            delivery_codes = data.get("delivery_codes", [])
-            serviceable = False
-            
-            if delivery_codes:
-                for code in delivery_codes:
-                    if code.get("postal_code") == pin_code and code.get("status") == "serviceable":
-                        serviceable = True
-                        break
+            serviceable_codes = set()
+            for code in data.get("delivery_codes", []) or []:
+                details = code.get("postal_code")
+                if isinstance(details, dict):
+                    # Full format: {"postal_code": {"pin": 110001, "pre_paid": "Y", "cod": "Y", ...}}
+                    if details.get("pre_paid") == "Y" or details.get("cod") == "Y":
+                        serviceable_codes.add(str(details.get("pin")))
+                elif code.get("status") == "serviceable":
+                    serviceable_codes.add(str(details))
             
             return {
-                "serviceable": serviceable,
-                "delivery_days": None,  # Delhivery doesn't provide this in the serviceability API
-                "raw_response": data
+                pin_code: {
+                    "serviceable": pin_code in serviceable_codes,
+                    "delivery_days": None,  # Delhivery doesn't provide this in the serviceability API
+                    "raw_response": data
+                }
+                for pin_code in pin_codes
             }
         except requests.exceptions.RequestException as e:
             logger.error(f"Delhivery serviceability check error: {str(e)}")
@@ -565,8 +739,7 @@ class DelhiveryService(ShippingPartnerService):
         
         try:
             headers = self._get_headers()
-            response = requests.post(url, headers=headers, json=shipment)
-            response.raise_for_status()
+            response = self._request("POST", url, headers=headers, json=shipment)
             data = response.json()
             
             # Check for errors in response
@@ -618,8 +791,7 @@ class DelhiveryService(ShippingPartnerService):
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, params=params)
             data = response.json()
             
             # Process tracking data
@@ -627,53 +799,76 @@ class DelhiveryService(ShippingPartnerService):
             if not shipment_data:
                 raise ShippingException(f"No tracking data found for {tracking_number}")
             
-            shipment = shipment_data[0]
-            scans = shipment.get("Scans", [])
-            
-            # Map Delhivery status to our status
-            status_mapping = {
-                "Pickup Scheduled": "PROCESSING",
-                "Pickup Generated": "PROCESSING",
-                "Pickup Assigned": "PROCESSING",
-                "Pickup Complete": "SHIPPED",
-                "In Transit": "IN_TRANSIT",
-                "Out for Delivery": "OUT_FOR_DELIVERY",
-                "Delivered": "DELIVERED",
-                "Cancelled": "CANCELLED",
-                "RTO Initiated": "RETURNED",
-                "RTO Delivered": "RETURNED",
-                "Failed Delivery": "FAILED_DELIVERY"
-            }
-            
-            # Get current status
-            current_status = "PENDING"
-            if shipment.get("Status"):
-                current_status = status_mapping.get(shipment.get("Status"), "IN_TRANSIT")
-            
-            # Extract tracking history
-            tracking_history = []
-            for scan in scans:
-                status = status_mapping.get(scan.get("ScanDetail", {}).get("Scan", ""), "IN_TRANSIT")
-                scan_time = scan.get("ScanDetail", {}).get("ScanDateTime", "")
-                
-                tracking_history.append({
-                    "status": status,
-                    "description": scan.get("ScanDetail", {}).get("Instructions", ""),
-                    "location": scan.get("ScanDetail", {}).get("ScannedLocation", ""),
-                    "timestamp": scan_time,
-                    "raw_response": scan
-                })
-            
-            return {
-                "status": current_status,
-                "estimated_delivery_date": shipment.get("ExpectedDeliveryDate"),
-                "tracking_history": tracking_history,
-                "raw_response": data
-            }
+            result = self._parse_shipment(shipment_data[0].get("Shipment", shipment_data[0]))
+            result["raw_response"] = data
+            return result
         except requests.exceptions.RequestException as e:
             logger.error(f"Delhivery tracking error: {str(e)}")
             raise ShippingException(f"Failed to track shipment with Delhivery: {str(e)}")
     
+    def track_shipments_bulk(self, tracking_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Track several waybills with one Delhivery request
+        
+        Args:
+            tracking_numbers: The waybills
+            
+        Returns:
+            Dict mapping each waybill to its tracking information
+        """
+        url = f"{self.base_url}/api/v1/packages/json/"
+        params = {
+            "token": self.api_key,
+            "waybill": ",".join(tracking_numbers)
+        }
+        
+        try:
+            response = self._request("GET", url, params=params)
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Delhivery bulk tracking error: {str(e)}")
+            raise ShippingException(f"Failed to track shipments with Delhivery: {str(e)}")
+        
+        results = {}
+        for entry in data.get("ShipmentData", []):
+            shipment = entry.get("Shipment", entry)
+            waybill = str(shipment.get("AWB", ""))
+            if waybill in tracking_numbers:
+                result = self._parse_shipment(shipment)
+                result["raw_response"] = entry
+                results[waybill] = result
+        for tracking_number in tracking_numbers:
+            results.setdefault(tracking_number, {"error": f"No tracking data found for {tracking_number}"})
+        return results
+    
+    def _parse_shipment(self, shipment: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert one Delhivery ShipmentData entry to our tracking information"""
+        # Get current status; newer responses nest it with its own date and location
+        current_status = "PENDING"
+        status = shipment.get("Status")
+        if isinstance(status, dict):
+            status = status.get("Status")
+        if status:
+            current_status = self.STATUS_MAPPING.get(status, "IN_TRANSIT")
+        
+        # Extract tracking history
+        tracking_history = []
+        for scan in shipment.get("Scans", []):
+            scan_detail = scan.get("ScanDetail", {})
+            tracking_history.append({
+                "status": self.STATUS_MAPPING.get(scan_detail.get("Scan", ""), "IN_TRANSIT"),
+                "description": scan_detail.get("Instructions", ""),
+                "location": scan_detail.get("ScannedLocation", ""),
+                "timestamp": scan_detail.get("ScanDateTime", ""),
+                "raw_response": scan
+            })
+        
+        return {
+            "status": current_status,
+            "estimated_delivery_date": shipment.get("ExpectedDeliveryDate"),
+            "tracking_history": tracking_history,
+        }
+    
     def calculate_shipping_rate(self, package_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Calculate shipping rate with Delhivery
@@ -700,8 +895,7 @@ class DelhiveryService(ShippingPartnerService):
         
         try:
             headers = self._get_headers()
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
+            response = self._request("POST", url, headers=headers, json=payload)
             data = response.json()
             
             # Process and return rate data
@@ -741,8 +935,7 @@ class DelhiveryService(ShippingPartnerService):
         }
         
         try:
-            response = requests.post(url, params=params)
-            response.raise_for_status()
+            response = self._request("POST", url, params=params)
             data = response.json()
             
             return {
@@ -775,50 +968,107 @@ class ShippingService:
         else:
             raise ShippingException(f"Unsupported shipping partner type: {shipping_partner.partner_type}")
     
-    def check_serviceability(self, pin_code: str, shipping_partner: ShippingPartner = None) -> Dict[str, Any]:
+    def check_serviceability(self, pin_code: str, shipping_partner: ShippingPartner = None,
+                             weight: float = None) -> Dict[str, Any]:
         """
         Check if a pin code is serviceable
         
         Args:
             pin_code: The pin code to check
             shipping_partner: Optional specific shipping partner to check with
+            weight: Optional package weight in kg
             
         Returns:
             Dict with serviceability information
         """
         if shipping_partner:
             # Check with specific partner
-            service = self.get_shipping_partner_service(shipping_partner)
-            return service.check_serviceability(pin_code)
-        else:
-            # Check with all active partners
-            partners = ShippingPartner.objects.filter(is_active=True)
-            results = {}
-            
-            for partner in partners:
-                try:
-                    service = self.get_shipping_partner_service(partner)
-                    results[partner.code] = service.check_serviceability(pin_code)
-                except Exception as e:
-                    logger.error(f"Error checking serviceability with {partner.name}: {str(e)}")
-                    results[partner.code] = {"serviceable": False, "error": str(e)}
-            
-            # Check if pin code is in our database
-            serviceable_areas = ServiceableArea.objects.filter(
-                pin_code=pin_code,
-                is_active=True
-            )
+            results = self._get_fanout().check_serviceability([shipping_partner], [pin_code], weight)
+            result = results[pin_code][shipping_partner.code]
+            if "error" in result:
+                raise ShippingException(result["error"])
+            return result
+        
+        return self.check_serviceability_bulk([pin_code], weight=weight)[pin_code]
+    
+    def check_serviceability_bulk(self, pin_codes: List[str], weight: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Check many pin codes with all active partners at once
+        
+        Carriers are called concurrently and answers are cached per pin code
+        and weight band; see ``apps.shipping.serviceability``.
+        
+        Args:
+            pin_codes: The pin codes to check
+            weight: Optional package weight in kg
             
+        Returns:
+            Dict mapping each pin code to its serviceability information
+        """
+        partners = list(ShippingPartner.objects.filter(is_active=True))
+        partner_results = self._get_fanout().check_serviceability(partners, pin_codes, weight)
+        
+        # Check which pin codes are in our database
+        area_delivery_days = {}
+        for area_pin_code, max_delivery_days in ServiceableArea.objects.filter(
+            pin_code__in=list(partner_results),
+            is_active=True
+        ).values_list('pin_code', 'max_delivery_days'):
+            current = area_delivery_days.get(area_pin_code)
+            area_delivery_days[area_pin_code] = max_delivery_days if current is None else min(current, max_delivery_days)
+        
+        results = {}
+        for pin_code, partner_result in partner_results.items():
             # Determine overall serviceability
-            serviceable = len(serviceable_areas) > 0 or any(r.get("serviceable", False) for r in results.values())
+            serviceable = pin_code in area_delivery_days or any(
+                r.get("serviceable", False) for r in partner_result.values()
+            )
+            delivery_days = area_delivery_days.get(pin_code)
+            if delivery_days is None:
+                partner_days = [
+                    r["delivery_days"] for r in partner_result.values()
+                    if r.get("serviceable") and isinstance(r.get("delivery_days"), (int, float))
+                ]
+                delivery_days = min(partner_days) if partner_days else None
             
-            return {
+            results[pin_code] = {
                 "serviceable": serviceable,
-                "partner_results": results,
-                "delivery_days": min([
-                    area.max_delivery_days for area in serviceable_areas
-                ]) if serviceable_areas else None
+                "partner_results": partner_result,
+                "delivery_days": delivery_days
             }
+        return results
+    
+    def shop_rates(self, package_data: Dict[str, Any], partners: List[ShippingPartner] = None) -> Dict[str, Any]:
+        """
+        Get rate quotes from all active partners concurrently
+        
+        Args:
+            package_data: Package information including weight, source, destination
+            partners: Optional partners to quote with, all active ones by default
+            
+        Returns:
+            Dict with all quotes sorted cheapest first and per-partner results
+        """
+        if partners is None:
+            partners = list(ShippingPartner.objects.filter(is_active=True))
+        partner_results = self._get_fanout().shop_rates(partners, package_data)
+        
+        rates = []
+        for partner in partners:
+            for rate in partner_results.get(partner.code, {}).get("rates", []):
+                if rate.get("rate") is None:
+                    continue
+                rates.append(dict(rate, partner_code=partner.code, partner_name=partner.name))
+        rates.sort(key=lambda rate: float(rate["rate"]))
+        
+        return {
+            "rates": rates,
+            "partner_results": partner_results
+        }
+    
+    def _get_fanout(self):
+        from .serviceability import CarrierFanout
+        return CarrierFanout(self.get_shipping_partner_service)
     
     def create_shipment(self, order, shipping_partner: ShippingPartner, order_data: Dict[str, Any]) -> Shipment:
         """
@@ -870,42 +1120,10 @@ class ShippingService:
         # Get tracking information
         result = service.track_shipment(shipment.tracking_number)
         
-        # Update shipment status
-        if result.get("status") != shipment.status:
-            shipment.status = result.get("status")
-            
-            # Update timestamps based on status
-            if shipment.status == "SHIPPED" and not shipment.shipped_at:
-                shipment.shipped_at = timezone.now()
-            elif shipment.status == "DELIVERED" and not shipment.delivered_at:
-                shipment.delivered_at = timezone.now()
-                
-            shipment.save()
-        
-        # Create tracking entries
-        for track in result.get("tracking_history", []):
-            # Parse timestamp
-            timestamp = parse_datetime(track.get("timestamp"))
-            if not timestamp:
-                timestamp = timezone.now()
-            
-            # Check if this tracking entry already exists
-            existing = ShipmentTracking.objects.filter(
-                shipment=shipment,
-                status=track.get("status"),
-                description=track.get("description"),
-                location=track.get("location")
-            ).exists()
-            
-            if not existing:
-                ShipmentTracking.objects.create(
-                    shipment=shipment,
-                    status=track.get("status"),
-                    description=track.get("description"),
-                    location=track.get("location"),
-                    timestamp=timestamp,
-                    raw_response=track.get("raw_response", {})
-                )
+        # Store new events and the shipment's status the same way the bulk sync does
+        TrackingSyncEngine(self.get_shipping_partner_service).apply(
+            [shipment], {shipment.tracking_number: result}
+        )
         
         return shipment
     
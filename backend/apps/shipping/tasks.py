@@ -0,0 +1,30 @@
+"""
+Celery tasks for shipping.
+"""
+import logging
+
+from celery import shared_task
+from django.core.cache import cache
+
+from .tracking_sync import TrackingSyncEngine, get_tracking_sync_settings
+
+logger = logging.getLogger(__name__)
+
+TRACKING_SYNC_LOCK_KEY = 'shipping_tracking_sync_lock'
+
+
+@shared_task(ignore_result=True)
+def sync_shipment_tracking():
+    """
+    Refresh tracking for every in-flight shipment.
+    
+    Runs are not overlapped; a run that starts while another is still
+    going returns immediately.
+    """
+    if not cache.add(TRACKING_SYNC_LOCK_KEY, 1, get_tracking_sync_settings()['lock_timeout']):
+        logger.info("Tracking sync already running, skipping")
+        return None
+    try:
+        return TrackingSyncEngine().sync()
+    finally:
+        cache.delete(TRACKING_SYNC_LOCK_KEY)
@@ -0,0 +1,177 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import requests
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.shipping.carrier_client import (
+    CarrierClient, CarrierTokenCache, _publish_carrier_metrics, get_carrier_metrics, request_deadline
+)
+from apps.shipping.models import ShippingPartner
+from apps.shipping.services import ShiprocketService
+from core.metrics_pipeline import MetricSeries
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shipping-carrier-client-tests',
+    }
+}
+
+
+def json_response(payload, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    if status_code >= 400:
+        error = requests.exceptions.HTTPError(f"{status_code} error")
+        error.response = response
+        response.raise_for_status.side_effect = error
+    return response
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Fails with 503 until the server's failure budget is spent"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.calls += 1
+        status_code = 503 if self.server.failures_left > 0 else 200
+        self.server.failures_left -= 1
+        self.send_response(status_code)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_POST = do_GET
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    SHIPPING_CARRIER_CLIENT={'RETRIES': 2, 'BACKOFF_FACTOR': 0}
+)
+class CarrierClientTest(TestCase):
+    """Tests for the pooled, retrying carrier client"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+        self.server.calls = 0
+        self.server.failures_left = 1
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/track"
+        self.client = CarrierClient("STUB")
+
+    def test_idempotent_request_is_retried(self):
+        """Test that a GET answered with 503 is retried"""
+        response = self.client.request("GET", self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.calls, 2)
+
+    def test_post_is_not_retried(self):
+        """Test that a POST is never sent twice"""
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.request("POST", self.url)
+        self.assertEqual(self.server.calls, 1)
+
+    def test_deadline_limits_retries(self):
+        """Test that requests under a deadline retry once and never start after it"""
+        self.server.failures_left = 5
+        with request_deadline(5):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.client.request("GET", self.url)
+        self.assertEqual(self.server.calls, 2)
+
+        with request_deadline(0):
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.client.request("GET", self.url)
+        self.assertEqual(self.server.calls, 2)
+
+    def test_metrics_are_recorded(self):
+        """Test that failures are counted in the carrier's metrics"""
+        with patch('apps.shipping.carrier_client.record_value') as record:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.client.request("POST", self.url)
+        sink, carrier, latency_ms, counters = record.call_args[0]
+        self.assertEqual(carrier, "STUB")
+        self.assertEqual(counters, {'errors': 1})
+
+    def test_metrics_are_published(self):
+        """Test that aggregated series are readable per carrier"""
+        series = MetricSeries("STUB")
+        series.add(40, {'errors': 1})
+        series.add(60)
+        _publish_carrier_metrics([series])
+
+        metrics = get_carrier_metrics(["STUB", "OTHER"])
+        self.assertEqual(metrics["STUB"]["requests"], 2)
+        self.assertEqual(metrics["STUB"]["error_rate"], 0.5)
+        self.assertIsNone(metrics["OTHER"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CarrierTokenCacheTest(TestCase):
+    """Tests for sharing carrier auth tokens"""
+
+    def setUp(self):
+        cache.clear()
+        self.partner = ShippingPartner.objects.create(
+            name="Shiprocket",
+            code="SHIPROCKET",
+            partner_type="SHIPROCKET",
+            api_key="key",
+            api_secret="token-cache-secret",
+            base_url="https://api.shiprocket.test",
+            configuration={"email": "ops@example.com"}
+        )
+        patcher = patch('apps.shipping.services.get_token_cache', return_value=CarrierTokenCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('requests.Session.request')
+    def test_token_is_shared_between_instances(self, mock_request):
+        """Test that new service instances reuse the cached login"""
+        mock_request.return_value = json_response({"token": "shared"})
+
+        self.assertEqual(ShiprocketService(self.partner)._get_auth_token(), "shared")
+        self.assertEqual(ShiprocketService(self.partner)._get_auth_token(), "shared")
+        mock_request.assert_called_once()
+
+    def test_token_is_shared_between_processes(self):
+        """Test that a token stored by another process is used without logging in"""
+        fetch = MagicMock(return_value=("first", 60))
+        CarrierTokenCache().get("carrier_token:X", fetch)
+
+        other_process = CarrierTokenCache()
+        self.assertEqual(other_process.get("carrier_token:X", MagicMock()), "first")
+        fetch.assert_called_once()
+
+    def test_waits_for_refresh_in_progress(self):
+        """Test that a worker that loses the refresh lock waits instead of logging in"""
+        tokens = CarrierTokenCache()
+        cache.add("carrier_token:X:lock", 1, 15)
+        fetch = MagicMock(return_value=("mine", 60))
+        threading.Timer(0.1, lambda: cache.set("carrier_token:X", ("theirs", 2 ** 40), 60)).start()
+
+        self.assertEqual(tokens.get("carrier_token:X", fetch), "theirs")
+        fetch.assert_not_called()
+
+    @patch('requests.Session.request')
+    def test_rejected_token_triggers_one_login(self, mock_request):
+        """Test that a 401 drops the cached token and retries once with a new one"""
+        mock_request.side_effect = [
+            json_response({"token": "stale"}),
+            json_response({}, status_code=401),
+            json_response({"token": "fresh"}),
+            json_response({"data": {"available_courier_companies": [{"courier_name": "Air"}]}}),
+        ]
+
+        result = ShiprocketService(self.partner).check_serviceability("110001")
+
+        self.assertTrue(result["serviceable"])
+        retried_headers = mock_request.call_args_list[3][1]["headers"]
+        self.assertEqual(retried_headers["Authorization"], "Bearer fresh")
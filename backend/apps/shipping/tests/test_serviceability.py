@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase, override_settings
+
+from apps.shipping.models import ShippingPartner, ServiceableArea
+from apps.shipping.serviceability import band_weight
+from apps.shipping.services import ShippingService
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shipping-serviceability-tests',
+    }
+}
+
+
+class StubCarrierHandler(BaseHTTPRequestHandler):
+    """Answers like Shiprocket or Delhivery after the server's configured delay"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == '/courier/serviceability':
+            self._reply({'data': {
+                'available_courier_companies': [
+                    {'courier_name': 'Stub Air', 'courier_company_id': 1, 'rate': 80.0,
+                     'estimated_delivery_days': 2, 'is_cod_available': 1},
+                ],
+                'delivery_days': 2,
+            }})
+        elif url.path == '/c/api/pin-codes/json/':
+            codes = params['filter_codes'][0].split(',')
+            self._reply({'delivery_codes': [
+                {'postal_code': {'pin': int(code), 'pre_paid': 'Y', 'cod': 'Y'}}
+                for code in codes if code.startswith('1')
+            ]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        self.server.requests.append(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        if self.path == '/auth/login':
+            self._reply({'token': 'stub-token'})
+            return
+        time.sleep(self.server.delay)
+        if self.path.startswith('/api/kinko/v1/invoice/charges/'):
+            self._reply({'success': True, 'total_amount': 65.0, 'expected_delivery_days': 4})
+        else:
+            self.send_error(404)
+
+
+def start_stub_carrier(delay):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubCarrierHandler)
+    server.delay = delay
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CarrierFanoutTest(TestCase):
+    """Tests for concurrent carrier checks against local stub carrier servers"""
+
+    DELAY = 0.4
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+        self.shiprocket_server = start_stub_carrier(self.DELAY)
+        self.delhivery_server = start_stub_carrier(self.DELAY)
+        self.addCleanup(self.shiprocket_server.shutdown)
+        self.addCleanup(self.delhivery_server.shutdown)
+
+        self.shiprocket = ShippingPartner.objects.create(
+            name="Shiprocket",
+            code="SHIPROCKET",
+            partner_type="SHIPROCKET",
+            api_key="key",
+            api_secret="secret",
+            base_url=f"http://127.0.0.1:{self.shiprocket_server.server_port}",
+            configuration={"email": "ops@example.com", "pickup_postcode": "400001"}
+        )
+        self.delhivery = ShippingPartner.objects.create(
+            name="Delhivery",
+            code="DELHIVERY",
+            partner_type="DELHIVERY",
+            api_key="key",
+            base_url=f"http://127.0.0.1:{self.delhivery_server.server_port}",
+            configuration={"pickup_postcode": "400001"}
+        )
+        self.service = ShippingService()
+
+    def test_carriers_are_called_concurrently(self):
+        """Test that a check takes about one carrier's latency, not the sum"""
+        started = time.monotonic()
+        result = self.service.check_serviceability("110001")
+        elapsed = time.monotonic() - started
+
+        self.assertTrue(result["serviceable"])
+        self.assertTrue(result["partner_results"]["SHIPROCKET"]["serviceable"])
+        self.assertTrue(result["partner_results"]["DELHIVERY"]["serviceable"])
+        self.assertEqual(result["delivery_days"], 2)
+        self.assertLess(elapsed, self.DELAY * 2)
+
+    def test_results_are_cached_per_weight_band(self):
+        """Test that weights in the same band reuse the cached answer"""
+        self.service.check_serviceability("110001", weight=1.2)
+        calls = len(self.shiprocket_server.requests)
+
+        self.service.check_serviceability("110001", weight=1.9)
+        self.assertEqual(len(self.shiprocket_server.requests), calls)
+
+        self.service.check_serviceability("110001", weight=3)
+        self.assertGreater(len(self.shiprocket_server.requests), calls)
+
+    def test_bulk_check_batches_delhivery(self):
+        """Test that many pin codes go to Delhivery in one request"""
+        ServiceableArea.objects.create(
+            shipping_partner=self.delhivery, pin_code="200002", city="X", state="Y", max_delivery_days=5
+        )
+        results = self.service.check_serviceability_bulk(["110001", "120001", "200002"])
+
+        delhivery_calls = [path for path in self.delhivery_server.requests if 'pin-codes' in path]
+        self.assertEqual(len(delhivery_calls), 1)
+        self.assertTrue(results["120001"]["partner_results"]["DELHIVERY"]["serviceable"])
+        self.assertFalse(results["200002"]["partner_results"]["DELHIVERY"]["serviceable"])
+        # Known to our own serviceable areas even though the carrier declined it
+        self.assertTrue(results["200002"]["serviceable"])
+        self.assertEqual(results["200002"]["delivery_days"], 5)
+
+    def test_slow_carrier_times_out_without_blocking_others(self):
+        """Test that a carrier past its timeout is reported as an error"""
+        self.delhivery.configuration["timeout"] = [1, 0.1]
+        self.delhivery.save()
+
+        result = self.service.check_serviceability("110001")
+
+        self.assertTrue(result["serviceable"])
+        self.assertIn("error", result["partner_results"]["DELHIVERY"])
+
+        # Failures are not cached
+        self.delhivery_server.delay = 0
+        result = self.service.check_serviceability("110001")
+        self.assertNotIn("error", result["partner_results"]["DELHIVERY"])
+
+    def test_shop_rates_sorted_cheapest_first(self):
+        """Test that quotes from all carriers come back cheapest first"""
+        result = self.service.shop_rates({
+            "source_pin_code": "400001",
+            "destination_pin_code": "110001",
+            "weight": 0.7,
+        })
+
+        self.assertEqual([rate["partner_code"] for rate in result["rates"]], ["DELHIVERY", "SHIPROCKET"])
+        self.assertEqual(result["rates"][0]["rate"], 65.0)
+
+    def test_band_weight(self):
+        """Test rounding weights up to their band"""
+        self.assertEqual(band_weight(0.2), 0.5)
+        self.assertEqual(band_weight(1), 1.0)
+        self.assertEqual(band_weight(1.01), 2.0)
+        self.assertEqual(band_weight(61.3), 62.0)
+        self.assertIsNone(band_weight(None))
@@ -226,7 +226,7 @@ class ShiprocketServiceTest(TestCase):
         
         self.service = ShiprocketService(self.shipping_partner)
     
-    @patch('requests.post')
+    @patch('requests.Session.request')
     def test_get_auth_token(self, mock_post):
         """Test getting authentication token"""
         # Mock response
@@ -246,7 +246,7 @@ class ShiprocketServiceTest(TestCase):
         # Should still be called only once (cached)
         mock_post.assert_called_once()
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_check_serviceability(self, mock_get):
         """Test checking serviceability"""
         # Mock response
@@ -272,7 +272,7 @@ class ShiprocketServiceTest(TestCase):
         self.assertEqual(result["delivery_days"], 3)
         mock_get.assert_called_once()
     
-    @patch('requests.post')
+    @patch('requests.Session.request')
     def test_create_order(self, mock_post):
         """Test creating an order"""
         # Mock response
@@ -359,7 +359,7 @@ class DelhiveryServiceTest(TestCase):
         
         self.service = DelhiveryService(self.shipping_partner)
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_check_serviceability(self, mock_get):
         """Test checking serviceability"""
         # Mock response
@@ -380,7 +380,7 @@ class DelhiveryServiceTest(TestCase):
         self.assertTrue(result["serviceable"])
         mock_get.assert_called_once()
     
-    @patch('requests.post')
+    @patch('requests.Session.request')
     def test_create_order(self, mock_post):
         """Test creating an order"""
         # Mock response
@@ -438,7 +438,7 @@ class DelhiveryServiceTest(TestCase):
         expected_url = f"{self.shipping_partner.base_url}/api/p/printwaybill/?wbns=TRACK123&token={self.shipping_partner.api_key}"
         self.assertEqual(label_url, expected_url)
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_track_shipment(self, mock_get):
         """Test tracking a shipment"""
         # Mock response
@@ -0,0 +1,183 @@
+import json
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.orders.models import Order
+from apps.shipping.models import ShippingPartner, Shipment, ShipmentTracking
+from apps.shipping.services import ShiprocketService
+from apps.shipping.tracking_sync import TRACKING_SYNC_STATS_KEY, TrackingSyncEngine, get_tracking_sync_stats
+
+User = get_user_model()
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shipping-tracking-sync-tests',
+    }
+}
+
+
+class StubDelhiveryHandler(BaseHTTPRequestHandler):
+    """Answers Delhivery's multi-waybill tracking; waybills starting with X are unknown"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        waybills = parse_qs(url.query)['waybill'][0].split(',')
+        self.server.requests.append(waybills)
+        body = json.dumps({'ShipmentData': [
+            {'Shipment': {
+                'AWB': waybill,
+                'Status': {'Status': 'In Transit'},
+                'Scans': [
+                    {'ScanDetail': {'Scan': 'Pickup Complete', 'Instructions': 'Picked up',
+                                    'ScannedLocation': 'Warehouse', 'ScanDateTime': '2025-07-20T10:00:00'}},
+                    {'ScanDetail': {'Scan': 'In Transit', 'Instructions': 'In transit',
+                                    'ScannedLocation': 'Hub', 'ScanDateTime': '2025-07-21T10:00:00'}},
+                ],
+            }}
+            for waybill in waybills if not waybill.startswith('X')
+        ]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TrackingSyncEngineTest(TestCase):
+    """Tests for the bulk tracking sync against a stub carrier"""
+
+    def setUp(self):
+        cache.clear()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubDelhiveryHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.shutdown)
+
+        self.partner = ShippingPartner.objects.create(
+            name="Delhivery",
+            code="DELHIVERY",
+            partner_type="DELHIVERY",
+            api_key="key",
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+        )
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='testpass123')
+        order = Order.objects.create(customer=user, order_number='ORD-TRACK-1', total_amount=Decimal('10.00'))
+        self.shipments = [
+            Shipment.objects.create(
+                order=order,
+                shipping_partner=self.partner,
+                tracking_number=f"AWB{index:04d}",
+                status="PROCESSING",
+                shipping_address={"name": "Test Customer"}
+            )
+            for index in range(120)
+        ]
+
+    def carrier_events(self):
+        return ShipmentTracking.objects.filter(event_key__isnull=False)
+
+    def test_shipments_are_tracked_in_batches(self):
+        """Test that waybills go to the carrier 50 at a time"""
+        report = TrackingSyncEngine().sync()
+
+        self.assertEqual(sorted(len(batch) for batch in self.server.requests), [20, 50, 50])
+        self.assertEqual(report["shipments"], 120)
+        self.assertEqual(report["carrier_requests"], 3)
+        self.assertEqual(self.carrier_events().count(), 240)
+        self.assertEqual(Shipment.objects.filter(status="IN_TRANSIT").count(), 120)
+
+    def test_repeated_sync_stores_no_duplicates(self):
+        """Test that events already stored are skipped on the next run"""
+        TrackingSyncEngine().sync()
+        report = TrackingSyncEngine().sync()
+
+        self.assertEqual(report["events_created"], 0)
+        self.assertEqual(self.carrier_events().count(), 240)
+
+    def test_unknown_waybills_are_failures(self):
+        """Test that a waybill the carrier does not know does not block the rest"""
+        Shipment.objects.filter(pk=self.shipments[0].pk).update(tracking_number="XMISSING")
+
+        report = TrackingSyncEngine().sync()
+
+        self.assertEqual(report["failures"], 1)
+        self.assertEqual(report["shipments"], 119)
+        self.assertFalse(self.carrier_events().filter(shipment=self.shipments[0]).exists())
+
+    def test_final_shipments_are_skipped(self):
+        """Test that delivered shipments are not tracked again"""
+        Shipment.objects.exclude(pk=self.shipments[0].pk).update(status="DELIVERED")
+
+        report = TrackingSyncEngine().sync()
+
+        self.assertEqual(report["shipments"], 1)
+        self.assertEqual(self.server.requests, [["AWB0000"]])
+
+    def test_report_is_published(self):
+        """Test that throughput and lag are reported and kept for monitoring"""
+        cache.set(TRACKING_SYNC_STATS_KEY, {'started_at': '2025-07-21T00:00:00+00:00'})
+
+        report = TrackingSyncEngine().sync()
+
+        self.assertGreater(report["shipments_per_second"], 0)
+        # Only the scans since the previous run count towards lag
+        self.assertEqual(report["lag_events"], 120)
+        self.assertGreater(report["lag_p95_seconds"], 0)
+        self.assertEqual(get_tracking_sync_stats(), report)
+
+    def test_backfilled_history_is_not_lag(self):
+        """Test that a first run does not report old carrier scans as ingest lag"""
+        report = TrackingSyncEngine().sync()
+
+        self.assertEqual(report["events_created"], 240)
+        self.assertEqual(report["lag_events"], 0)
+        self.assertIsNone(report["lag_p95_seconds"])
+
+
+class ShiprocketBulkTrackingTest(TestCase):
+    """Tests for Shiprocket's multi-AWB tracking"""
+
+    def setUp(self):
+        self.partner = ShippingPartner.objects.create(
+            name="Shiprocket",
+            code="SHIPROCKET",
+            partner_type="SHIPROCKET",
+            api_key="key",
+            api_secret="secret",
+            base_url="https://api.shiprocket.test",
+            configuration={"email": "ops@example.com"}
+        )
+
+    @patch('requests.Session.request')
+    def test_track_shipments_bulk(self, mock_request):
+        """Test that all AWBs are sent in one request and answered per AWB"""
+        response = MagicMock()
+        response.json.return_value = [{
+            "AWB1": {"tracking_data": {
+                "current_status": "Delivered",
+                "shipment_track": [{"status": "Delivered", "location": "Pune", "date": "2025-07-22 10:00:00"}],
+            }},
+            "AWB2": {"tracking_data": {}},
+        }]
+        mock_request.return_value = response
+
+        service = ShiprocketService(self.partner)
+        with patch.object(ShiprocketService, '_get_auth_token', return_value="token"):
+            results = service.track_shipments_bulk(["AWB1", "AWB2"])
+
+        self.assertEqual(mock_request.call_args[1]["json"], {"awbs": ["AWB1", "AWB2"]})
+        self.assertEqual(results["AWB1"]["status"], "DELIVERED")
+        self.assertEqual(len(results["AWB1"]["tracking_history"]), 1)
+        self.assertIn("error", results["AWB2"])
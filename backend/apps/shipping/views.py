@@ -26,9 +26,12 @@ from .serializers import (
     DeliverySlotAvailabilitySerializer,
     TrackingWebhookSerializer,
     BulkShipmentUpdateSerializer,
-    ShipmentAnalyticsSerializer
+    ShipmentAnalyticsSerializer,
+    BulkServiceabilitySerializer,
+    RateShoppingSerializer
 )
-from .services import ShippingPartnerService, ShiprocketService, ShippingException
+from .carrier_client import get_carrier_metrics
+from .services import ShippingPartnerService, ShiprocketService, ShippingService, ShippingException
 
 logger = logging.getLogger(__name__)
 
@@ -47,8 +50,8 @@ class ShippingPartnerViewSet(viewsets.ModelViewSet):
         try:
             if shipping_partner.partner_type == 'SHIPROCKET':
                 service = ShiprocketService(shipping_partner)
-                # Test authentication
-                service._authenticate()
+                # Test authentication with a fresh login rather than a cached token
+                service._login()
                 return Response({'status': 'success', 'message': 'Connection successful'})
             else:
                 return Response(
@@ -60,6 +63,12 @@ class ShippingPartnerViewSet(viewsets.ModelViewSet):
                 {'status': 'error', 'message': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+    
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        """Latency and error metrics of each partner's API over the last flush interval"""
+        codes = list(ShippingPartner.objects.values_list('code', flat=True))
+        return Response(get_carrier_metrics(codes))
 
 
 class ServiceableAreaViewSet(viewsets.ModelViewSet):
@@ -97,6 +106,20 @@ class ServiceableAreaViewSet(viewsets.ModelViewSet):
             'serviceable': True,
             'areas': serializer.data
         })
+    
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    def check_serviceability_bulk(self, request):
+        """Check many pin codes with all active shipping partners at once"""
+        serializer = BulkServiceabilitySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        weight = serializer.validated_data.get('weight')
+        results = ShippingService().check_serviceability_bulk(
+            serializer.validated_data['pin_codes'],
+            weight=float(weight) if weight is not None else None
+        )
+        return Response({'results': results})
 
 
 class DeliverySlotViewSet(viewsets.ModelViewSet):
@@ -524,6 +547,25 @@ class ShippingRateViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    def shop(self, request):
+        """Get live rate quotes from all active shipping partners, cheapest first"""
+        serializer = RateShoppingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        package_data = {
+            key: float(value) if key in ('weight', 'length', 'breadth', 'height') else value
+            for key, value in serializer.validated_data.items()
+        }
+        result = ShippingService().shop_rates(package_data)
+        errors = {
+            code: partner_result['error']
+            for code, partner_result in result['partner_results'].items()
+            if partner_result.get('error')
+        }
+        return Response({'rates': result['rates'], 'errors': errors})
+    
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def calculate(self, request):
         """Calculate shipping rate for a package"""
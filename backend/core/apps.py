@@ -29,6 +29,8 @@ class CoreConfig(AppConfig):
         # Initialize connection pool monitoring if enabled
         if getattr(settings, 'CONNECTION_MONITORING_ENABLED', False):
             self._start_connection_monitoring()
+        
+        self._connect_task_signals()
     
     def _start_replica_monitoring(self):
         """Start replica health monitoring"""
@@ -39,6 +41,14 @@ class CoreConfig(AppConfig):
         except Exception as e:
             logger.error(f"Failed to start replica monitoring: {e}")
     
+    def _connect_task_signals(self):
+        """Keep read-your-writes pins from leaking between Celery tasks"""
+        from celery.signals import task_postrun, task_prerun
+        from .database_router import clear_primary_pin
+        
+        task_prerun.connect(clear_primary_pin, dispatch_uid='core.clear_primary_pin.prerun', weak=False)
+        task_postrun.connect(clear_primary_pin, dispatch_uid='core.clear_primary_pin.postrun', weak=False)
+    
     def _start_connection_monitoring(self):
         """Start connection pool monitoring"""
         try:
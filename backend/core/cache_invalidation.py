@@ -0,0 +1,140 @@
+"""
+Cache invalidation without blocking Redis.
+
+Two tools shared by the cache managers:
+
+``scan_delete`` removes keys matching a pattern by walking the keyspace
+with ``SCAN`` and unlinking each batch in one pipeline. Unlike ``KEYS``
+it never holds the server for the whole keyspace, and ``UNLINK`` frees
+memory in a background thread.
+
+``TagVersions`` implements tag-based invalidation on any Django cache
+backend. Every tag has a version stored in the cache; a tagged value is
+stored together with the versions of its tags when it was written, and is
+treated as a miss once any of those tags has moved on. Invalidating a tag
+is a single write, however many keys carry it. Versions are time-based so
+a tag whose version key was evicted cannot resurrect old entries.
+"""
+import logging
+import time
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+SCAN_BATCH_SIZE = 1000
+
+
+def scan_delete(client, pattern: str, batch_size: int = SCAN_BATCH_SIZE) -> int:
+    """
+    Unlink every key matching ``pattern`` in batches, returning the count.
+
+    ``client`` is a redis-py client. Falls back to ``DEL`` on servers
+    without ``UNLINK``.
+    """
+    deleted = 0
+    batch = []
+    use_unlink = True
+    for key in client.scan_iter(match=pattern, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            removed, use_unlink = _unlink_batch(client, batch, use_unlink)
+            deleted += removed
+            batch = []
+    if batch:
+        removed, _ = _unlink_batch(client, batch, use_unlink)
+        deleted += removed
+    return deleted
+
+
+def unlink_keys(client, keys: Iterable, batch_size: int = SCAN_BATCH_SIZE) -> int:
+    """Unlink the given keys in pipelined batches, returning the count."""
+    keys = list(keys)
+    deleted = 0
+    use_unlink = True
+    for start in range(0, len(keys), batch_size):
+        removed, use_unlink = _unlink_batch(client, keys[start:start + batch_size], use_unlink)
+        deleted += removed
+    return deleted
+
+
+def _unlink_batch(client, keys: List, use_unlink: bool):
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        if use_unlink:
+            pipe.unlink(key)
+        else:
+            pipe.delete(key)
+    try:
+        return sum(int(result or 0) for result in pipe.execute()), use_unlink
+    except Exception as e:
+        if not use_unlink:
+            raise
+        # Redis before 4.0 has no UNLINK
+        logger.debug(f"UNLINK failed, retrying with DEL: {e}")
+        return _unlink_batch(client, keys, False)
+
+
+class TaggedValue:
+    """A cached value together with the versions of its tags at write time."""
+
+    __slots__ = ('value', 'tags')
+
+    def __init__(self, value, tags: Dict[str, int]):
+        self.value = value
+        self.tags = tags
+
+    def __getstate__(self):
+        return (self.value, self.tags)
+
+    def __setstate__(self, state):
+        self.value, self.tags = state
+
+
+class TagVersions:
+    """
+    Versions of invalidation tags kept in a Django cache backend.
+    """
+
+    def __init__(self, cache_backend, prefix: str = 'cache_tag'):
+        self.cache = cache_backend
+        self.prefix = prefix
+
+    def _key(self, tag: str) -> str:
+        return f"{self.prefix}:{tag}"
+
+    def current(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Return the current version of each tag, creating missing ones."""
+        tags = list(dict.fromkeys(tags))
+        if not tags:
+            return {}
+        keys = {self._key(tag): tag for tag in tags}
+        found = self.cache.get_many(list(keys))
+        versions = {keys[key]: value for key, value in found.items()}
+        missing = [tag for tag in tags if tag not in versions]
+        if missing:
+            new_version = time.time_ns()
+            for tag in missing:
+                # Another process may have created it first; keep whichever won
+                if not self.cache.add(self._key(tag), new_version, None):
+                    versions[tag] = self.cache.get(self._key(tag), new_version)
+                else:
+                    versions[tag] = new_version
+        return versions
+
+    def invalidate(self, tags: Iterable[str]):
+        """Move the given tags to a new version."""
+        tags = list(dict.fromkeys(tags))
+        if tags:
+            new_version = time.time_ns()
+            self.cache.set_many({self._key(tag): new_version for tag in tags}, None)
+
+    def wrap(self, value, tags: Iterable[str]) -> TaggedValue:
+        return TaggedValue(value, self.current(tags))
+
+    def unwrap(self, stored, default=None):
+        """Return the stored value, or ``default`` if any of its tags moved on."""
+        if not isinstance(stored, TaggedValue):
+            return stored
+        if stored.tags and self.current(stored.tags) != stored.tags:
+            return default
+        return stored.value
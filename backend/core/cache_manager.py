@@ -26,6 +26,8 @@ from django.utils import timezone
 from django.core.serializers import serialize
 from django.core.serializers.json import DjangoJSONEncoder
 
+from .cache_invalidation import TagVersions, scan_delete
+
 logger = logging.getLogger(__name__)
 
 
@@ -187,7 +189,7 @@ class SmartCacheManager:
             default_timeout=600,  # 10 minutes
             max_entries=2000,
             compression_enabled=True,
-            invalidation_strategy='ttl'
+            invalidation_strategy='signal'  # Product changes invalidate the tag
         ))
         
         # API response caching
@@ -213,9 +215,22 @@ class SmartCacheManager:
         
         return caches[strategy.cache_backend]
     
+    def get_tag_versions(self, strategy_name: str) -> TagVersions:
+        """Get tag versions stored in the strategy's cache backend"""
+        return TagVersions(self.get_cache_backend(strategy_name))
+    
+    def _tags_for(self, strategy_name: str, tags: Optional[List[str]]) -> List[str]:
+        """Signal-invalidated strategies tag every entry with the strategy name"""
+        tags = list(tags or [])
+        strategy = self.strategies.get(strategy_name)
+        if strategy and strategy.invalidation_strategy == 'signal':
+            tags.append(strategy_name)
+        return tags
+    
     def set(self, key: str, value: Any, timeout: Optional[int] = None, 
-            strategy_name: str = 'default', compress: bool = None) -> bool:
-        """Set cache value with strategy"""
+            strategy_name: str = 'default', compress: bool = None,
+            tags: Optional[List[str]] = None) -> bool:
+        """Set cache value with strategy, optionally under invalidation tags"""
         try:
             strategy = self.strategies.get(strategy_name)
             cache_backend = self.get_cache_backend(strategy_name)
@@ -233,6 +248,11 @@ class SmartCacheManager:
             if compress or (strategy and strategy.compression_enabled):
                 value = self._compress_value(value)
             
+            # Record the tag versions the value was computed at
+            tags = self._tags_for(strategy_name, tags)
+            if tags:
+                value = self.get_tag_versions(strategy_name).wrap(value, tags)
+            
             # Set cache value
             success = cache_backend.set(key, value, timeout)
             
@@ -252,6 +272,8 @@ class SmartCacheManager:
         try:
             cache_backend = self.get_cache_backend(strategy_name)
             value = cache_backend.get(key, default)
+            if value is not default:
+                value = self.get_tag_versions(strategy_name).unwrap(value, default)
             
             # Track metrics
             hit = value is not default
@@ -315,20 +337,35 @@ class SmartCacheManager:
             return False
     
     def invalidate_pattern(self, pattern: str, strategy_name: str = 'default'):
-        """Invalidate cache keys matching pattern"""
+        """
+        Invalidate cache keys matching pattern.
+        
+        Prefer ``invalidate_tags``: pattern deletion has to walk the keyspace.
+        It uses SCAN in batches and never the blocking KEYS command.
+        """
         try:
             cache_backend = self.get_cache_backend(strategy_name)
             
-            # This is a simplified implementation
-            # In production, you'd want to use Redis SCAN or similar
             if hasattr(cache_backend, 'delete_pattern'):
-                cache_backend.delete_pattern(pattern)
+                # django-redis: SCAN with the backend's key prefix and version applied
+                cache_backend.delete_pattern(pattern, itersize=1000)
+            elif hasattr(cache_backend, '_cache') and hasattr(cache_backend._cache, 'get_client'):
+                # Django's built-in Redis backend
+                client = cache_backend._cache.get_client(write=True)
+                scan_delete(client, cache_backend.make_key(pattern))
             else:
                 logger.warning(f"Pattern invalidation not supported for {strategy_name}")
                 
         except Exception as e:
             logger.error(f"Cache pattern invalidation failed: {e}")
     
+    def invalidate_tags(self, tags: List[str], strategy_name: str = 'default'):
+        """Invalidate every entry stored under any of the tags in one write"""
+        try:
+            self.get_tag_versions(strategy_name).invalidate(tags)
+        except Exception as e:
+            logger.error(f"Cache tag invalidation failed for {tags}: {e}")
+    
     @contextmanager
     def cached_result(self, key: str, timeout: Optional[int] = None, 
                      strategy_name: str = 'default'):
@@ -344,6 +381,11 @@ class SmartCacheManager:
         if result is not None:
             self.set(key, result, timeout, strategy_name)
     
+    @staticmethod
+    def model_tag(model_class, pk: Any) -> str:
+        """Tag for entries derived from one model instance"""
+        return f"{model_class._meta.label_lower}:{pk}"
+    
     def cache_model_instance(self, instance: Model, timeout: Optional[int] = None, 
                            strategy_name: str = 'default') -> str:
         """Cache a model instance"""
@@ -364,7 +406,10 @@ class SmartCacheManager:
                 value = value.isoformat()
             serialized_data['fields'][field.name] = value
         
-        self.set(cache_key, serialized_data, timeout, strategy_name)
+        self.set(
+            cache_key, serialized_data, timeout, strategy_name,
+            tags=[self.model_tag(instance.__class__, instance.pk)]
+        )
         return cache_key
     
     def get_cached_model_instance(self, model_class, pk: Any, 
@@ -470,8 +515,8 @@ class SmartCacheManager:
         self.delete(cache_key, 'products')
         
         # Invalidate related caches
-        self.invalidate_pattern(f"products:*", 'products')
-        self.invalidate_pattern(f"search_results:*", 'search_results')
+        self.invalidate_tags(['products', self.model_tag(sender, instance.pk)], 'products')
+        self.invalidate_tags(['search_results'], 'search_results')
     
     def _invalidate_category_cache(self, sender, instance, **kwargs):
         """Invalidate category-related cache"""
@@ -479,8 +524,8 @@ class SmartCacheManager:
         self.delete(cache_key, 'categories')
         
         # Invalidate related caches
-        self.invalidate_pattern(f"categories:*", 'categories')
-        self.invalidate_pattern(f"products:*", 'products')
+        self.invalidate_tags(['categories', self.model_tag(sender, instance.pk)], 'categories')
+        self.invalidate_tags(['products'], 'products')
     
     def _compress_value(self, value: Any) -> bytes:
         """Compress cache value"""
@@ -585,6 +630,11 @@ def invalidate_cache_pattern(pattern: str, strategy_name: str = 'default'):
     cache_manager.invalidate_pattern(pattern, strategy_name)
 
 
+def invalidate_cache_tags(tags: List[str], strategy_name: str = 'default'):
+    """Invalidate cache entries stored under any of the tags"""
+    cache_manager.invalidate_tags(tags, strategy_name)
+
+
 def warm_all_caches():
     """Warm all caches that have warming enabled"""
     for strategy_name, strategy in cache_manager.strategies.items():
@@ -1,15 +1,72 @@
 """
 Database router for read/write splitting and connection optimization
+
+Replica health comes from the snapshot maintained by
+``core.replica_state``; reads are spread over healthy replicas weighted by
+latency and lag. After a write, reads in the same request are pinned to the
+primary for ``REPLICA_STICKY_SECONDS``, and ``ReadYourWritesMiddleware``
+carries the pin over to the client's next requests.
 """
 import logging
 import random
+import time
+from contextvars import ContextVar
 from typing import Optional, List, Dict, Any
 from django.conf import settings
 from django.db import models
-from django.core.cache import cache
+
+from core.replica_state import (
+    get_replica_aliases, get_replica_settings, get_replica_tracker, probe_replica
+)
 
 logger = logging.getLogger(__name__)
 
+# Replicas faster than this are weighted as if they took this long
+MIN_LATENCY_MS = 0.5
+
+# Deadline (wall clock, so it can be carried in a cookie) until which reads use the primary
+_primary_pinned_until: ContextVar[float] = ContextVar('primary_pinned_until', default=0.0)
+
+
+def pin_to_primary(seconds: Optional[float] = None):
+    """Send reads in the current context to the primary for ``seconds``."""
+    if seconds is None:
+        seconds = get_replica_settings()['sticky_seconds']
+    deadline = time.time() + seconds
+    if deadline > _primary_pinned_until.get():
+        _primary_pinned_until.set(deadline)
+
+
+def is_pinned_to_primary() -> bool:
+    """Return whether reads in the current context must use the primary."""
+    return _primary_pinned_until.get() > time.time()
+
+
+def get_primary_pin() -> float:
+    """Return the deadline of the current primary pin (0 when unpinned)."""
+    return _primary_pinned_until.get()
+
+
+def set_primary_pin(deadline: float):
+    """Replace the current primary pin; returns a token for ``reset_primary_pin``."""
+    return _primary_pinned_until.set(deadline)
+
+
+def reset_primary_pin(token):
+    """Restore the primary pin that was active before ``set_primary_pin``."""
+    _primary_pinned_until.reset(token)
+
+
+def clear_primary_pin(**kwargs):
+    """
+    Drop any primary pin in the current context.
+
+    Connected to Celery's ``task_prerun`` and ``task_postrun``: a worker
+    runs its tasks one after another in the same context, so a write in
+    one task would otherwise pin the reads of the tasks after it.
+    """
+    _primary_pinned_until.set(0.0)
+
 
 class DatabaseRouter:
     """
@@ -31,10 +88,7 @@ class DatabaseRouter:
         
     def _get_read_databases(self) -> List[str]:
         """Get list of available read replica databases"""
-        read_dbs = []
-        for db_alias, db_config in settings.DATABASES.items():
-            if db_alias != 'default' and db_config.get('READ_REPLICA', False):
-                read_dbs.append(db_alias)
+        read_dbs = get_replica_aliases()
         
         # If no read replicas configured, fall back to default
         return read_dbs if read_dbs else ['default']
@@ -75,7 +129,9 @@ class DatabaseRouter:
         """
         Suggest the database to write to
         """
-        # All writes go to the primary database
+        # All writes go to the primary database, and later reads follow them
+        if self.read_databases != ['default']:
+            pin_to_primary()
         return self.write_database
     
     def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
@@ -102,6 +158,10 @@ class DatabaseRouter:
         if not self.read_databases or self.read_databases == ['default']:
             return 'default'
         
+        # Reads after a write in this request or session see the primary
+        if is_pinned_to_primary():
+            return self.write_database
+        
         # Get healthy read databases
         healthy_dbs = self._get_healthy_read_databases()
         
@@ -114,32 +174,22 @@ class DatabaseRouter:
     
     def _get_healthy_read_databases(self) -> List[str]:
         """
-        Get list of healthy read databases based on replication lag and connectivity
+        Get list of healthy read databases from the replica state snapshot.
+        
+        The snapshot is kept current by a background thread, so this never
+        touches the database.
         """
+        snapshot = get_replica_tracker().snapshot()
         healthy_dbs = []
         
         for db_alias in self.read_databases:
-            if db_alias == 'default':
-                healthy_dbs.append(db_alias)
+            state = snapshot.get(db_alias)
+            if state is None or not state.healthy:
+                continue
+            if state.lag > self.replica_lag_threshold:
+                logger.debug(f"Database {db_alias} has high replication lag: {state.lag}s")
                 continue
-                
-            # Check database health from cache
-            health_key = f"db_health_{db_alias}"
-            health_status = cache.get(health_key)
-            
-            if health_status is None:
-                # Check database health
-                health_status = self._check_database_health(db_alias)
-                # Cache health status for 30 seconds
-                cache.set(health_key, health_status, 30)
-            
-            if health_status.get('healthy', False):
-                # Check replication lag
-                lag = health_status.get('replication_lag', 0)
-                if lag <= self.replica_lag_threshold:
-                    healthy_dbs.append(db_alias)
-                else:
-                    logger.warning(f"Database {db_alias} has high replication lag: {lag}s")
+            healthy_dbs.append(db_alias)
         
         return healthy_dbs
     
@@ -147,46 +197,25 @@ class DatabaseRouter:
         """
         Check the health of a specific database
         """
-        from django.db import connections
-        from django.db.utils import OperationalError
+        return probe_replica(db_alias)
+    
+    def _replica_weights(self, databases: List[str]) -> List[float]:
+        """
+        Weight replicas by inverse latency, scaled down as lag approaches
+        the threshold. Replicas not probed yet get the mean known latency.
+        """
+        snapshot = get_replica_tracker().snapshot()
+        states = [snapshot.get(db_alias) for db_alias in databases]
+        known = [state.latency_ms for state in states if state and state.latency_ms is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
         
-        try:
-            connection = connections[db_alias]
-            
-            with connection.cursor() as cursor:
-                # Basic connectivity test
-                cursor.execute("SELECT 1")
-                result = cursor.fetchone()
-                
-                if not result or result[0] != 1:
-                    return {'healthy': False, 'error': 'Invalid response to health check'}
-                
-                # Check replication lag (MySQL specific)
-                replication_lag = 0
-                if 'mysql' in connection.settings_dict.get('ENGINE', ''):
-                    try:
-                        cursor.execute("SHOW SLAVE STATUS")
-                        slave_status = cursor.fetchone()
-                        if slave_status:
-                            # Seconds_Behind_Master is typically at index 32
-                            # This may vary based on MySQL version
-                            replication_lag = slave_status[32] if len(slave_status) > 32 else 0
-                            replication_lag = replication_lag or 0
-                    except Exception as e:
-                        logger.debug(f"Could not check replication lag for {db_alias}: {e}")
-                
-                return {
-                    'healthy': True,
-                    'replication_lag': replication_lag,
-                    'response_time': 0  # Could be measured if needed
-                }
-                
-        except OperationalError as e:
-            logger.error(f"Database {db_alias} health check failed: {e}")
-            return {'healthy': False, 'error': str(e)}
-        except Exception as e:
-            logger.error(f"Unexpected error checking {db_alias} health: {e}")
-            return {'healthy': False, 'error': str(e)}
+        weights = []
+        for state in states:
+            latency = state.latency_ms if state and state.latency_ms is not None else default_latency
+            lag = max(state.lag, 0) if state else 0
+            lag_factor = 1.0 - min(lag, self.replica_lag_threshold) / (self.replica_lag_threshold + 1)
+            weights.append(lag_factor / max(latency, MIN_LATENCY_MS))
+        return weights
     
     def _weighted_random_selection(self, databases: List[str]) -> str:
         """
@@ -195,12 +224,7 @@ class DatabaseRouter:
         if len(databases) == 1:
             return databases[0]
         
-        # For now, use simple random selection
-        # In the future, this could be weighted based on:
-        # - Connection pool availability
-        # - Response times
-        # - Current load
-        return random.choice(databases)
+        return random.choices(databases, weights=self._replica_weights(databases))[0]
     
     def _is_analytics_query(self, model, hints: Dict[str, Any]) -> bool:
         """
@@ -239,6 +263,10 @@ class DatabaseRouter:
                 health_status[db_alias] = self._check_database_health(db_alias)
         
         stats['database_health'] = health_status
+        stats['replica_state'] = {
+            db_alias: state.as_dict()
+            for db_alias, state in get_replica_tracker().snapshot().items()
+        }
         return stats
     
     def force_write_database(self, model_class=None, app_label=None):
@@ -0,0 +1,77 @@
+"""
+Management command to benchmark the per-request overhead of rate limiting.
+
+Runs the rate limit middleware around a no-op view for a number of
+simulated clients and reports the added latency per request for the local
+counters, the shared Redis script (when Redis is reachable) and clients
+that are already blocked and rejected from the in-process cache.
+"""
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from core.middleware.rate_limit_middleware import RateLimitMiddleware
+from core.rate_limit import reset_rate_limiter
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request overhead of the API rate limiter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000, help='Requests per scenario')
+        parser.add_argument('--clients', type=int, default=1000, help='Distinct client IPs')
+        parser.add_argument('--skip-redis', action='store_true', help='Only benchmark the local backend')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        requests = []
+        for i in range(options['requests']):
+            client = i % options['clients']
+            ip = f'10.{client >> 16 & 255}.{client >> 8 & 255}.{client & 255}'
+            request = factory.get('/api/v1/products/', REMOTE_ADDR=ip)
+            request.user = AnonymousUser()
+            requests.append(request)
+
+        baseline = self._time(lambda request: HttpResponse('ok'), requests)
+        self._report('no rate limiting', baseline, baseline)
+
+        policy = {'name': 'benchmark', 'path': r'^/api/', 'key': 'ip', 'limit': 10 ** 9, 'window': 60}
+        scenarios = [('local counters', 'local', policy)]
+        if not options['skip_redis']:
+            scenarios.append(('redis script', 'redis', policy))
+        scenarios.append(('blocked clients (local reject)', 'local', dict(policy, limit=1)))
+
+        for label, backend, scenario_policy in scenarios:
+            config = {'ENABLED': True, 'BACKEND': backend, 'POLICIES': [scenario_policy]}
+            with override_settings(API_RATE_LIMITING=config):
+                reset_rate_limiter()
+                middleware = RateLimitMiddleware(lambda request: HttpResponse('ok'))
+                if scenario_policy['limit'] == 1:
+                    # Use up every client's allowance so the timed run only sees rejections
+                    for request in requests[:options['clients']]:
+                        middleware(request)
+                        middleware(request)
+                timings = self._time(middleware, requests)
+            self._report(label, timings, baseline)
+        reset_rate_limiter()
+
+    def _time(self, handler, requests):
+        timings = []
+        for request in requests:
+            started = time.perf_counter()
+            handler(request)
+            timings.append((time.perf_counter() - started) * 1e6)
+        return sorted(timings)
+
+    def _report(self, label, timings, baseline):
+        p99 = timings[max(0, int(len(timings) * 0.99) - 1)]
+        overhead = statistics.mean(timings) - statistics.mean(baseline)
+        self.stdout.write(
+            f'{label:<32} mean={statistics.mean(timings):8.1f}us '
+            f'p50={statistics.median(timings):8.1f}us p99={p99:8.1f}us '
+            f'overhead={overhead:8.1f}us/request'
+        )
@@ -0,0 +1,140 @@
+"""
+Management command to load test the multiplexed realtime gateway.
+
+Opens a number of gateway sockets in one process against an in-memory
+channel layer, subscribes each to the inventory topic and publishes a burst
+of stock changes to the group. Reports how fast sockets connect, the memory
+each one holds, and how long updates take to reach every socket, so batching
+settings can be compared without Redis or a browser in the loop.
+"""
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.realtime import RealtimeGateway
+
+LAYER_ALIAS = 'realtime_benchmark'
+
+
+class BenchmarkGateway(RealtimeGateway):
+    channel_layer_alias = LAYER_ALIAS
+
+
+class Command(BaseCommand):
+    help = 'Load test connections per worker and fan-out latency of the realtime gateway'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000, help='Sockets to open')
+        parser.add_argument('--events', type=int, default=200, help='Stock changes to publish')
+        parser.add_argument(
+            '--products', type=int, default=0,
+            help='Distinct products the changes are spread over (default: one per event, so nothing coalesces)'
+        )
+        parser.add_argument(
+            '--flush-interval', type=float, default=None,
+            help='Override REALTIME_GATEWAY FLUSH_INTERVAL in seconds'
+        )
+
+    def handle(self, *args, **options):
+        config = dict(getattr(settings, 'REALTIME_GATEWAY', {}))
+        if options['flush_interval'] is not None:
+            config['FLUSH_INTERVAL'] = options['flush_interval']
+
+        layer = InMemoryChannelLayer(capacity=options['events'] + 10)
+        previous = channel_layers.set(LAYER_ALIAS, layer)
+        try:
+            with override_settings(REALTIME_GATEWAY=config):
+                asyncio.run(self._run(layer, options))
+        finally:
+            if previous is None:
+                channel_layers.backends.pop(LAYER_ALIAS, None)
+            else:
+                channel_layers.set(LAYER_ALIAS, previous)
+
+    async def _run(self, layer, options):
+        connections = options['connections']
+        events = options['events']
+        products = options['products'] or events
+        # Unsaved staff user: subscribing to inventory needs no database
+        user = get_user_model()(username='loadtest', is_staff=True)
+
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        communicators = []
+        for _ in range(connections):
+            communicator = WebsocketCommunicator(BenchmarkGateway.as_asgi(), '/ws/realtime/')
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError('Gateway refused the connection')
+            await communicator.send_json_to({'action': 'subscribe', 'topic': 'inventory'})
+            await communicator.receive_json_from()
+            communicators.append(communicator)
+        connect_seconds = time.perf_counter() - started
+        memory_per_connection = (tracemalloc.get_traced_memory()[0] - memory_before) / connections
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'connections={connections} connect+subscribe={connect_seconds:.2f}s '
+            f'({connections / connect_seconds:.0f}/s) memory={memory_per_connection / 1024:.1f}KiB/connection'
+        )
+
+        receivers = [asyncio.ensure_future(self._receive(communicator, events)) for communicator in communicators]
+        started = time.perf_counter()
+        for seq in range(events):
+            await layer.group_send('inventory_updates', {
+                'type': 'inventory_update',
+                'update_type': 'stock_change',
+                'product_id': str(seq % products),
+                'data': {'seq': seq, 'sent_at': time.perf_counter()},
+                'timestamp': None,
+            })
+            # Let consumers run between publishes, as separate requests would
+            await asyncio.sleep(0)
+        results = await asyncio.gather(*receivers)
+        fanout_seconds = time.perf_counter() - started
+
+        for communicator in communicators:
+            await communicator.disconnect()
+
+        latencies = sorted(latency for delivered, _ in results for latency in delivered)
+        frames = sum(frame_count for _, frame_count in results)
+        self.stdout.write(
+            f'events={events} products={products} delivered={len(latencies)} frames={frames} '
+            f'events/frame={len(latencies) / max(frames, 1):.1f} total={fanout_seconds:.2f}s '
+            f'({len(latencies) / fanout_seconds:.0f} deliveries/s)'
+        )
+        self.stdout.write(
+            f'fan-out latency p50={self._percentile(latencies, 0.50):.1f}ms '
+            f'p95={self._percentile(latencies, 0.95):.1f}ms '
+            f'p99={self._percentile(latencies, 0.99):.1f}ms max={self._percentile(latencies, 1.0):.1f}ms '
+            f'mean={statistics.mean(latencies or [0]):.1f}ms'
+        )
+
+    async def _receive(self, communicator, events):
+        latencies = []
+        frames = 0
+        while True:
+            frame = await communicator.receive_json_from(timeout=60)
+            if frame.get('type') != 'batch':
+                continue
+            frames += 1
+            received = time.perf_counter()
+            for event in frame['events']:
+                latencies.append((received - event['data']['sent_at']) * 1000)
+                if event['data']['seq'] == events - 1:
+                    return latencies, frames
+
+    def _percentile(self, values, fraction):
+        if not values:
+            return 0.0
+        return values[max(0, int(len(values) * fraction) - 1)]
@@ -0,0 +1,279 @@
+"""
+Buffered, per-process pipeline for request metrics.
+
+Middlewares call ``record(sink, key, payload)`` on the request path, which
+only appends a tuple to a bounded ``collections.deque``; appends are atomic
+in CPython, so recording takes no lock and never starts a thread. One
+daemon flusher thread per process drains the queue on an interval, hands
+each record to its sink and lets the sink write in bulk.
+
+Two kinds of sink are provided:
+
+* ``HistogramSink`` pre-aggregates values per key into ``MetricSeries``
+  (count, sum, min, max, fixed latency buckets and named counters) and
+  writes one row per key per flush.
+* ``BulkCreateSink`` collects model field dicts and writes them with
+  ``bulk_create``.
+
+When the queue is full the oldest records are dropped and counted rather
+than blocking the request. The flusher is started lazily and restarted
+after a fork, so it works under pre-forking servers.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds; the last bucket catches everything above
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def get_metrics_pipeline_settings():
+    """Return the flush interval, queue size and batch size."""
+    config = getattr(settings, 'METRICS_PIPELINE', {})
+    return {
+        'enabled': config.get('ENABLED', True),
+        'flush_interval': config.get('FLUSH_INTERVAL', 10),
+        'max_pending': config.get('MAX_PENDING', 50000),
+        'batch_size': config.get('BATCH_SIZE', 500),
+    }
+
+
+class MetricSeries:
+    """Aggregated values recorded under one key during a flush interval."""
+
+    __slots__ = ('key', 'count', 'total', 'min', 'max', 'buckets', 'counters', 'started_at')
+
+    def __init__(self, key, started_at=None):
+        self.key = key
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.counters = {}
+        self.started_at = time.time() if started_at is None else started_at
+
+    def add(self, value, counters=None):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+        if counters:
+            for name, amount in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Estimate a percentile as the upper bound of the bucket holding it."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(float(LATENCY_BUCKETS_MS[index]), self.max)
+                return self.max
+        return self.max
+
+    def histogram(self):
+        """Return bucket counts keyed by their upper bound."""
+        labels = [str(bound) for bound in LATENCY_BUCKETS_MS] + ['inf']
+        return {label: count for label, count in zip(labels, self.buckets) if count}
+
+
+class MetricsSink:
+    """Base class for sinks; ``add`` and ``flush`` run on the flusher thread."""
+
+    def add(self, key, payload, recorded_at):
+        raise NotImplementedError
+
+    def flush(self):
+        raise NotImplementedError
+
+
+class HistogramSink(MetricsSink):
+    """
+    Sink that aggregates ``(value, counters)`` payloads per key.
+
+    ``writer`` is called with the list of ``MetricSeries`` collected since
+    the last flush.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._series = {}
+
+    def add(self, key, payload, recorded_at):
+        value, counters = payload
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = MetricSeries(key, recorded_at)
+        series.add(value, counters)
+
+    def flush(self):
+        if not self._series:
+            return
+        series, self._series = list(self._series.values()), {}
+        self.writer(series)
+
+
+class BulkCreateSink(MetricsSink):
+    """
+    Sink that writes field dicts as rows of ``model`` with ``bulk_create``.
+
+    ``model`` may be a model class or an ``'app_label.ModelName'`` string,
+    resolved on first flush so middlewares can register sinks at import time.
+    When ``timestamp_field`` is set, rows without it get the time they were
+    recorded rather than the time they were flushed. Conflicting rows are
+    skipped so one bad record does not lose the whole batch.
+    """
+
+    def __init__(self, model, batch_size=None, timestamp_field='timestamp'):
+        self.model = model
+        self.batch_size = batch_size
+        self.timestamp_field = timestamp_field
+        self._rows = []
+
+    def add(self, key, payload, recorded_at):
+        if self.timestamp_field and self.timestamp_field not in payload:
+            payload[self.timestamp_field] = datetime.fromtimestamp(recorded_at, tz=dt_timezone.utc)
+        self._rows.append(payload)
+
+    def flush(self):
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        batch_size = self.batch_size or get_metrics_pipeline_settings()['batch_size']
+        if isinstance(self.model, str):
+            self.model = apps.get_model(self.model)
+        model = self.model
+        model.objects.bulk_create(
+            [model(**fields) for fields in rows], batch_size=batch_size, ignore_conflicts=True
+        )
+
+
+class MetricsPipeline:
+    """
+    Bounded queue of metric records and the thread that flushes them.
+    """
+
+    def __init__(self, flush_interval=None, max_pending=None, autostart=True):
+        config = get_metrics_pipeline_settings()
+        self.flush_interval = flush_interval or config['flush_interval']
+        self.max_pending = max_pending or config['max_pending']
+        self.dropped = 0
+        self._queue = deque(maxlen=self.max_pending)
+        self._sinks = {}
+        self._sinks_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None if autostart else os.getpid()
+
+    def register(self, name, sink):
+        """Register a sink under ``name``; an existing sink is kept."""
+        with self._sinks_lock:
+            return self._sinks.setdefault(name, sink)
+
+    def record(self, sink, key, payload):
+        """Queue one record for ``sink``. Never blocks and never raises."""
+        if len(self._queue) >= self.max_pending:
+            self.dropped += 1
+        self._queue.append((sink, key, payload, time.time()))
+        if self._pid != os.getpid():
+            self._start()
+
+    def record_value(self, sink, key, value, counters=None):
+        """Queue a value (and optional counters) for a ``HistogramSink``."""
+        self.record(sink, key, (value, counters))
+
+    def flush(self):
+        """Drain the queue into the sinks and write them out."""
+        with self._flush_lock:
+            queue = self._queue
+            for _ in range(len(queue)):
+                try:
+                    sink_name, key, payload, recorded_at = queue.popleft()
+                except IndexError:
+                    break
+                sink = self._sinks.get(sink_name)
+                if sink is None:
+                    continue
+                try:
+                    sink.add(key, payload, recorded_at)
+                except Exception as e:
+                    logger.error(f"Metrics sink {sink_name} rejected a record: {e}")
+
+            for sink_name, sink in list(self._sinks.items()):
+                try:
+                    sink.flush()
+                except Exception as e:
+                    logger.error(f"Metrics sink {sink_name} flush failed: {e}")
+
+            if self.dropped:
+                logger.warning(f"Metrics pipeline dropped {self.dropped} records")
+                self.dropped = 0
+
+    def _start(self):
+        with self._sinks_lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's thread does not exist in the child
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='metrics-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            # Flushes run outside any request, so release stale connections
+            close_old_connections()
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_metrics_pipeline():
+    """Return the process-wide metrics pipeline."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = MetricsPipeline()
+                atexit.register(_pipeline.flush)
+    return _pipeline
+
+
+def register_sink(name, sink):
+    """Register a sink with the process-wide pipeline."""
+    return get_metrics_pipeline().register(name, sink)
+
+
+def record_metric(sink, key, payload):
+    """Queue a record unless the pipeline is disabled."""
+    if get_metrics_pipeline_settings()['enabled']:
+        get_metrics_pipeline().record(sink, key, payload)
+
+
+def record_value(sink, key, value, counters=None):
+    """Queue a value for a ``HistogramSink`` unless the pipeline is disabled."""
+    if get_metrics_pipeline_settings()['enabled']:
+        get_metrics_pipeline().record_value(sink, key, value, counters)
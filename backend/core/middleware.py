@@ -3,7 +3,6 @@ Custom middleware for the ecommerce platform.
 """
 import logging
 from django.utils.deprecation import MiddlewareMixin
-from django.http import JsonResponse
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
@@ -154,63 +153,3 @@ class CORSMiddleware(MiddlewareMixin):
             response['Access-Control-Max-Age'] = '86400'
         
         return response
-
-
-class RateLimitMiddleware(MiddlewareMixin):
-    """
-    Simple rate limiting middleware for API endpoints.
-    """
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
-        self.rate_limit_cache = {}
-        super().__init__(get_response)
-    
-    def process_request(self, request):
-        """
-        Check rate limits for API requests.
-        """
-        if not request.path.startswith('/api/'):
-            return None
-        
-        # Skip rate limiting for authenticated admin users
-        if request.user.is_authenticated and request.user.is_staff:
-            return None
-        
-        client_ip = self.get_client_ip(request)
-        rate_limit = getattr(settings, 'API_RATE_LIMIT', 1000)  # requests per hour
-        
-        # Simple in-memory rate limiting (in production, use Redis)
-        import time
-        current_time = int(time.time() / 3600)  # Hour bucket
-        key = f"{client_ip}:{current_time}"
-        
-        if key in self.rate_limit_cache:
-            self.rate_limit_cache[key] += 1
-        else:
-            self.rate_limit_cache[key] = 1
-        
-        if self.rate_limit_cache[key] > rate_limit:
-            return JsonResponse(
-                {
-                    'error': {
-                        'message': 'Rate limit exceeded',
-                        'code': 'rate_limit_exceeded',
-                        'retry_after': 3600
-                    }
-                },
-                status=429
-            )
-        
-        return None
-    
-    def get_client_ip(self, request):
-        """
-        Get client IP address from request.
-        """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
\ No newline at end of file
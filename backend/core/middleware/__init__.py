@@ -2,6 +2,8 @@
 Core middleware package.
 """
 from .api_version_middleware import APIVersionHeaderMiddleware
+from .rate_limit_middleware import RateLimitMiddleware
+from .read_your_writes_middleware import ReadYourWritesMiddleware
 from .correlation_id_middleware import (
     CorrelationIdMiddleware,
     CorrelationIdFilter,
@@ -12,6 +14,8 @@ from .correlation_id_middleware import (
 
 __all__ = [
     'APIVersionHeaderMiddleware',
+    'RateLimitMiddleware',
+    'ReadYourWritesMiddleware',
     'CorrelationIdMiddleware',
     'CorrelationIdFilter',
     'CorrelationIdManager',
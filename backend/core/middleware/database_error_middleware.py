@@ -18,6 +18,7 @@ from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
 from ..database_error_handler import get_error_handler, DatabaseError as DBError
+from ..metrics_pipeline import HistogramSink, record_value, register_sink
 
 logger = logging.getLogger(__name__)
 
@@ -179,6 +180,30 @@ class DatabaseConnectionPoolMiddleware(MiddlewareMixin):
         return None
 
 
+def _publish_db_request_metrics(series_list):
+    """
+    Store each database's request metrics for the last flush interval in the cache
+    """
+    for series in series_list:
+        cache.set(
+            f"db_request_metrics_{series.key}",
+            {
+                'requests': series.count,
+                'query_count': series.counters.get('queries', 0),
+                'avg_queries': series.counters.get('queries', 0) / series.count,
+                'operation_time': series.mean / 1000,
+                'max_operation_time': series.max / 1000,
+                'p95_operation_time': series.percentile(0.95) / 1000,
+                'histogram_ms': series.histogram(),
+                'timestamp': time.time()
+            },
+            300  # 5 minutes
+        )
+
+
+DB_REQUEST_METRICS_SINK = 'database.request_metrics'
+
+
 class DatabaseMetricsMiddleware(MiddlewareMixin):
     """
     Middleware for collecting database operation metrics
@@ -186,6 +211,7 @@ class DatabaseMetricsMiddleware(MiddlewareMixin):
     
     def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
         self.get_response = get_response
+        register_sink(DB_REQUEST_METRICS_SINK, HistogramSink(_publish_db_request_metrics))
         super().__init__(get_response)
     
     def process_request(self, request: HttpRequest):
@@ -220,17 +246,9 @@ class DatabaseMetricsMiddleware(MiddlewareMixin):
                     query_count = current_count - start_count
                     total_queries += query_count
                     
-                    # Store metrics in cache for monitoring
-                    cache.set(
-                        f"db_request_metrics_{db_alias}",
-                        {
-                            'path': request.path,
-                            'method': request.method,
-                            'query_count': query_count,
-                            'operation_time': operation_time,
-                            'timestamp': time.time()
-                        },
-                        300  # 5 minutes
+                    # Aggregated per database and published to the cache by the metrics flusher
+                    record_value(
+                        DB_REQUEST_METRICS_SINK, db_alias, operation_time * 1000, {'queries': query_count}
                     )
                     
                 except Exception as e:
@@ -0,0 +1,47 @@
+"""
+Middleware enforcing the shared API rate limits.
+"""
+from django.http import JsonResponse
+
+from core.rate_limit import get_rate_limit_settings, get_rate_limiter
+
+
+class RateLimitMiddleware:
+    """
+    Middleware that rejects requests over their rate limit with HTTP 429.
+
+    Must run after ``AuthenticationMiddleware`` so per-user policies can see
+    session users; JWT bearer tokens are authenticated by the limiter itself,
+    since DRF only does so inside the view. Allowed requests get ``X-RateLimit-Limit`` and
+    ``X-RateLimit-Remaining`` headers; rejected ones get ``Retry-After``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_rate_limit_settings()['enabled']:
+            return self.get_response(request)
+
+        result = get_rate_limiter().check(request)
+        if not result.allowed:
+            response = JsonResponse(
+                {
+                    'error': {
+                        'message': 'Rate limit exceeded',
+                        'code': 'rate_limit_exceeded',
+                        'retry_after': result.retry_after
+                    }
+                },
+                status=429
+            )
+            response['Retry-After'] = str(result.retry_after)
+            response['X-RateLimit-Limit'] = str(result.limit)
+            response['X-RateLimit-Remaining'] = '0'
+            return response
+
+        response = self.get_response(request)
+        if result.limit:
+            response['X-RateLimit-Limit'] = str(result.limit)
+            response['X-RateLimit-Remaining'] = str(result.remaining)
+        return response
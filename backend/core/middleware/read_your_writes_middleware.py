@@ -0,0 +1,52 @@
+"""
+Middleware keeping a client's reads on the primary shortly after it writes.
+"""
+import time
+
+from core.database_router import get_primary_pin, reset_primary_pin, set_primary_pin
+from core.replica_state import get_replica_settings
+
+PIN_COOKIE_NAME = 'db_primary_until'
+
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware that carries the router's primary pin across requests.
+
+    ``DatabaseRouter`` pins reads to the primary when the request writes.
+    This middleware clears the pin left over on the worker from a previous
+    request, restores the pin recorded in the client's cookie, and sets the
+    cookie when the request wrote, so the client's next requests do not read
+    from a replica that has not caught up yet.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sticky_seconds = get_replica_settings()['sticky_seconds']
+        now = time.time()
+        try:
+            # Never trust a deadline further out than one window
+            pinned_until = min(float(request.COOKIES.get(PIN_COOKIE_NAME, 0)), now + sticky_seconds)
+        except ValueError:
+            pinned_until = 0.0
+        if pinned_until <= now:
+            pinned_until = 0.0
+
+        token = set_primary_pin(pinned_until)
+        try:
+            response = self.get_response(request)
+            new_pin = get_primary_pin()
+        finally:
+            reset_primary_pin(token)
+
+        if new_pin > pinned_until:
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                f"{new_pin:.3f}",
+                max_age=max(int(new_pin - time.time()) + 1, 1),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
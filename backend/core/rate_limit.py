@@ -0,0 +1,372 @@
+"""
+Request rate limiting shared by every worker.
+
+Limits are declared as policies in ``API_RATE_LIMITING['POLICIES']``; each
+policy matches requests by path pattern and method and counts them per
+client IP, per authenticated user, or per user falling back to IP. Every
+policy that matches a request must allow it.
+
+The limiter runs as middleware, before DRF authenticates API requests, so a
+JWT bearer token is validated here to find the user; session users come
+from ``AuthenticationMiddleware``. Client IPs are taken from
+``X-Forwarded-For`` only as far as ``TRUSTED_PROXY_COUNT`` proxies vouch
+for them, counting from the right, so clients cannot pick their own bucket.
+
+Counting uses a sliding window counter: the current and previous
+fixed-window buckets are combined, weighting the previous one by how much
+of it still overlaps the sliding window. All matching policies are checked
+and incremented by one Lua script, so a request costs a single atomic Redis
+round trip and the workers share one limit per client. Bucket keys expire
+after two windows.
+
+Each process also remembers clients that were just rejected and keeps
+rejecting them locally until their retry time, so a hot abuser does not cost
+a Redis call per request. If Redis is unavailable, or the ``local`` backend
+is configured, the same algorithm runs in process with a bounded number of
+keys; limits are then enforced per process only.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.conf import settings
+
+from core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ratelimit'
+
+KEY_IP = 'ip'
+KEY_USER = 'user'
+KEY_USER_OR_IP = 'user_or_ip'
+
+DEFAULT_POLICIES = [
+    {'name': 'api', 'path': r'^/api/', 'key': KEY_USER_OR_IP, 'limit': 1000, 'window': 3600},
+]
+
+# Seconds to stay on the local limiter after a Redis error
+REDIS_RETRY_INTERVAL = 5
+
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local pending = {}
+local remaining = -1
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[2 * i - 1])
+    local window = tonumber(ARGV[2 * i])
+    local bucket = math.floor(now / window)
+    local elapsed = now - bucket * window
+    local current_key = KEYS[i] .. ':' .. bucket
+    local previous = tonumber(redis.call('GET', KEYS[i] .. ':' .. (bucket - 1)) or '0')
+    local current = tonumber(redis.call('GET', current_key) or '0')
+    local weight = (window - elapsed) / window
+    if previous * weight + current + 1 > limit then
+        local retry_after = window - elapsed
+        if current + 1 <= limit and previous > 0 then
+            retry_after = retry_after - (limit - current - 1) * window / previous
+        end
+        return {i, 0, math.ceil(retry_after * 1000)}
+    end
+    local left = math.floor(limit - previous * weight - current - 1)
+    if remaining < 0 or left < remaining then
+        remaining = left
+    end
+    pending[i] = {current_key, window}
+end
+for i = 1, #pending do
+    redis.call('INCR', pending[i][1])
+    redis.call('PEXPIRE', pending[i][1], pending[i][2] * 2000)
+end
+return {0, remaining, 0}
+"""
+
+
+@dataclass
+class RateLimitPolicy:
+    """A request limit for the requests matching a path pattern and methods."""
+    name: str
+    limit: int
+    window: int
+    path: str = r'^/api/'
+    key: str = KEY_USER_OR_IP
+    methods: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.pattern = re.compile(self.path)
+        self.methods = [method.upper() for method in self.methods]
+
+    def matches(self, request):
+        return (
+            (not self.methods or request.method in self.methods) and
+            self.pattern.search(request.path) is not None
+        )
+
+    def identity(self, user, client_ip):
+        """Return the client identity this policy counts by, or None to skip."""
+        if self.key in (KEY_USER, KEY_USER_OR_IP) and user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        if self.key in (KEY_IP, KEY_USER_OR_IP):
+            return f'ip:{client_ip}'
+        return None
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int = 0
+    remaining: int = 0
+    retry_after: int = 0
+    policy: Optional[str] = None
+
+
+def get_client_ip(request, trusted_proxy_count=0):
+    """
+    Get client IP address from request.
+
+    Each trusted proxy appends the address it received the request from to
+    ``X-Forwarded-For``, so the client is the ``trusted_proxy_count``-th
+    entry from the right; anything left of it was supplied by the client.
+    Without trusted proxies, or with fewer entries than proxies, the
+    connection's address is used.
+    """
+    if trusted_proxy_count > 0:
+        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        addresses = [address.strip() for address in x_forwarded_for.split(',') if address.strip()]
+        if len(addresses) >= trusted_proxy_count:
+            return addresses[-trusted_proxy_count]
+    return request.META.get('REMOTE_ADDR')
+
+
+def get_request_user(request):
+    """
+    Return the request's user, authenticating a JWT bearer token if needed.
+
+    Invalid or expired tokens leave the request anonymous; DRF rejects them
+    later. A valid token costs the same user lookup DRF makes.
+    """
+    user = getattr(request, 'user', None)
+    if (user is not None and user.is_authenticated) or not request.META.get('HTTP_AUTHORIZATION'):
+        return user
+
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return user
+    return authenticated[0] if authenticated is not None else user
+
+
+def get_rate_limit_settings():
+    """Return the enabled flag, backend name, policies and local cache sizes."""
+    config = getattr(settings, 'API_RATE_LIMITING', {})
+    return {
+        'enabled': config.get('ENABLED', True),
+        'backend': config.get('BACKEND', 'redis'),
+        'policies': config.get('POLICIES', DEFAULT_POLICIES),
+        'exempt_staff': config.get('EXEMPT_STAFF', True),
+        'trusted_proxy_count': config.get('TRUSTED_PROXY_COUNT', 0),
+        'local_max_keys': config.get('LOCAL_MAX_KEYS', 100000),
+        'blocked_cache_size': config.get('BLOCKED_CACHE_SIZE', 10000),
+    }
+
+
+class LocalSlidingWindow:
+    """
+    In-process sliding window counter with a bounded key count.
+
+    Buckets older than two windows are dropped as they are touched, and the
+    least recently used keys are evicted once ``max_keys`` is reached.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def hit(self, checks, now=None):
+        """
+        Check and count one request against ``[(key, limit, window), ...]``.
+
+        Returns ``(denied_index, remaining, retry_after_ms)`` like the Redis
+        script, with ``denied_index`` 1-based and 0 when allowed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            pending = []
+            remaining = -1
+            for index, (key, limit, window) in enumerate(checks, start=1):
+                bucket = math.floor(now / window)
+                elapsed = now - bucket * window
+                state = self._buckets.get(key)
+                if state is None or state[0] < bucket - 1:
+                    previous, current = 0, 0
+                elif state[0] == bucket - 1:
+                    previous, current = state[1], 0
+                else:
+                    previous, current = state[2], state[1]
+
+                weight = (window - elapsed) / window
+                if previous * weight + current + 1 > limit:
+                    retry_after = window - elapsed
+                    if current + 1 <= limit and previous > 0:
+                        retry_after -= (limit - current - 1) * window / previous
+                    return index, 0, math.ceil(retry_after * 1000)
+
+                left = math.floor(limit - previous * weight - current - 1)
+                remaining = left if remaining < 0 else min(remaining, left)
+                pending.append((key, bucket, current, previous))
+
+            for key, bucket, current, previous in pending:
+                # (bucket, count in bucket, count in the bucket before it)
+                self._buckets[key] = (bucket, current + 1, previous)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0, remaining, 0
+
+
+class BlockedClients:
+    """
+    Bounded in-process record of identities rejected until a given time.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._until = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        until = self._until.get(key)
+        if until is None:
+            return None
+        if until <= now:
+            with self._lock:
+                self._until.pop(key, None)
+            return None
+        return until
+
+    def add(self, key, until):
+        with self._lock:
+            self._until[key] = until
+            self._until.move_to_end(key)
+            while len(self._until) > self.max_size:
+                self._until.popitem(last=False)
+
+
+class RateLimiter:
+    """
+    Evaluates rate limit policies for requests.
+    """
+
+    def __init__(self, policies=None, backend=None, client=None, local_max_keys=None, blocked_cache_size=None):
+        config = get_rate_limit_settings()
+        self.policies = [
+            policy if isinstance(policy, RateLimitPolicy) else RateLimitPolicy(**policy)
+            for policy in (config['policies'] if policies is None else policies)
+        ]
+        self.backend = backend or config['backend']
+        self.exempt_staff = config['exempt_staff']
+        self.trusted_proxy_count = config['trusted_proxy_count']
+        self.local = LocalSlidingWindow(local_max_keys or config['local_max_keys'])
+        self.blocked = BlockedClients(blocked_cache_size or config['blocked_cache_size'])
+        self._client = client
+        self._script = None
+        self._redis_down_until = 0
+
+    @property
+    def client(self):
+        return self._client or get_redis_client()
+
+    def _run_script(self, checks):
+        if self._script is None:
+            self._script = self.client.register_script(SLIDING_WINDOW_SCRIPT)
+        args = []
+        for _, limit, window in checks:
+            args.extend([limit, window])
+        return self._script(keys=[key for key, _, _ in checks], args=args)
+
+    def _count(self, checks):
+        """Count a request in Redis, or locally when Redis is off or failing."""
+        now = time.monotonic()
+        if self.backend == 'redis' and now >= self._redis_down_until:
+            try:
+                return [int(value) for value in self._run_script(checks)]
+            except Exception as e:
+                self._redis_down_until = now + REDIS_RETRY_INTERVAL
+                logger.warning(f"Rate limiter falling back to local counters: {e}")
+        return self.local.hit(checks)
+
+    def check(self, request):
+        """Return the rate limit decision for a request."""
+        policies = [policy for policy in self.policies if policy.matches(request)]
+        if not policies:
+            return RateLimitResult(allowed=True)
+
+        user = get_request_user(request)
+        if self.exempt_staff and user is not None and user.is_authenticated and user.is_staff:
+            return RateLimitResult(allowed=True)
+
+        client_ip = get_client_ip(request, self.trusted_proxy_count)
+        matched = []
+        for policy in policies:
+            identity = policy.identity(user, client_ip)
+            if identity is not None:
+                matched.append((policy, f'{KEY_PREFIX}:{{{policy.name}:{identity}}}'))
+        if not matched:
+            return RateLimitResult(allowed=True)
+
+        now = time.monotonic()
+        for policy, key in matched:
+            until = self.blocked.get(key, now)
+            if until is not None:
+                return RateLimitResult(
+                    allowed=False, limit=policy.limit, retry_after=math.ceil(until - now), policy=policy.name
+                )
+
+        denied, remaining, retry_after_ms = self._count(
+            [(key, policy.limit, policy.window) for policy, key in matched]
+        )
+        if denied:
+            policy, key = matched[denied - 1]
+            self.blocked.add(key, now + retry_after_ms / 1000)
+            return RateLimitResult(
+                allowed=False,
+                limit=policy.limit,
+                retry_after=max(1, math.ceil(retry_after_ms / 1000)),
+                policy=policy.name
+            )
+
+        tightest = min(policy.limit for policy, _ in matched)
+        return RateLimitResult(allowed=True, limit=tightest, remaining=max(remaining, 0))
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide limiter built from settings."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def reset_rate_limiter():
+    """Drop the process-wide limiter so it is rebuilt from settings."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
@@ -0,0 +1,297 @@
+"""
+Multiplexed realtime gateway.
+
+Chat, order tracking, inventory and notification updates each had their
+own consumer and so their own socket. ``RealtimeGateway`` serves all of
+them on one socket per client (``ws/realtime/``). The client subscribes
+to topics and the gateway joins the same channel-layer groups the
+per-feature consumers use, so existing publishers reach both unchanged:
+
+* ``chat:<room_id>`` joins ``chat_<room_id>``, for room participants and staff;
+* ``order:<order_id>`` joins ``order_tracking_<order_id>``, for whoever may
+  track the order;
+* ``inventory`` joins ``inventory_updates``, for staff and sellers;
+* ``notifications`` joins ``notifications_<user id>`` of the connected user.
+
+Client frames are JSON objects with an ``action``::
+
+    {"action": "subscribe", "topic": "order:42"}
+    {"action": "unsubscribe", "topic": "order:42"}
+    {"action": "publish", "topic": "chat:7", "message": "Hello"}
+    {"action": "ping"}
+
+Replies to these (``subscribed``, ``unsubscribed``, ``error``, ``pong``)
+are sent at once. Updates are queued and sent together as
+``{"type": "batch", "events": [{"topic": ..., ...}, ...]}`` every
+``FLUSH_INTERVAL`` seconds, or as soon as ``MAX_BATCH_SIZE`` are waiting.
+While queued, an update replaces an older one with the same coalescing key
+(stock changes and low stock alerts of one product), so a burst of stock
+movements reaches the client as the latest figure only. Chat messages,
+other inventory updates (such as ``products_indexed`` summaries), order
+updates and notifications are never coalesced.
+
+Access to a topic is checked once, on subscribe; publishing to a
+subscribed chat room needs no database lookups, and messages are stored
+in batches by ``apps.chat.persistence``.
+"""
+import asyncio
+import itertools
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+
+TOPIC_KEY_PATTERN = re.compile(r'^[\w-]{1,64}$')
+
+
+def get_realtime_gateway_settings():
+    """Return batching and subscription limits for the realtime gateway."""
+    config = getattr(settings, 'REALTIME_GATEWAY', {})
+    return {
+        'flush_interval': config.get('FLUSH_INTERVAL', 0.1),
+        'max_batch_size': config.get('MAX_BATCH_SIZE', 100),
+        'max_subscriptions': config.get('MAX_SUBSCRIPTIONS', 50),
+        'max_message_length': config.get('MAX_MESSAGE_LENGTH', 4000),
+    }
+
+
+def _can_chat(user, room_id) -> bool:
+    from apps.chat.consumers import user_in_room
+    try:
+        return user_in_room(user, room_id)
+    except ValueError:
+        return False
+
+
+def _can_track_order(user, order_id) -> bool:
+    from apps.orders.consumers import user_can_track_order
+    return user_can_track_order(user, order_id)
+
+
+def _can_view_inventory(user, key) -> bool:
+    from apps.inventory.consumers import user_can_view_inventory
+    return user_can_view_inventory(user)
+
+
+class TopicFamily:
+    """
+    A kind of topic: how its group is named and who may subscribe.
+
+    Keyed families (``chat:<id>``) need a key; the others take none.
+    """
+
+    def __init__(self, name: str, group: Callable[[Any, Optional[str]], str],
+                 authorize: Optional[Callable[[Any, Optional[str]], bool]] = None, keyed: bool = False):
+        self.name = name
+        self.group = group
+        self.authorize = authorize
+        self.keyed = keyed
+
+
+TOPIC_FAMILIES = {
+    family.name: family for family in (
+        TopicFamily('chat', lambda user, key: f'chat_{key}', _can_chat, keyed=True),
+        TopicFamily('order', lambda user, key: f'order_tracking_{key}', _can_track_order, keyed=True),
+        TopicFamily('inventory', lambda user, key: 'inventory_updates', _can_view_inventory),
+        TopicFamily('notifications', lambda user, key: f'notifications_{user.id}'),
+    )
+}
+
+
+def parse_topic(topic: Any) -> Tuple[Optional[TopicFamily], Optional[str]]:
+    """Split ``topic`` into its family and key; the family is ``None`` if unknown."""
+    if not isinstance(topic, str):
+        return None, None
+    name, _, key = topic.partition(':')
+    family = TOPIC_FAMILIES.get(name)
+    if family is None or family.keyed != bool(key) or (key and not TOPIC_KEY_PATTERN.match(key)):
+        return None, None
+    return family, key or None
+
+
+class RealtimeGateway(AsyncJsonWebsocketConsumer):
+    """
+    One socket per client, carrying every topic it subscribes to.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated:
+            await self.close()
+            return
+
+        self.user = user
+        self.config = get_realtime_gateway_settings()
+        self.subscriptions: Dict[str, str] = {}
+        self.outbox: Dict[Any, Dict[str, Any]] = {}
+        self.sequence = itertools.count()
+        self.flush_task = None
+        self.published = False
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if not hasattr(self, 'subscriptions'):
+            return
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        for group in self.subscriptions.values():
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.subscriptions.clear()
+        if self.published:
+            from apps.chat.persistence import get_chat_writer
+            await get_chat_writer().flush()
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action') if isinstance(content, dict) else None
+        if action == 'subscribe':
+            await self.subscribe(content.get('topic'))
+        elif action == 'unsubscribe':
+            await self.unsubscribe(content.get('topic'))
+        elif action == 'publish':
+            await self.publish(content.get('topic'), content)
+        elif action == 'ping':
+            await self.send_json({'type': 'pong'})
+        else:
+            await self.send_error(None, 'unknown_action')
+
+    async def send_error(self, topic, error: str):
+        await self.send_json({'type': 'error', 'topic': topic, 'error': error})
+
+    async def subscribe(self, topic):
+        family, key = parse_topic(topic)
+        if family is None:
+            await self.send_error(topic, 'unknown_topic')
+            return
+        if topic in self.subscriptions:
+            await self.send_json({'type': 'subscribed', 'topic': topic})
+            return
+        if len(self.subscriptions) >= self.config['max_subscriptions']:
+            await self.send_error(topic, 'too_many_subscriptions')
+            return
+        if family.authorize is not None:
+            allowed = await database_sync_to_async(family.authorize)(self.user, key)
+            if not allowed:
+                await self.send_error(topic, 'forbidden')
+                return
+
+        group = family.group(self.user, key)
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.subscriptions[topic] = group
+        await self.send_json({'type': 'subscribed', 'topic': topic})
+
+    async def unsubscribe(self, topic):
+        group = self.subscriptions.pop(topic, None)
+        if group is not None:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.send_json({'type': 'unsubscribed', 'topic': topic})
+
+    async def publish(self, topic, content):
+        family, key = parse_topic(topic)
+        if family is None or family.name != 'chat' or topic not in self.subscriptions:
+            await self.send_error(topic, 'not_subscribed')
+            return
+        message = content.get('message')
+        if not isinstance(message, str) or not message.strip():
+            await self.send_error(topic, 'empty_message')
+            return
+        if len(message) > self.config['max_message_length']:
+            await self.send_error(topic, 'message_too_long')
+            return
+
+        from apps.chat.persistence import get_chat_writer
+        await get_chat_writer().add(key, self.user.id, message)
+        self.published = True
+        await self.channel_layer.group_send(self.subscriptions[topic], {
+            'type': 'chat_message',
+            'room_id': key,
+            'message': message,
+            'user_id': str(self.user.id),
+            'timestamp': content.get('timestamp') or timezone.now().isoformat(),
+        })
+
+    # Batching
+
+    def _topic_for(self, family: str, key) -> Optional[str]:
+        if key is not None:
+            topic = f'{family}:{key}'
+            return topic if topic in self.subscriptions else None
+        if family in self.subscriptions:
+            return family
+        # Events from publishers that do not name their key: only unambiguous
+        # while a single topic of the family is subscribed
+        matches = [topic for topic in self.subscriptions if topic.startswith(f'{family}:')]
+        return matches[0] if len(matches) == 1 else None
+
+    async def enqueue(self, topic: Optional[str], payload: Dict[str, Any], coalesce_key=None):
+        if topic is None:
+            return
+        key = (topic, coalesce_key) if coalesce_key is not None else next(self.sequence)
+        # A newer update replaces the queued one and moves to the end
+        self.outbox.pop(key, None)
+        self.outbox[key] = dict(payload, topic=topic)
+
+        if len(self.outbox) >= self.config['max_batch_size'] or not self.config['flush_interval']:
+            await self.flush()
+        elif self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.config['flush_interval'])
+        await self.flush()
+
+    async def flush(self):
+        if not self.outbox:
+            return
+        events, self.outbox = list(self.outbox.values()), {}
+        await self.send_json({'type': 'batch', 'events': events})
+
+    # Channel layer events, named as the per-feature consumers expect them
+
+    async def chat_message(self, event):
+        await self.enqueue(self._topic_for('chat', event.get('room_id')), {
+            'type': 'chat_message',
+            'message': event['message'],
+            'user_id': event['user_id'],
+            'timestamp': event.get('timestamp'),
+        })
+
+    async def order_update(self, event):
+        await self.enqueue(self._topic_for('order', event.get('order_id')), {
+            'type': 'status_update',
+            'status': event['status'],
+            'message': event['message'],
+            'tracking_data': event.get('tracking_data', {}),
+            'timestamp': event.get('timestamp'),
+        })
+
+    async def inventory_update(self, event):
+        product_id = event.get('product_id')
+        # Only a product's stock figure is superseded by a newer one
+        coalesce = event['update_type'] == 'stock_change' and product_id is not None
+        await self.enqueue(self._topic_for('inventory', None), {
+            'type': event['update_type'],
+            'product_id': product_id,
+            'data': event.get('data', {}),
+            'timestamp': event.get('timestamp'),
+        }, coalesce_key=('stock_change', product_id) if coalesce else None)
+
+    async def low_stock_alert(self, event):
+        await self.enqueue(self._topic_for('inventory', None), {
+            'type': 'low_stock_alert',
+            'product_id': event.get('product_id'),
+            'product_name': event.get('product_name'),
+            'current_stock': event.get('current_stock'),
+            'threshold': event.get('threshold'),
+            'timestamp': event.get('timestamp'),
+        }, coalesce_key=None if event.get('product_id') is None else ('low_stock_alert', event.get('product_id')))
+
+    async def notification_message(self, event):
+        await self.enqueue(self._topic_for('notifications', None), {
+            'type': event['notification_type'],
+            'message': event['message'],
+            'data': event.get('data', {}),
+            'timestamp': event.get('timestamp'),
+        })
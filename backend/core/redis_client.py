@@ -0,0 +1,59 @@
+"""
+Shared Redis client for cross-process coordination.
+
+Django's cache framework is configured per environment and may be a
+process-local backend, so subsystems that need state shared by every
+worker (queues, counters, locks) use this client instead. The client is
+created lazily and reuses one connection pool per process.
+"""
+import logging
+import threading
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client():
+    """
+    Return the process-wide Redis client.
+
+    Uses ``REDIS_URL`` when configured, otherwise ``REDIS_HOST``,
+    ``REDIS_PORT`` and ``REDIS_DB``. Responses are decoded to ``str``.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                options = {
+                    'decode_responses': True,
+                    'socket_timeout': getattr(settings, 'REDIS_SOCKET_TIMEOUT', 1.0),
+                    'socket_connect_timeout': getattr(settings, 'REDIS_SOCKET_TIMEOUT', 1.0),
+                    'health_check_interval': 30,
+                }
+                if getattr(settings, 'REDIS_URL', None):
+                    _client = redis.from_url(settings.REDIS_URL, **options)
+                else:
+                    _client = redis.Redis(
+                        host=getattr(settings, 'REDIS_HOST', 'localhost'),
+                        port=getattr(settings, 'REDIS_PORT', 6379),
+                        db=getattr(settings, 'REDIS_DB', 0),
+                        **options
+                    )
+    return _client
+
+
+def reset_redis_client():
+    """Drop the cached client, e.g. after fork or in tests."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            try:
+                _client.close()
+            except Exception as e:
+                logger.debug(f"Error closing Redis client: {e}")
+        _client = None
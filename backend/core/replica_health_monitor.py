@@ -14,6 +14,7 @@ from django.core.cache import cache
 from django.core.mail import send_mail
 from django.utils import timezone
 from core.read_replica_setup import ReadReplicaManager
+from core.replica_state import get_replica_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -99,6 +100,7 @@ class ReplicaHealthMonitor:
         }
         
         cache.set(f"db_health_{replica_alias}", health_data, 120)
+        self._publish_state(replica_alias, is_healthy, lag, replica_info)
         
         if not is_healthy:
             self._handle_unhealthy_replica(replica_alias, replica_info, lag)
@@ -107,6 +109,16 @@ class ReplicaHealthMonitor:
             if replica_alias in self._failure_counts:
                 del self._failure_counts[replica_alias]
     
+    def _publish_state(self, replica_alias: str, is_healthy: bool, lag: int, replica_info: Dict):
+        """Push a check result into this process's routing snapshot"""
+        get_replica_tracker().publish(
+            replica_alias,
+            healthy=is_healthy,
+            lag=max(lag, 0),
+            checked_at=time.time(),
+            error=replica_info.get('last_error') or replica_info.get('error'),
+        )
+    
     def _evaluate_replica_health(self, replica_info: Dict, lag: int) -> bool:
         """Evaluate if a replica is healthy"""
         # Check basic replication status
@@ -283,6 +295,7 @@ Please check the replica status and take appropriate action if needed.
             
             # Update cache
             cache.set(f"db_health_{replica_alias}", results[replica_alias], 120)
+            self._publish_state(replica_alias, is_healthy, lag, replica_info)
         
         return results
 
@@ -0,0 +1,229 @@
+"""
+Background tracking of read replica lag and latency.
+
+``DatabaseRouter`` used to probe a replica with ``SELECT 1`` and
+``SHOW SLAVE STATUS`` inside ``db_for_read`` whenever its cached health
+entry expired, so the first query after expiry stalled and every worker
+re-checked at the same moment. Routing now only reads an in-memory
+snapshot; this module keeps that snapshot current.
+
+One daemon thread per process probes each replica every
+``REPLICA_PROBE_INTERVAL`` seconds, measuring round-trip latency (smoothed
+with an exponential moving average) and replication lag. It also picks up
+the ``db_health_<alias>`` entries written by ``ReplicaHealthMonitor`` so a
+replica failed over by the monitor, possibly in another process, stops
+receiving reads. The monitor publishes its results straight into the
+snapshot when it runs in the same process.
+
+The snapshot is a dict of immutable ``ReplicaState`` objects that is
+replaced as a whole on every update, so readers never take a lock. A
+replica counts as unhealthy until its first probe, so reads go to the
+primary rather than to a replica nobody has checked. The thread is
+started lazily, probes at once and is restarted after a fork.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the smoothed latency
+LATENCY_SMOOTHING = 0.3
+
+
+def get_replica_settings():
+    """Return the probe interval, lag threshold and read-your-writes window."""
+    return {
+        'probe_interval': getattr(settings, 'REPLICA_PROBE_INTERVAL', 5),
+        'lag_threshold': getattr(settings, 'REPLICA_LAG_THRESHOLD', 5),
+        'sticky_seconds': getattr(settings, 'REPLICA_STICKY_SECONDS', 10),
+    }
+
+
+def get_replica_aliases():
+    """Return the aliases of databases marked ``READ_REPLICA``."""
+    return [
+        alias for alias, config in settings.DATABASES.items()
+        if alias != 'default' and config.get('READ_REPLICA', False)
+    ]
+
+
+class ReplicaState:
+    """Last known health of one replica; unknown (unhealthy) until probed."""
+
+    __slots__ = ('alias', 'healthy', 'lag', 'latency_ms', 'checked_at', 'error')
+
+    def __init__(self, alias, healthy=False, lag=0, latency_ms=None, checked_at=None, error=None):
+        self.alias = alias
+        self.healthy = healthy
+        self.lag = lag
+        self.latency_ms = latency_ms
+        self.checked_at = checked_at
+        self.error = error
+
+    def replace(self, **fields):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(fields)
+        return ReplicaState(**values)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def probe_replica(alias: str) -> Dict:
+    """
+    Run the health queries against ``alias`` and time the round trip.
+
+    Returns ``healthy``, ``replication_lag``, ``response_time`` (ms) and,
+    on failure, ``error``.
+    """
+    try:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute("SELECT 1")
+            result = cursor.fetchone()
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            if not result or result[0] != 1:
+                return {'healthy': False, 'error': 'Invalid response to health check'}
+
+            replication_lag = 0
+            if connection.vendor == 'mysql':
+                try:
+                    cursor.execute("SHOW SLAVE STATUS")
+                    row = cursor.fetchone()
+                    if row:
+                        columns = [column[0] for column in cursor.description]
+                        status = dict(zip(columns, row))
+                        replication_lag = status.get('Seconds_Behind_Master')
+                        if replication_lag is None:
+                            # NULL while the replication threads are stopped
+                            return {
+                                'healthy': False,
+                                'response_time': latency_ms,
+                                'error': status.get('Last_Error') or 'Replication is not running',
+                            }
+                except Exception as e:
+                    logger.debug(f"Could not check replication lag for {alias}: {e}")
+
+            return {
+                'healthy': True,
+                'replication_lag': replication_lag,
+                'response_time': latency_ms,
+            }
+    except Exception as e:
+        logger.error(f"Database {alias} health check failed: {e}")
+        return {'healthy': False, 'error': str(e)}
+
+
+class ReplicaStateTracker:
+    """
+    Process-wide snapshot of replica states and the thread refreshing it.
+    """
+
+    def __init__(self, aliases: Optional[Iterable[str]] = None, probe_interval=None, autostart=True):
+        self.aliases = list(aliases) if aliases is not None else get_replica_aliases()
+        self.probe_interval = probe_interval or get_replica_settings()['probe_interval']
+        self._snapshot = {alias: ReplicaState(alias) for alias in self.aliases}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None if autostart else os.getpid()
+
+    def snapshot(self) -> Dict[str, ReplicaState]:
+        """Return the current states without doing any I/O."""
+        if self._pid != os.getpid():
+            self._start()
+        return self._snapshot
+
+    def publish(self, alias: str, **fields):
+        """Update the state of ``alias`` with the given fields."""
+        with self._lock:
+            snapshot = dict(self._snapshot)
+            current = snapshot.get(alias) or ReplicaState(alias)
+            snapshot[alias] = current.replace(**fields)
+            self._snapshot = snapshot
+
+    def record_probe(self, alias: str, result: Dict):
+        """Fold a ``probe_replica`` result into the snapshot."""
+        current = self._snapshot.get(alias) or ReplicaState(alias)
+        latency_ms = result.get('response_time')
+        if latency_ms is not None and current.latency_ms is not None:
+            latency_ms = LATENCY_SMOOTHING * latency_ms + (1 - LATENCY_SMOOTHING) * current.latency_ms
+        elif latency_ms is None:
+            latency_ms = current.latency_ms
+        self.publish(
+            alias,
+            healthy=result.get('healthy', False),
+            lag=result.get('replication_lag', current.lag) or 0,
+            latency_ms=latency_ms,
+            checked_at=time.time(),
+            error=result.get('error'),
+        )
+
+    def refresh(self):
+        """Probe every replica once and apply the monitor's verdicts."""
+        try:
+            published = cache.get_many([f"db_health_{alias}" for alias in self.aliases])
+        except Exception as e:
+            logger.debug(f"Could not read published replica health: {e}")
+            published = {}
+
+        for alias in self.aliases:
+            result = probe_replica(alias)
+            health = published.get(f"db_health_{alias}")
+            if health and result.get('healthy'):
+                lag = health.get('replication_lag')
+                if lag is not None and lag > result.get('replication_lag', 0):
+                    result['replication_lag'] = lag
+                if not health.get('healthy', True):
+                    result['healthy'] = False
+                    result['error'] = health.get('error') or 'Marked unhealthy by monitor'
+            self.record_probe(alias, result)
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's thread does not exist in the child
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='replica-state', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Replica state refresh failed: {e}")
+            finally:
+                for alias in self.aliases:
+                    connections[alias].close_if_unusable_or_obsolete()
+            time.sleep(self.probe_interval)
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_replica_tracker() -> ReplicaStateTracker:
+    """Return the process-wide replica state tracker."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = ReplicaStateTracker()
+    return _tracker
+
+
+def reset_replica_tracker():
+    """Drop the process-wide tracker; the next call builds a new one."""
+    global _tracker
+    with _tracker_lock:
+        _tracker = None
@@ -0,0 +1,6 @@
+from django.urls import re_path
+from . import realtime
+
+websocket_urlpatterns = [
+    re_path(r'ws/realtime/$', realtime.RealtimeGateway.as_asgi()),
+]
@@ -0,0 +1,346 @@
+"""
+Streaming export pipeline.
+
+Exports are produced row by row so memory stays flat regardless of how
+many rows are exported:
+
+* ``iter_queryset`` reads a queryset in chunks. On PostgreSQL and Oracle
+  this is ``QuerySet.iterator()``, which uses a server-side cursor. MySQL
+  and SQLite drivers buffer the whole result of ``iterator()`` on the
+  client, so there querysets are paged by keyset instead, one short query
+  per chunk: by their ``order_by`` fields with the primary key breaking
+  ties, or by primary key alone when there is no explicit ``order_by``
+  (rows then come out in primary-key order rather than the model's default
+  ordering). Orderings keyset paging cannot follow (nullable or related
+  fields, expressions) still go through ``iterator()`` and are buffered;
+* ``iter_export_bytes`` encodes rows to CSV, JSON, JSON lines, XML, YAML or
+  XLSX, yielding buffers of about ``STREAMING_EXPORT['BUFFER_SIZE']``
+  bytes. XLSX is written with ``openpyxl`` in write-only mode to a
+  temporary file, since a workbook is only complete once it is closed;
+* ``write_export`` writes the bytes, optionally gzipped, to a temporary
+  file and saves that to the default storage;
+* ``streaming_export_response`` sends them to the client as they are
+  produced, gzipped on the fly when asked.
+
+Rows are dicts; ``headers`` lists the keys to export, in order.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import tempfile
+import zlib
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+import yaml
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+# Vendors whose QuerySet.iterator() streams through a server-side cursor
+SERVER_SIDE_CURSOR_VENDORS = ('postgresql', 'oracle')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'jsonl': 'application/x-ndjson',
+    'xml': 'application/xml',
+    'yaml': 'application/x-yaml',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Values openpyxl writes natively
+CELL_TYPES = (str, int, float, Decimal, bool, date, time, timedelta)
+
+EXTENSIONS = {
+    'csv': 'csv',
+    'json': 'json',
+    'jsonl': 'jsonl',
+    'xml': 'xml',
+    'yaml': 'yaml',
+    'excel': 'xlsx',
+}
+
+
+def get_export_settings():
+    """Return the queryset chunk size and output buffer size for exports."""
+    config = getattr(settings, 'STREAMING_EXPORT', {})
+    return {
+        'chunk_size': config.get('CHUNK_SIZE', 2000),
+        'buffer_size': config.get('BUFFER_SIZE', 64 * 1024),
+    }
+
+
+def export_filename(name: str, export_format: str, compress: bool = False) -> str:
+    """``name`` with the extension for ``export_format`` (and ``.gz``)."""
+    filename = f"{name}.{EXTENSIONS.get(export_format, export_format)}"
+    return f"{filename}.gz" if compress else filename
+
+
+def _keyset_ordering(queryset) -> Optional[List[Any]]:
+    """
+    Return the ``(attname, descending)`` columns to page ``queryset`` by,
+    ending with the primary key, or ``None`` if its ordering cannot be
+    followed with keyset comparisons.
+    """
+    opts = queryset.model._meta
+    ordering = []
+    for item in queryset.query.order_by:
+        if not isinstance(item, str) or item == '?':
+            return None
+        name = item.lstrip('-+')
+        try:
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        # NULLs do not compare, and ordering by a relation follows the related model's ordering
+        if not field.concrete or field.null or (field.is_relation and name != field.attname):
+            return None
+        ordering.append((field.attname, item.startswith('-')))
+        if field.primary_key:
+            return ordering
+    ordering.append((opts.pk.attname, False))
+    return ordering
+
+
+def _after(ordering: List[Any], values: List[Any]) -> Q:
+    """Filter for the rows that sort after the row with ``values``."""
+    condition = Q()
+    for index, (attname, descending) in enumerate(ordering):
+        term = Q(**{f"{attname}__{'lt' if descending else 'gt'}": values[index]})
+        for (previous, _), value in zip(ordering[:index], values):
+            term &= Q(**{previous: value})
+        condition |= term
+    return condition
+
+
+def iter_queryset(queryset, chunk_size: Optional[int] = None) -> Iterator[Any]:
+    """
+    Yield the rows of ``queryset`` (instances or ``values()`` dicts) without
+    loading the whole result.
+    """
+    chunk_size = chunk_size or get_export_settings()['chunk_size']
+    ordering = None
+    if connections[queryset.db].vendor not in SERVER_SIDE_CURSOR_VENDORS and not queryset.query.is_sliced:
+        if queryset.query.order_by:
+            ordering = _keyset_ordering(queryset)
+        else:
+            ordering = [(queryset.model._meta.pk.attname, False)]
+    values_select = queryset.query.values_select
+    if ordering and values_select and any(attname not in values_select for attname, _ in ordering):
+        ordering = None
+    if not ordering:
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    order_by = [f'-{attname}' if descending else attname for attname, descending in ordering]
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(_after(ordering, last))
+        rows = list(page.order_by(*order_by)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        row = rows[-1]
+        last = [row[attname] if isinstance(row, dict) else getattr(row, attname) for attname, _ in ordering]
+
+
+class _Buffer:
+    """Accumulates encoded text and hands it out in ``size`` byte pieces."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.text = io.StringIO()
+
+    def write(self, value: str):
+        self.text.write(value)
+
+    def full(self) -> bool:
+        return self.text.tell() >= self.size
+
+    def take(self) -> bytes:
+        data = self.text.getvalue().encode('utf-8')
+        self.text.seek(0)
+        self.text.truncate()
+        return data
+
+
+def _iter_text(rows: Iterable[Dict[str, Any]], export_format: str, headers: List[str],
+               include_headers: bool, buffer_size: int) -> Iterator[bytes]:
+    buffer = _Buffer(buffer_size)
+    writer = csv.writer(buffer)
+
+    if export_format == 'csv' and include_headers:
+        writer.writerow(headers)
+    elif export_format == 'json':
+        buffer.write('[')
+    elif export_format == 'xml':
+        buffer.write("<?xml version='1.0' encoding='utf-8'?>\n<data>")
+
+    first = True
+    for row in rows:
+        if export_format == 'csv':
+            writer.writerow([row.get(header) for header in headers])
+        elif export_format == 'json':
+            buffer.write(('\n  ' if first else ',\n  ') + json.dumps(row, default=str))
+        elif export_format == 'jsonl':
+            buffer.write(json.dumps(row, default=str) + '\n')
+        elif export_format == 'xml':
+            buffer.write('<item>')
+            for key, value in row.items():
+                text = escape(str(value)) if value is not None else ''
+                buffer.write(f'<{key}>{text}</{key}>')
+            buffer.write('</item>')
+        elif export_format == 'yaml':
+            buffer.write(yaml.dump([row], default_flow_style=False))
+        first = False
+        if buffer.full():
+            yield buffer.take()
+
+    if export_format == 'json':
+        buffer.write('\n]' if not first else ']')
+    elif export_format == 'xml':
+        buffer.write('</data>')
+    data = buffer.take()
+    if data:
+        yield data
+
+
+def _iter_xlsx(rows: Iterable[Dict[str, Any]], headers: List[str], include_headers: bool,
+               buffer_size: int) -> Iterator[bytes]:
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    if include_headers:
+        worksheet.append(headers)
+    for row in rows:
+        worksheet.append([_cell_value(row.get(header)) for header in headers])
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            data = output.read(buffer_size)
+            if not data:
+                return
+            yield data
+
+
+def _cell_value(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel has no time zones; openpyxl rejects aware datetimes
+        return timezone.make_naive(value)
+    if value is None or isinstance(value, CELL_TYPES):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def iter_export_bytes(rows: Iterable[Dict[str, Any]], export_format: str, headers: Optional[List[str]] = None,
+                      include_headers: bool = True) -> Iterator[bytes]:
+    """
+    Encode ``rows`` in ``export_format``, yielding bytes as they fill up.
+
+    Without ``headers``, the keys of the first row are used.
+    """
+    if export_format not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    buffer_size = get_export_settings()['buffer_size']
+
+    rows = iter(rows)
+    if headers is None:
+        first = next(rows, None)
+        headers = list(first) if first is not None else []
+        if first is not None:
+            rows = _prepend(first, rows)
+
+    if export_format == 'excel':
+        if openpyxl is not None:
+            return _iter_xlsx(rows, headers, include_headers, buffer_size)
+        logger.warning("openpyxl is not installed; writing the Excel export as CSV")
+        export_format = 'csv'
+    return _iter_text(rows, export_format, headers, include_headers, buffer_size)
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip ``chunks`` on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class _RowCounter:
+    """Counts rows as they are consumed."""
+
+    def __init__(self, rows: Iterable):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def write_export(rows: Iterable[Dict[str, Any]], export_format: str, file_path: str,
+                 headers: Optional[List[str]] = None, include_headers: bool = True,
+                 compress: bool = False) -> Dict[str, Any]:
+    """
+    Write ``rows`` to ``file_path`` in the default storage.
+
+    Returns the stored path (the storage may change the name), its size in
+    bytes and the number of rows written.
+    """
+    counter = _RowCounter(rows)
+    with tempfile.TemporaryFile() as output:
+        target = gzip.GzipFile(fileobj=output, mode='wb') if compress else output
+        for chunk in iter_export_bytes(counter, export_format, headers, include_headers):
+            target.write(chunk)
+        if compress:
+            target.close()
+        size = output.tell()
+        output.seek(0)
+        saved_path = default_storage.save(file_path, File(output))
+    return {'file_path': saved_path, 'file_size': size, 'rows': counter.count}
+
+
+def streaming_export_response(rows: Iterable[Dict[str, Any]], export_format: str, filename: str,
+                              headers: Optional[List[str]] = None, include_headers: bool = True,
+                              compress: bool = False) -> StreamingHttpResponse:
+    """
+    Stream ``rows`` to the client as a file download named ``filename``.
+    """
+    chunks = iter_export_bytes(rows, export_format, headers, include_headers)
+    if compress:
+        chunks = gzip_stream(chunks)
+    response = StreamingHttpResponse(
+        chunks, content_type='application/gzip' if compress else CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
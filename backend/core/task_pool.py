@@ -0,0 +1,73 @@
+"""
+Process-wide thread pools for fanning out blocking calls.
+
+Carrier requests (``apps.shipping``) and notification provider calls
+(``apps.notifications``) are I/O bound and independent, so each feature
+submits them as a dict of tasks to its own ``TaskPool`` and collects every
+outcome, successful or not, keyed like the tasks.
+
+The underlying ``ThreadPoolExecutor`` is created on first use and rebuilt
+after a fork, since the parent's worker threads do not exist in the child.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+
+class TaskPool:
+    """
+    Bounded thread pool that runs a dict of tasks and reports each outcome.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = 'task-pool'):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, tasks: Dict[Any, Callable[[], Any]], timeout: Optional[float] = None) -> Dict[Any, Dict[str, Any]]:
+        """
+        Run ``tasks`` concurrently and wait up to ``timeout`` seconds
+        (``None`` waits for all of them).
+
+        Returns ``{key: {"result": ...}}`` or ``{key: {"error": "..."}}``
+        for every task; tasks still running at the deadline are reported as
+        timed out and their results discarded.
+        """
+        if not tasks:
+            return {}
+        if len(tasks) == 1:
+            # Nothing to overlap; skip the hand-off to the pool
+            key, task = next(iter(tasks.items()))
+            try:
+                return {key: {"result": task()}}
+            except Exception as e:
+                return {key: {"error": str(e)}}
+
+        executor = self._get_executor()
+        futures = {executor.submit(task): key for key, task in tasks.items()}
+        done, _ = wait(futures, timeout=timeout)
+
+        outcomes = {}
+        for future, key in futures.items():
+            if future in done:
+                try:
+                    outcomes[key] = {"result": future.result()}
+                except Exception as e:
+                    outcomes[key] = {"error": str(e)}
+            else:
+                future.cancel()
+                outcomes[key] = {"error": f"Timed out after {timeout}s"}
+        return outcomes
@@ -0,0 +1,187 @@
+"""
+In-memory stand-ins shared by tests.
+"""
+import redis
+
+
+def in_score_range(score, minimum, maximum):
+    """Redis score range check; a leading ``(`` makes a bound exclusive."""
+    def bound(value):
+        value = str(value)
+        return (float(value[1:]), True) if value.startswith('(') else (float(value), False)
+
+    low, low_exclusive = bound(minimum)
+    high, high_exclusive = bound(maximum)
+    return (score > low if low_exclusive else score >= low) and (score < high if high_exclusive else score <= high)
+
+
+class FakePipeline:
+    """Collects pipelined calls and replays them on the fake client."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return call
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the Redis commands used by the Redis-backed services."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.data.setdefault(key, {})
+        if mapping:
+            fields.update({name: str(item) for name, item in mapping.items()})
+        if field is not None:
+            fields[field] = value
+        return 1
+
+    def hsetnx(self, key, field, value):
+        fields = self.data.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = value
+        return 1
+
+    def hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, {})
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value, ex=seconds)
+
+    def rename(self, source, destination):
+        if source not in self.data:
+            raise redis.ResponseError('no such key')
+        self.data[destination] = self.data.pop(source)
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def sinter(self, keys):
+        return set.intersection(*[set(self.data.get(key, set())) for key in keys])
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    def ltrim(self, key, start, end):
+        items = self.data.get(key, [])
+        self.data[key] = items[start:None if end == -1 else end + 1]
+
+    def lrange(self, key, start, end):
+        return list(self.data.get(key, [])[start:None if end == -1 else end + 1])
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.data.get(key, {}).pop(member, None)
+
+    def zrangebyscore(self, key, minimum, maximum):
+        ranked = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        return [member for member, score in ranked if in_score_range(score, minimum, maximum)]
+
+    def zrevrangebyscore(self, key, maximum, minimum, start=None, num=None):
+        ranked = sorted(self.data.get(key, {}).items(), key=lambda item: (-item[1], item[0]))
+        members = [member for member, score in ranked if in_score_range(score, minimum, maximum)]
+        if start is not None:
+            members = members[start:start + num]
+        return members
+
+    def zrange(self, key, start, end):
+        ranked = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        return [member for member, _ in ranked[start:None if end == -1 else end + 1]]
+
+    def zinterstore(self, destination, keys, aggregate=None):
+        scores = [self.data.get(key, {}) for key in keys]
+        common = set.intersection(*[set(item) for item in scores])
+        combine = max if aggregate == 'MAX' else sum
+        self.data[destination] = {member: combine(item[member] for item in scores) for member in common}
+        return len(common)
+
+    def srem(self, key, *members):
+        self.data.get(key, set()).difference_update(members)
+
+    def zincrby(self, key, amount, member):
+        scores = self.data.setdefault(key, {})
+        scores[member] = scores.get(member, 0) + amount
+        return scores[member]
+
+    def zrevrange(self, key, start, end, withscores=False):
+        ranked = sorted(self.data.get(key, {}).items(), key=lambda item: (-item[1], item[0]))
+        ranked = ranked[start:None if end == -1 else end + 1]
+        return ranked if withscores else [member for member, _ in ranked]
+
+    def zunionstore(self, destination, weights):
+        scores = {}
+        for key, weight in weights.items():
+            for member, score in self.data.get(key, {}).items():
+                scores[member] = scores.get(member, 0) + score * weight
+        self.data[destination] = scores
+
+    def zremrangebyrank(self, key, start, end):
+        ranked = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        for member, _ in ranked[start:None if end == -1 else end + 1]:
+            del self.data[key][member]
+        if key in self.data and not self.data[key]:
+            del self.data[key]
+
+    def zremrangebyscore(self, key, minimum, maximum):
+        scores = self.data.get(key, {})
+        removed = [member for member, score in scores.items() if in_score_range(score, minimum, maximum)]
+        for member in removed:
+            del scores[member]
+        if key in self.data and not scores:
+            del self.data[key]
+        return len(removed)
@@ -0,0 +1,65 @@
+"""
+Tests for SCAN-based and tag-based cache invalidation.
+"""
+from unittest.mock import MagicMock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase
+
+from core.cache_invalidation import TagVersions, scan_delete
+
+
+class ScanDeleteTest(TestCase):
+    """Test cases for batched pattern deletion."""
+
+    def test_unlinks_in_batches_without_keys(self):
+        """Test that matching keys are unlinked per batch and KEYS is never used."""
+        client = MagicMock()
+        client.scan_iter.return_value = iter([f'products:{i}' for i in range(5)])
+        pipe = client.pipeline.return_value
+        pipe.execute.side_effect = [[1, 1], [1, 1], [1]]
+
+        self.assertEqual(scan_delete(client, 'products:*', batch_size=2), 5)
+
+        client.scan_iter.assert_called_once_with(match='products:*', count=2)
+        self.assertEqual(pipe.unlink.call_count, 5)
+        self.assertEqual(pipe.execute.call_count, 3)
+        client.keys.assert_not_called()
+
+    def test_falls_back_to_del_without_unlink(self):
+        """Test that servers without UNLINK get DEL instead."""
+        client = MagicMock()
+        client.scan_iter.return_value = iter(['a', 'b'])
+        pipe = client.pipeline.return_value
+        pipe.execute.side_effect = [Exception('unknown command UNLINK'), [1, 1]]
+
+        self.assertEqual(scan_delete(client, '*'), 2)
+        self.assertEqual(pipe.delete.call_count, 2)
+
+
+class TagVersionsTest(TestCase):
+    """Test cases for versioned tag invalidation."""
+
+    def setUp(self):
+        self.cache = LocMemCache('tag-versions-test', {})
+        self.tags = TagVersions(self.cache)
+
+    def test_invalidating_a_tag_expires_its_values(self):
+        """Test that values are misses once one of their tags is invalidated."""
+        product = self.tags.wrap({'id': 1}, ['products', 'products.product:1'])
+        category = self.tags.wrap({'id': 2}, ['categories'])
+
+        self.tags.invalidate(['products.product:1'])
+
+        self.assertIsNone(self.tags.unwrap(product))
+        self.assertEqual(self.tags.unwrap(category), {'id': 2})
+
+    def test_evicted_tag_does_not_revive_old_values(self):
+        """Test that losing a tag's version key invalidates rather than resets."""
+        stored = self.tags.wrap('value', ['products'])
+        self.cache.delete('cache_tag:products')
+        self.assertIsNone(self.tags.unwrap(stored))
+
+    def test_untagged_values_pass_through(self):
+        """Test that plain cached values are returned unchanged."""
+        self.assertEqual(self.tags.unwrap('plain'), 'plain')
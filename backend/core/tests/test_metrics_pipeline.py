@@ -0,0 +1,95 @@
+"""
+Tests for the buffered request metrics pipeline.
+"""
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+
+from core.metrics_pipeline import BulkCreateSink, HistogramSink, MetricSeries, MetricsPipeline
+
+
+class MetricSeriesTest(TestCase):
+    """Test cases for per-key aggregation."""
+
+    def test_aggregates_values_and_counters(self):
+        """Test that count, extremes, histogram and counters are tracked."""
+        series = MetricSeries('default')
+        for value in (3, 40, 40, 900):
+            series.add(value, {'hit': 1})
+
+        self.assertEqual(series.count, 4)
+        self.assertEqual((series.min, series.max), (3, 900))
+        self.assertAlmostEqual(series.mean, 245.75)
+        self.assertEqual(series.counters, {'hit': 4})
+        self.assertEqual(series.histogram(), {'5': 1, '50': 2, '1000': 1})
+        self.assertEqual(series.percentile(0.5), 50)
+        self.assertEqual(series.percentile(0.99), 900)
+
+
+class MetricsPipelineTest(TestCase):
+    """Test cases for queueing and flushing records."""
+
+    def test_flush_aggregates_per_key(self):
+        """Test that a histogram sink writes one series per key per flush."""
+        writer = Mock()
+        pipeline = MetricsPipeline(autostart=False)
+        pipeline.register('cache', HistogramSink(writer))
+
+        for value in (10, 20, 30):
+            pipeline.record_value('cache', 'default', value, {'miss': 1})
+        pipeline.record_value('cache', 'sessions', 5)
+        pipeline.flush()
+
+        series = {item.key: item for item in writer.call_args.args[0]}
+        self.assertEqual(series['default'].count, 3)
+        self.assertEqual(series['default'].counters, {'miss': 3})
+        self.assertEqual(series['sessions'].count, 1)
+
+        # Nothing new to write on the next interval
+        pipeline.flush()
+        writer.assert_called_once()
+
+    def test_queue_is_bounded(self):
+        """Test that a full queue drops the oldest records instead of growing."""
+        writer = Mock()
+        pipeline = MetricsPipeline(max_pending=10, autostart=False)
+        pipeline.register('cache', HistogramSink(writer))
+
+        for value in range(25):
+            pipeline.record_value('cache', 'default', value)
+
+        self.assertEqual(pipeline.dropped, 15)
+        pipeline.flush()
+        series = writer.call_args.args[0][0]
+        self.assertEqual((series.count, series.min), (10, 15))
+        self.assertEqual(pipeline.dropped, 0)
+
+    def test_bulk_create_sink_writes_in_one_call(self):
+        """Test that row sinks use bulk_create and keep the recorded time."""
+        model = Mock(side_effect=lambda **fields: fields)
+        pipeline = MetricsPipeline(autostart=False)
+        pipeline.register('rows', BulkCreateSink(model, batch_size=100))
+
+        with patch('core.metrics_pipeline.time.time', return_value=0):
+            pipeline.record('rows', None, {'name': 'a'})
+        pipeline.record('rows', None, {'name': 'b', 'timestamp': 'set'})
+        pipeline.flush()
+
+        rows = model.objects.bulk_create.call_args.args[0]
+        self.assertEqual([row['name'] for row in rows], ['a', 'b'])
+        self.assertEqual(rows[0]['timestamp'].timestamp(), 0)
+        self.assertEqual(rows[1]['timestamp'], 'set')
+        model.objects.bulk_create.assert_called_once()
+
+    def test_failing_sink_does_not_block_others(self):
+        """Test that one sink raising leaves other sinks flushed."""
+        good = Mock()
+        pipeline = MetricsPipeline(autostart=False)
+        pipeline.register('bad', HistogramSink(Mock(side_effect=RuntimeError('db down'))))
+        pipeline.register('good', HistogramSink(good))
+
+        pipeline.record_value('bad', 'x', 1)
+        pipeline.record_value('good', 'x', 1)
+        pipeline.flush()
+
+        good.assert_called_once()
@@ -0,0 +1,199 @@
+"""
+Tests for the shared API rate limiter.
+"""
+from unittest.mock import Mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.middleware.rate_limit_middleware import RateLimitMiddleware
+from core.rate_limit import (
+    LocalSlidingWindow, RateLimitPolicy, RateLimiter, get_client_ip, reset_rate_limiter
+)
+
+User = get_user_model()
+
+
+class LocalSlidingWindowTest(TestCase):
+    """Test cases for the in-process sliding window counter."""
+
+    def test_limit_within_window(self):
+        """Test that requests beyond the limit are denied until the window slides."""
+        window = LocalSlidingWindow()
+        checks = [('client', 3, 60)]
+        for _ in range(3):
+            self.assertEqual(window.hit(checks, now=600)[0], 0)
+
+        denied, remaining, retry_after_ms = window.hit(checks, now=630)
+        self.assertEqual((denied, remaining), (1, 0))
+        self.assertEqual(retry_after_ms, 30000)
+
+    def test_previous_window_is_weighted(self):
+        """Test that the previous bucket counts in proportion to its overlap."""
+        window = LocalSlidingWindow()
+        checks = [('client', 4, 60)]
+        for _ in range(4):
+            window.hit(checks, now=610)
+
+        # Half of the previous window overlaps: 4 * 0.5 = 2 used, 2 left
+        self.assertEqual(window.hit(checks, now=690)[0], 0)
+        self.assertEqual(window.hit(checks, now=690)[0], 0)
+        self.assertEqual(window.hit(checks, now=690)[0], 1)
+        # Two windows later nothing is left of the old requests
+        self.assertEqual(window.hit(checks, now=900), (0, 3, 0))
+
+    def test_denied_request_is_not_counted_for_other_policies(self):
+        """Test that a request denied by one policy does not use up the others."""
+        window = LocalSlidingWindow()
+        window.hit([('strict', 1, 60)], now=0)
+        self.assertEqual(window.hit([('loose', 10, 60), ('strict', 1, 60)], now=1)[0], 2)
+        self.assertEqual(window.hit([('loose', 10, 60)], now=1), (0, 9, 0))
+
+    def test_old_keys_are_evicted(self):
+        """Test that the number of tracked keys stays bounded."""
+        window = LocalSlidingWindow(max_keys=100)
+        for client in range(1000):
+            window.hit([(f'client-{client}', 5, 60)], now=0)
+        self.assertEqual(len(window), 100)
+
+
+class RateLimiterTest(TestCase):
+    """Test cases for policy matching, Redis use and local fallbacks."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.policies = [
+            RateLimitPolicy(name='login', path=r'^/api/v1/auth/login/', methods=['post'], key='ip', limit=2, window=60),
+            RateLimitPolicy(name='api', path=r'^/api/', key='user_or_ip', limit=100, window=3600),
+        ]
+
+    def _request(self, path='/api/v1/products/', method='get', ip='10.0.0.1', user=None):
+        request = getattr(self.factory, method)(path, REMOTE_ADDR=ip)
+        request.user = user or AnonymousUser()
+        return request
+
+    def _user(self, pk, is_staff=False):
+        return Mock(pk=pk, is_authenticated=True, is_staff=is_staff)
+
+    def test_all_matching_policies_are_checked_in_one_script_call(self):
+        """Test that matching policies share one Redis round trip."""
+        script = Mock(return_value=[0, 1, 0])
+        client = Mock(register_script=Mock(return_value=script))
+        limiter = RateLimiter(self.policies, backend='redis', client=client)
+
+        result = limiter.check(self._request('/api/v1/auth/login/', 'post'))
+
+        self.assertTrue(result.allowed)
+        script.assert_called_once_with(
+            keys=['ratelimit:{login:ip:10.0.0.1}', 'ratelimit:{api:ip:10.0.0.1}'],
+            args=[2, 60, 100, 3600]
+        )
+        self.assertEqual((result.limit, result.remaining), (2, 1))
+
+    def test_users_are_counted_separately_from_their_ip(self):
+        """Test that user_or_ip policies key authenticated users by ID."""
+        script = Mock(return_value=[0, 99, 0])
+        limiter = RateLimiter(self.policies, backend='redis', client=Mock(register_script=Mock(return_value=script)))
+        limiter.check(self._request(user=self._user(7)))
+        self.assertEqual(script.call_args.kwargs['keys'], ['ratelimit:{api:user:7}'])
+
+    def test_bearer_tokens_are_authenticated_before_drf(self):
+        """Test that JWT users are keyed by ID and staff tokens are exempt."""
+        user = User.objects.create_user(username='jwt', email='jwt@example.com', password='password123')
+        staff = User.objects.create_user(username='jwtstaff', email='staff@example.com', is_staff=True)
+        script = Mock(return_value=[0, 99, 0])
+        limiter = RateLimiter(self.policies, backend='redis', client=Mock(register_script=Mock(return_value=script)))
+
+        request = self._request()
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(user)}'
+        limiter.check(request)
+        self.assertEqual(script.call_args.kwargs['keys'], [f'ratelimit:{{api:user:{user.pk}}}'])
+
+        request.META['HTTP_AUTHORIZATION'] = 'Bearer not-a-token'
+        limiter.check(request)
+        self.assertEqual(script.call_args.kwargs['keys'], ['ratelimit:{api:ip:10.0.0.1}'])
+
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(staff)}'
+        self.assertEqual(limiter.check(request).limit, 0)
+        self.assertEqual(script.call_count, 2)
+
+    def test_forwarded_for_is_read_from_trusted_proxies(self):
+        """Test that the client IP is taken from the right of X-Forwarded-For."""
+        request = self._request(ip='10.0.0.254')
+        request.META['HTTP_X_FORWARDED_FOR'] = '1.2.3.4, 203.0.113.9, 10.0.0.253'
+
+        self.assertEqual(get_client_ip(request), '10.0.0.254')
+        self.assertEqual(get_client_ip(request, trusted_proxy_count=1), '10.0.0.253')
+        self.assertEqual(get_client_ip(request, trusted_proxy_count=2), '203.0.113.9')
+        # Fewer entries than proxies: the header cannot be trusted
+        self.assertEqual(get_client_ip(request, trusted_proxy_count=4), '10.0.0.254')
+
+    def test_blocked_clients_are_rejected_without_redis(self):
+        """Test that a rejected client is turned away locally until its retry time."""
+        script = Mock(return_value=[1, 0, 30000])
+        limiter = RateLimiter(self.policies, backend='redis', client=Mock(register_script=Mock(return_value=script)))
+
+        first = limiter.check(self._request())
+        second = limiter.check(self._request())
+
+        self.assertFalse(first.allowed)
+        self.assertEqual(first.retry_after, 30)
+        self.assertFalse(second.allowed)
+        self.assertEqual(second.policy, 'api')
+        script.assert_called_once()
+
+        # Other clients are still checked against Redis
+        limiter.check(self._request(ip='10.0.0.2'))
+        self.assertEqual(script.call_count, 2)
+
+    def test_redis_errors_fall_back_to_local_counting(self):
+        """Test that an unavailable Redis degrades to per-process limits."""
+        script = Mock(side_effect=ConnectionError('down'))
+        limiter = RateLimiter(self.policies, backend='redis', client=Mock(register_script=Mock(return_value=script)))
+
+        request = self._request('/api/v1/auth/login/', 'post')
+        results = [limiter.check(request).allowed for _ in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        # Redis is not retried on every request while it is down
+        script.assert_called_once()
+
+    def test_staff_and_unmatched_requests_are_not_limited(self):
+        """Test that staff users and non-API paths skip counting."""
+        limiter = RateLimiter(self.policies, backend='local')
+        self.assertTrue(limiter.check(self._request('/admin/')).allowed)
+        self.assertEqual(limiter.check(self._request(user=self._user(1, is_staff=True))).limit, 0)
+        self.assertEqual(len(limiter.local), 0)
+
+
+@override_settings(API_RATE_LIMITING={
+    'ENABLED': True,
+    'BACKEND': 'local',
+    'POLICIES': [{'name': 'api', 'path': r'^/api/', 'key': 'ip', 'limit': 2, 'window': 60}],
+})
+class RateLimitMiddlewareTest(TestCase):
+    """Test cases for the rate limit middleware responses."""
+
+    def setUp(self):
+        reset_rate_limiter()
+        self.addCleanup(reset_rate_limiter)
+        self.middleware = RateLimitMiddleware(lambda request: HttpResponse('ok'))
+        self.factory = RequestFactory()
+
+    def test_headers_and_429(self):
+        """Test that limits are reported and exceeded requests get 429."""
+        request = self.factory.get('/api/v1/products/')
+        request.user = AnonymousUser()
+
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Limit'], '2')
+        self.assertEqual(response['X-RateLimit-Remaining'], '1')
+
+        self.middleware(request)
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
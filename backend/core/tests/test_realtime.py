@@ -0,0 +1,163 @@
+"""
+Tests for the multiplexed realtime gateway.
+"""
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TransactionTestCase, override_settings
+
+from apps.chat.models import ChatRoom, Message
+from core.realtime import RealtimeGateway, parse_topic
+
+User = get_user_model()
+
+IN_MEMORY_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def stock_change(product_id, quantity):
+    return {
+        'type': 'inventory_update',
+        'update_type': 'stock_change',
+        'product_id': product_id,
+        'data': {'current_quantity': quantity},
+        'timestamp': '2024-01-01T12:00:00Z',
+    }
+
+
+@override_settings(
+    CHANNEL_LAYERS=IN_MEMORY_LAYERS,
+    REALTIME_GATEWAY={'FLUSH_INTERVAL': 0.05, 'MAX_BATCH_SIZE': 100, 'CHAT_WRITE_INTERVAL': 60}
+)
+class RealtimeGatewayTest(TransactionTestCase):
+    """Test cases for topic subscriptions, batching and chat publishing."""
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(RealtimeGateway.as_asgi(), '/ws/realtime/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def subscribe(self, communicator, topic):
+        await communicator.send_json_to({'action': 'subscribe', 'topic': topic})
+        return await communicator.receive_json_from()
+
+    def test_parse_topic(self):
+        """Test that topics are validated against their family."""
+        self.assertEqual(parse_topic('chat:12')[1], '12')
+        self.assertEqual(parse_topic('inventory')[0].name, 'inventory')
+        self.assertIsNone(parse_topic('chat')[0])
+        self.assertIsNone(parse_topic('inventory:1')[0])
+        self.assertIsNone(parse_topic('chat:1/../2')[0])
+        self.assertIsNone(parse_topic('unknown')[0])
+
+    async def test_anonymous_connections_are_rejected(self):
+        """Test that only authenticated users get a socket."""
+        communicator, connected = await self.connect(AnonymousUser())
+        self.assertFalse(connected)
+
+    async def test_bursts_are_coalesced_into_one_batch(self):
+        """Test that queued stock changes for a product collapse to the latest."""
+        staff = User(username='staff', is_staff=True)
+        communicator, connected = await self.connect(staff)
+        self.assertTrue(connected)
+        self.assertEqual((await self.subscribe(communicator, 'inventory'))['type'], 'subscribed')
+
+        channel_layer = get_channel_layer()
+        for quantity in (10, 9, 8):
+            await channel_layer.group_send('inventory_updates', stock_change('1', quantity))
+        await channel_layer.group_send('inventory_updates', stock_change('2', 5))
+
+        frame = await communicator.receive_json_from(timeout=1)
+        self.assertEqual(frame['type'], 'batch')
+        self.assertEqual(
+            [(event['product_id'], event['data']['current_quantity']) for event in frame['events']],
+            [('1', 8), ('2', 5)]
+        )
+        self.assertEqual(frame['events'][0]['topic'], 'inventory')
+        self.assertTrue(await communicator.receive_nothing(timeout=0.1))
+
+        await communicator.disconnect()
+
+    async def test_other_inventory_updates_are_not_coalesced(self):
+        """Test that summaries without a product are all delivered."""
+        staff = User(username='staff', is_staff=True)
+        communicator, connected = await self.connect(staff)
+        self.assertTrue(connected)
+        await self.subscribe(communicator, 'inventory')
+
+        channel_layer = get_channel_layer()
+        for count in (3, 4):
+            await channel_layer.group_send('inventory_updates', {
+                'type': 'inventory_update',
+                'update_type': 'products_indexed',
+                'product_id': None,
+                'data': {'count': count},
+                'timestamp': '2024-01-01T12:00:00Z',
+            })
+
+        frame = await communicator.receive_json_from(timeout=1)
+        self.assertEqual([event['data']['count'] for event in frame['events']], [3, 4])
+
+        await communicator.disconnect()
+
+    async def test_forbidden_and_unknown_topics(self):
+        """Test that subscriptions are checked before joining a group."""
+        customer = await database_sync_to_async(User.objects.create_user)(
+            username='customer', email='customer@example.com', password='password123'
+        )
+        room = await database_sync_to_async(ChatRoom.objects.create)(name='Private', room_type='CUSTOMER_SUPPORT')
+        communicator, _ = await self.connect(customer)
+
+        self.assertEqual((await self.subscribe(communicator, 'inventory'))['error'], 'forbidden')
+        self.assertEqual((await self.subscribe(communicator, f'chat:{room.id}'))['error'], 'forbidden')
+        self.assertEqual((await self.subscribe(communicator, 'weather'))['error'], 'unknown_topic')
+        self.assertEqual((await self.subscribe(communicator, 'notifications'))['type'], 'subscribed')
+
+        await communicator.disconnect()
+
+    async def test_one_socket_carries_several_topics(self):
+        """Test that chat and notification events arrive on the same socket, tagged by topic."""
+        user = await database_sync_to_async(User.objects.create_user)(
+            username='member', email='member@example.com', password='password123'
+        )
+        room = await database_sync_to_async(ChatRoom.objects.create)(name='Support', room_type='CUSTOMER_SUPPORT')
+        await database_sync_to_async(room.participants.add)(user)
+        communicator, _ = await self.connect(user)
+        await self.subscribe(communicator, f'chat:{room.id}')
+        await self.subscribe(communicator, 'notifications')
+
+        await communicator.send_json_to({'action': 'publish', 'topic': f'chat:{room.id}', 'message': 'Hello'})
+        await get_channel_layer().group_send(f'notifications_{user.id}', {
+            'type': 'notification_message',
+            'notification_type': 'ORDER_UPDATE',
+            'message': 'Your order has been shipped',
+            'data': {},
+        })
+
+        frame = await communicator.receive_json_from(timeout=1)
+        events = {event['topic']: event for event in frame['events']}
+        self.assertEqual(set(events), {f'chat:{room.id}', 'notifications'})
+        self.assertEqual(events[f'chat:{room.id}']['message'], 'Hello')
+        self.assertEqual(events[f'chat:{room.id}']['user_id'], str(user.id))
+        self.assertEqual(events['notifications']['message'], 'Your order has been shipped')
+
+        # Messages are stored in batches, at the latest when the socket closes
+        await communicator.disconnect()
+        self.assertEqual(
+            await database_sync_to_async(Message.objects.filter(room=room, user=user, content='Hello').count)(),
+            1
+        )
+
+    async def test_publishing_requires_a_subscription(self):
+        """Test that clients cannot post to rooms they have not joined."""
+        user = await database_sync_to_async(User.objects.create_user)(
+            username='outsider', email='outsider@example.com', password='password123'
+        )
+        communicator, _ = await self.connect(user)
+
+        await communicator.send_json_to({'action': 'publish', 'topic': 'chat:1', 'message': 'Hi'})
+        self.assertEqual((await communicator.receive_json_from())['error'], 'not_subscribed')
+
+        await communicator.disconnect()
@@ -0,0 +1,190 @@
+"""
+Tests for replica state tracking and replica-aware read routing.
+"""
+import time
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from core.database_router import (
+    DatabaseRouter, get_primary_pin, is_pinned_to_primary, reset_primary_pin, set_primary_pin
+)
+from core.middleware.read_your_writes_middleware import PIN_COOKIE_NAME, ReadYourWritesMiddleware
+from core.replica_state import ReplicaStateTracker
+
+
+def make_router(tracker, replicas=('replica_a', 'replica_b')):
+    router = DatabaseRouter()
+    router.read_databases = list(replicas)
+    router.replica_lag_threshold = 5
+    patcher = patch('core.database_router.get_replica_tracker', return_value=tracker)
+    return router, patcher
+
+
+def probed_tracker(aliases):
+    tracker = ReplicaStateTracker(aliases=aliases, autostart=False)
+    for alias in aliases:
+        tracker.publish(alias, healthy=True)
+    return tracker
+
+
+class ReplicaStateTrackerTest(TestCase):
+    """Test cases for the in-memory replica snapshot."""
+
+    def test_probe_results_are_smoothed(self):
+        """Test that latency is averaged across probes rather than replaced."""
+        tracker = ReplicaStateTracker(aliases=['replica_a'], autostart=False)
+        tracker.record_probe('replica_a', {'healthy': True, 'replication_lag': 1, 'response_time': 10.0})
+        tracker.record_probe('replica_a', {'healthy': True, 'replication_lag': 2, 'response_time': 20.0})
+
+        state = tracker.snapshot()['replica_a']
+        self.assertTrue(state.healthy)
+        self.assertEqual(state.lag, 2)
+        self.assertAlmostEqual(state.latency_ms, 13.0)
+
+    def test_unprobed_replicas_are_unhealthy(self):
+        """Test that a replica gets no reads before its first probe."""
+        tracker = ReplicaStateTracker(aliases=['replica_a'], autostart=False)
+        state = tracker.snapshot()['replica_a']
+        self.assertFalse(state.healthy)
+        self.assertIsNone(state.checked_at)
+
+        router, patcher = make_router(tracker, ('replica_a',))
+        with patcher:
+            self.assertEqual(router._select_read_database(), 'default')
+
+    def test_publish_replaces_snapshot(self):
+        """Test that readers holding an old snapshot do not see later updates."""
+        tracker = probed_tracker(['replica_a'])
+        before = tracker.snapshot()
+        tracker.publish('replica_a', healthy=False)
+
+        self.assertTrue(before['replica_a'].healthy)
+        self.assertFalse(tracker.snapshot()['replica_a'].healthy)
+
+    def test_monitor_verdict_overrides_probe(self):
+        """Test that a replica failed over by the monitor stays out of rotation."""
+        tracker = ReplicaStateTracker(aliases=['replica_a'], autostart=False)
+        with patch('core.replica_state.probe_replica',
+                   return_value={'healthy': True, 'replication_lag': 0, 'response_time': 1.0}), \
+                patch('core.replica_state.cache') as cache:
+            cache.get_many.return_value = {'db_health_replica_a': {'healthy': False}}
+            tracker.refresh()
+
+        self.assertFalse(tracker.snapshot()['replica_a'].healthy)
+
+
+class ReplicaRoutingTest(TestCase):
+    """Test cases for snapshot-based replica selection."""
+
+    def test_unhealthy_and_lagging_replicas_are_skipped(self):
+        """Test that reads avoid replicas that are down or past the lag threshold."""
+        tracker = probed_tracker(['replica_a', 'replica_b', 'replica_c'])
+        tracker.publish('replica_a', healthy=False)
+        tracker.publish('replica_b', lag=30)
+        router, patcher = make_router(tracker, ('replica_a', 'replica_b', 'replica_c'))
+        with patcher:
+            self.assertEqual(router._get_healthy_read_databases(), ['replica_c'])
+
+    def test_no_queries_on_read_path(self):
+        """Test that selecting a replica never probes the database."""
+        tracker = probed_tracker(['replica_a', 'replica_b'])
+        router, patcher = make_router(tracker)
+        with patcher, patch('core.replica_state.probe_replica') as probe:
+            for _ in range(20):
+                self.assertIn(router._select_read_database(), ['replica_a', 'replica_b'])
+        probe.assert_not_called()
+
+    def test_faster_replica_gets_more_weight(self):
+        """Test that weights follow latency and shrink with lag."""
+        tracker = ReplicaStateTracker(aliases=['replica_a', 'replica_b'], autostart=False)
+        tracker.publish('replica_a', latency_ms=2.0, lag=0)
+        tracker.publish('replica_b', latency_ms=8.0, lag=0)
+        router, patcher = make_router(tracker)
+        with patcher:
+            fast, slow = router._replica_weights(['replica_a', 'replica_b'])
+            self.assertAlmostEqual(fast / slow, 4.0)
+
+            tracker.publish('replica_b', latency_ms=2.0, lag=4)
+            fresh, lagging = router._replica_weights(['replica_a', 'replica_b'])
+            self.assertGreater(fresh, lagging)
+
+    def test_all_replicas_down_falls_back_to_primary(self):
+        """Test that reads go to the primary when no replica is usable."""
+        tracker = ReplicaStateTracker(aliases=['replica_a', 'replica_b'], autostart=False)
+        tracker.publish('replica_a', healthy=False)
+        tracker.publish('replica_b', healthy=False)
+        router, patcher = make_router(tracker)
+        with patcher:
+            self.assertEqual(router._select_read_database(), 'default')
+
+
+class ReadYourWritesTest(TestCase):
+    """Test cases for pinning reads to the primary after a write."""
+
+    def setUp(self):
+        self.token = set_primary_pin(0.0)
+
+    def tearDown(self):
+        reset_primary_pin(self.token)
+
+    def test_write_pins_reads_to_primary(self):
+        """Test that reads after a write use the primary."""
+        tracker = probed_tracker(['replica_a', 'replica_b'])
+        router, patcher = make_router(tracker)
+        with patcher:
+            self.assertNotEqual(router._select_read_database(), 'default')
+            router.db_for_write(None)
+            self.assertTrue(is_pinned_to_primary())
+            self.assertEqual(router._select_read_database(), 'default')
+
+    def test_task_signals_clear_the_pin(self):
+        """Test that a pin set by one Celery task does not reach the next."""
+        from celery.signals import task_postrun, task_prerun
+
+        set_primary_pin(time.time() + 10)
+        task_postrun.send(sender=None, task_id='1', task=None)
+        self.assertFalse(is_pinned_to_primary())
+
+        set_primary_pin(time.time() + 10)
+        task_prerun.send(sender=None, task_id='2', task=None)
+        self.assertFalse(is_pinned_to_primary())
+
+    def test_middleware_sets_cookie_after_write(self):
+        """Test that a writing request leaves a cookie pinning the next ones."""
+        def view(request):
+            set_primary_pin(time.time() + 10)
+            return HttpResponse('ok')
+
+        response = ReadYourWritesMiddleware(view)(RequestFactory().post('/'))
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        # The pin does not leak to the next request on this worker
+        self.assertEqual(get_primary_pin(), 0.0)
+
+    def test_middleware_restores_pin_from_cookie(self):
+        """Test that a pinned client keeps reading from the primary."""
+        seen = {}
+
+        def view(request):
+            seen['pinned'] = is_pinned_to_primary()
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = str(time.time() + 5)
+        response = ReadYourWritesMiddleware(view)(request)
+        self.assertTrue(seen['pinned'])
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_forged_cookie_is_capped(self):
+        """Test that a far-future cookie pins for at most one window."""
+        seen = {}
+
+        def view(request):
+            seen['pin'] = get_primary_pin()
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = str(time.time() + 10 ** 9)
+        ReadYourWritesMiddleware(view)(request)
+        self.assertLess(seen['pin'], time.time() + 60)
@@ -0,0 +1,147 @@
+"""
+Tests for the streaming export pipeline.
+"""
+import gzip
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from core.streaming_export import (
+    export_filename, gzip_stream, iter_export_bytes, iter_queryset, streaming_export_response, write_export
+)
+
+User = get_user_model()
+
+ROWS = [
+    {'name': 'Pen', 'price': 10},
+    {'name': 'Ink & paper', 'price': None},
+]
+
+
+def encode(rows, export_format, **kwargs):
+    return b''.join(iter_export_bytes(iter(rows), export_format, **kwargs)).decode('utf-8')
+
+
+class EncoderTest(TestCase):
+    """Test cases for incremental encoding."""
+
+    def test_csv_uses_headers_in_order(self):
+        """Test that CSV columns follow the given headers."""
+        content = encode(ROWS, 'csv', headers=['price', 'name'])
+        self.assertEqual(content.splitlines(), ['price,name', '10,Pen', ',Ink & paper'])
+
+    def test_headers_default_to_first_row(self):
+        """Test that the first row's keys are used when no headers are given."""
+        self.assertEqual(encode(ROWS, 'csv').splitlines()[0], 'name,price')
+
+    def test_json_and_json_lines(self):
+        """Test that JSON is an array and JSON lines one object per line."""
+        self.assertEqual(json.loads(encode(ROWS, 'json')), ROWS)
+        self.assertEqual(json.loads(encode([], 'json')), [])
+        self.assertEqual([json.loads(line) for line in encode(ROWS, 'jsonl').splitlines()], ROWS)
+
+    def test_xml_escapes_values(self):
+        """Test that XML values are escaped."""
+        content = encode(ROWS, 'xml')
+        self.assertIn('<name>Ink &amp; paper</name><price></price>', content)
+        self.assertTrue(content.endswith('</data>'))
+
+    @override_settings(STREAMING_EXPORT={'BUFFER_SIZE': 16})
+    def test_output_is_yielded_in_pieces(self):
+        """Test that bytes are handed out as the buffer fills."""
+        rows = [{'name': f'product {index}'} for index in range(10)]
+        chunks = list(iter_export_bytes(iter(rows), 'csv'))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks).decode('utf-8').count('\n'), 11)
+
+    def test_unsupported_format(self):
+        """Test that unknown formats are rejected."""
+        with self.assertRaises(ValueError):
+            iter_export_bytes(iter(ROWS), 'pdf')
+
+    def test_gzip_stream(self):
+        """Test that gzipped chunks decompress to the original bytes."""
+        chunks = [b'name,price\r\n', b'Pen,10\r\n']
+        self.assertEqual(gzip.decompress(b''.join(gzip_stream(iter(chunks)))), b''.join(chunks))
+
+    def test_export_filename(self):
+        """Test that Excel exports get the xlsx extension and compressed ones .gz."""
+        self.assertEqual(export_filename('report', 'excel'), 'report.xlsx')
+        self.assertEqual(export_filename('report', 'jsonl', compress=True), 'report.jsonl.gz')
+
+
+class IterQuerysetTest(TestCase):
+    """Test cases for chunked queryset reads."""
+
+    def setUp(self):
+        for index in range(5):
+            User.objects.create_user(username=f'user{index}', email=f'user{index}@example.com')
+
+    def test_keyset_pages_by_primary_key(self):
+        """Test that unordered querysets are read one short query per chunk."""
+        with self.assertNumQueries(3):
+            users = list(iter_queryset(User.objects.all(), chunk_size=2))
+        self.assertEqual([user.username for user in users], [f'user{index}' for index in range(5)])
+
+    def test_values_querysets(self):
+        """Test that values() rows are paged by their primary key."""
+        rows = list(iter_queryset(User.objects.values('id', 'username'), chunk_size=2))
+        self.assertEqual([row['username'] for row in rows], [f'user{index}' for index in range(5)])
+
+    def test_ordered_querysets_keep_their_order(self):
+        """Test that an explicit ordering is respected."""
+        with self.assertNumQueries(3):
+            users = list(iter_queryset(User.objects.order_by('-username'), chunk_size=2))
+        self.assertEqual([user.username for user in users], [f'user{index}' for index in reversed(range(5))])
+
+    def test_ordering_ties_are_broken_by_primary_key(self):
+        """Test that keyset pages over duplicate sort values skip and repeat nothing."""
+        User.objects.filter(username__in=['user1', 'user3']).update(first_name='b')
+        rows = list(iter_queryset(User.objects.order_by('-first_name').values('id', 'first_name', 'username'), 2))
+        self.assertEqual([row['username'] for row in rows], ['user1', 'user3', 'user0', 'user2', 'user4'])
+
+    def test_nullable_ordering_falls_back_to_iterator(self):
+        """Test that orderings keyset paging cannot follow still return every row."""
+        users = list(iter_queryset(User.objects.order_by('last_login', 'username'), chunk_size=2))
+        self.assertEqual(len(users), 5)
+
+
+class WriteExportTest(TestCase):
+    """Test cases for writing exports to storage and responses."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_write_export_saves_to_storage(self):
+        """Test that the file is stored and its size and row count reported."""
+        result = write_export(iter(ROWS), 'jsonl', 'exports/products.jsonl')
+
+        self.assertEqual(result['rows'], 2)
+        with default_storage.open(result['file_path'], 'rb') as file:
+            content = file.read()
+        self.assertEqual(len(content), result['file_size'])
+        self.assertEqual(len(content.splitlines()), 2)
+
+    def test_write_export_compressed(self):
+        """Test that compressed exports are gzipped."""
+        result = write_export(iter(ROWS), 'csv', 'exports/products.csv.gz', compress=True)
+
+        with default_storage.open(result['file_path'], 'rb') as file:
+            content = gzip.decompress(file.read()).decode('utf-8')
+        self.assertEqual(content.splitlines()[0], 'name,price')
+
+    def test_streaming_response(self):
+        """Test that rows are streamed as an attachment."""
+        response = streaming_export_response(iter(ROWS), 'csv', 'products.csv')
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('products.csv', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content).decode('utf-8').splitlines()[1], 'Pen,10')
@@ -5,7 +5,7 @@ import uuid
 import hashlib
 import secrets
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.conf import settings
@@ -135,6 +135,12 @@ def paginate_queryset(queryset, page_size: int = 20, page: int = 1):
     }
 
 
+def chunks(items: Sequence, size: int) -> Iterator[List]:
+    """Split a sequence into consecutive slices of at most ``size`` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 def send_notification_email(to_email: str, subject: str, template: str, context: Dict[str, Any]):
     """
     Send notification email using Django's email system.
@@ -22,6 +22,7 @@ from apps.notifications import routing as notification_routing
 from apps.orders import routing as order_routing
 from apps.inventory import routing as inventory_routing
 from apps.debugging import routing as debugging_routing
+from core import routing as realtime_routing
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
@@ -33,6 +34,7 @@ application = ProtocolTypeRouter({
                 *order_routing.websocket_urlpatterns,
                 *inventory_routing.websocket_urlpatterns,
                 *debugging_routing.websocket_urlpatterns,
+                *realtime_routing.websocket_urlpatterns,
             ])
         )
     ),
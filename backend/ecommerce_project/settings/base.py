@@ -102,10 +102,13 @@ MIDDLEWARE = [
     'apps.authentication.middleware.AccountLockoutMiddleware',
     'apps.authentication.middleware.IPSecurityMonitoringMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.rate_limit_middleware.RateLimitMiddleware',  # Shared API rate limits
+    'core.middleware.read_your_writes_middleware.ReadYourWritesMiddleware',  # Reads follow writes to the primary
     'core.middleware.database_security_middleware.DatabaseSecurityMiddleware',
     'core.middleware.database_security_middleware.AuthenticationSecurityMiddleware',
     'apps.debugging.middleware.CorrelationIdMiddleware',  # Correlation ID tracking
     'apps.debugging.middleware.DebuggingMiddleware',  # Debugging and monitoring
+    'apps.caching.middleware.CachingMiddleware',  # Single-flight page cache for anonymous GETs
     'core.db_logging.DatabaseLoggingMiddleware',  # Database query logging
     # 'core.middleware.APIVersionMiddleware',  # Not implemented yet
     # 'core.middleware.RequestLoggingMiddleware',  # Not implemented yet
@@ -219,6 +222,8 @@ READ_ONLY_APPS = ['analytics', 'reports', 'search']
 WRITE_ONLY_APPS = ['admin', 'auth', 'contenttypes', 'sessions']
 READ_ONLY_MODELS = []
 REPLICA_LAG_THRESHOLD = config('REPLICA_LAG_THRESHOLD', default=5, cast=int)  # seconds
+REPLICA_PROBE_INTERVAL = config('REPLICA_PROBE_INTERVAL', default=5, cast=int)  # seconds, background lag/latency probes
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)  # reads stay on the primary after a write
 
 # Connection Monitoring Settings (disabled during testing)
 CONNECTION_MONITORING_ENABLED = config('CONNECTION_MONITORING_ENABLED', default=False, cast=bool)
@@ -323,6 +328,130 @@ AUTH_RATE_LIMITING = {
     'ADMIN_LOGIN_WINDOW': config('AUTH_ADMIN_LOGIN_RATE_WINDOW', default=900, cast=int),  # 15 minutes
 }
 
+# API Rate Limiting Settings (see core.rate_limit)
+API_RATE_LIMITING = {
+    'ENABLED': config('API_RATE_LIMITING_ENABLED', default=True, cast=bool),
+    'BACKEND': config('API_RATE_LIMITING_BACKEND', default='redis'),  # redis or local
+    'EXEMPT_STAFF': True,
+    # Proxies in front of the app that append to X-Forwarded-For; 0 uses REMOTE_ADDR
+    'TRUSTED_PROXY_COUNT': config('API_RATE_LIMIT_TRUSTED_PROXIES', default=0, cast=int),
+    'POLICIES': [
+        # Checked in addition to the general API limit
+        {
+            'name': 'api-write',
+            'path': r'^/api/',
+            'methods': ['POST', 'PUT', 'PATCH', 'DELETE'],
+            'key': 'user_or_ip',
+            'limit': config('API_WRITE_RATE_LIMIT', default=120, cast=int),
+            'window': 60,
+        },
+        {
+            'name': 'api',
+            'path': r'^/api/',
+            'key': 'user_or_ip',
+            'limit': config('API_RATE_LIMIT', default=1000, cast=int),  # requests per hour
+            'window': 3600,
+        },
+    ],
+    'LOCAL_MAX_KEYS': 100000,
+    'BLOCKED_CACHE_SIZE': 10000,
+}
+
+# Request metrics pipeline (see core.metrics_pipeline)
+METRICS_PIPELINE = {
+    'ENABLED': config('METRICS_PIPELINE_ENABLED', default=True, cast=bool),
+    'FLUSH_INTERVAL': config('METRICS_PIPELINE_FLUSH_INTERVAL', default=10, cast=int),  # seconds
+    'MAX_PENDING': 50000,  # records queued per process before the oldest are dropped
+    'BATCH_SIZE': 500,
+}
+
+# MultiLevelCacheManager value codec and in-process L1 tier (see apps.caching.cache_manager)
+MULTI_LEVEL_CACHE = {
+    'SERIALIZER': config('MULTI_LEVEL_CACHE_SERIALIZER', default='pickle'),  # pickle, msgpack or json
+    'COMPRESSOR': config('MULTI_LEVEL_CACHE_COMPRESSOR', default='zstd'),  # zstd, lz4, zlib, gzip or none
+    'COMPRESSION_THRESHOLD': 1024,  # bytes; smaller values are stored uncompressed
+    'L1_ENABLED': config('MULTI_LEVEL_CACHE_L1_ENABLED', default=True, cast=bool),
+    'L1_MAX_ENTRIES': 10000,
+    'L1_TTL': 30,  # seconds
+    'L1_MAX_VALUE_SIZE': 64 * 1024,  # bytes; larger values skip the L1 tier
+    'L1_KEY_VERSION_SLOTS': 1024,  # per-cache version slots that sets and deletes bump
+    'VERSION_CHECK_INTERVAL': 1.0,  # seconds between reads of a cache's version
+    'CONFIG_CACHE_TTL': 60,  # seconds to memoize CacheConfiguration lookups
+}
+
+# Full-page cache for anonymous GET requests (see apps.caching.middleware.CachingMiddleware)
+PAGE_CACHE = {
+    'CACHE_NAME': 'page_cache',  # CacheConfiguration used for storage
+    'STALE_TTL': 60,  # seconds an expired page is served while one request regenerates it
+    'LOCK_TIMEOUT': 30,  # seconds before a regeneration lock is abandoned
+    'WAIT_TIMEOUT': 1.0,  # seconds a request waits for a page another request is generating
+    'MAX_BODY_SIZE': 1024 * 1024,  # bytes; larger responses are not cached
+    # Path prefixes never cached: admin, API and live monitoring pages
+    'SKIP_PATHS': (
+        '/admin/', '/api/', '/db-admin/', '/admin-panel/',
+        '/health/', '/alerts/', '/dashboard/', '/production/', '/__debug__/',
+    ),
+}
+
+# Concurrent carrier serviceability checks and rate shopping (see apps.shipping.serviceability)
+SHIPPING_FANOUT = {
+    'MAX_WORKERS': config('SHIPPING_FANOUT_MAX_WORKERS', default=16, cast=int),  # carrier calls in flight per process
+    'CARRIER_TIMEOUT': (3.05, 10),  # (connect, read) seconds per carrier request
+    'OVERALL_TIMEOUT': 8,  # seconds to wait for all carriers before reporting stragglers as timed out
+    'SERVICEABILITY_TTL': 6 * 60 * 60,  # seconds
+    'RATE_TTL': 30 * 60,  # seconds
+    'WEIGHT_BANDS': (0.5, 1, 2, 5, 10, 20, 50),  # kg; weights are rounded up to their band
+    'BULK_CHUNK_SIZE': 50,  # pin codes per carrier request when the carrier supports bulk lookups
+}
+
+# Shared HTTP clients and auth token cache for shipping partner APIs (see apps.shipping.carrier_client)
+SHIPPING_CARRIER_CLIENT = {
+    'POOL_SIZE': 16,  # keep-alive connections per carrier per process
+    'RETRIES': 3,  # for idempotent requests only
+    'DEADLINE_RETRIES': 1,  # connect/status retries for fan-out calls; read timeouts are never retried
+    'BACKOFF_FACTOR': 0.3,  # seconds; doubles on each retry
+    'RETRY_STATUSES': (429, 500, 502, 503, 504),
+    'TOKEN_LOCK_TIMEOUT': 15,  # seconds before an abandoned token refresh lock expires
+    'TOKEN_WAIT_TIMEOUT': 5,  # seconds to wait for another worker's login before logging in directly
+}
+
+# Bulk carrier tracking sync for in-flight shipments (see apps.shipping.tracking_sync)
+SHIPPING_TRACKING_SYNC = {
+    'MAX_WORKERS': config('SHIPPING_TRACKING_SYNC_MAX_WORKERS', default=8, cast=int),  # tracking requests in flight
+    'CHUNK_SIZE': 500,  # shipments fetched, tracked and written per round
+    'CHUNK_TIMEOUT': 120,  # seconds to wait for a round's carrier requests
+    'LOCK_TIMEOUT': 2 * 60 * 60,  # seconds before an abandoned run's lock expires
+    'STATS_TTL': 24 * 60 * 60,  # seconds the last run's report is kept
+}
+
+# In-memory compiled promotion rules for cart pricing (see apps.promotions.engine)
+PROMOTION_ENGINE = {
+    'CHECK_INTERVAL': 2,  # seconds between checks of the shared rules version
+    'MAX_AGE': 5 * 60,  # seconds before the index is rebuilt even without changes
+}
+
+# Streaming bulk imports for data management jobs (see apps.data_management.importer)
+DATA_IMPORT = {
+    # Processes transforming and coercing chunks while the previous chunk is written; 0 keeps it in
+    # process. Celery prefork workers cannot start child processes, so use it with --pool=solo/threads
+    'WORKERS': config('DATA_IMPORT_WORKERS', default=0, cast=int),
+    'MAX_LOGGED_ERRORS': 1000,  # row errors kept in a job's error log; later ones are only counted
+    'MAX_VALIDATION_ERRORS': 1000,  # validation errors reported before an import
+}
+
+# Batched fan-out for bulk notification campaigns (see apps.notifications.fanout)
+NOTIFICATION_FANOUT = {
+    'MAX_WORKERS': config('NOTIFICATION_FANOUT_MAX_WORKERS', default=8, cast=int),  # provider calls in flight
+    'CHUNK_SIZE': 1000,  # recipients loaded, stored and sent per round
+    'SEND_BATCH_SIZE': 100,  # notifications per provider call (one mail connection, one SMS request)
+}
+
+# Streaming exports for data management jobs and reports (see core.streaming_export)
+STREAMING_EXPORT = {
+    'CHUNK_SIZE': config('STREAMING_EXPORT_CHUNK_SIZE', default=2000, cast=int),  # rows fetched per query
+    'BUFFER_SIZE': 64 * 1024,  # bytes encoded before a chunk is written or sent
+}
+
 # Account Lockout Settings
 ACCOUNT_LOCKOUT = {
     'ENABLED': config('ACCOUNT_LOCKOUT_ENABLED', default=True, cast=bool),
@@ -473,6 +602,17 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Multiplexed WebSocket gateway at ws/realtime/ (see core.realtime)
+REALTIME_GATEWAY = {
+    'FLUSH_INTERVAL': 0.1,  # seconds updates are held so bursts go out as one batch frame; 0 sends at once
+    'MAX_BATCH_SIZE': 100,  # queued updates that trigger an immediate batch frame
+    'MAX_SUBSCRIPTIONS': 50,  # topics per socket
+    'MAX_MESSAGE_LENGTH': 4000,  # characters per published chat message
+    'CHAT_WRITE_INTERVAL': 0.5,  # seconds chat messages wait before being stored together
+    'CHAT_WRITE_BATCH_SIZE': 200,  # queued chat messages that trigger an immediate write
+    'CHAT_MAX_PENDING': 10000,  # unsaved chat messages kept while the database is unavailable
+}
+
 # DRF Spectacular Settings - Temporarily disabled
 # SPECTACULAR_SETTINGS = {
 #     'TITLE': 'E-Commerce Platform API',
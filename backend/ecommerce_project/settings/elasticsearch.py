@@ -64,5 +64,23 @@ ELASTICSEARCH_TIMEOUT = config('ELASTICSEARCH_TIMEOUT', default=60, cast=int)
 # Elasticsearch bulk indexing size
 ELASTICSEARCH_BULK_SIZE = config('ELASTICSEARCH_BULK_SIZE', default=100, cast=int)
 
+# Coalescing indexing queue: changes within the window are flushed together
+ELASTICSEARCH_INDEXING_WINDOW = config('ELASTICSEARCH_INDEXING_WINDOW', default=5, cast=int)  # seconds
+ELASTICSEARCH_INDEXING_BATCH_SIZE = config('ELASTICSEARCH_INDEXING_BATCH_SIZE', default=500, cast=int)
+ELASTICSEARCH_INDEXING_MAX_RETRIES = config('ELASTICSEARCH_INDEXING_MAX_RETRIES', default=3, cast=int)
+
+# Alias-swap full rebuilds: documents per bulk request and default parallel slices
+ELASTICSEARCH_REINDEX_CHUNK_SIZE = config('ELASTICSEARCH_REINDEX_CHUNK_SIZE', default=1000, cast=int)
+ELASTICSEARCH_REINDEX_SLICES = config('ELASTICSEARCH_REINDEX_SLICES', default=1, cast=int)
+
+# Search result cache: seconds each kind stays fresh, then may be served stale while refreshing
+SEARCH_CACHE_ENABLED = config('SEARCH_CACHE_ENABLED', default=True, cast=bool)
+SEARCH_CACHE_TTLS = {
+    'results': config('SEARCH_CACHE_RESULTS_TTL', default=60, cast=int),
+    'suggestions': config('SEARCH_CACHE_SUGGESTIONS_TTL', default=300, cast=int),
+    'filter_options': config('SEARCH_CACHE_FILTER_OPTIONS_TTL', default=600, cast=int),
+}
+SEARCH_CACHE_STALE_TTL = config('SEARCH_CACHE_STALE_TTL', default=300, cast=int)
+
 # Elasticsearch search result size limit
 ELASTICSEARCH_MAX_RESULT_WINDOW = config('ELASTICSEARCH_MAX_RESULT_WINDOW', default=10000, cast=int)
\ No newline at end of file
@@ -38,6 +38,10 @@ CACHES = {
     }
 }
 
+SEARCH_CACHE_ENABLED = False
+TRENDING_ENABLED = False
+API_RATE_LIMITING = {**API_RATE_LIMITING, 'ENABLED': False}
+
 # Disable password validation for tests
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -10,11 +10,16 @@ from django.utils import timezone
 from django.conf import settings
 from django.urls import resolve, Resolver404
 
+from core.metrics_pipeline import BulkCreateSink, record_metric, register_sink
+
 # Create dedicated loggers
 request_logger = logging.getLogger('request')
 performance_logger = logging.getLogger('performance')
 security_logger = logging.getLogger('security')
 
+# Slow requests are bulk-created by the shared metrics pipeline
+SLOW_REQUEST_SINK = 'logs.slow_request'
+
 class RequestLoggingMiddleware:
     """
     Middleware to log all HTTP requests.
@@ -372,6 +377,7 @@ class PerformanceMonitoringMiddleware:
         self.slow_threshold_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
         self.very_slow_threshold_ms = getattr(settings, 'VERY_SLOW_REQUEST_THRESHOLD_MS', 2000)
         self.track_all_requests = getattr(settings, 'TRACK_ALL_REQUEST_PERFORMANCE', False)
+        register_sink(SLOW_REQUEST_SINK, BulkCreateSink('logs.PerformanceMetric'))
     
     def __call__(self, request):
         start_time = time.time()
@@ -480,15 +486,13 @@ class PerformanceMonitoringMiddleware:
         
         # Store performance metric in database for analysis
         try:
-            from apps.logs.models import PerformanceMetric
-            
-            PerformanceMetric.objects.create(
+            record_metric(SLOW_REQUEST_SINK, None, dict(
                 name='slow_request',
                 value=duration_ms,
                 endpoint=request.path,
                 method=request.method,
                 response_time=duration_ms
-            )
+            ))
         except Exception as e:
             # Log the error but don't fail the request
             self.performance_logger.error(f"Failed to store performance metric: {str(e)}")
\ No newline at end of file
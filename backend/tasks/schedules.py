@@ -205,6 +205,20 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(hour=3, minute=0, day_of_week=1),
         'options': {'queue': 'monitoring'}
     },
+    
+    # Persist decayed trending product lists every 15 minutes
+    'snapshot-trending-products': {
+        'task': 'apps.products.trending.snapshot_trending_products',
+        'schedule': crontab(minute='*/15'),
+        'options': {'queue': 'maintenance'}
+    },
+    
+    # Refresh carrier tracking for in-flight shipments every 30 minutes
+    'sync-shipment-tracking': {
+        'task': 'apps.shipping.tasks.sync_shipment_tracking',
+        'schedule': crontab(minute='*/30'),
+        'options': {'queue': 'orders'}
+    },
 }
 
 # Task routing configuration
@@ -247,6 +261,16 @@ CELERY_TASK_ROUTES = {
     # Search tasks
     'apps.search.signals.update_document': {'queue': 'search'},
     'apps.search.signals.delete_document': {'queue': 'search'},
+    'apps.search.indexing.flush_index_queue': {'queue': 'search'},
+    'apps.search.reindex.reindex_slice_task': {'queue': 'search'},
+    'apps.search.reindex.finalize_reindex_task': {'queue': 'search'},
+    'apps.search.cache.refresh_search_cache': {'queue': 'search'},
+    
+    # Product tasks
+    'apps.products.trending.snapshot_trending_products': {'queue': 'maintenance'},
+    
+    # Shipping tasks
+    'apps.shipping.tasks.sync_shipment_tracking': {'queue': 'orders'},
     
     # Database maintenance tasks
     'tasks.database_maintenance_tasks.run_daily_maintenance_task': {'queue': 'maintenance'},